@@ -18,6 +18,11 @@ import os
 import sys
 import inspect
 import ctypes
+import time
+import queue
+import codecs
+import threading
+import selectors
 import subprocess
 import traceback
 import logging
@@ -25,6 +30,7 @@ import platform
 import ast
 import re
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
 from inspect import isasyncgen, isawaitable
 from typing import Any
@@ -243,47 +249,26 @@ class RunTool(object):
         if _shell_encoding is None:
             _shell_encoding = cls.get_global_var('SHELL_ENCODING', default='utf-8')
 
-        _sp = subprocess.Popen(
-            cmd, close_fds=True,
-            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            shell=True
-        )
-
-        # 循环等待执行完成
-        _exit_code = None
-        _info_str = ''
-        while True:
-            # 判断是否中止执行
-            if stop_var is not None and len(stop_var) > 0:
-                if stop_var[0]:
-                    # 需要强制结束进程
-                    if use_stop_signal is None:
-                        _sp.terminate()
-                    else:
-                        os.kill(_sp.pid, use_stop_signal)
-
-                    _info_str += '\nkilled with singal'
-                    _exit_code = 0
-                    break
-
-            # 获取输出信息 .replace('\r', '').replace('\n', '')
-            _info_str += _sp.stdout.read().decode(
-                _shell_encoding
-            )
-
-            _exit_code = _sp.poll()
-            if _exit_code is not None:
-                # 结束, 打印异常日志
-                _info_str += _sp.stdout.read().decode(_shell_encoding)
-                if _exit_code != 0:
-                    _info_str += _sp.stderr.read().decode(_shell_encoding)
-
-                # 关闭输出管道
-                _sp.stdout.close()
-                break
-
-            # 释放一下CPU
-            cls.sleep(0.01)
+        # 同时读取stdout和stderr, 避免stderr管道写满导致子进程阻塞
+        _stdout = list()
+        _stderr = list()
+        _exit_code_var = list()
+        for _stream, _text in cls.iter_sys_cmd(
+            cmd, shell_encoding=_shell_encoding, stop_var=stop_var, use_stop_signal=use_stop_signal,
+            by_line=False, exit_code_var=_exit_code_var
+        ):
+            (_stdout if _stream == 'stdout' else _stderr).append(_text)
+
+        _info_str = ''.join(_stdout)
+        _stdout.clear()  # 尽早释放数据块, 降低内存占用峰值
+        if stop_var is not None and len(stop_var) > 0 and stop_var[0]:
+            # 强制结束进程
+            _info_str += '\nkilled with singal'
+            _exit_code = 0
+        else:
+            _exit_code = _exit_code_var[0]
+            if _exit_code != 0:
+                _info_str += ''.join(_stderr)
 
         # 格式化
         if sys.platform == 'darwin':
@@ -358,6 +343,287 @@ class RunTool(object):
 
         return (_exit_code, _info_str.split('\n'))
 
+    @classmethod
+    def iter_sys_cmd(cls, cmd: str, shell_encoding: str = None, stop_var: list = None,
+                     use_stop_signal: int = None, timeout: float = None, by_line: bool = True,
+                     read_size: int = 65536, max_line_size: int = 1048576, exit_code_var: list = None,
+                     stop_wait_time: float = 5.0):
+        """
+        执行系统命令并以迭代方式获取输出信息
+        注: 同时读取stdout和stderr, 内存中只保留未输出的缓存(不超过read_size或max_line_size)
+
+        @param {str} cmd - 要执行的命令
+        @param {str} shell_encoding=None - 传入指定的编码
+            注: 如果不传入, 尝试获取全局变量 SHELL_ENCODING, 如果也找不到, 则默认为'utf-8'
+        @param {list} stop_var=None - 用于在运行过程中在外部设置停止标志的列表变量, 第一个值为True时停止执行
+        @param {int} use_stop_signal=None - 使用指定signal进行中止, 例如 signal.CTRL_C_EVENT
+        @param {float} timeout=None - 执行超时时间, 单位为秒, 超时将结束进程并抛出subprocess.TimeoutExpired异常
+        @param {bool} by_line=True - 是否按行返回, 如果为False则按读取到的数据块返回
+        @param {int} read_size=65536 - 每次从管道读取的最大字节数
+        @param {int} max_line_size=1048576 - 按行返回时单行的最大字符数, 超过时直接返回已缓存的内容
+        @param {list} exit_code_var=None - 用于获取命令退出码的列表变量, 执行完成后将退出码放入列表
+            注: 进程结束失败时放入None
+        @param {float} stop_wait_time=5.0 - 结束进程时等待进程退出的最长时间, 单位为秒
+            注: 超过该时间将强制结束进程(kill)并再等待相同时间, 仍未退出则不再等待
+
+        @returns {generator} - 输出信息迭代对象, 每次返回(stream, text)
+            stream {str} - 输出来源, 'stdout'或'stderr'
+            text {str} - 输出内容, 按行返回时不包含换行符
+        """
+        _shell_encoding = shell_encoding
+        if _shell_encoding is None:
+            _shell_encoding = cls.get_global_var('SHELL_ENCODING', default='utf-8')
+
+        _sp = subprocess.Popen(
+            cmd, close_fds=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            shell=True
+        )
+        _sp.stdin.close()
+
+        _end_time = None if timeout is None else time.monotonic() + timeout
+        _decoders = {
+            'stdout': codecs.getincrementaldecoder(_shell_encoding)(errors='replace'),
+            'stderr': codecs.getincrementaldecoder(_shell_encoding)(errors='replace')
+        }
+        _line_caches = {'stdout': '', 'stderr': ''}
+        _is_stop = False
+        _reader = cls._read_process_pipes(_sp, read_size)
+        try:
+            for _stream, _data in _reader:
+                if _data is not None:
+                    _text = _decoders[_stream].decode(_data)
+                    if not by_line:
+                        if _text != '':
+                            yield _stream, _text
+                    else:
+                        # 按行拆分, 未完整的行放入缓存
+                        _lines = (_line_caches[_stream] + cls._format_cmd_text(_text)).split('\n')
+                        _line_caches[_stream] = _lines.pop()
+                        for _line in _lines:
+                            yield _stream, _line
+
+                        if len(_line_caches[_stream]) > max_line_size:
+                            yield _stream, _line_caches[_stream]
+                            _line_caches[_stream] = ''
+
+                # 判断是否中止执行
+                if stop_var is not None and len(stop_var) > 0 and stop_var[0]:
+                    _is_stop = True
+                    break
+
+                if _end_time is not None and time.monotonic() >= _end_time:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+
+            if not _is_stop:
+                # 输出剩余的内容
+                for _stream, _decoder in _decoders.items():
+                    _text = _decoder.decode(b'', final=True)
+                    if by_line:
+                        _text = _line_caches[_stream] + cls._format_cmd_text(_text)
+                        if _text != '':
+                            yield _stream, _text
+                    elif _text != '':
+                        yield _stream, _text
+        finally:
+            _reader.close()
+            if _sp.poll() is None:
+                # 未执行完成(中止、超时或调用方提前结束迭代), 结束进程
+                if use_stop_signal is None:
+                    _sp.terminate()
+                else:
+                    os.kill(_sp.pid, use_stop_signal)
+
+            _sp.stdout.close()
+            _sp.stderr.close()
+            try:
+                _exit_code = _sp.wait(timeout=stop_wait_time)
+            except subprocess.TimeoutExpired:
+                # 进程未响应结束信号, 强制结束
+                _sp.kill()
+                try:
+                    _exit_code = _sp.wait(timeout=stop_wait_time)
+                except subprocess.TimeoutExpired:
+                    _exit_code = None
+
+            if exit_code_var is not None:
+                exit_code_var.append(_exit_code)
+
+    @classmethod
+    def exec_sys_cmd_stream(cls, cmd: str, output_fun=None, shell_encoding: str = None,
+                            stop_var: list = None, use_stop_signal: int = None, timeout: float = None,
+                            by_line: bool = True, read_size: int = 65536) -> int:
+        """
+        执行系统命令并通过回调函数实时处理输出信息
+
+        @param {str} cmd - 要执行的命令
+        @param {function} output_fun=None - 输出信息处理函数, fun(stream, text), 不传代表丢弃输出信息
+            stream {str} - 输出来源, 'stdout'或'stderr'
+            text {str} - 输出内容, 按行返回时不包含换行符
+        @param {str} shell_encoding=None - 传入指定的编码
+        @param {list} stop_var=None - 用于在运行过程中在外部设置停止标志的列表变量, 第一个值为True时停止执行
+        @param {int} use_stop_signal=None - 使用指定signal进行中止, 例如 signal.CTRL_C_EVENT
+        @param {float} timeout=None - 执行超时时间, 单位为秒, 超时将结束进程并抛出subprocess.TimeoutExpired异常
+        @param {bool} by_line=True - 是否按行返回, 如果为False则按读取到的数据块返回
+        @param {int} read_size=65536 - 每次从管道读取的最大字节数
+
+        @returns {int} - 命令退出码, 0代表成功
+        """
+        _exit_code_var = list()
+        for _stream, _text in cls.iter_sys_cmd(
+            cmd, shell_encoding=shell_encoding, stop_var=stop_var, use_stop_signal=use_stop_signal,
+            timeout=timeout, by_line=by_line, read_size=read_size, exit_code_var=_exit_code_var
+        ):
+            if output_fun is not None:
+                output_fun(_stream, _text)
+
+        return _exit_code_var[0]
+
+    @classmethod
+    def run_many(cls, cmds: list, max_workers: int = 4, timeout: float = None,
+                 shell_encoding: str = None, stop_var: list = None, output_fun=None) -> list:
+        """
+        并发执行多个系统命令
+
+        @param {list} cmds - 要执行的命令清单
+        @param {int} max_workers=4 - 同时执行的最大命令数
+        @param {float} timeout=None - 每个命令的执行超时时间, 单位为秒
+        @param {str} shell_encoding=None - 传入指定的编码
+        @param {list} stop_var=None - 用于在运行过程中在外部设置停止标志的列表变量, 第一个值为True时停止所有命令
+        @param {function} output_fun=None - 输出信息处理函数, fun(index, stream, line), 传入时不再收集输出信息
+            index {int} - 命令在清单中的序号
+            stream {str} - 输出来源, 'stdout'或'stderr'
+            line {str} - 输出行内容
+
+        @returns {list} - 按命令清单顺序返回的执行结果列表, 每个结果为(exit_code, list)
+            exit_code {int} - 命令退出码, 0代表成功, 超时返回None
+            list {list} - 输出信息行数组, 与exec_sys_cmd的处理方式一致(失败时包含stderr的信息)
+        """
+        def _run(index: int, cmd: str):
+            _stdout = list()
+            _stderr = list()
+            if output_fun is None:
+                _fun = (lambda stream, line: (_stdout if stream == 'stdout' else _stderr).append(line))
+            else:
+                _fun = (lambda stream, line: output_fun(index, stream, line))
+
+            try:
+                _exit_code = cls.exec_sys_cmd_stream(
+                    cmd, output_fun=_fun, shell_encoding=shell_encoding, stop_var=stop_var,
+                    timeout=timeout
+                )
+            except subprocess.TimeoutExpired:
+                return (None, _stdout + _stderr + ['timeout after %s seconds' % str(timeout)])
+
+            if _exit_code != 0:
+                _stdout.extend(_stderr)
+            return (_exit_code, _stdout)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as _executor:
+            _futures = [_executor.submit(_run, _index, _cmd) for _index, _cmd in enumerate(cmds)]
+            return [_future.result() for _future in _futures]
+
+    @classmethod
+    def _format_cmd_text(cls, text: str) -> str:
+        """
+        格式化命令输出的内容(与exec_sys_cmd的处理一致)
+
+        @param {str} text - 输出内容
+
+        @returns {str} - 格式化后的内容
+        """
+        if sys.platform == 'darwin':
+            # mac os, \r 代表回车换行
+            return text.replace('\r', '\n')
+        else:
+            # \r 代表回车  \n 代表换行
+            return text.replace('\r', '')
+
+    @classmethod
+    def _read_process_pipes(cls, sp: subprocess.Popen, read_size: int, wait_time: float = 0.1,
+                            use_selector: bool = None):
+        """
+        同时读取进程的stdout和stderr管道
+
+        @param {subprocess.Popen} sp - 进程对象
+        @param {int} read_size - 每次读取的最大字节数
+        @param {float} wait_time=0.1 - 无数据时的最长等待时间, 超时返回(None, None)以便调用方检查中止条件
+        @param {bool} use_selector=None - 是否通过selectors等待管道可读, 否则通过线程读取
+            注: 不传入时windows使用线程读取, 其他平台使用selectors
+
+        @returns {generator} - 每次返回(stream, data), 管道全部关闭后结束
+            注: 调用方提前结束迭代(close)时, 读取线程将在管道关闭或读取到下一个数据后退出
+        """
+        _pipes = {'stdout': sp.stdout, 'stderr': sp.stderr}
+        _use_selector = (sys.platform != 'win32') if use_selector is None else use_selector
+        if _use_selector:
+            # 通过selectors等待管道可读
+            with selectors.DefaultSelector() as _selector:
+                for _stream, _pipe in _pipes.items():
+                    _selector.register(_pipe, selectors.EVENT_READ, _stream)
+
+                while len(_selector.get_map()) > 0:
+                    _events = _selector.select(wait_time)
+                    if len(_events) == 0:
+                        yield None, None
+                        continue
+
+                    for _key, _ in _events:
+                        _data = os.read(_key.fileobj.fileno(), read_size)
+                        if _data == b'':
+                            # 管道已关闭
+                            _selector.unregister(_key.fileobj)
+                        else:
+                            yield _key.data, _data
+            return
+
+        # windows的管道不支持selectors, 通过线程读取并放入有界队列
+        _queue = queue.Queue(maxsize=16)
+        _stop_flag = threading.Event()
+
+        def _put(item) -> bool:
+            # 放入队列, 调用方已结束迭代时返回False
+            while not _stop_flag.is_set():
+                try:
+                    _queue.put(item, timeout=wait_time)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def _read_pipe(stream: str, pipe):
+            try:
+                while not _stop_flag.is_set():
+                    _data = pipe.read1(read_size)
+                    if _data == b'' or not _put((stream, _data)):
+                        break
+            except (OSError, ValueError):
+                # 调用方结束迭代后关闭了管道
+                if not _stop_flag.is_set():
+                    raise
+            finally:
+                _put((stream, None))
+
+        for _stream, _pipe in _pipes.items():
+            threading.Thread(target=_read_pipe, args=(_stream, _pipe), daemon=True).start()
+
+        try:
+            _open_num = len(_pipes)
+            while _open_num > 0:
+                try:
+                    _stream, _data = _queue.get(timeout=wait_time)
+                except queue.Empty:
+                    yield None, None
+                    continue
+
+                if _data is None:
+                    _open_num -= 1
+                else:
+                    yield _stream, _data
+        finally:
+            # 通知读取线程退出
+            _stop_flag.set()
+
     #############################
     # 线程处理函数
     #############################
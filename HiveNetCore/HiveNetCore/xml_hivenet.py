@@ -15,7 +15,10 @@
 import sys
 import os
 import re
+import io
+import codecs
 from enum import Enum
+from collections import OrderedDict
 import lxml.etree as ET
 import lxml.html as HT
 import elementpath
@@ -57,7 +60,8 @@ class SimpleXml(object):
     # 内部函数
     #############################
     def __init__(self, xml_obj, obj_type=EnumXmlObjType.File, encoding=None, use_chardet=True,
-                 parser: str = 'xml', register_namespace=None, use_xpath2=False, **kwargs):
+                 parser: str = 'xml', register_namespace=None, use_xpath2=False,
+                 xpath_cache_size: int = 100, **kwargs):
         """
         构造函数
 
@@ -67,6 +71,8 @@ class SimpleXml(object):
             obj_type = EnumXmlObjType.String 时, obj为报文文本
         @param {EnumXmlObjType} obj_type=EnumXmlObjType.File - xml对象类型
         @param {string} encoding=encoding - 装载字符编码, 如果传None代表自动判断
+            注: 自动判断时优先使用BOM和xml声明中的编码, 都没有时根据报文前面部分的内容判断,
+                前面部分只有ascii字符时根据后面第一个非ascii字符开始的内容判断
         @param {bool} use_chardet=True - 当自动判断的时候, 是否使用chardet库
         @param {str} parser='xml' - 解析器类型, 默认为xml
             xml - 标准xml解析器
@@ -75,6 +81,7 @@ class SimpleXml(object):
             {prefix: uri, prefix: uri, ... }  其中prefix和uri都为字符串
             注册命名空间后, 后续的节点就可以通过tag='{uri}tagname'的方式添加带命名空间的节点
         @param {bool} use_xpath2=False - 使用xpath2.0, 默认只支持xpath1.0
+        @param {int} xpath_cache_size=100 - 缓存已编译XPath搜索路径的最大数量, <=0代表不缓存
         @param {**kwargs} kwargs - 扩展的装载参数, 包括XMLParser的参数
             attribute_defaults - inject default attributes from DTD or XMLSchema
             dtd_validation - validate against a DTD referenced by the document
@@ -98,6 +105,9 @@ class SimpleXml(object):
         self.root = None  # xml对象的根对象
         self.encoding = encoding
         self.use_xpath2 = use_xpath2
+        # 已编译的XPath搜索路径缓存(LRU), key为(是否xpath2.0, xpath, 命名空间)
+        self._xpath_cache_size = xpath_cache_size
+        self._xpath_cache = OrderedDict()
         # 注册命名空间
         if register_namespace is not None:
             for _key in register_namespace.keys():
@@ -120,12 +130,7 @@ class SimpleXml(object):
 
         # 判断字符集
         if self.encoding is None:
-            if use_chardet:
-                self.encoding = chardet.detect(_xml_bytes)['encoding']
-                if self.encoding.startswith('ISO-8859'):
-                    self.encoding = 'gbk'
-            else:
-                self.encoding = 'utf-8'
+            self.encoding = self._sniff_encoding(_xml_bytes, use_chardet=use_chardet)
 
         # 生成root
         if parser == 'html':
@@ -290,6 +295,127 @@ class SimpleXml(object):
             _value = ''
         return _key, _value
 
+    def _get_selector(self, xpath: str, namespaces: dict = None):
+        """
+        获取已编译的XPath搜索对象(从缓存中获取, 不存在则编译并放入缓存)
+
+        @param {str} xpath - 符合XPath语法的搜索路径
+        @param {dict} namespaces=None - 命名空间
+
+        @returns {ET.XPath|elementpath.Selector} - 已编译的搜索对象
+        """
+        _key = (self.use_xpath2, xpath, None if namespaces is None else frozenset(namespaces.items()))
+        _selector = self._xpath_cache.get(_key, None)
+        if _selector is not None:
+            self._xpath_cache.move_to_end(_key)
+            return _selector
+
+        if self.use_xpath2:
+            # xpath2.0
+            _selector = elementpath.Selector(xpath, namespaces=namespaces)
+        else:
+            # xpath1.0
+            _selector = ET.XPath(xpath, namespaces=namespaces)
+
+        if self._xpath_cache_size > 0:
+            self._xpath_cache[_key] = _selector
+            if len(self._xpath_cache) > self._xpath_cache_size:
+                # 删除最久未使用的搜索对象
+                self._xpath_cache.popitem(last=False)
+
+        return _selector
+
+    def _select(self, xpath: str, namespaces: dict = None) -> list:
+        """
+        从根节点按xpath搜索节点
+
+        @param {str} xpath - 符合XPath语法的搜索路径
+        @param {dict} namespaces=None - 命名空间
+
+        @returns {list} - 匹配的节点清单
+        """
+        _selector = self._get_selector(xpath, namespaces=namespaces)
+        if self.use_xpath2:
+            return _selector.select(self.root)
+        else:
+            return _selector(self.root)
+
+    @staticmethod
+    def _sniff_encoding(xml_bytes: bytes, use_chardet: bool = True, sniff_size: int = 65536,
+                        file_handle=None) -> str:
+        """
+        判断xml报文的字符集
+        注: 报文前面部分只有ascii字符时, 查找后面第一个非ascii字符, 按从该位置开始的内容判断字符集
+
+        @param {bytes} xml_bytes - xml报文, 传入file_handle时为已读取的文件前面部分的内容
+        @param {bool} use_chardet=True - BOM和xml声明都没有指定编码时, 是否使用chardet库判断
+        @param {int} sniff_size=65536 - 用于判断字符集的报文最大长度
+        @param {FileIO} file_handle=None - 以二进制模式打开的文件句柄, 用于继续读取xml_bytes后面的内容
+
+        @returns {str} - 字符集
+        """
+        # BOM
+        for _bom, _encoding in (
+            (codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'),
+            (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')
+        ):
+            if xml_bytes.startswith(_bom):
+                return _encoding
+
+        # xml声明
+        _prefix = xml_bytes[0: sniff_size]
+        _match = re.match(br'\s*<\?xml[^>]*?\sencoding\s*=\s*["\']([A-Za-z][\w.\-]*)["\']', _prefix)
+        if _match is not None:
+            _encoding = _match.group(1).decode('ascii')
+            # gbk是gb2312的超集, 避免声明为gb2312但包含gbk字符的情况
+            return 'gbk' if _encoding.lower() == 'gb2312' else _encoding
+
+        if re.search(br'[\x80-\xff]', _prefix) is None:
+            # 前面部分只有ascii字符, 获取后面第一个非ascii字符开始的内容
+            _prefix = SimpleXml._get_non_ascii_bytes(xml_bytes, sniff_size, file_handle=file_handle)
+            if _prefix is None:
+                # 全部为ascii字符
+                return 'utf-8'
+
+        # 报文前面部分符合utf-8编码(最后一个字符可能被截断)
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(_prefix, final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+
+        if use_chardet:
+            _encoding = chardet.detect(_prefix)['encoding']
+            if _encoding is not None:
+                return 'gbk' if _encoding.startswith('ISO-8859') or _encoding.lower() == 'gb2312' else _encoding
+
+        return 'utf-8'
+
+    @staticmethod
+    def _get_non_ascii_bytes(xml_bytes: bytes, size: int, file_handle=None) -> bytes:
+        """
+        获取报文前面部分之后, 从第一个非ascii字符开始的内容
+
+        @param {bytes} xml_bytes - xml报文, 传入file_handle时为已读取的文件前面部分的内容
+        @param {int} size - 前面部分的长度, 同时也是返回内容的最大长度
+        @param {FileIO} file_handle=None - 以二进制模式打开的文件句柄, 用于继续读取xml_bytes后面的内容
+
+        @returns {bytes} - 从第一个非ascii字符开始的内容, 没有非ascii字符返回None
+        """
+        _pattern = re.compile(br'[\x80-\xff]')
+        if file_handle is None:
+            _match = _pattern.search(xml_bytes, size)
+            return None if _match is None else xml_bytes[_match.start(): _match.start() + size]
+
+        while True:
+            _data = file_handle.read(size)
+            if len(_data) == 0:
+                return None
+
+            _match = _pattern.search(_data)
+            if _match is not None:
+                return _data[_match.start():] + file_handle.read(_match.start())
+
     #############################
     # 文件操作
     #############################
@@ -365,12 +491,7 @@ class SimpleXml(object):
         if xpath is None:
             _node = self.root
         else:
-            if self.use_xpath2:
-                # xpath2.0
-                _nodes = elementpath.select(self.root, xpath, namespaces=namespaces)
-            else:
-                # xpath1.0
-                _nodes = self.root.xpath(xpath, namespaces=namespaces)
+            _nodes = self._select(xpath, namespaces=namespaces)
             if len(_nodes) > 0:
                 _node = _nodes[0]
 
@@ -410,17 +531,7 @@ class SimpleXml(object):
         if 'item_dict_xpaths' in kwargs.keys() and kwargs['item_dict_xpaths'] is not None:
             _item_dict_nodes = list()
             for _get_xpath in kwargs['item_dict_xpaths'].keys():
-                if self.use_xpath2:
-                    # xpath2.0
-                    _get_nodes = elementpath.select(
-                        self.root, _get_xpath, namespaces=kwargs['item_dict_xpaths'][_get_xpath]
-                    )
-                else:
-                    # xpath1.0
-                    _get_nodes = self.root.xpath(
-                        _get_xpath,
-                        namespaces=kwargs['item_dict_xpaths'][_get_xpath]
-                    )
+                _get_nodes = self._select(_get_xpath, namespaces=kwargs['item_dict_xpaths'][_get_xpath])
                 # 合并列表
                 _item_dict_nodes = _item_dict_nodes + _get_nodes
 
@@ -428,14 +539,7 @@ class SimpleXml(object):
         _roots = [self.root]
         if xpath is not None:
             # 获取全部匹配节点
-            if self.use_xpath2:
-                # xpath2.0
-                _roots = elementpath.select(
-                    self.root, xpath, namespaces=namespaces
-                )
-            else:
-                # xpath1.0
-                _roots = self.root.xpath(xpath, namespaces=namespaces)
+            _roots = self._select(xpath, namespaces=namespaces)
 
         # 生成字典
         _dict = dict()
@@ -460,12 +564,7 @@ class SimpleXml(object):
 
         @return {list} - 返回节点清单(返回的数组内部对象为ET._Element)
         """
-        if self.use_xpath2:
-            # xpath2.0
-            _els = elementpath.select(self.root, xpath, namespaces=namespaces)
-        else:
-            # xpath1.0
-            _els = self.root.xpath(xpath, namespaces=namespaces)
+        _els = self._select(xpath, namespaces=namespaces)
         return _els
 
     def get_xpath(self, node: ET._Element):
@@ -541,12 +640,7 @@ class SimpleXml(object):
 
         @return {ET._Element} - 返回匹配到的节点
         """
-        if self.use_xpath2:
-            # xpath2.0
-            _nodes = elementpath.select(self.root, xpath, namespaces=namespaces)
-        else:
-            # xpath1.0
-            _nodes = self.root.xpath(xpath, namespaces=namespaces)
+        _nodes = self._select(xpath, namespaces=namespaces)
         if len(_nodes) > 0:
             return _nodes[0].append(node)
         else:
@@ -606,12 +700,7 @@ class SimpleXml(object):
         @param {dict} namespaces=None - 命名空间
         @param {bool} hold_tail=False - 是否保留上一节点的tail信息
         """
-        if self.use_xpath2:
-            # xpath2.0
-            _nodes = elementpath.select(self.root, xpath, namespaces=namespaces)
-        else:
-            # xpath1.0
-            _nodes = self.root.xpath(xpath, namespaces=namespaces)
+        _nodes = self._select(xpath, namespaces=namespaces)
 
         for _node in _nodes:
             self.remove_node(_node, hold_tail=hold_tail)
@@ -636,12 +725,7 @@ class SimpleXml(object):
 
         @return {string} - 第一个匹配节点的文本值, 如果没有找到匹配节点, 返回''
         """
-        if self.use_xpath2:
-            # xpath2.0
-            _nodes = elementpath.select(self.root, xpath, namespaces=namespaces)
-        else:
-            # xpath1.0
-            _nodes = self.root.xpath(xpath, namespaces=namespaces)
+        _nodes = self._select(xpath, namespaces=namespaces)
 
         if len(_nodes) == 0:
             return default
@@ -669,12 +753,7 @@ class SimpleXml(object):
 
         @return {string} - 第一个匹配节点的指定属性文本值, 如果没有找到匹配节点或属性, 返回''
         """
-        if self.use_xpath2:
-            # xpath2.0
-            _nodes = elementpath.select(self.root, xpath, namespaces=namespaces)
-        else:
-            # xpath1.0
-            _nodes = self.root.xpath(xpath, namespaces=namespaces)
+        _nodes = self._select(xpath, namespaces=namespaces)
 
         if len(_nodes) == 0:
             return default
@@ -704,12 +783,7 @@ class SimpleXml(object):
         @throws {AttributeError} - 当搜索路径不符合自动创建规范时, 抛出该异常
         """
         try:
-            if self.use_xpath2:
-                # xpath2.0
-                _nodes = elementpath.select(self.root, xpath, namespaces=namespaces)
-            else:
-                # xpath1.0
-                _nodes = self.root.xpath(xpath, namespaces=namespaces)
+            _nodes = self._select(xpath, namespaces=namespaces)
 
             if len(_nodes) == 0:
                 if auto_create:
@@ -753,12 +827,7 @@ class SimpleXml(object):
         @throw {NameError} - 当节点不存在时抛出该异常
         @throws {AttributeError} - 当搜索路径不符合自动创建规范时, 抛出该异常
         """
-        if self.use_xpath2:
-            # xpath2.0
-            _nodes = elementpath.select(self.root, xpath, namespaces=namespaces)
-        else:
-            # xpath1.0
-            _nodes = self.root.xpath(xpath, namespaces=namespaces)
+        _nodes = self._select(xpath, namespaces=namespaces)
 
         if len(_nodes) == 0:
             if auto_create:
@@ -866,6 +935,83 @@ class SimpleXml(object):
 
         return _exception_list
 
+    #############################
+    # 大文件流式处理, 静态函数
+    #############################
+    @staticmethod
+    def iter_nodes(xml_obj, tag, obj_type=EnumXmlObjType.File, encoding=None, use_chardet=True,
+                   namespaces=None, parser: str = 'xml', **kwargs):
+        """
+        流式解析xml报文, 依次返回指定标签的节点(不将整个报文装载到内存, 适用于无法装载到内存的大文件)
+        注: 迭代到下一个节点时, 上一个返回的节点内容及其前面的兄弟节点将被清除以释放内存,
+            因此须在当次迭代中完成节点的处理, 且要返回的节点不能相互嵌套
+
+        @param {object} xml_obj - 要解析的报文载体(与obj_type结合来判断是什么对象), 例如(仅供参考):
+            obj_type = EnumXmlObjType.File 时, obj为文件路径
+            obj_type = EnumXmlObjType.FileHandle 时, obj为以二进制模式打开的文件句柄
+            obj_type = EnumXmlObjType.String 时, obj为报文文本
+            obj_type = EnumXmlObjType.Bytes 时, obj为报文二进制数组
+        @param {str|list} tag - 要返回的节点标签, 可以传入多个标签的列表
+            注: 带命名空间的标签可以为'{uri}tagname'的格式, 或者为'prefix:tagname'的格式(需传入namespaces)
+        @param {EnumXmlObjType} obj_type=EnumXmlObjType.File - xml对象类型
+        @param {string} encoding=None - 装载字符编码, 如果传None代表自动判断
+            注: 文件路径通过BOM、xml声明或文件前面部分的内容判断(前面部分只有ascii字符时继续读取到第一个非ascii字符);
+                文件句柄和二进制数组由解析器根据BOM和xml声明判断
+        @param {bool} use_chardet=True - 当自动判断的时候, 是否使用chardet库
+        @param {dict} namespaces=None - 命名空间, 用于转换'prefix:tagname'格式的标签
+        @param {str} parser='xml' - 解析器类型, 默认为xml
+            xml - 标准xml解析器
+            html - html解析器, 兼容html一些不规范的地方
+        @param {**kwargs} kwargs - 扩展的解析参数, 为lxml.etree.iterparse的参数, 例如:
+            remove_blank_text - discard blank text nodes that appear ignorable
+            remove_comments - discard comments
+            recover - try hard to parse through broken XML
+            huge_tree - disable security restrictions and support very deep trees
+
+        @returns {iterator} - 节点(ET._Element)迭代器
+        """
+        # 标签标准化
+        _tags = [tag] if type(tag) == str else list(tag)
+        for _i in range(len(_tags)):
+            if namespaces is not None and not _tags[_i].startswith('{') and ':' in _tags[_i]:
+                _prefix, _name = _tags[_i].split(':', 1)
+                _tags[_i] = '{%s}%s' % (namespaces[_prefix], _name)
+
+        # 获取报文来源
+        _file = None
+        _encoding = encoding
+        if obj_type == EnumXmlObjType.File:
+            _file = open(xml_obj, 'rb')
+            _source = _file
+            if _encoding is None:
+                # 只读取文件前面部分判断字符集
+                _encoding = SimpleXml._sniff_encoding(_file.read(65536), use_chardet=use_chardet, file_handle=_file)
+                _file.seek(0)
+        elif obj_type == EnumXmlObjType.FileHandle:
+            _source = xml_obj
+        elif obj_type == EnumXmlObjType.Bytes:
+            _source = io.BytesIO(xml_obj)
+        else:
+            if _encoding is None:
+                _encoding = 'utf-8'
+            _source = io.BytesIO(xml_obj.encode(encoding=_encoding))
+
+        try:
+            for _event, _node in ET.iterparse(
+                _source, events=('end', ), tag=_tags, encoding=_encoding, html=(parser == 'html'), **kwargs
+            ):
+                yield _node
+
+                # 清除已处理的节点
+                _node.clear(keep_tail=True)
+                _parent = _node.getparent()
+                if _parent is not None:
+                    while _node.getprevious() is not None:
+                        del _parent[0]
+        finally:
+            if _file is not None:
+                _file.close()
+
     #############################
     # 特定节点的值处理, 静态函数
     #############################
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+RunTool命令行执行性能测试
+@module benchmark_exec_sys_cmd
+@file benchmark_exec_sys_cmd.py
+
+执行步骤:
+python benchmark_exec_sys_cmd.py [output_mb] [cmd_num] [max_workers]
+
+注: 1、大输出场景: 执行输出output_mb兆字节(按行)的命令, 比较原有的执行方式(legacy)、exec_sys_cmd和exec_sys_cmd_stream
+        的耗时及Python内存分配峰值(tracemalloc);
+    2、多个小命令场景: 比较原有方式顺序执行cmd_num个命令与run_many并发执行的耗时,
+        每个命令为'sleep 0.02 && echo n', 模拟耗时20ms的小命令(需在支持sleep命令的shell中执行)
+"""
+
+import os
+import sys
+import time
+import subprocess
+import tracemalloc
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.utils.run_tool import RunTool
+
+
+def legacy_exec_sys_cmd(cmd: str, shell_encoding: str = 'utf-8'):
+    """
+    原有的执行方式(字符串累加, 执行结束后才读取stderr, 每次循环sleep 10ms)
+    """
+    _sp = subprocess.Popen(
+        cmd, close_fds=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        shell=True
+    )
+    _exit_code = None
+    _info_str = ''
+    while True:
+        _info_str += _sp.stdout.read().decode(shell_encoding)
+        _exit_code = _sp.poll()
+        if _exit_code is not None:
+            _info_str += _sp.stdout.read().decode(shell_encoding)
+            if _exit_code != 0:
+                _info_str += _sp.stderr.read().decode(shell_encoding)
+            _sp.stdout.close()
+            break
+        time.sleep(0.01)
+
+    _info_str = _info_str.replace('\r', '')
+    return (_exit_code, _info_str.split('\n'))
+
+
+def run_case(name: str, fun, *args, **kwargs):
+    """
+    执行测试场景, 输出耗时和内存峰值
+    """
+    tracemalloc.start()
+    _start = time.perf_counter()
+    _ret = fun(*args, **kwargs)
+    _use = time.perf_counter() - _start
+    _peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('%-36s use: %7.3fs  peak memory: %9.2fMB' % (name, _use, _peak / 1024 / 1024))
+    return _ret
+
+
+if __name__ == '__main__':
+    _output_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    _cmd_num = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    _max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    # 每行100字节
+    _big_cmd = '"%s" -c "import sys; [sys.stdout.write(\'x\' * 99 + \'\\n\') for _ in range(%d)]"' % (
+        sys.executable, _output_mb * 1024 * 1024 // 100
+    )
+    print('high output: %dMB' % _output_mb)
+    run_case('legacy', legacy_exec_sys_cmd, _big_cmd)
+    run_case('exec_sys_cmd', RunTool.exec_sys_cmd, _big_cmd)
+    _counter = [0]
+    run_case(
+        'exec_sys_cmd_stream (count lines)', RunTool.exec_sys_cmd_stream, _big_cmd,
+        output_fun=lambda stream, line: _counter.__setitem__(0, _counter[0] + 1)
+    )
+
+    print('many small commands: %d' % _cmd_num)
+    _cmds = ['sleep 0.02 && echo %d' % _i for _i in range(_cmd_num)]
+    run_case('legacy sequential', lambda: [legacy_exec_sys_cmd(_cmd) for _cmd in _cmds])
+    run_case('exec_sys_cmd sequential', lambda: [RunTool.exec_sys_cmd(_cmd) for _cmd in _cmds])
+    run_case('run_many (%d workers)' % _max_workers, RunTool.run_many, _cmds, max_workers=_max_workers)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+SimpleXml装载及取值性能测试
+@module benchmark_xml
+@file benchmark_xml.py
+
+执行步骤:
+python benchmark_xml.py [node_num] [query_num]
+
+注: 1、装载场景: 生成node_num个节点的gbk编码xml文件(无xml声明, 内容包含中文),
+        比较原有的装载方式(legacy, 对整个文件执行chardet.detect)和SimpleXml(通过BOM/xml声明/文件前面部分判断字符集)的耗时;
+    2、取值场景: 在1000个节点的xml对象上通过20个不同的xpath循环执行query_num次get_value,
+        比较每次重新解析xpath(legacy)和使用已编译xpath缓存的耗时, xpath1.0和xpath2.0分别测试(不统计内存峰值);
+    3、流式解析场景: 比较SimpleXml装载后get_nodes遍历节点和iter_nodes流式遍历节点的耗时及Python内存分配峰值(tracemalloc)
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.xml_hivenet import SimpleXml, EnumXmlObjType
+
+
+def run_case(name: str, trace_memory: bool, fun, *args):
+    """
+    执行测试场景
+    """
+    if trace_memory:
+        tracemalloc.start()
+    _start = time.perf_counter()
+    _ret = fun(*args)
+    _use = time.perf_counter() - _start
+    _peak = 0
+    if trace_memory:
+        _peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    print('  %-28s use: %8.3fs  peak memory: %8s  result: %s' % (
+        name, _use, '%.1fMB' % (_peak / 1024 / 1024) if trace_memory else '-', str(_ret)
+    ))
+
+
+def load_legacy(file: str):
+    """
+    原有的装载方式(对整个文件执行chardet.detect)
+    """
+    import chardet
+    with open(file, 'rb') as _f:
+        _bytes = _f.read()
+    _encoding = chardet.detect(_bytes)['encoding']
+    if _encoding.startswith('ISO-8859'):
+        _encoding = 'gbk'
+    return SimpleXml(_bytes, obj_type=EnumXmlObjType.Bytes, encoding=_encoding).encoding
+
+
+def get_values(use_xpath2: bool, query_num: int, use_cache: bool):
+    """
+    循环获取节点值
+    """
+    xml = SimpleXml(
+        '<data>%s</data>' % ''.join(['<item><name>名称%d</name></item>' % _i for _i in range(1000)]),
+        obj_type=EnumXmlObjType.String, use_xpath2=use_xpath2
+    )
+    if not use_cache:
+        # 模拟原处理方式
+        xml._xpath_cache_size = 0
+
+    _count = 0
+    for _i in range(query_num):
+        if xml.get_value('/data/item[%d]/name' % (_i % 20 + 1)) != '':
+            _count += 1
+    return _count
+
+
+def iter_all(file: str, stream: bool):
+    """
+    遍历全部节点
+    """
+    _count = 0
+    if stream:
+        for _node in SimpleXml.iter_nodes(file, 'item'):
+            if _node.findtext('name') is not None:
+                _count += 1
+    else:
+        for _node in SimpleXml(file).get_nodes('/data/item'):
+            if _node.findtext('name') is not None:
+                _count += 1
+    return _count
+
+
+if __name__ == '__main__':
+    _node_num = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    _query_num = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    _path = tempfile.mkdtemp()
+    _file = os.path.join(_path, 'benchmark.xml')
+    try:
+        with open(_file, 'wb') as _f:
+            _f.write('<data>\n'.encode('gbk'))
+            for _i in range(_node_num):
+                _f.write((
+                    '<item id="%d"><name>名称%d</name><value>测试值%d</value></item>\n' % (_i, _i, _i)
+                ).encode('gbk'))
+            _f.write('</data>\n'.encode('gbk'))
+        print('xml file: %d nodes, %.1fMB' % (_node_num, os.path.getsize(_file) / 1024 / 1024))
+
+        print('load:')
+        run_case('legacy (chardet full file)', True, load_legacy, _file)
+        run_case('SimpleXml (sniff prefix)', True, lambda: SimpleXml(_file).encoding)
+
+        print('get_value: %d queries' % _query_num)
+        for _use_xpath2 in (False, True):
+            _tips = 'xpath2' if _use_xpath2 else 'xpath1'
+            run_case('%s legacy (no cache)' % _tips, False, get_values, _use_xpath2, _query_num, False)
+            run_case('%s xpath cache' % _tips, False, get_values, _use_xpath2, _query_num, True)
+
+        print('iterate nodes:')
+        run_case('SimpleXml + get_nodes', True, iter_all, _file, False)
+        run_case('iter_nodes', True, iter_all, _file, True)
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
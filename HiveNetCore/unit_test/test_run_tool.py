@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+测试RunTool的命令行执行
+@module test_run_tool
+@file test_run_tool.py
+"""
+
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HiveNetCore.utils.run_tool import RunTool
+
+
+PYTHON_CMD = '"%s" -c' % sys.executable
+
+
+class TestRunToolCmd(unittest.TestCase):
+    """
+    测试RunTool的命令行执行
+    """
+
+    def test_exec_sys_cmd(self):
+        _exit_code, _lines = RunTool.exec_sys_cmd(
+            '%s "import sys; print(\'out\'); sys.stderr.write(\'err\\n\')"' % PYTHON_CMD
+        )
+        self.assertEqual((_exit_code, _lines), (0, ['out', '']))
+
+        _exit_code, _lines = RunTool.exec_sys_cmd(
+            '%s "import sys; print(\'out\'); sys.stderr.write(\'err\\n\'); sys.exit(3)"' % PYTHON_CMD
+        )
+        self.assertEqual((_exit_code, _lines), (3, ['out', 'err', '']))
+
+        # stderr输出超过管道缓存不会阻塞
+        _exit_code, _lines = RunTool.exec_sys_cmd(
+            '%s "import sys; sys.stderr.write(\'x\' * 1000000); print(\'done\')"' % PYTHON_CMD
+        )
+        self.assertEqual((_exit_code, _lines), (0, ['done', '']))
+
+    def test_stream(self):
+        _items = list()
+        _exit_code = RunTool.exec_sys_cmd_stream(
+            '%s "import sys; print(\'a\'); print(\'b\'); sys.stderr.write(\'e\')"' % PYTHON_CMD,
+            output_fun=lambda stream, text: _items.append((stream, text))
+        )
+        self.assertEqual(_exit_code, 0)
+        self.assertEqual(
+            [_item for _item in _items if _item[0] == 'stdout'], [('stdout', 'a'), ('stdout', 'b')]
+        )
+        self.assertIn(('stderr', 'e'), _items)
+
+        # 按数据块获取
+        _exit_code_var = list()
+        _text = ''.join([
+            _item[1] for _item in RunTool.iter_sys_cmd(
+                '%s "print(\'x\' * 200000)"' % PYTHON_CMD, by_line=False, read_size=4096,
+                exit_code_var=_exit_code_var
+            )
+        ])
+        self.assertEqual((_exit_code_var, len(_text.strip())), ([0], 200000))
+
+        # 超时
+        _start = time.time()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            RunTool.exec_sys_cmd_stream('%s "import time; time.sleep(5)"' % PYTHON_CMD, timeout=0.3)
+        self.assertLess(time.time() - _start, 3)
+
+    @unittest.skipIf(sys.platform == 'win32', 'need posix signal')
+    def test_stop_wait_time(self):
+        # 进程忽略结束信号时强制结束, 不会一直等待
+        _exit_code_var = list()
+        _start = time.time()
+        for _stream, _text in RunTool.iter_sys_cmd(
+            'exec %s "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); '
+            'print(\'a\', flush=True); time.sleep(10)"' % PYTHON_CMD,
+            exit_code_var=_exit_code_var, stop_wait_time=0.5
+        ):
+            if _stream == 'stdout':
+                break
+        self.assertEqual(_exit_code_var, [-signal.SIGKILL])
+        self.assertLess(time.time() - _start, 5)
+
+    def test_read_pipes_by_thread(self):
+        # 通过线程读取管道, 提前结束迭代后读取线程可以退出
+        _thread_num = threading.active_count()
+        _sp = subprocess.Popen(
+            '%s "import sys; [sys.stdout.write(\'x\' * 1000) for _ in range(100000)]"' % PYTHON_CMD,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True
+        )
+        _reader = RunTool._read_process_pipes(_sp, 4096, use_selector=False)
+        _size = 0
+        for _stream, _data in _reader:
+            if _data is not None:
+                _size += len(_data)
+                if _size > 100000:
+                    break
+        _reader.close()
+        _sp.kill()
+        _sp.wait()
+        _sp.stdout.close()
+        _sp.stderr.close()
+        _start = time.time()
+        while threading.active_count() > _thread_num and time.time() - _start < 5:
+            time.sleep(0.05)
+        self.assertEqual(threading.active_count(), _thread_num)
+
+        _sp = subprocess.Popen(
+            '%s "import sys; print(\'out\'); sys.stderr.write(\'err\')"' % PYTHON_CMD,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True
+        )
+        _datas = {'stdout': b'', 'stderr': b''}
+        for _stream, _data in RunTool._read_process_pipes(_sp, 4096, use_selector=False):
+            if _data is not None:
+                _datas[_stream] += _data
+        _sp.wait()
+        self.assertEqual((_datas['stdout'].strip(), _datas['stderr']), (b'out', b'err'))
+
+    def test_run_many(self):
+        _cmds = ['%s "print(%d)"' % (PYTHON_CMD, _i) for _i in range(6)]
+        _cmds.append('%s "import sys; sys.stderr.write(\'fail\'); sys.exit(1)"' % PYTHON_CMD)
+        _cmds.append('%s "import time; time.sleep(5)"' % PYTHON_CMD)
+        _results = RunTool.run_many(_cmds, max_workers=4, timeout=2)
+        self.assertEqual(_results[0:6], [(0, [str(_i)]) for _i in range(6)])
+        self.assertEqual(_results[6], (1, ['fail']))
+        self.assertIsNone(_results[7][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
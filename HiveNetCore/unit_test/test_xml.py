@@ -149,6 +149,97 @@ class TestSimpleXml(unittest.TestCase):
         self.assertTrue(_dict['data'][1]['list'][0]['b1'] == 'b1',
                         '失败：测试SimpleXml - to_dict - 检查3：%s' % str(_dict['data'][1]['list'][0]['b1']))
 
+    def test_xml_encoding_and_xpath_cache(self):
+        """
+        测试字符集判断和XPath缓存
+        """
+        print('测试SimpleXml - 字符集判断')
+        _pfile = SimpleXml(os.path.join(self.file_path, 'encode_gbk.xml'), obj_type=EnumXmlObjType.File)
+        self.assertTrue(_pfile.encoding == 'gbk',
+                        '失败：测试SimpleXml - 字符集判断 - xml声明：%s' % _pfile.encoding)
+        _pfile = SimpleXml(b'\xef\xbb\xbf<a>\xe4\xb8\xad</a>', obj_type=EnumXmlObjType.Bytes)
+        self.assertTrue(_pfile.encoding == 'utf-8' and _pfile.get_value('/a') == '中',
+                        '失败：测试SimpleXml - 字符集判断 - BOM：%s' % _pfile.encoding)
+        _pfile = SimpleXml('<a>中文</a>'.encode('utf-8'), obj_type=EnumXmlObjType.Bytes)
+        self.assertTrue(_pfile.encoding == 'utf-8',
+                        '失败：测试SimpleXml - 字符集判断 - 无声明：%s' % _pfile.encoding)
+
+        # 非ascii字符出现在判断字符集的前面部分之后
+        _xml_bytes = ('<data><a>%s</a><b>中文测试内容</b></data>' % ('x' * 70000)).encode('gbk')
+        _pfile = SimpleXml(_xml_bytes, obj_type=EnumXmlObjType.Bytes)
+        self.assertTrue(_pfile.encoding.lower() in ('gbk', 'gb18030') and _pfile.get_value('/data/b') == '中文测试内容',
+                        '失败：测试SimpleXml - 字符集判断 - 后面部分gbk：%s' % _pfile.encoding)
+        _file = os.path.join(_TEMP_DIR, 'encode_gbk_after_ascii.xml')
+        with open(_file, 'wb') as _f:
+            _f.write(_xml_bytes)
+        _texts = [_node.text for _node in SimpleXml.iter_nodes(_file, 'b')]
+        self.assertTrue(_texts == ['中文测试内容'],
+                        '失败：测试SimpleXml - 字符集判断 - 流式解析后面部分gbk：%s' % str(_texts))
+        _xml_bytes = ('<data><a>%s</a><b>中文</b></data>' % ('x' * 70000)).encode('utf-8')
+        _pfile = SimpleXml(_xml_bytes, obj_type=EnumXmlObjType.Bytes)
+        self.assertTrue(_pfile.encoding == 'utf-8' and _pfile.get_value('/data/b') == '中文',
+                        '失败：测试SimpleXml - 字符集判断 - 后面部分utf-8：%s' % _pfile.encoding)
+
+        print('测试SimpleXml - XPath缓存')
+        for _use_xpath2 in (False, True):
+            _pfile = SimpleXml(
+                '<data><a>1</a><b>2</b><c>3</c></data>', obj_type=EnumXmlObjType.String,
+                use_xpath2=_use_xpath2, xpath_cache_size=2
+            )
+            for _xpath, _value in (('a', '1'), ('b', '2'), ('a', '1'), ('c', '3')):
+                _text = _pfile.get_value(_xpath)
+                self.assertTrue(_text == _value,
+                                '失败：测试SimpleXml - XPath缓存 - 获取值错误：%s' % _text)
+            self.assertTrue(
+                [_key[1] for _key in _pfile._xpath_cache.keys()] == ['a', 'c'],
+                '失败：测试SimpleXml - XPath缓存 - 缓存清单错误：%s' % str(_pfile._xpath_cache.keys())
+            )
+            _pfile.set_value('b', '修改')
+            _text = _pfile.get_value('b')
+            self.assertTrue(_text == '修改',
+                            '失败：测试SimpleXml - XPath缓存 - 修改后获取值错误：%s' % _text)
+
+    def test_xml_iter_nodes(self):
+        """
+        测试流式解析
+        """
+        print('测试SimpleXml - 流式解析文件')
+        _names = [
+            _node.get('name') for _node in SimpleXml.iter_nodes(
+                os.path.join(self.file_path, 'encode_gbk.xml'), 'country'
+            )
+        ]
+        self.assertTrue(_names == ['中国', 'Singapore', 'Panama'],
+                        '失败：测试SimpleXml - 流式解析文件 - 节点错误：%s' % str(_names))
+
+        print('测试SimpleXml - 流式解析命名空间')
+        _ns = {
+            'people': 'http://people.example.com',
+            'role': 'http://characters.example.com'
+        }
+        _names = [
+            _node.findtext('people:name', namespaces=_ns) for _node in SimpleXml.iter_nodes(
+                os.path.join(self.file_path, 'with_namespace.xml'), 'people:actor', namespaces=_ns
+            )
+        ]
+        self.assertTrue(_names == ['John Cleese - 中文', 'Eric Idle'],
+                        '失败：测试SimpleXml - 流式解析命名空间 - 节点错误：%s' % str(_names))
+
+        print('测试SimpleXml - 流式解析释放节点')
+        _xml = '<data>%s</data>' % ''.join(['<item id="%d"><v>%d</v></item>' % (_i, _i) for _i in range(1000)])
+        _count = 0
+        for _node in SimpleXml.iter_nodes(_xml, 'item', obj_type=EnumXmlObjType.String):
+            self.assertTrue(_node.findtext('v') == str(_count),
+                            '失败：测试SimpleXml - 流式解析释放节点 - 值错误：%s' % _node.findtext('v'))
+            # 前面已处理的节点已被删除, 只保留上一个节点(内容已清除)
+            _previous = _node.getprevious()
+            self.assertTrue(
+                _previous is None or (_previous.getprevious() is None and len(_previous) == 0),
+                '失败：测试SimpleXml - 流式解析释放节点 - 节点未清除：%d' % _node.getparent().index(_node)
+            )
+            _count += 1
+        self.assertTrue(_count == 1000, '失败：测试SimpleXml - 流式解析释放节点 - 数量错误：%d' % _count)
+
 
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作
@@ -2,5 +2,5 @@
 # -*- coding: UTF-8 -*-
 
 __all__ = [
-    'transfer', 'saver', 'protocol', 'exceptions'
+    'transfer', 'saver', 'protocol', 'digest', 'batch', 'exceptions'
 ]
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+多文件(目录)传输控制模块
+
+@module batch
+@file batch.py
+"""
+
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HiveNetFileTransfer.protocol import LocalProtocol
+from HiveNetFileTransfer.transfer import Transfer, BandwidthLimiter
+
+
+__MOUDLE__ = 'batch'  # 模块名
+__DESCRIPT__ = u'多文件(目录)传输控制模块'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2021.09.06'  # 发布日期
+
+
+class BatchTransfer(object):
+    """
+    多文件(目录)传输控制对象
+    注: 所有文件共享同一个线程池处理, 小文件打包在一次请求中传输, 大文件按线程索引拆分传输
+    """
+    #############################
+    # 类初始化
+    #############################
+
+    def __init__(self, files: list = None, src_dir: str = None, dest_dir: str = None,
+                 protocol_class=LocalProtocol, is_resume: bool = True, is_overwrite: bool = False,
+                 worker_num: int = 8, max_running_files: int = 4, file_thread_num: int = 4,
+                 small_file_size: int = 1048576, pack_size: int = 4194304, pack_num: int = 200,
+                 block_size: int = 65536, cache_size: int = 1024, bandwidth_limit: int = 0,
+                 file_notify_fun=None, **kwargs):
+        """
+        初始化多文件传输对象
+
+        @param {list} files=None - 要传输的文件清单, 每项为 [源文件路径, 目标文件路径, 文件大小]
+            注: 文件大小可以不传(或传None), 未知大小的文件不进行打包传输
+        @param {str} src_dir=None - 要传输的源目录, 传入后将获取目录下所有文件(包括子目录)加入传输清单
+        @param {str} dest_dir=None - 目标目录, 与src_dir配合使用
+        @param {class} protocol_class=LocalProtocol - 传输协议类, 需继承ProtocolFw并实现多文件传输的工具函数
+        @param {bool} is_resume=True - 大文件是否续传
+        @param {bool} is_overwrite=False - 是否覆盖已有文件
+        @param {int} worker_num=8 - 共享线程池的线程数(所有文件的处理线程总数)
+        @param {int} max_running_files=4 - 同时传输的大文件数量(打开的传输协议对象数量)
+        @param {int} file_thread_num=4 - 单个大文件的拆分传输线程索引数量
+        @param {int} small_file_size=1048576 - 小文件的大小上限, 单位为byte, 小于等于该大小的文件打包传输
+        @param {int} pack_size=4194304 - 单个打包请求的数据大小上限, 单位为byte
+        @param {int} pack_num=200 - 单个打包请求的文件数量上限
+        @param {int} block_size=65536 - 大文件每次传输块大小, 单位为byte
+        @param {int} cache_size=1024 - 大文件单线程缓存大小, 单位为kb
+        @param {int} bandwidth_limit=0 - 全局带宽限制, 单位为byte/s, 0代表不限制
+        @param {function} file_notify_fun=None - 单个文件传输结束的通知函数, 如果不传代表不通知
+            函数定义为 fun(src_file:str, dest_file:str, status:str, msg:str)
+        @param {kwargs} - 传输协议的扩展参数, 将送入传输协议对象及多文件传输工具函数
+            注: gRpc传输协议可传入conn_pool参数共享连接池, 所有文件复用同一组连接
+        """
+        self.protocol_class = protocol_class
+        self.is_resume = is_resume
+        self.is_overwrite = is_overwrite
+        self.worker_num = worker_num
+        self.max_running_files = max(1, max_running_files)
+        self.file_thread_num = file_thread_num
+        self.small_file_size = small_file_size
+        self.pack_size = pack_size
+        self.pack_num = pack_num
+        self.block_size = block_size
+        self.cache_size = cache_size
+        self.file_notify_fun = file_notify_fun
+        self.kwargs = kwargs
+
+        # 传输文件清单
+        self.files = list() if files is None else [
+            [_item[0], _item[1], _item[2] if len(_item) > 2 else None] for _item in files
+        ]
+        if src_dir is not None:
+            for _file, _size in self.protocol_class.list_src_files(src_dir, **self.kwargs):
+                self.files.append([
+                    os.path.join(src_dir, _file), os.path.join(dest_dir, _file), _size
+                ])
+
+        # 内部控制参数
+        self.status = 'stop'  # stop - 停止, running - 正在运行, finished - 已完成, exception - 部分文件传输失败
+        self.results = dict()  # 文件传输结果, key为源文件路径, value为{'dest': 目标文件, 'status': 状态, 'msg': 信息}
+        self._limiter = BandwidthLimiter(bandwidth_limit) if bandwidth_limit > 0 else None
+        self._lock = threading.RLock()
+        self._done_event = threading.Event()
+        self._executor: ThreadPoolExecutor = None
+        self._job_num = 0  # 未完成的任务数
+        self._pending_files = deque()  # 等待传输的大文件任务
+        self._running_files = dict()  # 正在传输的大文件任务, key为源文件路径, value为Transfer对象
+        self._pack_futures = list()  # 已提交的打包传输任务, 每项为 (Future, 文件清单)
+        self._file_futures = list()  # 已提交的启动大文件传输任务, 每项为 (Future, 文件信息)
+
+    #############################
+    # 功能函数
+    #############################
+
+    def start(self, wait_finished: bool = False) -> str:
+        """
+        启动多文件传输
+
+        @param {bool} wait_finished=False - 是否等待传输结束
+
+        @returns {str} - 返回当前状态值
+        """
+        with self._lock:
+            if self.status != 'stop':
+                return self.status
+
+            # 拆分任务, 大文件按大小倒序优先启动, 小文件按清单顺序打包
+            _packs = list()
+            _pack = list()
+            _pack_size = 0
+            _large_files = list()
+            for _item in self.files:
+                if self.results.get(_item[0], {}).get('status', '') == 'finished':
+                    # 已完成的文件不再传输(停止后重新启动的情况)
+                    continue
+                if _item[2] is None or _item[2] > self.small_file_size:
+                    _large_files.append(_item)
+                    continue
+                if len(_pack) > 0 and (_pack_size + _item[2] > self.pack_size or len(_pack) >= self.pack_num):
+                    _packs.append(_pack)
+                    _pack = list()
+                    _pack_size = 0
+                _pack.append(_item)
+                _pack_size += _item[2]
+            if len(_pack) > 0:
+                _packs.append(_pack)
+            _large_files.sort(key=lambda _item: -1 if _item[2] is None else _item[2], reverse=True)
+
+            self.status = 'running'
+            self._done_event.clear()
+            self._job_num = len(_packs) + len(_large_files)
+            if self._job_num == 0:
+                self._set_done()
+                return self.status
+
+            # 提交任务
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.worker_num, thread_name_prefix='Thread-BatchTransfer'
+            )
+            self._pending_files = deque(_large_files)
+            self._file_futures = list()
+            for _ in range(min(self.max_running_files, len(_large_files))):
+                self._submit_file_job(self._pending_files.popleft())
+            self._pack_futures = [
+                (self._executor.submit(self._pack_job, _pack), _pack) for _pack in _packs
+            ]
+
+        if wait_finished:
+            self.wait()
+
+        return self.status
+
+    def wait(self, timeout: float = None) -> str:
+        """
+        等待传输结束
+
+        @param {float} timeout=None - 超时时间, 单位为秒, 不传代表一直等待
+
+        @returns {str} - 返回当前状态值
+        """
+        self._done_event.wait(timeout=timeout)
+        return self.status
+
+    def stop(self):
+        """
+        停止传输
+        注: 正在传输的大文件将保存续传信息, 未开始的任务取消执行
+        """
+        with self._lock:
+            if self.status != 'running':
+                return
+
+            self.status = 'stopping'
+            # 取消未开始的任务(包括已提交但还在线程池排队的任务), 每个大文件及每个打包均为一个任务
+            _cancel_jobs = [[_item] for _item in self._pending_files]
+            self._pending_files.clear()
+            for _future, _item in self._file_futures:
+                if _future.cancel():
+                    _cancel_jobs.append([_item])
+            for _future, _pack in self._pack_futures:
+                if _future.cancel():
+                    _cancel_jobs.append(_pack)
+            _transfers = list(self._running_files.values())
+
+        for _job in _cancel_jobs:
+            for _item in _job:
+                self._set_result(_item, 'stop', 'stop by function')
+            self._job_finished()
+
+        # 停止正在传输的文件, 由于Transfer停止时会通知协议暂停, 因此在停止后再关闭协议对象
+        for _transfer in _transfers:
+            _transfer.stop()
+            if _transfer.status == 'stop':
+                _transfer.protocol.close()
+
+        self.wait()
+
+    def get_stat(self) -> dict:
+        """
+        获取传输统计信息
+
+        @returns {dict} - 统计信息字典
+            {
+                'total': 0,  # 文件总数
+                'finished': 0,  # 已完成的文件数
+                'failed': 0,  # 传输失败(或停止)的文件数
+            }
+        """
+        with self._lock:
+            _finished = len([
+                _result for _result in self.results.values() if _result['status'] == 'finished'
+            ])
+            return {
+                'total': len(self.files), 'finished': _finished,
+                'failed': len(self.results) - _finished
+            }
+
+    #############################
+    # 内部函数
+    #############################
+    def _pack_job(self, pack: list):
+        """
+        打包传输小文件的任务
+
+        @param {list} pack - 要传输的文件清单
+        """
+        try:
+            if self._limiter is not None:
+                self._limiter.acquire(sum([_item[2] for _item in pack]))
+
+            try:
+                _rets = self.protocol_class.pack_transfer(
+                    [[_item[0], _item[1]] for _item in pack], is_overwrite=self.is_overwrite,
+                    **self.kwargs
+                )
+            except Exception as _e:
+                _rets = ['%s: %s' % (type(_e).__name__, str(_e))] * len(pack)
+
+            for _item, _msg in zip(pack, _rets):
+                self._set_result(
+                    _item, 'finished' if _msg == '' else 'exception', _msg
+                )
+        finally:
+            self._job_finished()
+
+    def _start_file_job(self, item: list):
+        """
+        启动大文件传输的任务
+        注: 大文件的各个线程索引传输处理提交至共享线程池执行
+
+        @param {list} item - 要传输的文件信息 [源文件路径, 目标文件路径, 文件大小]
+        """
+        if self.status != 'running':
+            self._set_result(item, 'stop', 'stop by function')
+            self._file_job_finished(item)
+            return
+
+        _protocol = None
+        try:
+            _protocol = self.protocol_class(
+                item[0], item[1], is_resume=self.is_resume, is_overwrite=self.is_overwrite,
+                thread_num=self.file_thread_num, block_size=self.block_size,
+                cache_size=self.cache_size, **self.kwargs
+            )
+            _transfer = Transfer(
+                _protocol, thread_interval=0.0, executor=self._executor, limiter=self._limiter
+            )
+            _transfer.add_done_callback(
+                lambda transfer: self._on_transfer_done(item, transfer)
+            )
+            with self._lock:
+                self._running_files[item[0]] = _transfer
+            _transfer.start()
+        except Exception as _e:
+            with self._lock:
+                self._running_files.pop(item[0], None)
+            if _protocol is not None:
+                _protocol.close()
+            self._set_result(item, 'exception', '%s: %s' % (type(_e).__name__, str(_e)))
+            self._file_job_finished(item)
+
+    def _on_transfer_done(self, item: list, transfer: Transfer):
+        """
+        大文件传输线程全部结束的回调函数
+
+        @param {list} item - 传输的文件信息 [源文件路径, 目标文件路径, 文件大小]
+        @param {Transfer} transfer - 文件传输控制对象
+        """
+        _status = transfer.status
+        if _status == 'stop':
+            # 通过stop函数停止, 由stop函数关闭协议对象
+            self._set_result(item, 'stop', 'stop by function')
+        else:
+            try:
+                transfer.protocol.close()
+            except Exception as _e:
+                if _status == 'finished':
+                    _status = 'exception'
+                    transfer.exception = _e
+
+            if _status == 'finished':
+                self._set_result(item, 'finished', '')
+            else:
+                self._set_result(item, 'exception', '%s: %s' % (
+                    type(transfer.exception).__name__, str(transfer.exception)
+                ) if transfer.exception is not None else 'transfer not finished')
+
+        self._file_job_finished(item)
+
+    def _file_job_finished(self, item: list):
+        """
+        大文件任务结束的处理, 启动下一个等待传输的大文件
+
+        @param {list} item - 传输的文件信息 [源文件路径, 目标文件路径, 文件大小]
+        """
+        with self._lock:
+            self._running_files.pop(item[0], None)
+            if self.status == 'running' and len(self._pending_files) > 0:
+                self._submit_file_job(self._pending_files.popleft())
+
+        self._job_finished()
+
+    def _submit_file_job(self, item: list):
+        """
+        提交启动大文件传输的任务
+        注: 需在持有锁的情况下调用
+
+        @param {list} item - 要传输的文件信息 [源文件路径, 目标文件路径, 文件大小]
+        """
+        self._file_futures.append(
+            (self._executor.submit(self._start_file_job, item), item)
+        )
+
+    def _job_finished(self):
+        """
+        任务结束的处理, 所有任务结束后设置传输状态
+        """
+        with self._lock:
+            self._job_num -= 1
+            if self._job_num == 0:
+                self._set_done()
+
+    def _set_done(self):
+        """
+        设置传输结束状态
+        """
+        if self.status == 'stopping':
+            self.status = 'stop'
+        else:
+            self.status = 'finished'
+            for _result in self.results.values():
+                if _result['status'] != 'finished':
+                    self.status = 'exception'
+                    break
+
+        if self._executor is not None:
+            # 在线程池的线程中执行时不能等待线程池结束
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+        self._done_event.set()
+
+    def _set_result(self, item: list, status: str, msg: str):
+        """
+        登记文件传输结果
+
+        @param {list} item - 传输的文件信息 [源文件路径, 目标文件路径, 文件大小]
+        @param {str} status - 传输状态, finished - 已完成, exception - 出现异常, stop - 已停止
+        @param {str} msg - 传输信息
+        """
+        with self._lock:
+            self.results[item[0]] = {'dest': item[1], 'status': status, 'msg': msg}
+
+        if self.file_notify_fun is not None:
+            self.file_notify_fun(item[0], item[1], status, msg)
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名: %s  -  %s\n'
+           '作者: %s\n'
+           '发布日期: %s\n'
+           '版本: %s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2019 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+文件分块摘要及差异同步模块
+
+@module digest
+@file digest.py
+"""
+
+import os
+import zlib
+import hashlib
+import operator
+import threading
+from io import FileIO
+from itertools import accumulate
+from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+
+
+__MOUDLE__ = 'digest'  # 模块名
+__DESCRIPT__ = u'文件分块摘要及差异同步模块'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2026.10.19'  # 发布日期
+
+
+class BlockDigest(object):
+    """
+    文件分块md5计算对象
+    注: 将文件按固定大小分块, 数据按分块内的顺序传入时增量计算md5, 无法增量计算的分块(乱序传入或续传)
+        在完成时再通过并行读取文件的方式计算, 两端按分块比较即可定位出有问题的数据区间
+    """
+
+    def __init__(self, file_size: int, block_size: int):
+        """
+        初始化分块md5计算对象
+
+        @param {int} file_size - 文件大小
+        @param {int} block_size - 分块大小, 单位为byte
+        """
+        self.file_size = file_size
+        self.block_size = block_size
+        self.block_num = (file_size + block_size - 1) // block_size
+
+        # 分块计算状态, key为分块索引, value为 {'md5': hashlib.md5, 'pos': 已计算到的文件位置, 'busy': 是否正在计算}
+        self._hashes = dict()
+        self._digests = [None] * self.block_num  # 已完成计算的分块md5值
+        self._lock = threading.RLock()
+
+    #############################
+    # 工具函数
+    #############################
+    def get_block_range(self, block: int) -> list:
+        """
+        获取分块对应的文件区间
+
+        @param {int} block - 分块索引
+
+        @returns {list} - [开始位置, 结束位置]
+        """
+        _start = block * self.block_size
+        return [_start, min(_start + self.block_size, self.file_size) - 1]
+
+    def update(self, start: int, data: Union[bytes, memoryview]):
+        """
+        传入写入(或读取)的数据, 增量计算所在分块的md5值
+
+        @param {int} start - 数据在文件的开始位置
+        @param {bytes|memoryview} data - 数据
+        """
+        _size = len(data)
+        _pos = start
+        while _pos < start + _size:
+            _block = _pos // self.block_size
+            if _block >= self.block_num:
+                break
+
+            _block_end = min((_block + 1) * self.block_size, self.file_size)
+            _len = min(_block_end, start + _size) - _pos
+
+            # 只有分块内的数据按顺序传入才可以增量计算, 同一分块只允许一个线程计算
+            _hash = None
+            with self._lock:
+                if self._digests[_block] is None:
+                    _state = self._hashes.get(_block, None)
+                    if _state is None and _pos == _block * self.block_size:
+                        _state = {'md5': hashlib.md5(), 'pos': _pos, 'busy': False}
+                        self._hashes[_block] = _state
+
+                    if _state is not None and not _state['busy'] and _state['pos'] == _pos:
+                        _state['busy'] = True
+                        _hash = _state['md5']
+
+            if _hash is not None:
+                _hash.update(data[_pos - start: _pos - start + _len])
+                with self._lock:
+                    _state['pos'] = _pos + _len
+                    _state['busy'] = False
+                    if _state['pos'] >= _block_end:
+                        # 分块已计算完成
+                        self._digests[_block] = _hash.hexdigest()
+                        self._hashes.pop(_block, None)
+
+            _pos += _len
+
+    def reset(self, block: int):
+        """
+        重置分块的计算状态, 用于重新传输分块数据
+
+        @param {int} block - 分块索引
+        """
+        with self._lock:
+            self._digests[block] = None
+            self._hashes.pop(block, None)
+
+    def get_digests(self, get_block_md5_fun) -> list:
+        """
+        获取所有分块的md5值
+
+        @param {function} get_block_md5_fun - 获取未能增量计算完成的分块md5值的函数
+            函数定义为 fun(blocks: list) -> list, 传入分块索引清单, 返回对应的md5值清单
+
+        @returns {list} - 所有分块的md5值清单
+        """
+        with self._lock:
+            _blocks = [_block for _block in range(self.block_num) if self._digests[_block] is None]
+
+        if len(_blocks) > 0:
+            _md5s = get_block_md5_fun(_blocks)
+            with self._lock:
+                for _i in range(len(_blocks)):
+                    self._digests[_blocks[_i]] = _md5s[_i]
+                    self._hashes.pop(_blocks[_i], None)
+
+        return list(self._digests)
+
+    @classmethod
+    def get_file_block_md5(cls, file: Union[str, FileIO], file_size: int, block_size: int,
+                           blocks: list = None, workers: int = 4, buffer_size: int = 1048576) -> list:
+        """
+        获取文件指定分块的md5值
+        注: 文件路径的情况使用多线程并行计算, 已打开的文件对象只能顺序计算
+
+        @param {str|FileIO} file - 文件路径, 或已打开的文件对象
+        @param {int} file_size - 文件大小
+        @param {int} block_size - 分块大小, 单位为byte
+        @param {list} blocks=None - 要计算的分块索引清单, 不传代表计算所有分块
+        @param {int} workers=4 - 并行计算的线程数
+        @param {int} buffer_size=1048576 - 每次读取文件的数据大小
+
+        @returns {list} - 与分块索引清单对应的md5值清单
+        """
+        if blocks is None:
+            blocks = list(range((file_size + block_size - 1) // block_size))
+
+        if len(blocks) == 0:
+            return []
+
+        def _read_fun(fd, start: int, size: int) -> bytes:
+            if fd is None:
+                file.seek(start)
+                return file.read(size)
+            elif hasattr(os, 'pread'):
+                return os.pread(fd, size, start)
+            else:
+                with open(file, 'rb') as _f:
+                    _f.seek(start)
+                    return _f.read(size)
+
+        def _block_md5(fd, block: int) -> str:
+            _md5 = hashlib.md5()
+            _pos = block * block_size
+            _end = min(_pos + block_size, file_size)
+            while _pos < _end:
+                _data = _read_fun(fd, _pos, min(buffer_size, _end - _pos))
+                if not _data:
+                    break
+                _md5.update(_data)  # hashlib在数据较大时会释放GIL, 可以多线程并行计算
+                _pos += len(_data)
+            return _md5.hexdigest()
+
+        if type(file) != str:
+            return [_block_md5(None, _block) for _block in blocks]
+
+        _fd = os.open(file, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(blocks)))) as _executor:
+                return list(_executor.map(lambda _block: _block_md5(_fd, _block), blocks))
+        finally:
+            os.close(_fd)
+
+    @classmethod
+    def compare(cls, src_digests: list, dest_digests: list) -> list:
+        """
+        比较两端的分块md5值
+
+        @param {list} src_digests - 源文件的分块md5值清单
+        @param {list} dest_digests - 目标文件的分块md5值清单
+
+        @returns {list} - md5值不一致的分块索引清单
+        """
+        return [
+            _block for _block in range(len(dest_digests))
+            if _block >= len(src_digests) or src_digests[_block] != dest_digests[_block]
+        ]
+
+
+class BlockSignature(object):
+    """
+    文件分块签名工具(rsync方式的差异同步)
+    注: 目标端对已有文件按固定大小分块计算签名(弱校验的滚动和 + 强校验的md5),
+        源端使用滚动和在文件任意位置查找与签名相同的数据块, 形成可直接从目标端已有文件复制的区间清单,
+        只需传输清单以外的数据
+    """
+
+    @classmethod
+    def get_weak_sum(cls, data: Union[bytes, memoryview]) -> int:
+        """
+        计算数据块的弱校验滚动和
+        注: 使用adler32算法, 可以通过 get_rolling_sums 滚动计算任意位置的值
+
+        @param {bytes|memoryview} data - 数据块
+
+        @returns {int} - 弱校验值
+        """
+        return zlib.adler32(data)
+
+    @classmethod
+    def get_rolling_sums(cls, data: bytes, block_size: int) -> list:
+        """
+        计算数据中每个位置开始的数据块的弱校验滚动和
+        注: 通过前缀和一次性计算, 避免逐字节滚动的处理
+
+        @param {bytes} data - 数据
+        @param {int} block_size - 数据块大小
+
+        @returns {list} - 弱校验值清单, 第k项为data[k: k + block_size]的弱校验值
+        """
+        _len = len(data)
+        if _len < block_size:
+            return []
+
+        # adler32: a = 1 + sum(x[i]), b = L + sum((L - i) * x[i]), 均对65521取模
+        _s = [0]
+        _s.extend(accumulate(data))
+        _t = [0]
+        _t.extend(accumulate(map(operator.mul, data, range(_len))))
+        return [
+            ((1 + _s[_k + block_size] - _s[_k]) % 65521) | (
+                ((block_size + (_k + block_size) * (_s[_k + block_size] - _s[_k]) - _t[_k + block_size] + _t[_k])
+                 % 65521) << 16
+            ) for _k in range(_len - block_size + 1)
+        ]
+
+    @classmethod
+    def get_file_signature(cls, file: str, block_size: int, workers: int = 4) -> list:
+        """
+        获取文件的分块签名
+        注: 使用多线程并行计算
+
+        @param {str} file - 文件路径
+        @param {int} block_size - 分块大小, 单位为byte
+        @param {int} workers=4 - 并行计算的线程数
+
+        @returns {list} - 分块签名清单, 每项为 [弱校验值, md5值], 文件最后不足一个分块的数据不计算签名;
+            如果文件不存在返回空清单
+        """
+        if not os.path.exists(file):
+            return []
+
+        _block_num = os.path.getsize(file) // block_size
+        if _block_num == 0:
+            return []
+
+        def _block_signature(fd, block: int) -> list:
+            if hasattr(os, 'pread'):
+                _data = os.pread(fd, block_size, block * block_size)
+            else:
+                with open(file, 'rb') as _f:
+                    _f.seek(block * block_size)
+                    _data = _f.read(block_size)
+            return [cls.get_weak_sum(_data), hashlib.md5(_data).hexdigest()]
+
+        _fd = os.open(file, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, _block_num))) as _executor:
+                return list(_executor.map(lambda _block: _block_signature(_fd, _block), range(_block_num)))
+        finally:
+            os.close(_fd)
+
+    @classmethod
+    def get_delta(cls, file: Union[str, FileIO], file_size: int, signature: list, block_size: int,
+                  search_size: int = None) -> list:
+        """
+        根据目标端的分块签名获取可从目标端已有文件复制的区间清单
+
+        @param {str|FileIO} file - 源文件路径, 或已打开的文件对象
+        @param {int} file_size - 源文件大小
+        @param {list} signature - 目标端的分块签名清单, 每项为 [弱校验值, md5值]
+        @param {int} block_size - 分块大小, 单位为byte
+        @param {int} search_size=None - 数据块不匹配时向后滚动查找的位置数量, 不传代表查找至下一个分块位置之前
+            注: 滚动查找的处理开销与查找的位置数量成正比, 查找不到时将跳到查找结束的位置继续优先检查数据块
+
+        @returns {list} - 可复制区间清单, 每项为 [源文件位置, 目标端已有文件位置, 数据大小]
+        """
+        _delta = list()
+        if len(signature) == 0 or file_size < block_size:
+            return _delta
+
+        # 建立弱校验值的索引
+        _weak_index = dict()
+        for _block in range(len(signature)):
+            _weak_index.setdefault(signature[_block][0], list()).append(_block)
+
+        if search_size is None:
+            search_size = block_size - 1
+
+        _handle = open(file, 'rb') if type(file) == str else file
+        try:
+            def _read(start: int, size: int) -> bytes:
+                _handle.seek(start)
+                return _handle.read(size)
+
+            def _match(data, weak: int) -> int:
+                # 返回匹配的目标端分块, 没有匹配返回-1
+                _blocks = _weak_index.get(weak, None)
+                if _blocks is not None:
+                    _md5 = hashlib.md5(data).hexdigest()
+                    for _block in _blocks:
+                        if signature[_block][1] == _md5:
+                            return _block
+                return -1
+
+            _pos = 0
+            while _pos + block_size <= file_size:
+                # 优先检查当前位置的数据块
+                _data = _read(_pos, block_size)
+                _block = _match(_data, cls.get_weak_sum(_data))
+                if _block != -1:
+                    cls._append_delta(_delta, _pos, _block * block_size, block_size)
+                    _pos += block_size
+                    continue
+
+                # 不匹配, 在后续区域滚动查找匹配的数据块
+                _data = _read(_pos + 1, min(search_size + block_size - 1, file_size - _pos - 1))
+                _next_pos = _pos + 1 + max(len(_data) - block_size + 1, 0)
+                _weaks = cls.get_rolling_sums(_data, block_size)
+                for _k in range(len(_weaks)):
+                    if _weaks[_k] in _weak_index:
+                        _block = _match(_data[_k: _k + block_size], _weaks[_k])
+                        if _block != -1:
+                            cls._append_delta(_delta, _pos + 1 + _k, _block * block_size, block_size)
+                            _next_pos = _pos + 1 + _k + block_size
+                            break
+                _pos = _next_pos
+        finally:
+            if type(file) == str:
+                _handle.close()
+
+        return _delta
+
+    @classmethod
+    def _append_delta(cls, delta: list, start: int, old_start: int, size: int):
+        """
+        添加可复制区间, 与上一个区间连续的情况进行合并
+
+        @param {list} delta - 可复制区间清单
+        @param {int} start - 源文件位置
+        @param {int} old_start - 目标端已有文件位置
+        @param {int} size - 数据大小
+        """
+        if len(delta) > 0 and delta[-1][0] + delta[-1][2] == start and delta[-1][1] + delta[-1][2] == old_start:
+            delta[-1][2] += size
+        else:
+            delta.append([start, old_start, size])
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名: %s  -  %s\n'
+           '作者: %s\n'
+           '发布日期: %s\n'
+           '版本: %s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
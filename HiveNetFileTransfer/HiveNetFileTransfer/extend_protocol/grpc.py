@@ -23,6 +23,7 @@ import datetime
 import threading
 import traceback
 import queue
+import hashlib
 from typing import Iterator, Union
 from io import FileIO
 from HiveNetCore.generic import CResult
@@ -41,7 +42,8 @@ sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
 from HiveNetFileTransfer.saver import TransferSaver
 from HiveNetFileTransfer.protocol import LocalProtocol
-from HiveNetFileTransfer.exceptions import FileNotUnderWorkDirError
+from HiveNetFileTransfer.digest import BlockDigest, BlockSignature
+from HiveNetFileTransfer.exceptions import FileNotUnderWorkDirError, Md5VerifyError
 
 
 __MOUDLE__ = 'grpc'  # 模块名
@@ -51,6 +53,65 @@ __AUTHOR__ = u'黎慧剑'  # 作者
 __PUBLISH__ = '2021.09.06'  # 发布日期
 
 
+#############################
+# 工具函数
+#############################
+def create_conn_pool(conn_config: dict, max_size: int = 10) -> AIOConnectionPool:
+    """
+    创建gRpc连接池
+
+    @param {dict} conn_config - grpc的连接参数, 具体参数参考HiveNetGRpc.client.AIOGRpcClient的初始化函数
+        注: use_sync_client参数无效, 将固定设置为True
+    @param {int} max_size=10 - 连接池的最大连接数
+
+    @returns {AIOConnectionPool} - 连接池对象
+    """
+    # 指定grpc客户端只能使用同步模式
+    conn_config['use_sync_client'] = True
+
+    return AIOConnectionPool(
+        AIOGRpcClient, GRpcPoolConnection, args=[conn_config], connect_method_name=None,
+        max_size=max_size, min_size=0, connect_on_init=False,
+        get_timeout=10, free_idle_time=10, ping_on_get=True,
+        ping_on_back=False, ping_on_idle=True, ping_interval=5
+    )
+
+
+def pool_grpc_call(service_uri: str, request, conn_pool: AIOConnectionPool = None,
+                   conn_config: dict = None) -> CResult:
+    """
+    从连接池获取连接执行grpc远程函数调用
+
+    @param {str} service_uri - 服务uri
+    @param {JsonRpcRequest} request - 请求对象
+    @param {AIOConnectionPool} conn_pool=None - 共享的连接池对象
+    @param {dict} conn_config=None - grpc的连接参数, 未传入连接池时使用该参数创建临时连接池
+
+    @returns {CResult} - 调用结果, result.resp为返回的json对象, result.extend_bytes为返回的字节数组
+
+    @throws {RuntimeError} - 调用失败时抛出异常
+    """
+    _pool = conn_pool if conn_pool is not None else create_conn_pool(conn_config, max_size=1)
+    try:
+        _conn: AIOGRpcClient = AsyncTools.sync_run_coroutine(_pool.connection())
+        try:
+            _result = AsyncTools.sync_run_coroutine(_conn.call(
+                service_uri, request
+            ))
+            _result = RemoteCallFormater.format_call_result(_result)
+            if not _result.is_success():
+                # 执行失败, 抛出异常
+                raise RuntimeError('call %s error: %s' % (service_uri, str(_result)))
+
+            return _result
+        finally:
+            # 释放连接
+            AsyncTools.sync_run_coroutine(_conn.close())
+    finally:
+        if conn_pool is None:
+            AsyncTools.sync_run_coroutine(_pool.close())
+
+
 class GRpcProtocolServer(object):
     """
     GRpc文件传输协议的服务端
@@ -99,6 +160,9 @@ class GRpcProtocolServer(object):
         AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
             'push_transfer_init_saver', self.push_transfer_init_saver
         ))
+        AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
+            'push_transfer_get_signature', self.push_transfer_get_signature
+        ))
         AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
             'push_transfer_get_save_info', self.push_transfer_get_save_info
         ))
@@ -118,6 +182,9 @@ class GRpcProtocolServer(object):
             'push_transfer_write_data', self.push_transfer_write_data,
             call_mode=EnumCallMode.BidirectionalStream
         ))  # 写入数据采用双向流的模式
+        AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
+            'push_transfer_pack_files', self.push_transfer_pack_files
+        ))
 
         # 添加客户端拉模式的处理函数
         AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
@@ -126,6 +193,18 @@ class GRpcProtocolServer(object):
         AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
             'pull_transfer_get_file_md5', self.pull_transfer_get_file_md5
         ))
+        AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
+            'pull_transfer_get_file_block_md5', self.pull_transfer_get_file_block_md5
+        ))
+        AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
+            'pull_transfer_get_delta', self.pull_transfer_get_delta
+        ))
+        AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
+            'pull_transfer_list_files', self.pull_transfer_list_files
+        ))
+        AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
+            'pull_transfer_pack_files', self.pull_transfer_pack_files
+        ))
         AsyncTools.sync_run_coroutine(self._grpc_server.add_service(
             'pull_transfer_open_file_handle', self.pull_transfer_open_file_handle
         ))
@@ -203,7 +282,8 @@ class GRpcProtocolServer(object):
     def push_transfer_init_saver(self, file: str, is_resume: bool = True, file_size: int = None, md5: str = None,
                                  is_overwrite: bool = False, extend_info: dict = None, thread_num: int = 1,
                                  block_size: int = 4096, cache_size: int = 1024,
-                                 auto_expand: bool = True) -> dict:
+                                 auto_expand: bool = True, verify_block_size: int = 0,
+                                 block_md5: list = None, delta_seed: list = None) -> dict:
         """
         初始化文件保存对象
 
@@ -219,6 +299,9 @@ class GRpcProtocolServer(object):
         @param {int} block_size=4096 - 每次写入块大小, 单位为byte
         @param {int} cache_size=1024 - 单线程缓存大小, 单位为kb(注意: 真实缓存大小还需要乘以处理线程数量)
         @param {bool} auto_expand=True - 是否自动扩展文件大小(否则在初始化时会自动创建指定大小的文件)
+        @param {int} verify_block_size=0 - 分块校验的分块大小, 单位为byte, 0代表不使用分块校验
+        @param {list} block_md5=None - 源文件的分块md5值清单, 传入代表使用分块校验
+        @param {list} delta_seed=None - 差异同步可从目标文件已有数据复制的区间清单, 每项为 [文件位置, 已有文件位置, 数据大小]
 
         @returns {dict} - 返回文件保存对象的信息
             {
@@ -247,7 +330,8 @@ class GRpcProtocolServer(object):
         _saver = TransferSaver(
             _file, is_resume=is_resume, file_size=file_size, md5=md5,
             is_overwrite=is_overwrite, extend_info=extend_info, thread_num=_thread_num,
-            block_size=block_size, cache_size=_cache_size, auto_expand=auto_expand
+            block_size=block_size, cache_size=_cache_size, auto_expand=auto_expand,
+            verify_block_size=verify_block_size, block_md5=block_md5, delta_seed=delta_seed
         )
         self._dealing_saver[_uuid] = {
             'saver': _saver, 'last': datetime.datetime.now()
@@ -258,6 +342,19 @@ class GRpcProtocolServer(object):
             'id': _uuid, 'thread_num': _saver._thread_num
         }
 
+    @RemoteCallFormater.format_service(with_request=False)
+    def push_transfer_get_signature(self, file: str, block_size: int) -> list:
+        """
+        获取要保存的文件已有数据的分块签名(差异同步)
+
+        @param {str} file - 要保存的文件路径(工作目录的相对路径)
+        @param {int} block_size - 分块大小, 单位为byte
+
+        @returns {list} - 分块签名清单, 每项为 [弱校验值, md5值], 如果文件不存在返回空清单
+        """
+        _file = self._get_file_real_path(file)
+        return BlockSignature.get_file_signature(_file, block_size)
+
     @RemoteCallFormater.format_service(with_request=False)
     def push_transfer_flush(self, id: str):
         """
@@ -359,9 +456,82 @@ class GRpcProtocolServer(object):
         self._dealing_saver[id]['last'] = datetime.datetime.now()
         return self._dealing_saver[id]['saver'].get_extend_info()
 
+    @RemoteCallFormater.format_service(with_request=True, native_request=True)
+    def push_transfer_pack_files(self, request: dict, files: list, is_overwrite: bool = False) -> list:
+        """
+        保存打包传输的多个小文件
+        注: 所有文件的数据按顺序拼接后通过请求对象的extend_bytes传入
+
+        @param {dict} request - 请求信息字典
+            {
+                'request': request,  # 请求报文对象
+                'context': context,  # 请求服务端上下文, grpc.ServicerContext
+                'call_mode': call_mode  # 调用模式
+            }
+        @param {list} files - 文件清单, 每项为 [要保存的文件路径(工作目录的相对路径), 文件大小, 文件md5值]
+        @param {bool} is_overwrite=False - 是否覆盖已有文件
+
+        @returns {list} - 与文件清单对应的处理结果清单, 成功为'', 失败为错误信息
+        """
+        _data = request['request'].extend_bytes
+        _pos = 0
+        _results = list()
+        for _file, _size, _md5 in files:
+            _file_data = _data[_pos: _pos + _size]
+            _pos += _size
+            try:
+                if hashlib.md5(_file_data).hexdigest() != _md5:
+                    raise Md5VerifyError('md5 verify error')
+
+                LocalProtocol.save_file_data(
+                    self._get_file_real_path(_file), _file_data, is_overwrite=is_overwrite
+                )
+                _results.append('')
+            except Exception as _e:
+                _results.append('%s: %s' % (type(_e).__name__, str(_e)))
+
+        return _results
+
     #############################
     # 拉文件模式服务函数
     #############################
+    @RemoteCallFormater.format_service(with_request=False)
+    def pull_transfer_list_files(self, path: str) -> list:
+        """
+        获取目录下的文件清单(包括子目录)
+
+        @param {str} path - 目录路径
+
+        @returns {list} - 文件清单, 每项为 [相对目录的文件路径, 文件大小]
+        """
+        return LocalProtocol.list_src_files(self._get_file_real_path(path))
+
+    @RemoteCallFormater.format_service(with_request=False)
+    def pull_transfer_pack_files(self, files: list):
+        """
+        打包获取多个小文件的数据
+        注: 所有文件的数据按顺序拼接后通过响应对象的extend_bytes返回
+
+        @param {list} files - 文件路径清单
+
+        @returns {JsonRpcResponse} - 响应对象, 返回的json对象为与文件路径清单对应的文件信息清单,
+            每项为 [文件大小, 文件md5值, 错误信息], 获取成功错误信息为''
+        """
+        _infos = list()
+        _datas = list()
+        for _file in files:
+            try:
+                with open(self._get_file_real_path(_file), 'rb') as _f:
+                    _data = _f.read()
+                _infos.append([len(_data), hashlib.md5(_data).hexdigest(), ''])
+                _datas.append(_data)
+            except Exception as _e:
+                _infos.append([0, '', '%s: %s' % (type(_e).__name__, str(_e))])
+
+        return RemoteCallFormater.service_resp_to_grpc_resp(
+            _infos, EnumCallMode.Simple, extend_bytes=b''.join(_datas)
+        )
+
     @RemoteCallFormater.format_service(with_request=False)
     def pull_transfer_get_file_size(self, file: str) -> int:
         """
@@ -386,6 +556,36 @@ class GRpcProtocolServer(object):
         _file = self._get_file_real_path(file)
         return NetTool.get_file_md5(_file)
 
+    @RemoteCallFormater.format_service(with_request=False)
+    def pull_transfer_get_file_block_md5(self, file: str, block_size: int, blocks: list = None) -> list:
+        """
+        获取文件指定分块的md5值
+
+        @param {str} file - 文件路径
+        @param {int} block_size - 分块大小, 单位为byte
+        @param {list} blocks=None - 要获取的分块索引清单, 不传代表获取所有分块
+
+        @returns {list} - 与分块索引清单对应的md5值清单
+        """
+        _file = self._get_file_real_path(file)
+        return BlockDigest.get_file_block_md5(
+            _file, os.path.getsize(_file), block_size, blocks=blocks
+        )
+
+    @RemoteCallFormater.format_service(with_request=False)
+    def pull_transfer_get_delta(self, file: str, block_size: int, signature: list) -> list:
+        """
+        根据目标端已有文件的分块签名获取可复制的区间清单(差异同步)
+
+        @param {str} file - 文件路径
+        @param {int} block_size - 分块大小, 单位为byte
+        @param {list} signature - 目标端已有文件的分块签名清单, 每项为 [弱校验值, md5值]
+
+        @returns {list} - 可复制区间清单, 每项为 [源文件位置, 目标端已有文件位置, 数据大小]
+        """
+        _file = self._get_file_real_path(file)
+        return BlockSignature.get_delta(_file, os.path.getsize(_file), signature, block_size)
+
     @RemoteCallFormater.format_service(with_request=False)
     def pull_transfer_open_file_handle(self, file: str) -> dict:
         """
@@ -534,19 +734,18 @@ class GRpcPushProtocol(LocalProtocol):
         @param {kwargs} - 扩展参数, 重载类自行扩展处理所需的参数
             conn_config {dict} - grpc的连接参数, 具体参数参考HiveNetGRpc.client.AIOGRpcClient的初始化函数
                 注: use_sync_client参数无效, 将固定设置为True
+            conn_pool {AIOConnectionPool} - 共享的grpc连接池, 可通过 create_conn_pool 创建
+                注: 传入后不再使用conn_config创建连接池, 多个文件的传输可复用同一组连接
         """
         # 自定义的参数
-        self.conn_config = kwargs['conn_config']
-        # 指定grpc客户端只能使用同步模式
-        self.conn_config['use_sync_client'] = True
+        self.conn_config = kwargs.get('conn_config', None)
 
         # 创建连接线程池
-        self._pool = AIOConnectionPool(
-            AIOGRpcClient, GRpcPoolConnection, args=[self.conn_config], connect_method_name=None,
-            max_size=max(thread_num, 10), min_size=0, connect_on_init=False,
-            get_timeout=10, free_idle_time=10, ping_on_get=True,
-            ping_on_back=False, ping_on_idle=True, ping_interval=5
-        )
+        self._is_share_pool = kwargs.get('conn_pool', None) is not None
+        if self._is_share_pool:
+            self._pool = kwargs['conn_pool']
+        else:
+            self._pool = create_conn_pool(self.conn_config, max_size=max(thread_num, 10))
 
         # 执行父类的初始化函数
         super().__init__(
@@ -559,10 +758,11 @@ class GRpcPushProtocol(LocalProtocol):
         """
         析构函数
         """
-        # 关闭连接池
-        AsyncTools.sync_run_coroutine(
-            self._pool.close()
-        )
+        # 关闭连接池(共享的连接池由创建方关闭)
+        if not self._is_share_pool:
+            AsyncTools.sync_run_coroutine(
+                self._pool.close()
+            )
 
     #############################
     # 写入对象的工具函数
@@ -573,7 +773,18 @@ class GRpcPushProtocol(LocalProtocol):
         """
         # 处理源文件信息
         self._file_size = self.get_file_size()
-        self._file_md5 = self.get_file_md5()
+        _block_md5 = None
+        if self._verify_block_size > 0 and self._file_size is not None:
+            # 分块校验, 远端保存对象在完成写入时就需要进行校验, 因此在传输前并行计算源文件的分块md5
+            self._file_md5 = None
+            _block_md5 = self.get_file_block_md5()
+        else:
+            self._file_md5 = self.get_file_md5()
+
+        # 差异同步处理
+        _delta_seed = None
+        if self._delta_block_size > 0 and self.is_overwrite and self._file_size is not None:
+            _delta_seed = self.get_delta_seed()
 
         # 初始化远端的数据保存对象
         _ret = self._grpc_call(
@@ -581,7 +792,8 @@ class GRpcPushProtocol(LocalProtocol):
                 'is_resume': self.is_resume, 'file_size': self._file_size, 'md5': self._file_md5,
                 'is_overwrite': self.is_overwrite, 'extend_info': None, 'thread_num': self.thread_num,
                 'block_size': self.block_size, 'cache_size': self.cache_size,
-                'auto_expand': self.auto_expand
+                'auto_expand': self.auto_expand, 'verify_block_size': self._verify_block_size,
+                'block_md5': _block_md5, 'delta_seed': _delta_seed
             }
         )
 
@@ -589,6 +801,16 @@ class GRpcPushProtocol(LocalProtocol):
         self._saver = _ret['id']
         self.thread_num = _ret['thread_num']  # 线程数有可能被改变
 
+    def get_dest_signature(self) -> list:
+        """
+        获取目标端已有文件的分块签名
+
+        @returns {list} - 分块签名清单, 每项为 [弱校验值, md5值], 如果文件不存在返回空清单
+        """
+        return self._grpc_call(
+            'push_transfer_get_signature', para_args=[self.dest_file, self._delta_block_size]
+        )
+
     def destroy_saver(self):
         """
         销毁接收数据对象
@@ -597,6 +819,57 @@ class GRpcPushProtocol(LocalProtocol):
             'push_transfer_close', para_args=[self._saver]
         )
 
+    #############################
+    # 多文件传输的工具函数
+    #############################
+    @classmethod
+    def pack_transfer(cls, files: list, is_overwrite: bool = False, **kwargs) -> list:
+        """
+        将多个小文件打包在一次请求中传输
+        注: 整个文件一次传输, 不支持续传, 适用于小文件
+
+        @param {list} files - 要传输的文件清单, 每项为 [源文件路径, 目标文件路径(远端工作目录的相对路径)]
+        @param {bool} is_overwrite=False - 是否覆盖已有文件
+        @param {kwargs} - 扩展参数, 与传输协议初始化的扩展参数一致
+            conn_pool {AIOConnectionPool} - 共享的grpc连接池, 不传则使用conn_config创建临时连接池
+
+        @returns {list} - 与文件清单对应的处理结果清单, 成功为'', 失败为错误信息
+        """
+        # 读取本地文件数据
+        _results = [''] * len(files)
+        _send_files = list()
+        _send_indexs = list()
+        _datas = list()
+        for _index, (_src_file, _dest_file) in enumerate(files):
+            try:
+                with open(_src_file, 'rb') as _file:
+                    _data = _file.read()
+            except Exception as _e:
+                _results[_index] = '%s: %s' % (type(_e).__name__, str(_e))
+                continue
+
+            _send_files.append([_dest_file, len(_data), hashlib.md5(_data).hexdigest()])
+            _send_indexs.append(_index)
+            _datas.append(_data)
+
+        if len(_send_files) == 0:
+            return _results
+
+        # 数据拼接后一次发送
+        _request = RemoteCallFormater.paras_to_grpc_request(
+            args=[_send_files], kwargs={'is_overwrite': is_overwrite}
+        )
+        _request.extend_bytes = b''.join(_datas)
+        _ret = pool_grpc_call(
+            'push_transfer_pack_files', _request, conn_pool=kwargs.get('conn_pool', None),
+            conn_config=kwargs.get('conn_config', None)
+        ).resp
+
+        for _index, _msg in zip(_send_indexs, _ret):
+            _results[_index] = _msg
+
+        return _results
+
     #############################
     # 写入对象的工具函数(需继承类实现)
     #############################
@@ -898,19 +1171,18 @@ class GRpcPullProtocol(LocalProtocol):
         @param {kwargs} - 扩展参数, 重载类自行扩展处理所需的参数
             conn_config {dict} - grpc的连接参数, 具体参数参考HiveNetGRpc.client.AIOGRpcClient的初始化函数
                 注: use_sync_client参数无效, 将固定设置为True
+            conn_pool {AIOConnectionPool} - 共享的grpc连接池, 可通过 create_conn_pool 创建
+                注: 传入后不再使用conn_config创建连接池, 多个文件的传输可复用同一组连接
         """
         # 自定义的参数
-        self.conn_config = kwargs['conn_config']
-        # 指定grpc客户端只能使用同步模式
-        self.conn_config['use_sync_client'] = True
+        self.conn_config = kwargs.get('conn_config', None)
 
         # 创建连接线程池
-        self._pool = AIOConnectionPool(
-            AIOGRpcClient, GRpcPoolConnection, args=[self.conn_config], connect_method_name=None,
-            max_size=max(thread_num, 10), min_size=0, connect_on_init=False,
-            get_timeout=10, free_idle_time=10, ping_on_get=True,
-            ping_on_back=False, ping_on_idle=True, ping_interval=5
-        )
+        self._is_share_pool = kwargs.get('conn_pool', None) is not None
+        if self._is_share_pool:
+            self._pool = kwargs['conn_pool']
+        else:
+            self._pool = create_conn_pool(self.conn_config, max_size=max(thread_num, 10))
 
         # 执行父类的初始化函数
         super().__init__(
@@ -923,15 +1195,71 @@ class GRpcPullProtocol(LocalProtocol):
         """
         析构函数
         """
-        # 关闭连接池
-        AsyncTools.sync_run_coroutine(
-            self._pool.close()
+        # 关闭连接池(共享的连接池由创建方关闭)
+        if not self._is_share_pool:
+            AsyncTools.sync_run_coroutine(
+                self._pool.close()
+            )
+
+    #############################
+    # 多文件传输的工具函数
+    #############################
+    @classmethod
+    def list_src_files(cls, src_dir: str, **kwargs) -> list:
+        """
+        获取源目录下的文件清单(包括子目录), 用于目录传输
+
+        @param {str} src_dir - 源目录(指的是远端服务器上的路径, 是约定工作目录的相对路径)
+        @param {kwargs} - 扩展参数, 与传输协议初始化的扩展参数一致
+            conn_pool {AIOConnectionPool} - 共享的grpc连接池, 不传则使用conn_config创建临时连接池
+
+        @returns {list} - 文件清单, 每项为 [相对源目录的文件路径, 文件大小]
+        """
+        return pool_grpc_call(
+            'pull_transfer_list_files', RemoteCallFormater.paras_to_grpc_request(args=[src_dir]),
+            conn_pool=kwargs.get('conn_pool', None), conn_config=kwargs.get('conn_config', None)
+        ).resp
+
+    @classmethod
+    def pack_transfer(cls, files: list, is_overwrite: bool = False, **kwargs) -> list:
+        """
+        将多个小文件打包在一次请求中传输
+        注: 整个文件一次传输, 不支持续传, 适用于小文件
+
+        @param {list} files - 要传输的文件清单, 每项为 [源文件路径(远端工作目录的相对路径), 目标文件路径]
+        @param {bool} is_overwrite=False - 是否覆盖已有文件
+        @param {kwargs} - 扩展参数, 与传输协议初始化的扩展参数一致
+            conn_pool {AIOConnectionPool} - 共享的grpc连接池, 不传则使用conn_config创建临时连接池
+
+        @returns {list} - 与文件清单对应的处理结果清单, 成功为'', 失败为错误信息
+        """
+        # 一次请求获取所有文件数据
+        _ret = pool_grpc_call(
+            'pull_transfer_pack_files',
+            RemoteCallFormater.paras_to_grpc_request(args=[[_item[0] for _item in files]]),
+            conn_pool=kwargs.get('conn_pool', None), conn_config=kwargs.get('conn_config', None)
         )
 
+        _results = list()
+        _pos = 0
+        for (_src_file, _dest_file), (_size, _md5, _msg) in zip(files, _ret.resp):
+            _data = _ret.extend_bytes[_pos: _pos + _size]
+            _pos += _size
+            if _msg == '':
+                try:
+                    if hashlib.md5(_data).hexdigest() != _md5:
+                        raise Md5VerifyError('md5 verify error')
+
+                    LocalProtocol.save_file_data(_dest_file, _data, is_overwrite=is_overwrite)
+                except Exception as _e:
+                    _msg = '%s: %s' % (type(_e).__name__, str(_e))
+            _results.append(_msg)
+
+        return _results
+
     #############################
     # 文件读取的工具函数
     #############################
-
     def get_file_size(self) -> int:
         """
         获取文件的大小
@@ -952,6 +1280,33 @@ class GRpcPullProtocol(LocalProtocol):
             'pull_transfer_get_file_md5', para_args=[self.src_file]
         )
 
+    def get_delta_seed(self) -> list:
+        """
+        获取差异同步可从目标端已有文件复制的区间清单
+
+        @returns {list} - 可复制区间清单, 每项为 [源文件位置, 目标端已有文件位置, 数据大小]
+        """
+        _signature = self.get_dest_signature()
+        if len(_signature) == 0:
+            return []
+
+        return self._grpc_call(
+            'pull_transfer_get_delta', para_args=[self.src_file, self._delta_block_size, _signature]
+        )
+
+    def get_file_block_md5(self, blocks: list = None) -> list:
+        """
+        获取文件指定分块的md5值
+
+        @param {list} blocks=None - 要获取的分块索引清单, 不传代表获取所有分块
+
+        @returns {list} - 与分块索引清单对应的md5值清单
+        """
+        return self._grpc_call(
+            'pull_transfer_get_file_block_md5', para_args=[self.src_file, self._verify_block_size],
+            para_kwargs={'blocks': blocks}
+        )
+
     #############################
     # 文件读取的工具函数(需继承类实现)
     #############################
@@ -1056,12 +1411,16 @@ class GRpcPullProtocol(LocalProtocol):
             if type(_bytes) != bytes:
                 # 非数据类型, 则为异常
                 raise _bytes
-
-            # 返回处理结果
-            return _bytes
         finally:
             lock.release()
 
+        # 增量计算源文件分块md5
+        if self._src_digest is not None:
+            self._src_digest.update(start, _bytes)
+
+        # 返回处理结果
+        return _bytes
+
     #############################
     # 内部函数
     #############################
@@ -22,6 +22,7 @@ from HiveNetCore.utils.net_tool import NetTool
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetFileTransfer.saver import TransferSaver
+from HiveNetFileTransfer.digest import BlockDigest, BlockSignature
 
 
 __MOUDLE__ = 'protocol'  # 模块名
@@ -233,6 +234,35 @@ class ProtocolFw(object):
         """
         raise NotImplementedError()
 
+    #############################
+    # 多文件传输的工具函数(需继承类实现)
+    #############################
+    @classmethod
+    def list_src_files(cls, src_dir: str, **kwargs) -> list:
+        """
+        获取源目录下的文件清单(包括子目录), 用于目录传输
+
+        @param {str} src_dir - 源目录
+        @param {kwargs} - 扩展参数, 与传输协议初始化的扩展参数一致
+
+        @returns {list} - 文件清单, 每项为 [相对源目录的文件路径, 文件大小]
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def pack_transfer(cls, files: list, is_overwrite: bool = False, **kwargs) -> list:
+        """
+        将多个小文件打包在一次请求中传输
+        注: 整个文件一次传输, 不支持续传, 适用于小文件
+
+        @param {list} files - 要传输的文件清单, 每项为 [源文件路径, 目标文件路径]
+        @param {bool} is_overwrite=False - 是否覆盖已有文件
+        @param {kwargs} - 扩展参数, 与传输协议初始化的扩展参数一致
+
+        @returns {list} - 与文件清单对应的处理结果清单, 成功为'', 失败为错误信息
+        """
+        raise NotImplementedError()
+
 
 class LocalProtocol(ProtocolFw):
     """
@@ -258,6 +288,12 @@ class LocalProtocol(ProtocolFw):
         @param {int} cache_size=1024 - 单线程缓存大小, 单位为kb(注意: 真实缓存大小还需要乘以处理线程数量)
         @param {bool} auto_expand=True - 是否自动扩展文件大小(否则在初始化时会自动创建指定大小的文件)
         @param {kwargs} - 扩展参数, 重载类自行扩展处理所需的参数
+            verify_block_size {int} - 分块校验的分块大小, 单位为byte, 默认为0代表使用整个文件的md5进行校验
+                注: 使用分块校验时, 源文件在读取数据时增量计算分块md5, 完成传输后按分块进行校验,
+                    并只重新传输校验失败的分块
+            delta_block_size {int} - 差异同步的分块大小, 单位为byte, 默认为0代表不使用差异同步
+                注: 使用差异同步时, 如果目标文件已存在且指定覆盖, 将获取目标文件的分块签名, 源文件中与签名相同的
+                    数据块直接从目标文件已有数据复制, 只传输有变化的数据
         """
         # 要保存的参数
         self.src_file = src_file
@@ -280,6 +316,13 @@ class LocalProtocol(ProtocolFw):
         self._writer_handles_lock = threading.RLock()  # 控制打开关闭文件的锁
         self._mutiple_write = False  # 控制是否允许多线程写的变量
 
+        # 分块校验的参数
+        self._verify_block_size = kwargs.get('verify_block_size', 0)
+        self._src_digest: BlockDigest = None  # 源文件的分块md5计算对象
+
+        # 差异同步的参数
+        self._delta_block_size = kwargs.get('delta_block_size', 0)
+
         # 初始化数据接收对象
         self.init_saver()
 
@@ -347,6 +390,66 @@ class LocalProtocol(ProtocolFw):
         """
         return NetTool.get_file_md5(self.src_file)
 
+    def get_file_block_md5(self, blocks: list = None) -> list:
+        """
+        获取文件指定分块的md5值
+
+        @param {list} blocks=None - 要获取的分块索引清单, 不传代表获取所有分块
+
+        @returns {list} - 与分块索引清单对应的md5值清单
+        """
+        if type(self.src_file) == str:
+            return BlockDigest.get_file_block_md5(
+                self.src_file, self._file_size, self._verify_block_size, blocks=blocks,
+                workers=max(self.thread_num, 4)
+            )
+
+        # 已打开的文件对象, 需要锁定文件访问
+        _file_dict = self.open_file(0)
+        with _file_dict['lock']:
+            return BlockDigest.get_file_block_md5(
+                self.src_file, self._file_size, self._verify_block_size, blocks=blocks
+            )
+
+    def get_dest_signature(self) -> list:
+        """
+        获取目标端已有文件的分块签名
+
+        @returns {list} - 分块签名清单, 每项为 [弱校验值, md5值], 如果文件不存在返回空清单
+        """
+        return BlockSignature.get_file_signature(self.dest_file, self._delta_block_size)
+
+    def get_delta_seed(self) -> list:
+        """
+        获取差异同步可从目标端已有文件复制的区间清单
+
+        @returns {list} - 可复制区间清单, 每项为 [源文件位置, 目标端已有文件位置, 数据大小]
+        """
+        _signature = self.get_dest_signature()
+        if len(_signature) == 0:
+            return []
+
+        if type(self.src_file) == str:
+            return BlockSignature.get_delta(
+                self.src_file, self._file_size, _signature, self._delta_block_size
+            )
+
+        # 已打开的文件对象, 需要锁定文件访问
+        _file_dict = self.open_file(0)
+        with _file_dict['lock']:
+            return BlockSignature.get_delta(
+                self.src_file, self._file_size, _signature, self._delta_block_size
+            )
+
+    def get_verify_block_md5(self) -> list:
+        """
+        获取用于分块校验的源文件所有分块md5值
+        注: 传输过程中已增量计算完成的分块直接使用计算结果, 其他分块再从源文件获取
+
+        @returns {list} - 所有分块的md5值清单
+        """
+        return self._src_digest.get_digests(self.get_file_block_md5)
+
     #############################
     # 文件读取的工具函数(需继承类实现)
     #############################
@@ -435,11 +538,15 @@ class LocalProtocol(ProtocolFw):
             # 移动到指定位置并获取数据
             handle.seek(start)
             _bytes = handle.read(size)
-
-            return _bytes
         finally:
             lock.release()
 
+        # 增量计算源文件分块md5
+        if self._src_digest is not None:
+            self._src_digest.update(start, _bytes)
+
+        return _bytes
+
     #############################
     # 写入对象的工具函数
     #############################
@@ -449,13 +556,26 @@ class LocalProtocol(ProtocolFw):
         """
         # 处理源文件信息
         self._file_size = self.get_file_size()
-        self._file_md5 = self.get_file_md5()
+        if self._verify_block_size > 0 and self._file_size is not None:
+            # 分块校验, 无需在传输前计算整个文件的md5
+            self._file_md5 = None
+            self._src_digest = BlockDigest(self._file_size, self._verify_block_size)
+        else:
+            self._file_md5 = self.get_file_md5()
+
+        # 差异同步处理
+        _delta_seed = None
+        if self._delta_block_size > 0 and self.is_overwrite and self._file_size is not None:
+            _delta_seed = self.get_delta_seed()
 
         # 处理文件传输接收对象
         self._saver = TransferSaver(
             self.dest_file, is_resume=self.is_resume, file_size=self._file_size, md5=self._file_md5,
             is_overwrite=self.is_overwrite, thread_num=self.thread_num, block_size=self.block_size,
-            cache_size=self.cache_size, auto_expand=self.auto_expand
+            cache_size=self.cache_size, auto_expand=self.auto_expand,
+            verify_block_size=self._verify_block_size,
+            block_md5=None if self._src_digest is None else self.get_verify_block_md5,
+            delta_seed=_delta_seed
         )
         self.thread_num = self._saver._thread_num  # 线程数有可能被改变
 
@@ -557,6 +677,76 @@ class LocalProtocol(ProtocolFw):
         """
         return self._saver.get_extend_info()
 
+    #############################
+    # 多文件传输的工具函数
+    #############################
+    @classmethod
+    def list_src_files(cls, src_dir: str, **kwargs) -> list:
+        """
+        获取源目录下的文件清单(包括子目录), 用于目录传输
+
+        @param {str} src_dir - 源目录
+        @param {kwargs} - 扩展参数, 与传输协议初始化的扩展参数一致
+
+        @returns {list} - 文件清单, 每项为 [相对源目录的文件路径, 文件大小]
+        """
+        _files = list()
+        for _root, _dirs, _names in os.walk(src_dir):
+            _dirs.sort()
+            for _name in sorted(_names):
+                _file = os.path.join(_root, _name)
+                _files.append([os.path.relpath(_file, src_dir), os.path.getsize(_file)])
+
+        return _files
+
+    @classmethod
+    def pack_transfer(cls, files: list, is_overwrite: bool = False, **kwargs) -> list:
+        """
+        将多个小文件打包在一次请求中传输
+        注: 整个文件一次传输, 不支持续传, 适用于小文件
+
+        @param {list} files - 要传输的文件清单, 每项为 [源文件路径, 目标文件路径]
+        @param {bool} is_overwrite=False - 是否覆盖已有文件
+        @param {kwargs} - 扩展参数, 与传输协议初始化的扩展参数一致
+
+        @returns {list} - 与文件清单对应的处理结果清单, 成功为'', 失败为错误信息
+        """
+        _results = list()
+        for _src_file, _dest_file in files:
+            try:
+                with open(_src_file, 'rb') as _file:
+                    _data = _file.read()
+                cls.save_file_data(_dest_file, _data, is_overwrite=is_overwrite)
+                _results.append('')
+            except Exception as _e:
+                _results.append('%s: %s' % (type(_e).__name__, str(_e)))
+
+        return _results
+
+    @classmethod
+    def save_file_data(cls, file: str, data: bytes, is_overwrite: bool = False):
+        """
+        将完整的文件数据保存为文件
+        注: 先写入临时文件再替换, 避免出现不完整的文件
+
+        @param {str} file - 要保存的文件路径
+        @param {bytes} data - 文件数据
+        @param {bool} is_overwrite=False - 是否覆盖已有文件
+
+        @throws {FileExistsError} - 如果文件已存在且不允许覆盖的情况抛出异常
+        """
+        if not is_overwrite and os.path.exists(file):
+            raise FileExistsError('file exists: %s' % file)
+
+        _path = os.path.dirname(file)
+        if _path != '':
+            os.makedirs(_path, exist_ok=True)
+
+        _temp_file = '%s.tmp' % file
+        with open(_temp_file, 'wb') as _file:
+            _file.write(data)
+        os.replace(_temp_file, file)
+
 
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作
@@ -16,6 +16,7 @@
 import os
 import sys
 import json
+import time
 import threading
 from HiveNetCore.utils.file_tool import FileTool
 from HiveNetCore.utils.net_tool import NetTool
@@ -24,6 +25,7 @@ from HiveNetCore.utils.debug_tool import DebugTool
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetFileTransfer.exceptions import InfoFileLockError, AlreadyKnowFileSizeError, Md5VerifyError
+from HiveNetFileTransfer.digest import BlockDigest
 
 
 __MOUDLE__ = 'saver'  # 模块名
@@ -42,7 +44,9 @@ class TransferSaver(object):
                  is_overwrite: bool = False,
                  temp_ext: str = 'tmp', info_ext: str = 'info',
                  extend_info: dict = None, thread_num: int = 1, block_size: int = 4096, cache_size: int = 1024,
-                 auto_expand: bool = True):
+                 auto_expand: bool = True, journal_ext: str = 'journal', checkpoint_interval: float = 5.0,
+                 verify_block_size: int = 0, block_md5=None, verify_retry: int = 3,
+                 delta_seed: list = None, fsync_data: bool = True):
         """
         初始化文件保存对象
 
@@ -60,6 +64,21 @@ class TransferSaver(object):
         @param {int} block_size=4096 - 每次写入块大小, 单位为byte
         @param {int} cache_size=1024 - 单线程缓存大小, 单位为kb（注意：真实缓存大小还需要乘以处理线程数量）
         @param {bool} auto_expand=True - 是否自动扩展文件大小（否则在初始化时会自动创建指定大小的文件）
+        @param {str} journal_ext='journal' - 处理过程中写入日志文件扩展名
+            注：每次缓存写入文件后只在日志文件追加一行写入区间记录, 续传时将日志记录重放到信息文件的存储索引中
+        @param {float} checkpoint_interval=5.0 - 将写入日志合并到信息文件的时间间隔, 单位为秒
+            注：合并时先写入临时信息文件再替换, 然后清空日志文件, 避免中断导致信息文件损坏
+        @param {int} verify_block_size=0 - 分块校验的分块大小, 单位为byte, 0代表不使用分块校验
+            注：使用分块校验时写入数据的同时增量计算分块md5, 完成写入后按分块与源文件比较, 不一致的分块将重新获取
+        @param {list|function} block_md5=None - 源文件的分块md5值清单, 或获取分块md5值清单的函数(在完成写入后调用)
+            注：传入该参数且文件大小已知的情况才使用分块校验, 此时不再使用md5参数进行整个文件的校验
+        @param {int} verify_retry=3 - 分块校验失败时重新获取数据的最大次数, 超过将返回文件md5校验失败
+        @param {list} delta_seed=None - 可从目标文件已有数据复制的区间清单(差异同步), 每项为 [文件位置, 已有文件位置, 数据大小]
+            注：只有在目标文件已存在且允许覆盖、文件大小已知且不是续传的情况下才会处理, 初始化时直接从已有文件复制
+                这些区间的数据, 只需获取其余区间的数据; 区间清单可以通过 BlockSignature.get_delta 获取
+        @param {bool} fsync_data=True - 登记写入日志前是否先将临时文件数据同步到磁盘(os.fsync)
+            注：为True时操作系统崩溃或断电后续传也不会跳过未落盘的数据; 为False时可减少磁盘同步提升写入性能,
+                但写入日志只保证进程中断的续传, 操作系统崩溃时只有合并到信息文件的写入情况是可靠的(合并前固定会同步数据)
 
         @throws {FileExistsError} - 如果下载文件已存在且不允许覆盖的情况抛出异常
         @throws {FileNotFoundError} - 续传情况下临时文件不存在则抛出异常
@@ -68,10 +87,14 @@ class TransferSaver(object):
         # 检查文件是否存在
         self._file = os.path.abspath(file)
         self._path, self._filename = os.path.split(self._file)
+        _old_file_exists = False  # 是否保留已存在的文件用于差异同步
         if os.path.exists(self._file):
             # 文件已存在
             if is_overwrite:
-                FileTool.remove_file(self._file)
+                if delta_seed is None or file_size is None:
+                    FileTool.remove_file(self._file)
+                else:
+                    _old_file_exists = True
             else:
                 raise FileExistsError('file exists: %s' % self._file)
         else:
@@ -100,6 +123,10 @@ class TransferSaver(object):
             # 处理信息字典、临时文件、信息文件
             self._temp_file = os.path.join(self._path, '%s.%s' % (self._filename, temp_ext))
             self._info_file = os.path.join(self._path, '%s.%s' % (self._filename, info_ext))
+            self._journal_file = os.path.join(self._path, '%s.%s' % (self._filename, journal_ext))
+            self._checkpoint_interval = checkpoint_interval
+            self._fsync_data = fsync_data
+            self._last_checkpoint = time.time()
             self._auto_expand = auto_expand
             self._thread_num = thread_num
             self._block_size = block_size
@@ -114,9 +141,15 @@ class TransferSaver(object):
 
             if is_resume and os.path.exists(self._info_file):
                 # 自动续传情况
-                self._info_file_handle = open(self._info_file, 'r+', encoding='utf-8')
-                self._info_file_handle.seek(0)
-                self._info = json.loads(self._info_file_handle.read())
+                with open(self._info_file, 'r', encoding='utf-8') as _info_file_handle:
+                    self._info = json.loads(_info_file_handle.read())
+
+                # 重放写入日志, 恢复最后一次合并后的写入情况
+                if os.path.exists(self._journal_file):
+                    with open(self._journal_file, 'r', encoding='utf-8') as _journal_file_handle:
+                        self._info['write_size'] += self._f_load_journal(
+                            self._info['store_index'], _journal_file_handle.read()
+                        )
 
                 # 检查传入信息是否一致
                 if file_size is not None and file_size != self._info['file_size']:
@@ -137,6 +170,10 @@ class TransferSaver(object):
 
                 self._tmp_file_handle = open(self._temp_file, 'rb+')
                 self._tmp_file_handle.seek(0)
+
+                if _old_file_exists:
+                    # 续传无需差异同步处理
+                    FileTool.remove_file(self._file)
             else:
                 # 删除已存在的临时文件信息
                 if os.path.exists(self._temp_file):
@@ -145,6 +182,9 @@ class TransferSaver(object):
                 if os.path.exists(self._info_file):
                     FileTool.remove_file(self._info_file)
 
+                if os.path.exists(self._journal_file):
+                    FileTool.remove_file(self._journal_file)
+
                 # 形成信息字典
                 self._info = {
                     'tmp_file': '%s.%s' % (self._filename, temp_ext),  # 临时文件名称
@@ -164,27 +204,42 @@ class TransferSaver(object):
                     self._tmp_file_handle.write(b'\x00')  # 一定要写入一个字符, 否则无效
                     self._tmp_file_handle.flush()
 
-                # 写入信息字典文件
-                self._info_file_handle = open(self._info_file, 'w', encoding='utf-8')
-                self._write_info_file()
+                if _old_file_exists:
+                    # 差异同步, 从已有文件复制相同的数据区间后删除已有文件
+                    self._write_delta_seed(delta_seed)
+                    FileTool.remove_file(self._file)
 
             # 合并存储索引, 把碎片合并成为大块
             self._info['store_index'] = self._f_merge_store_index(self._info['store_index'])
 
+            # 写入信息字典文件, 并清空已合并的写入日志
+            self._journal_file_handle = open(self._journal_file, 'a', encoding='utf-8')
+            self._write_info_file()
+
             # 初始化缓存等信息
             if self._info['file_size'] == -1:
                 # 如果没有文件大小的情况, 不支持拆分多写入线程和一次性创建指定大小文件的情况
                 self._thread_num = 1
                 self._auto_expand = True
 
-            # 缓存处理
+            # 分块校验处理
+            self._block_md5 = block_md5
+            self._verify_retry = verify_retry
+            self._digest = None
+            if verify_block_size > 0 and block_md5 is not None and self._info['file_size'] != -1:
+                self._digest = BlockDigest(self._info['file_size'], verify_block_size)
+
+            # 缓存处理, 每个线程预分配固定大小的缓存, 避免数据拼接时的内存复制
+            _buffer_size = self._cache_size + self._block_size
+            if self._info['file_size'] != -1:
+                _buffer_size = min(_buffer_size, self._info['file_size'])
             self._max_cache_pos = [-1, ]  # 当前缓存分配到的区域最大位置
             self._cache = dict()
             for _i in range(self._thread_num):
                 self._cache[_i] = {
                     'start': -1,  # 缓存数据对应文件的写入位置, -1代表没有设置
                     'size': 0,  # 缓存数据大小
-                    'buffer': bytes(),  # 具体的缓存数据
+                    'buffer': bytearray(_buffer_size),  # 预分配的缓存数据
                     'end_pos': -1,  # 该缓存对应线程要处理的文件块结束位置
                     'lock': threading.RLock(),  # 用于缓存线程处理的锁）
                     'get_start': -1,  # 当前正在获取的数据的开始位置
@@ -226,6 +281,11 @@ class TransferSaver(object):
         # 先写入缓存数据
         self.flush()
 
+        # 将写入日志合并到信息文件
+        with self._cache_info_lock:
+            if not self._is_finished and self._journal_file_handle is not None:
+                self._write_info_file()
+
         # 关闭所有打开文件
         self._clear_file_handle_and_lock()
 
@@ -300,6 +360,8 @@ class TransferSaver(object):
                 'start': -1,  # 开始位置, 如果传入-1代表该线程已无获取任务
                 'size': 0,  # 要获取数据的大小
             }
+
+        @throws {ValueError} - 传入数据的长度与size不一致时抛出异常
         """
         if index >= self._thread_num:
             # 索引有错误, 直接返回无获取任务的信息, 让前端不再处理该线程索引
@@ -313,18 +375,12 @@ class TransferSaver(object):
         ):
             _status = 0
             if start is not None:
-                # 涉及到修改cache, 统一锁定
-                with WaitLockTool(
-                    self._cache_info_lock, print_timeout=self._lock_print_timeout,
-                    label='_cache_info_lock %d' % index, print_acquire_ok=self._debug_on,
-                    print_release=self._debug_on
-                ):
-                    # 写入数据到缓存
-                    _status = self._write_data_to_cache(index, start, size, data)
-
-                    # 获取新的获取信息
-                    if _status == 0:
-                        self._set_cache_area(index, lock_cache=False)
+                # 写入数据到缓存, 内部只在更新缓存信息时锁定, 数据复制及写入文件不阻塞其他线程
+                _status = self._write_data_to_cache(index, start, size, data)
+
+                # 获取新的获取信息
+                if _status == 0:
+                    self._set_cache_area(index)
 
             # 返回下一次获取的数据区间
             _cache = self._cache[index]
@@ -338,15 +394,28 @@ class TransferSaver(object):
                     # 将临时文件改名, 清除临时文件
                     try:
                         if not self._dealed_finished:
-                            self._dealed_finished = True
-                            self._write_finished()
+                            if self._digest is not None and self._verify_blocks():
+                                # 分块校验失败, 重新获取校验失败的数据区间
+                                self._set_cache_area(index)
+                                _status = 0
+                            else:
+                                self._dealed_finished = True
+                                self._write_finished()
                     except Md5VerifyError:
+                        self._dealed_finished = True
                         _status = 3
                     except:
                         raise
                     finally:
                         self._dealed_finished_lock.release()
 
+                    if _status == 0 and _cache['start'] != -1:
+                        return {
+                            'status': _status, 'index': index,
+                            'start': _cache['get_start'],
+                            'size': _cache['get_size']
+                        }
+
                 return {
                     'status': _status, 'index': index, 'start': -1, 'size': 0
                 }
@@ -363,22 +432,47 @@ class TransferSaver(object):
 
     def _write_info_file(self):
         """
-        将内存写入信息文件
+        将内存写入信息文件, 并清空写入日志
+        注：先写入临时信息文件再进行替换, 保证中断时信息文件的完整性;
+            在替换后清空日志前中断的情况, 续传重放日志时已处理的记录不会变更存储索引;
+            写入信息文件前先将临时文件数据同步到磁盘, 保证信息文件登记的区间数据已落盘
         """
-        self._info_file_handle.truncate(0)
-        self._info_file_handle.seek(0)
-        self._info_file_handle.write(
-            json.dumps(self._info, ensure_ascii=False, indent=2)
-        )
-        self._info_file_handle.flush()
+        self._tmp_file_handle.flush()
+        os.fsync(self._tmp_file_handle.fileno())
+
+        _temp_info_file = '%s.%s' % (self._info_file, 'tmp')
+        with open(_temp_info_file, 'w', encoding='utf-8') as _file:
+            _file.write(
+                json.dumps(self._info, ensure_ascii=False, indent=2)
+            )
+            _file.flush()
+            os.fsync(_file.fileno())
+        os.replace(_temp_info_file, self._info_file)
+
+        self._journal_file_handle.truncate(0)
+        self._journal_file_handle.flush()
+        self._last_checkpoint = time.time()
+
+    def _write_journal(self, start_pos: int, size: int):
+        """
+        在写入日志中追加写入区间记录, 超过合并时间间隔的情况合并到信息文件
+
+        @param {int} start_pos - 写入数据的开始位置
+        @param {int} size - 写入数据的大小
+        """
+        if time.time() - self._last_checkpoint >= self._checkpoint_interval:
+            self._write_info_file()
+        else:
+            self._journal_file_handle.write('%d,%d\n' % (start_pos, size))
+            self._journal_file_handle.flush()
 
     def _clear_file_handle_and_lock(self):
         """
         清理文件句柄及锁文件
         """
         # 关闭文件句柄
-        if hasattr(self, '_info_file_handle') and self._info_file_handle is not None:
-            self._info_file_handle.close()
+        if hasattr(self, '_journal_file_handle') and self._journal_file_handle is not None:
+            self._journal_file_handle.close()
 
         if hasattr(self, '_tmp_file_handle') and self._tmp_file_handle is not None:
             self._tmp_file_handle.close()
@@ -425,8 +519,8 @@ class TransferSaver(object):
         _cache = self._cache[index]
 
         with WaitLockTool(
-            self._tmp_file_lock, print_timeout=self._lock_print_timeout,
-            label='_tmp_file_lock %d' % index, print_acquire_ok=self._debug_on,
+            _cache['lock'], print_timeout=self._lock_print_timeout,
+            label='cache %d' % index, print_acquire_ok=self._debug_on,
             print_release=self._debug_on, force_no_acquire=(not lock_cache)
         ):
             if _cache['size'] <= 0:
@@ -437,10 +531,17 @@ class TransferSaver(object):
             _start_pos = _cache['start']
             _size = _cache['size']
 
-            # 写入文件, 更新info字典
-            self._tmp_file_handle.seek(_start_pos)
-            _write_size = self._tmp_file_handle.write(_cache['buffer'])
-            self._tmp_file_handle.flush()
+            # 写入文件, 文件写入无需锁定缓存信息
+            with memoryview(_cache['buffer']) as _view:
+                _write_size = self._write_to_file(_start_pos, _view[0: _size])
+
+                # 增量计算分块md5
+                if self._digest is not None:
+                    self._digest.update(_start_pos, _view[0: _size])
+
+            if self._fsync_data:
+                # 登记写入日志前先将数据同步到磁盘, 避免操作系统崩溃时日志登记的区间数据未落盘
+                os.fsync(self._tmp_file_handle.fileno())
 
             # 更新info字典的store_index
             with WaitLockTool(
@@ -460,9 +561,9 @@ class TransferSaver(object):
                     # 更新已写入数据大小
                     self._info['write_size'] += _write_size
 
-                    # 写入info文件
+                    # 登记写入日志
                     if not self._is_finished:
-                        self._write_info_file()
+                        self._write_journal(_start_pos, _size)
 
                     # 更新cache信息
                     _end_pos = _cache['end_pos']
@@ -474,7 +575,36 @@ class TransferSaver(object):
                         _cache['start'] = _start_pos + _size
 
                     _cache['size'] = 0
-                    _cache['buffer'] = bytes()
+
+        return _is_writed
+
+    def _write_to_file(self, start_pos: int, data: memoryview) -> int:
+        """
+        将数据写入临时文件的指定位置
+        注：支持os.pwrite的情况直接按位置写入, 无需移动文件指针, 多线程写入不用相互等待
+
+        @param {int} start_pos - 写入文件的开始位置
+        @param {memoryview} data - 要写入的数据
+
+        @returns {int} - 写入数据的大小
+        """
+        if hasattr(os, 'pwrite'):
+            _fd = self._tmp_file_handle.fileno()
+            _write_size = 0
+            _size = len(data)
+            while _write_size < _size:
+                _write_size += os.pwrite(_fd, data[_write_size:], start_pos + _write_size)
+        else:
+            with WaitLockTool(
+                self._tmp_file_lock, print_timeout=self._lock_print_timeout,
+                label='_tmp_file_lock', print_acquire_ok=self._debug_on,
+                print_release=self._debug_on
+            ):
+                self._tmp_file_handle.seek(start_pos)
+                _write_size = self._tmp_file_handle.write(data)
+                self._tmp_file_handle.flush()
+
+        return _write_size
 
     def _write_finished(self):
         """
@@ -483,15 +613,15 @@ class TransferSaver(object):
         @throws {Md5VerifyError} - 当文件校验失败时抛出异常
         """
         # 关闭文件句柄
-        self._info_file_handle.close()
-        self._info_file_handle = None
+        self._journal_file_handle.close()
+        self._journal_file_handle = None
         self._tmp_file_handle.close()
         self._tmp_file_handle = None
         os.close(self._lock_file_handle)
         self._lock_file_handle = None
 
-        # 检查md5
-        if self._info['md5'] != '':
+        # 检查md5, 已进行分块校验的情况无需再校验整个文件
+        if self._digest is None and self._info['md5'] != '':
             _file_md5 = NetTool.get_file_md5(self._temp_file)
             if self._info['md5'] != _file_md5:
                 raise Md5VerifyError('md5 verify error')
@@ -503,8 +633,73 @@ class TransferSaver(object):
 
         # 删除临时文件
         FileTool.remove_file(self._info_file)
+        FileTool.remove_file(self._journal_file)
         FileTool.remove_file(self._lock_file)
 
+    def _verify_blocks(self) -> bool:
+        """
+        按分块校验已写入的文件, 并将校验失败的分块重新登记为未写入区间
+
+        @returns {bool} - 是否有校验失败需要重新获取的分块
+
+        @throws {Md5VerifyError} - 当超过重新获取的最大次数时抛出异常
+        """
+        # 获取两端的分块md5值, 未能增量计算的分块从临时文件并行计算
+        _src_digests = self._block_md5() if callable(self._block_md5) else self._block_md5
+        _dest_digests = self._digest.get_digests(
+            lambda blocks: BlockDigest.get_file_block_md5(
+                self._temp_file, self._info['file_size'], self._digest.block_size, blocks=blocks,
+                workers=max(self._thread_num, 4)
+            )
+        )
+        _bad_blocks = BlockDigest.compare(_src_digests, _dest_digests)
+        if len(_bad_blocks) == 0:
+            return False
+
+        if self._verify_retry <= 0:
+            raise Md5VerifyError('md5 verify error, blocks: %s' % str(_bad_blocks))
+        self._verify_retry -= 1
+
+        # 将校验失败的分块登记为未写入区间, 重新分配缓存
+        with WaitLockTool(
+            self._cache_info_lock, print_timeout=self._lock_print_timeout,
+            label='_cache_info_lock verify', print_acquire_ok=self._debug_on,
+            print_release=self._debug_on
+        ):
+            _store_index = list()
+            for _block in _bad_blocks:
+                self._digest.reset(_block)
+                _area = self._digest.get_block_range(_block)
+                _store_index.append(_area)
+                self._info['write_size'] -= _area[1] - _area[0] + 1
+
+            self._info['store_index'] = self._f_merge_store_index(_store_index)
+            self._max_cache_pos[0] = -1
+            self._is_finished = False
+
+        return True
+
+    def _write_delta_seed(self, delta_seed: list):
+        """
+        从已存在的目标文件复制差异同步的相同数据区间到临时文件
+
+        @param {list} delta_seed - 可从目标文件已有数据复制的区间清单, 每项为 [文件位置, 已有文件位置, 数据大小]
+        """
+        with open(self._file, 'rb') as _old_file:
+            for _start, _old_start, _size in delta_seed:
+                _pos = 0
+                while _pos < _size:
+                    _old_file.seek(_old_start + _pos)
+                    _data = _old_file.read(min(self._cache_size, _size - _pos))
+                    if not _data:
+                        break
+                    self._write_to_file(_start + _pos, _data)
+                    _pos += len(_data)
+
+                # 只登记完整复制的区间, 其余数据通过传输获取
+                if _pos == _size and self._f_update_store_index(self._info['store_index'], _start, _size):
+                    self._info['write_size'] += _size
+
     def _write_data_to_cache(self, index: int, start: int, size: int, data: bytes) -> int:
         """
         写入数据到缓存
@@ -515,25 +710,47 @@ class TransferSaver(object):
         @param {bytes} data - 要写入的输入
 
         @returns {int} - 写入结果, 0-成功, 1-开始位置与线程缓存不一致
+
+        @throws {ValueError} - 传入数据的长度与size不一致时抛出异常
         """
+        if len(data) != size:
+            # 长度不一致时切片赋值会改变缓存的长度, 导致后续数据错位
+            raise ValueError('data length [%d] not match size [%d]' % (len(data), size))
+
         # 写入数据到缓存
         _cache = self._cache[index]
         if start != _cache['get_start']:
             # 开始位置与线程缓存不一致, 写入失败
             return 1
-        else:
-            # 进行写入处理, 添加数据到缓存中, 更新缓存数据需要获取锁
 
+        # 复制数据到预分配的缓存中, 缓存只由当前线程索引使用, 无需锁定缓存信息
+        _buffer = _cache['buffer']
+        _pos = _cache['size']
+        if _pos + size > len(_buffer):
+            # 传入数据超过预分配的缓存大小, 扩展缓存
+            _buffer.extend(bytes(_pos + size - len(_buffer)))
+        _buffer[_pos: _pos + size] = data
+
+        # 更新缓存信息需要获取锁
+        with WaitLockTool(
+            self._cache_info_lock, print_timeout=self._lock_print_timeout,
+            label='_cache_info_lock %d' % index, print_acquire_ok=self._debug_on,
+            print_release=self._debug_on
+        ):
             _cache['size'] += size
-            _cache['buffer'] += data
             # 重置正在获取的数据位置
             _cache['get_start'] = -1
             _cache['get_size'] = 0
 
             # 判断是否需要写入(超过缓存控制大小, 或已写到当前cache的结束位置)
             _end_pos = _cache['end_pos']
-            if _cache['size'] >= self._cache_size or (_end_pos != -1 and _end_pos <= (_cache['start'] + _cache['size'])):
-                self._flush_cache(index, lock_cache=False)
+            _need_flush = (
+                _cache['size'] >= self._cache_size or
+                (_end_pos != -1 and _end_pos <= (_cache['start'] + _cache['size']))
+            )
+
+        if _need_flush:
+            self._flush_cache(index, lock_cache=False)
 
         # 返回处理成功
         return 0
@@ -575,7 +792,7 @@ class TransferSaver(object):
                 index: {
                     'start': -1,  # 缓存数据对应文件的写入位置, -1代表没有设置
                     'size': 0,  # 缓存数据大小
-                    'buffer': bytes(),  # 具体的缓存数据
+                    'buffer': bytearray(),  # 预分配的缓存数据
                     'end_pos': -1,  # 该缓存对应线程要处理的文件块结束位置
                     'lock': threading.RLock,  # 用于锁定缓存数据的锁
                 },
@@ -708,6 +925,31 @@ class TransferSaver(object):
         # 如果能走到结束, 代表没有找到可修改的存储索引
         return False
 
+    @classmethod
+    def _f_load_journal(cls, store_index: list, journal: str) -> int:
+        """
+        将写入日志重放到存储索引数组
+        注：日志每行登记一次写入的区间, 格式为"开始位置,数据大小"; 中断导致最后一行不完整的情况将忽略该行
+
+        @param {list} store_index - 索引存储数组
+            按位置顺序在数组中登记未写入区间, 数组每一项登记未写入数据的开始位置和结束位置
+        @param {str} journal - 写入日志内容
+
+        @returns {int} - 重放后增加的已写入数据大小
+        """
+        _write_size = 0
+        for _line in journal.split('\n')[0: -1]:
+            try:
+                _start_pos, _size = [int(_val) for _val in _line.split(',')]
+            except ValueError:
+                # 不完整的记录, 不再处理
+                break
+
+            if cls._f_update_store_index(store_index, _start_pos, _size):
+                _write_size += _size
+
+        return _write_size
+
 
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作
@@ -31,6 +31,46 @@ __AUTHOR__ = u'黎慧剑'  # 作者
 __PUBLISH__ = '2021.08.24'  # 发布日期
 
 
+class BandwidthLimiter(object):
+    """
+    传输带宽限制对象(令牌桶)
+    注: 可以在多个Transfer对象间共享, 实现全局的带宽限制
+    """
+
+    def __init__(self, rate: int, burst: int = None):
+        """
+        初始化带宽限制对象
+
+        @param {int} rate - 每秒允许传输的数据大小, 单位为byte, 小于等于0代表不限制
+        @param {int} burst=None - 允许突发传输的最大数据大小, 单位为byte, 不传代表与rate相同
+        """
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, size: int):
+        """
+        获取传输指定大小数据的许可, 超出带宽限制时阻塞等待
+
+        @param {int} size - 要传输的数据大小, 单位为byte
+        """
+        if self.rate <= 0 or size <= 0:
+            return
+
+        with self._lock:
+            _now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (_now - self._last) * self.rate)
+            self._last = _now
+            # 直接扣减令牌, 令牌不足时按欠缺的数量计算等待时间
+            self._tokens -= size
+            _wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if _wait > 0:
+            time.sleep(_wait)
+
+
 class Transfer(object):
     """
     文件传输控制对象
@@ -41,7 +81,8 @@ class Transfer(object):
 
     def __init__(self, protocol: ProtocolFw, show_process_bar_fun=None,
                  process_bar_label: str = '', process_bar_info: str = '',
-                 stop_notify_fun=None, thread_interval: float = 0.001, **kwargs):
+                 stop_notify_fun=None, thread_interval: float = 0.001, executor=None,
+                 limiter: BandwidthLimiter = None, **kwargs):
         """
         初始化文件传输发送对象
 
@@ -54,10 +95,15 @@ class Transfer(object):
         @param {function} stop_notify_fun=None - 传输停止的通知函数，如果不传代表不通知
             函数定义为 fun(status:str, file_size:int, write_size:int, msg:str)
         @param {float} thread_interval=0.001 - 线程执行循环间隔时间
+        @param {concurrent.futures.Executor} executor=None - 共享的线程池对象
+            注: 如果传入, 传输处理将提交至线程池执行, 不再为每个线程索引单独创建线程
+        @param {BandwidthLimiter} limiter=None - 带宽限制对象, 不传代表不限制
         """
         self.protocol = protocol
         self.stop_notify_fun = stop_notify_fun
         self.thread_interval = thread_interval
+        self.executor = executor
+        self.limiter = limiter
         self.process_bar_label = process_bar_label
         self.process_bar_info = process_bar_info
         self.kwargs = kwargs
@@ -68,6 +114,12 @@ class Transfer(object):
         self.exception = None  # 如果是异常状态，可以通过该变量获取异常对象
         self._status_lock = threading.RLock()  # 控制状态变化的锁
         self._threads = list()  # 正在运行的线程对象数组，如果对应的值为None代表线程已结束
+        self._futures = list()  # 使用共享线程池时提交的任务对象数组, 与线程索引一一对应
+        self._running_num = 0  # 正在运行的传输线程数量
+        self._running_num_lock = threading.Lock()  # 控制运行线程数量变化的锁
+        self._done_event = threading.Event()  # 传输线程全部结束的事件
+        self._done_event.set()
+        self._done_callbacks = list()  # 传输线程全部结束后的回调函数清单
 
         # 进度显示相关
         self._info = self.protocol.get_saver_info()
@@ -108,17 +160,28 @@ class Transfer(object):
             # 启动传输线程
             self.status = 'running'  # 设置状态为正在运行
             self._threads.clear()  # 清理数组
-            # 根据传输协议对象的类型选择不同的处理线程
-            for _index in range(self.thread_num):
-                _thread = threading.Thread(
-                    target=self._file_trans_thread_fun,
-                    name='Thread-TransferReader-Running %s' % _index,
-                    args=(_index,)
-                )
-                self._threads.append(_thread)
+            self._futures.clear()
+            self._running_num = self.thread_num
+            self._done_event.clear()
+            if self.executor is not None:
+                # 使用共享线程池, 先占位再提交任务, 避免任务执行完成时数组未初始化
+                self._threads.extend([True] * self.thread_num)
+                for _index in range(self.thread_num):
+                    self._futures.append(
+                        self.executor.submit(self._file_trans_thread_fun, _index)
+                    )
+            else:
+                # 根据传输协议对象的类型选择不同的处理线程
+                for _index in range(self.thread_num):
+                    _thread = threading.Thread(
+                        target=self._file_trans_thread_fun,
+                        name='Thread-TransferReader-Running %s' % _index,
+                        args=(_index,)
+                    )
+                    self._threads.append(_thread)
 
-                _thread.setDaemon(True)
-                _thread.start()
+                    _thread.setDaemon(True)
+                    _thread.start()
 
             # 显示当前进度
             if self._rate is not None:
@@ -134,12 +197,31 @@ class Transfer(object):
 
         if wait_finished:
             # 等待结束再返回
-            while self.status == 'running':
-                time.sleep(0.1)
+            self.wait()
 
         # 返回结果
         return self.status
 
+    def wait(self, timeout: float = None) -> str:
+        """
+        等待传输线程全部结束
+
+        @param {float} timeout=None - 超时时间, 单位为秒, 不传代表一直等待
+
+        @returns {str} - 返回当前状态值
+        """
+        self._done_event.wait(timeout=timeout)
+        return self.status
+
+    def add_done_callback(self, fun):
+        """
+        添加传输线程全部结束后的回调函数
+        注: 回调函数在最后一个结束的传输线程中执行
+
+        @param {function} fun - 回调函数, 函数定义为 fun(transfer: Transfer)
+        """
+        self._done_callbacks.append(fun)
+
     def stop(self):
         """
         停止文件传输
@@ -150,16 +232,16 @@ class Transfer(object):
                 # 已经在停止状态
                 return
 
-            # 设置状态为停止，同时等待线程自行结束
+            # 设置状态为停止
             self.status = 'stop'
-            _is_stoped = False
-            while not _is_stoped:
-                _is_stoped = True
-                for _index in range(self.protocol.get_thread_num()):
-                    if self._threads[_index] is not None:
-                        # 只要出现线程不为None，则代表还没有处理完成
-                        _is_stoped = False
-                        break
+
+            # 使用共享线程池时取消还在排队的任务, 避免等待线程池中其他任务执行完成, 取消的任务视为线程已结束
+            for _index, _future in enumerate(self._futures):
+                if _future.cancel():
+                    self._thread_finished(_index)
+
+            # 等待正在运行的线程自行结束
+            self._done_event.wait()
 
             # 通知传输对象停止传输
             self.protocol.pause()
@@ -202,6 +284,8 @@ class Transfer(object):
                 _trans_size = 0
                 _info_dict = None  # 从写入对象获取到的下一个数据获取范围信息
                 if _start is not None:
+                    if self.limiter is not None:
+                        self.limiter.acquire(_size)
                     _data = self.protocol.read_file_data(
                         index, _file_dict['handle'], _start, _size, _file_dict['lock']
                     )
@@ -271,21 +355,37 @@ class Transfer(object):
                 # 处理下一次循环
                 _start = _info_dict['start']
                 _size = _info_dict['size']
-                time.sleep(self.thread_interval)
+                if self.thread_interval > 0:
+                    time.sleep(self.thread_interval)
         except:
             # 执行过程中抛出异常，应中止服务
             self.status = 'exception'
             self.exception = sys.exc_info()[1]
             raise
         finally:
-            # 跳出循环，代表线程已结束, 设置线程索引对象为None
-            self._threads[index] = None
             # 关闭文件对象
             if _file_dict is not None and _file_dict['close_able']:
                 self.protocol.close_file(index)
             # 关闭写入对象
             if _writer_dict is not None and _writer_dict['close_able']:
                 self.protocol.close_writer(index)
+            self._thread_finished(index)
+
+    def _thread_finished(self, index: int):
+        """
+        传输线程结束的处理, 所有线程结束后通知等待对象并执行回调函数
+
+        @param {int} index - 线程对应的传输
+        """
+        # 设置线程索引对象为None
+        self._threads[index] = None
+        with self._running_num_lock:
+            self._running_num -= 1
+            _is_done = (self._running_num == 0)
+        if _is_done:
+            self._done_event.set()
+            for _fun in self._done_callbacks:
+                _fun(self)
 
 
 if __name__ == '__main__':
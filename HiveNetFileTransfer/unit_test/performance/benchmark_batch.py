@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+多文件(目录)传输性能测试
+@module benchmark_batch
+@file benchmark_batch.py
+
+执行步骤:
+python benchmark_batch.py [file_num] [file_size_kb]
+
+注: 使用LocalProtocol进行本地复制, 比较逐个文件使用Transfer传输与BatchTransfer批量传输的每秒文件数
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetFileTransfer.protocol import LocalProtocol
+from HiveNetFileTransfer.transfer import Transfer
+from HiveNetFileTransfer.batch import BatchTransfer
+
+
+def run_single(src_dir: str, dest_dir: str):
+    """
+    逐个文件创建Transfer传输
+    """
+    for _file, _ in LocalProtocol.list_src_files(src_dir):
+        with LocalProtocol(
+            os.path.join(src_dir, _file), os.path.join(dest_dir, _file), is_resume=False,
+            is_overwrite=True, thread_num=4, block_size=65536
+        ) as _protocol:
+            _status = Transfer(_protocol, thread_interval=0.0).start(wait_finished=True)
+            assert _status == 'finished'
+
+
+def run_batch(src_dir: str, dest_dir: str):
+    """
+    使用BatchTransfer批量传输
+    """
+    _batch = BatchTransfer(
+        src_dir=src_dir, dest_dir=dest_dir, is_resume=False, is_overwrite=True, worker_num=8
+    )
+    assert _batch.start(wait_finished=True) == 'finished'
+
+
+if __name__ == '__main__':
+    _file_num = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    _file_size = int(float(sys.argv[2]) * 1024) if len(sys.argv) > 2 else 4096
+    _path = tempfile.mkdtemp()
+    try:
+        _src_dir = os.path.join(_path, 'src')
+        for _i in range(_file_num):
+            _sub_dir = os.path.join(_src_dir, 'dir%d' % (_i % 20))
+            os.makedirs(_sub_dir, exist_ok=True)
+            with open(os.path.join(_sub_dir, 'file%d.bin' % _i), 'wb') as _file:
+                _file.write(os.urandom(_file_size))
+
+        for _name, _fun in (('single', run_single), ('batch', run_batch)):
+            _dest_dir = os.path.join(_path, _name)
+            _start = time.perf_counter()
+            _fun(_src_dir, _dest_dir)
+            _use = time.perf_counter() - _start
+            print('%-6s files: %6d  size: %6.1fKB  use: %7.3fs  files/s: %9.1f' % (
+                _name, _file_num, _file_size / 1024, _use, _file_num / _use
+            ))
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
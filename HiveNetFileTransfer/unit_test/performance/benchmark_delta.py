@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+差异同步(大文件小修改)性能测试
+@module benchmark_delta
+@file benchmark_delta.py
+
+执行步骤:
+python benchmark_delta.py [size_mb] [delta_block_size_kb]
+
+注: 使用LocalProtocol进行本地复制, 目标文件为修改前的文件, 比较全量传输与差异同步的耗时和传输数据量
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from HiveNetCore.utils.net_tool import NetTool
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetFileTransfer.protocol import LocalProtocol
+from HiveNetFileTransfer.transfer import Transfer
+
+
+def make_changed_file(src: str, dest: str, size: int):
+    """
+    生成修改后的文件: 修改若干位置的字节, 并在中间插入一段数据
+    """
+    with open(src, 'rb') as _file:
+        _data = bytearray(_file.read())
+
+    for _ in range(5):
+        _pos = random.randint(0, size - 16)
+        _data[_pos: _pos + 16] = os.urandom(16)
+
+    _pos = size // 2
+    _data[_pos: _pos] = os.urandom(1000)
+    with open(dest, 'wb') as _file:
+        _file.write(_data)
+
+
+def run_case(name: str, src: str, dest: str, old: str, delta_block_size: int):
+    """
+    执行一个测试场景
+    """
+    shutil.copyfile(old, dest)
+    _start = time.perf_counter()
+    with LocalProtocol(
+        src, dest, is_resume=False, is_overwrite=True, thread_num=4, block_size=65536,
+        delta_block_size=delta_block_size
+    ) as _protocol:
+        _info = _protocol.get_saver_info()
+        _trans_size = _info['file_size'] - _info['write_size']
+        _status = Transfer(_protocol, thread_interval=0.0).start(wait_finished=True)
+
+    _use = time.perf_counter() - _start
+    assert _status == 'finished' and NetTool.get_file_md5(src) == NetTool.get_file_md5(dest)
+    print('%-6s size: %6.1fMB  transfer: %8.3fMB  use: %7.3fs' % (
+        name, os.path.getsize(src) / 1048576, _trans_size / 1048576, _use
+    ))
+
+
+if __name__ == '__main__':
+    _size = int(float(sys.argv[1]) * 1048576) if len(sys.argv) > 1 else 256 * 1048576
+    _delta_block_size = int(float(sys.argv[2]) * 1024) if len(sys.argv) > 2 else 65536
+    _path = tempfile.mkdtemp()
+    try:
+        _old = os.path.join(_path, 'old.bin')
+        _src = os.path.join(_path, 'src.bin')
+        _dest = os.path.join(_path, 'dest.bin')
+        with open(_old, 'wb') as _file:
+            _file.write(os.urandom(_size))
+        make_changed_file(_old, _src, _size)
+
+        run_case('full', _src, _dest, _old, 0)
+        run_case('delta', _src, _dest, _old, _delta_block_size)
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+TransferSaver多线程写入性能测试
+@module benchmark_saver
+@file benchmark_saver.py
+
+执行步骤:
+python benchmark_saver.py [size_mb] [block_size_kb] [cache_size_kb]
+
+注: 不进行md5校验, 只测试缓存写入、文件写入及写入信息登记的处理性能
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetFileTransfer.saver import TransferSaver
+
+
+def run_case(path: str, data: bytes, thread_num: int, block_size: int, cache_size: int):
+    """
+    执行一个测试场景
+    """
+    _file = os.path.join(path, 'benchmark_%d.bin' % thread_num)
+    _view = memoryview(data)
+    _start = time.perf_counter()
+    _saver = TransferSaver(
+        _file, is_resume=False, file_size=len(data), is_overwrite=True,
+        thread_num=thread_num, block_size=block_size, cache_size=cache_size
+    )
+
+    def _write_thread(index: int):
+        _next = _saver.write_data(index=index)
+        while _next['start'] != -1:
+            _next = _saver.write_data(
+                index=index, start=_next['start'], size=_next['size'],
+                data=_view[_next['start']: _next['start'] + _next['size']]
+            )
+
+    _threads = [
+        threading.Thread(target=_write_thread, args=(_i, )) for _i in range(_saver._thread_num)
+    ]
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+
+    # 最后一个线程完成时可能未触发完成处理, 再次检查完成状态
+    for _i in range(_saver._thread_num):
+        _saver.write_data(index=_i)
+
+    _use = time.perf_counter() - _start
+    assert os.path.getsize(_file) == len(data)
+    os.remove(_file)
+    print('threads: %2d  size: %5.1fMB  use: %7.3fs  throughput: %8.1fMB/s' % (
+        thread_num, len(data) / 1048576, _use, len(data) / 1048576 / _use
+    ))
+
+
+if __name__ == '__main__':
+    _size = float(sys.argv[1]) if len(sys.argv) > 1 else 256
+    _block_size = int(float(sys.argv[2]) * 1024) if len(sys.argv) > 2 else 65536
+    _cache_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1024
+    _data = os.urandom(int(_size * 1048576))
+    _path = tempfile.mkdtemp()
+    try:
+        for _thread_num in (1, 4, 16):
+            run_case(_path, _data, _thread_num, _block_size, _cache_size)
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
@@ -8,23 +8,35 @@ import random
 import unittest
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from HiveNetCore.utils.test_tool import TestTool
 from HiveNetCore.utils.file_tool import FileTool
 from HiveNetCore.utils.net_tool import NetTool
+from HiveNetCore.utils.run_tool import AsyncTools
 from HiveNetCore.logging_hivenet import Logger, EnumLoggerName, EnumLoggerConfigType
 from HiveNetPromptPlus import ProgressRate
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetFileTransfer.saver import TransferSaver
+from HiveNetFileTransfer.digest import BlockDigest, BlockSignature
 from HiveNetFileTransfer.protocol import LocalProtocol
 from HiveNetFileTransfer.transfer import Transfer
-from HiveNetFileTransfer.extend_protocol.grpc import GRpcProtocolServer, GRpcPullProtocol, GRpcPushProtocol
+from HiveNetFileTransfer.batch import BatchTransfer
+from HiveNetFileTransfer.extend_protocol.grpc import GRpcProtocolServer, GRpcPullProtocol, GRpcPushProtocol, create_conn_pool
 
 # sys.setrecursionlimit(1000000)
 
 TEST_FLAG = {
     'test_TransferSaver_fun': False,
     'test_local_to_local': False,
+    'test_journal_fsync': True,
+    'test_block_md5_verify': True,
+    'test_delta_sync': True,
+    'test_batch_transfer': True,
+    'test_stop_queued': True,
+    'test_grpc_block_md5_verify': True,
+    'test_grpc_delta_sync': True,
     'test_local_to_grpc': False,
     'test_grpc_to_local': True
 }
@@ -224,6 +236,25 @@ class Test(unittest.TestCase):
             msg='_f_update_store_index - 4'
         )
 
+        # _f_load_journal
+        _store_index = [[0, 900], [950, 1000]]
+        _write_size = TransferSaver._f_load_journal(
+            _store_index, '0,100\n100,50\n950,20\n'
+        )
+        self.assertTrue(
+            TestTool.cmp_list(_store_index, [[150, 900], [970, 1000]]) and _write_size == 170,
+            msg='_f_load_journal - 1'
+        )
+
+        # 已合并到信息文件的记录重复重放, 以及最后一行不完整
+        _write_size = TransferSaver._f_load_journal(
+            _store_index, '100,50\n150,10\n160,1'
+        )
+        self.assertTrue(
+            TestTool.cmp_list(_store_index, [[160, 900], [970, 1000]]) and _write_size == 10,
+            msg='_f_load_journal - 2'
+        )
+
     def test_local_to_local(self):
         if not TEST_FLAG['test_local_to_local']:
             return
@@ -236,7 +267,7 @@ class Test(unittest.TestCase):
         # 删除临时文件
         if os.path.exists(_copy_file):
             FileTool.remove_file(_copy_file)
-        for _ext in ('.lock', '.tmp', '.info'):
+        for _ext in ('.lock', '.tmp', '.info', '.journal'):
             if os.path.exists(_copy_file + _ext):
                 FileTool.remove_file(_copy_file + _ext)
 
@@ -454,6 +485,480 @@ class Test(unittest.TestCase):
                 _status == 'finished', msg="本地文件复制-%s: %s" % (_tips, _status)
             )
 
+    def test_journal_fsync(self):
+        if not TEST_FLAG['test_journal_fsync']:
+            return
+
+        print('测试写入日志前同步数据')
+        _copy_file = os.path.join(_temp_path, 'journal_fsync_copy.bin')
+        with open(_temp_file, 'rb') as _file:
+            _src_data = _file.read(1024 * 1024)
+
+        _fsync = os.fsync
+        for _fsync_data in (True, False):
+            _tips = '写入日志前同步数据-%s' % str(_fsync_data)
+            _saver = TransferSaver(
+                _copy_file, is_resume=False, file_size=len(_src_data), is_overwrite=True,
+                thread_num=1, block_size=4096, cache_size=64, checkpoint_interval=3600,
+                fsync_data=_fsync_data
+            )
+            _events = list()
+            _tmp_fd = _saver._tmp_file_handle.fileno()
+            _write_journal = _saver._write_journal
+
+            def _record_fsync(fd):
+                if fd == _tmp_fd:
+                    _events.append('fsync')
+                return _fsync(fd)
+
+            def _record_journal(start_pos, size):
+                _events.append('journal')
+                return _write_journal(start_pos, size)
+
+            os.fsync = _record_fsync
+            _saver._write_journal = _record_journal
+            try:
+                _next = _saver.write_data(index=0)
+                while _next['start'] != -1:
+                    _next = _saver.write_data(
+                        index=0, start=_next['start'], size=_next['size'],
+                        data=_src_data[_next['start']: _next['start'] + _next['size']]
+                    )
+            finally:
+                os.fsync = _fsync
+                _saver.close()
+
+            self.assertTrue(_events.count('journal') > 0, msg='%s: no journal' % _tips)
+            if _fsync_data:
+                # 每个写入日志前都已同步数据
+                self.assertTrue(
+                    all(_events[_i - 1] == 'fsync' for _i, _event in enumerate(_events) if _event == 'journal'),
+                    msg='%s: events %s' % (_tips, str(_events))
+                )
+            else:
+                self.assertTrue('fsync' not in _events, msg='%s: events %s' % (_tips, str(_events)))
+            self.assertTrue(
+                NetTool.get_file_md5(_copy_file) == NetTool.get_file_md5(_src_data),
+                msg='%s: md5 error' % _tips
+            )
+
+    def test_block_md5_verify(self):
+        if not TEST_FLAG['test_block_md5_verify']:
+            return
+
+        print('测试分块校验')
+        _copy_file = os.path.join(_temp_path, 'block_md5_copy.bin')
+        if os.path.exists(_copy_file):
+            FileTool.remove_file(_copy_file)
+
+        # 写入错误数据后只重新获取校验失败的分块
+        _tips = '分块校验-重新获取失败分块'
+        with open(_temp_file, 'rb') as _file:
+            _src_data = _file.read()
+        _verify_block_size = 65536
+        _block_md5 = BlockDigest.get_file_block_md5(
+            _temp_file, len(_src_data), _verify_block_size
+        )
+        _bad_start = _verify_block_size * 3 + 100
+        _saver = TransferSaver(
+            _copy_file, is_resume=False, file_size=len(_src_data), is_overwrite=True,
+            thread_num=1, block_size=4096, cache_size=16,
+            verify_block_size=_verify_block_size, block_md5=_block_md5
+        )
+        try:
+            _refetch = list()
+            _next = _saver.write_data(index=0)
+            with self.assertRaises(ValueError, msg='%s: data length not match size' % _tips):
+                _saver.write_data(
+                    index=0, start=_next['start'], size=_next['size'],
+                    data=_src_data[_next['start']: _next['start'] + _next['size'] - 1]
+                )
+            while _next['start'] != -1:
+                _data = _src_data[_next['start']: _next['start'] + _next['size']]
+                if _next['start'] <= _bad_start < _next['start'] + _next['size'] and len(_refetch) == 0:
+                    # 第一次写入错误数据
+                    _data = b'\xff' * len(_data)
+                    _refetch.append(_next['start'])
+                elif len(_refetch) > 0 and _refetch[-1] != -1 and _next['start'] <= _refetch[0]:
+                    # 已进入重新获取的阶段
+                    _refetch.append(-1)
+                _next = _saver.write_data(
+                    index=0, start=_next['start'], size=_next['size'], data=_data
+                )
+            self.assertTrue(_next['status'] == 2, msg='%s: status %s' % (_tips, str(_next)))
+        finally:
+            _saver.close()
+
+        self.assertTrue(
+            _refetch[-1] == -1 and NetTool.get_file_md5(_copy_file) == NetTool.get_file_md5(_temp_file),
+            msg='%s: md5 error' % _tips
+        )
+
+        # 本地复制使用分块校验
+        _tips = '分块校验-多线程本地复制'
+        with LocalProtocol(
+            _temp_file, _copy_file, is_resume=True, is_overwrite=True,
+            cache_size=2, thread_num=5, verify_block_size=_verify_block_size
+        ) as _protocol:
+            _reader = Transfer(
+                _protocol, show_process_bar_fun=ProgressRate.show_cmd_process_bar,
+                process_bar_label=_tips,
+                thread_interval=0.0
+            )
+            _status = _reader.start(wait_finished=True)
+            self.assertTrue(
+                _status == 'finished', msg="%s: %s" % (_tips, _status)
+            )
+        self.assertTrue(
+            NetTool.get_file_md5(_copy_file) == NetTool.get_file_md5(_temp_file),
+            msg='%s: md5 error' % _tips
+        )
+
+    def test_delta_sync(self):
+        if not TEST_FLAG['test_delta_sync']:
+            return
+
+        print('测试差异同步')
+        _copy_file = os.path.join(_temp_path, 'delta_sync_copy.bin')
+        for _ext in ('', '.lock', '.tmp', '.info', '.journal'):
+            if os.path.exists(_copy_file + _ext):
+                FileTool.remove_file(_copy_file + _ext)
+
+        with open(_temp_file, 'rb') as _file:
+            _src_data = _file.read()
+        _delta_block_size = 4096
+
+        # 弱校验值滚动计算
+        _tips = '差异同步-滚动弱校验'
+        _data = os.urandom(_delta_block_size * 3)
+        _sums = BlockSignature.get_rolling_sums(_data, _delta_block_size)
+        for _pos in (0, 1, 100, _delta_block_size, len(_data) - _delta_block_size):
+            self.assertTrue(
+                _sums[_pos] == BlockSignature.get_weak_sum(_data[_pos: _pos + _delta_block_size]),
+                msg='%s: pos %d' % (_tips, _pos)
+            )
+
+        # 目标文件为修改后的旧文件: 修改部分数据, 并删除及插入部分数据
+        _old_data = bytearray(_src_data)
+        _old_data[5000: 5010] = b'\xff' * 10
+        del _old_data[100000: 100100]
+        _old_data[200000: 200000] = os.urandom(300)
+        for _item in (
+            {'tips': '差异同步-本地复制', 'thread_num': 1},
+            {'tips': '差异同步-多线程本地复制', 'thread_num': 5}
+        ):
+            _tips = _item['tips']
+            with open(_copy_file, 'wb') as _file:
+                _file.write(_old_data)
+
+            with LocalProtocol(
+                _temp_file, _copy_file, is_resume=False, is_overwrite=True,
+                cache_size=2, thread_num=_item['thread_num'], delta_block_size=_delta_block_size
+            ) as _protocol:
+                _info = _protocol.get_saver_info()
+                self.assertTrue(
+                    _info['write_size'] > len(_src_data) // 2,
+                    msg='%s: seed size %d' % (_tips, _info['write_size'])
+                )
+                _reader = Transfer(
+                    _protocol, show_process_bar_fun=ProgressRate.show_cmd_process_bar,
+                    process_bar_label=_tips,
+                    thread_interval=0.0
+                )
+                _status = _reader.start(wait_finished=True)
+                self.assertTrue(
+                    _status == 'finished', msg="%s: %s" % (_tips, _status)
+                )
+            self.assertTrue(
+                NetTool.get_file_md5(_copy_file) == NetTool.get_file_md5(_temp_file),
+                msg='%s: md5 error' % _tips
+            )
+
+    def test_batch_transfer(self):
+        if not TEST_FLAG['test_batch_transfer']:
+            return
+
+        print('测试目录传输')
+        _src_dir = os.path.join(_temp_path, 'batch_src')
+        _local_dir = os.path.join(_temp_path, 'batch_local')
+        _push_dir = 'batch_push'  # 远端为工作目录的相对路径
+        _pull_dir = os.path.join(_temp_path, 'batch_pull')
+        for _path in (_src_dir, _local_dir, os.path.join(_temp_path, _push_dir), _pull_dir):
+            if os.path.exists(_path):
+                FileTool.remove_dir(_path)
+
+        # 创建测试目录: 多个子目录的小文件及大文件
+        for _i in range(50):
+            _sub_dir = os.path.join(_src_dir, 'dir%d' % (_i % 5))
+            FileTool.create_dir(_sub_dir, exist_ok=True)
+            with open(os.path.join(_sub_dir, 'file%d.bin' % _i), 'wb') as _file:
+                _file.write(os.urandom(_i * 100))
+        FileTool.copy_file(_temp_file, os.path.join(_src_dir, 'big.bin'))
+
+        def _check_dir(tips: str, batch: BatchTransfer, src_dir: str, dest_dir: str):
+            _stat = batch.get_stat()
+            self.assertTrue(
+                batch.status == 'finished' and _stat['finished'] == 51 and _stat['failed'] == 0,
+                msg='%s: %s, %s' % (tips, batch.status, str(_stat))
+            )
+            for _file, _size in LocalProtocol.list_src_files(src_dir):
+                self.assertTrue(
+                    NetTool.get_file_md5(os.path.join(src_dir, _file)) == NetTool.get_file_md5(
+                        os.path.join(dest_dir, _file)),
+                    msg='%s: md5 error %s' % (tips, _file)
+                )
+
+        _tips = '目录传输-本地复制'
+        _batch = BatchTransfer(
+            src_dir=_src_dir, dest_dir=_local_dir, is_resume=False, is_overwrite=True,
+            worker_num=4, small_file_size=64 * 1024, pack_num=10, block_size=4096, cache_size=16
+        )
+        _batch.start(wait_finished=True)
+        _check_dir(_tips, _batch, _src_dir, _local_dir)
+
+        _tips = '目录传输-带宽限制'
+        _start = time.time()
+        _batch = BatchTransfer(
+            src_dir=_src_dir, dest_dir=_local_dir, is_resume=False, is_overwrite=True,
+            small_file_size=64 * 1024, bandwidth_limit=256 * 1024
+        )
+        _batch.start(wait_finished=True)
+        _check_dir(_tips, _batch, _src_dir, _local_dir)
+        self.assertTrue(time.time() - _start > 1.0, msg='%s: bandwidth limit error' % _tips)
+
+        # gRpc推送及拉取, 所有文件共享连接池
+        _conn_config = {
+            'host': '127.0.0.1', 'port': 50051, 'ping_on_connect': False, 'ping_with_health_check': False,
+            'use_sync_client': True, 'timeout': 100
+        }
+        _pool = create_conn_pool(_conn_config, max_size=10)
+        try:
+            _tips = '目录传输-gRpc推送'
+            _batch = BatchTransfer(
+                src_dir=_src_dir, dest_dir=_push_dir, protocol_class=GRpcPushProtocol,
+                is_resume=False, is_overwrite=True, small_file_size=64 * 1024, conn_pool=_pool
+            )
+            _batch.start(wait_finished=True)
+            _check_dir(_tips, _batch, _src_dir, os.path.join(_temp_path, _push_dir))
+
+            _tips = '目录传输-gRpc拉取'
+            _batch = BatchTransfer(
+                src_dir=_push_dir, dest_dir=_pull_dir, protocol_class=GRpcPullProtocol,
+                is_resume=False, is_overwrite=True, small_file_size=64 * 1024, conn_pool=_pool
+            )
+            _batch.start(wait_finished=True)
+            _check_dir(_tips, _batch, _src_dir, _pull_dir)
+        finally:
+            AsyncTools.sync_run_coroutine(_pool.close())
+
+    def test_stop_queued(self):
+        if not TEST_FLAG['test_stop_queued']:
+            return
+
+        print('测试停止排队中的传输任务')
+        _copy_file = os.path.join(_temp_path, 'stop_queued_copy.bin')
+
+        # 共享线程池被其他任务占用, 传输线程只能排队等待
+        _tips = '停止排队中的任务-共享线程池'
+        _executor = ThreadPoolExecutor(max_workers=1)
+        _release = threading.Event()
+        _executor.submit(_release.wait, 30)
+        try:
+            with LocalProtocol(
+                _temp_file, _copy_file, is_resume=False, is_overwrite=True, thread_num=3
+            ) as _protocol:
+                _transfer = Transfer(_protocol, thread_interval=0.0, executor=_executor)
+                _transfer.start()
+                _stop_thread = threading.Thread(target=_transfer.stop, daemon=True)
+                _stop_thread.start()
+                _stop_thread.join(timeout=5)
+                self.assertTrue(
+                    not _stop_thread.is_alive() and _transfer.status == 'stop' and not _release.is_set(),
+                    msg='%s: stop not return, status %s' % (_tips, _transfer.status)
+                )
+        finally:
+            _release.set()
+            _executor.shutdown(wait=True)
+
+        # 多文件传输启动后马上停止, 然后重新启动
+        _tips = '停止排队中的任务-多文件传输'
+        _src_dir = os.path.join(_temp_path, 'stop_queued_src')
+        _dest_dir = os.path.join(_temp_path, 'stop_queued_dest')
+        for _path in (_src_dir, _dest_dir):
+            if os.path.exists(_path):
+                FileTool.remove_dir(_path)
+        FileTool.create_dir(_src_dir, exist_ok=True)
+        for _i in range(3):
+            FileTool.copy_file(_temp_file, os.path.join(_src_dir, 'big%d.bin' % _i))
+        for _i in range(30):
+            with open(os.path.join(_src_dir, 'file%d.bin' % _i), 'wb') as _file:
+                _file.write(os.urandom(1000))
+
+        _batch = BatchTransfer(
+            src_dir=_src_dir, dest_dir=_dest_dir, is_resume=False, is_overwrite=True,
+            worker_num=1, max_running_files=2, small_file_size=64 * 1024, pack_num=5
+        )
+        _batch.start()
+        _stop_thread = threading.Thread(target=_batch.stop, daemon=True)
+        _stop_thread.start()
+        _stop_thread.join(timeout=10)
+        self.assertTrue(
+            not _stop_thread.is_alive() and _batch.status == 'stop',
+            msg='%s: stop not return, status %s' % (_tips, _batch.status)
+        )
+        for _result in _batch.results.values():
+            self.assertTrue(_result['status'] in ('finished', 'stop'), msg='%s: %s' % (_tips, str(_result)))
+
+        _batch.start(wait_finished=True)
+        _stat = _batch.get_stat()
+        self.assertTrue(
+            _batch.status == 'finished' and _stat['finished'] == 33,
+            msg='%s: restart %s, %s' % (_tips, _batch.status, str(_stat))
+        )
+        for _file, _size in LocalProtocol.list_src_files(_src_dir):
+            self.assertTrue(
+                NetTool.get_file_md5(os.path.join(_src_dir, _file)) == NetTool.get_file_md5(
+                    os.path.join(_dest_dir, _file)),
+                msg='%s: md5 error %s' % (_tips, _file)
+            )
+
+    def test_grpc_block_md5_verify(self):
+        if not TEST_FLAG['test_grpc_block_md5_verify']:
+            return
+
+        print('测试gRpc分块校验')
+        _push_file = 'grpc_block_md5_push.bin'  # 远端为工作目录的相对路径
+        _pull_file = os.path.join(_temp_path, 'grpc_block_md5_pull.bin')
+        for _file in (os.path.join(_temp_path, _push_file), _pull_file):
+            for _ext in ('', '.lock', '.tmp', '.info', '.journal'):
+                if os.path.exists(_file + _ext):
+                    FileTool.remove_file(_file + _ext)
+
+        _verify_block_size = 65536
+        _bad_start = _verify_block_size * 3 + 100
+
+        def _corrupt_once(protocol, refetch: list):
+            # 第一次读取到指定位置时返回错误数据, 校验失败后应重新获取该分块
+            _read_file_data = protocol.read_file_data
+
+            def _read(index, handle, start, size, lock):
+                _data = _read_file_data(index, handle, start, size, lock)
+                if start <= _bad_start < start + len(_data):
+                    refetch.append(start)
+                    if len(refetch) == 1:
+                        _data = b'\xff' * len(_data)
+                return _data
+
+            protocol.read_file_data = _read
+
+        _conn_config = {
+            'host': '127.0.0.1', 'port': 50051, 'ping_on_connect': False, 'ping_with_health_check': False,
+            'use_sync_client': True, 'timeout': 100
+        }
+        _pool = create_conn_pool(_conn_config, max_size=10)
+        try:
+            for _tips, _protocol_class, _src, _dest, _dest_real in (
+                ('gRpc分块校验-推送', GRpcPushProtocol, _temp_file, _push_file, os.path.join(_temp_path, _push_file)),
+                ('gRpc分块校验-拉取', GRpcPullProtocol, 'temp_src_file.bin', _pull_file, _pull_file)
+            ):
+                _refetch = list()
+                with _protocol_class(
+                    _src, _dest, is_resume=False, is_overwrite=True, thread_num=2,
+                    block_size=40960, cache_size=16, verify_block_size=_verify_block_size, conn_pool=_pool
+                ) as _protocol:
+                    _corrupt_once(_protocol, _refetch)
+                    _reader = Transfer(
+                        _protocol, show_process_bar_fun=ProgressRate.show_cmd_process_bar,
+                        process_bar_label=_tips,
+                        thread_interval=0.0
+                    )
+                    _status = _reader.start(wait_finished=True)
+                    self.assertTrue(
+                        _status == 'finished', msg="%s: %s" % (_tips, _status)
+                    )
+                self.assertTrue(len(_refetch) == 2, msg='%s: bad block not refetched %s' % (_tips, str(_refetch)))
+                self.assertTrue(
+                    NetTool.get_file_md5(_dest_real) == NetTool.get_file_md5(_temp_file),
+                    msg='%s: md5 error' % _tips
+                )
+        finally:
+            AsyncTools.sync_run_coroutine(_pool.close())
+
+    def test_grpc_delta_sync(self):
+        if not TEST_FLAG['test_grpc_delta_sync']:
+            return
+
+        print('测试gRpc差异同步')
+        _push_file = 'grpc_delta_push.bin'  # 远端为工作目录的相对路径
+        _pull_file = os.path.join(_temp_path, 'grpc_delta_pull.bin')
+        for _file in (os.path.join(_temp_path, _push_file), _pull_file):
+            for _ext in ('', '.lock', '.tmp', '.info', '.journal'):
+                if os.path.exists(_file + _ext):
+                    FileTool.remove_file(_file + _ext)
+
+        with open(_temp_file, 'rb') as _file:
+            _src_data = _file.read()
+        _delta_block_size = 4096
+
+        # 目标文件为修改后的旧文件: 修改部分数据, 并删除及插入部分数据
+        _old_data = bytearray(_src_data)
+        _old_data[5000: 5010] = b'\xff' * 10
+        del _old_data[100000: 100100]
+        _old_data[200000: 200000] = os.urandom(300)
+
+        _conn_config = {
+            'host': '127.0.0.1', 'port': 50051, 'ping_on_connect': False, 'ping_with_health_check': False,
+            'use_sync_client': True, 'timeout': 100
+        }
+        _pool = create_conn_pool(_conn_config, max_size=10)
+        try:
+            for _tips, _protocol_class, _src, _dest, _dest_real in (
+                ('gRpc差异同步-推送', GRpcPushProtocol, _temp_file, _push_file, os.path.join(_temp_path, _push_file)),
+                ('gRpc差异同步-拉取', GRpcPullProtocol, 'temp_src_file.bin', _pull_file, _pull_file)
+            ):
+                with open(_dest_real, 'wb') as _file:
+                    _file.write(_old_data)
+
+                with _protocol_class(
+                    _src, _dest, is_resume=False, is_overwrite=True, thread_num=2,
+                    cache_size=2, delta_block_size=_delta_block_size, conn_pool=_pool
+                ) as _protocol:
+                    _info = _protocol.get_saver_info()
+                    self.assertTrue(
+                        _info['write_size'] > len(_src_data) // 2,
+                        msg='%s: seed size %d' % (_tips, _info['write_size'])
+                    )
+
+                    # 统计实际传输的数据大小
+                    _read_size = list()
+                    _read_file_data = _protocol.read_file_data
+
+                    def _read(index, handle, start, size, lock):
+                        _data = _read_file_data(index, handle, start, size, lock)
+                        _read_size.append(len(_data))
+                        return _data
+
+                    _protocol.read_file_data = _read
+                    _reader = Transfer(
+                        _protocol, show_process_bar_fun=ProgressRate.show_cmd_process_bar,
+                        process_bar_label=_tips,
+                        thread_interval=0.0
+                    )
+                    _status = _reader.start(wait_finished=True)
+                    self.assertTrue(
+                        _status == 'finished', msg="%s: %s" % (_tips, _status)
+                    )
+                self.assertTrue(
+                    sum(_read_size) == len(_src_data) - _info['write_size'],
+                    msg='%s: transfer size %d' % (_tips, sum(_read_size))
+                )
+                self.assertTrue(
+                    NetTool.get_file_md5(_dest_real) == NetTool.get_file_md5(_temp_file),
+                    msg='%s: md5 error' % _tips
+                )
+        finally:
+            AsyncTools.sync_run_coroutine(_pool.close())
+
     def test_local_to_grpc(self):
         if not TEST_FLAG['test_local_to_grpc']:
             return
@@ -466,7 +971,7 @@ class Test(unittest.TestCase):
         # 删除临时文件
         if os.path.exists(_copy_file):
             FileTool.remove_file(_copy_file)
-        for _ext in ('.lock', '.tmp', '.info'):
+        for _ext in ('.lock', '.tmp', '.info', '.journal'):
             if os.path.exists(_copy_file + _ext):
                 FileTool.remove_file(_copy_file + _ext)
 
@@ -696,7 +1201,7 @@ class Test(unittest.TestCase):
         # 删除临时文件
         if os.path.exists(_copy_file):
             FileTool.remove_file(_copy_file)
-        for _ext in ('.lock', '.tmp', '.info'):
+        for _ext in ('.lock', '.tmp', '.info', '.journal'):
             if os.path.exists(_copy_file + _ext):
                 FileTool.remove_file(_copy_file + _ext)
 
@@ -2,5 +2,5 @@
 # -*- coding: UTF-8 -*-
 
 __all__ = [
-    'driver_fw'
+    'driver_fw', 'query_cache'
 ]
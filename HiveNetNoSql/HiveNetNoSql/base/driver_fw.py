@@ -26,6 +26,10 @@ from HiveNetCore.connection_pool import AIOConnectionPool
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetNoSql.base.query_cache import (
+    QueryResultCache, cache_query, invalidate_query_cache, invalidate_query_cache_session,
+    invalidate_query_cache_db
+)
 
 
 class NosqlDriverFW(object):
@@ -83,6 +87,13 @@ class NosqlDriverFW(object):
                 注1: 该参数用于将init_db和init_collections参数内容放置的配置文件中, 如果参数有值则忽略前面两个参数
                 注2: 配置文件为init_db和init_collections两个字典, 内容与这两个参数一致
             logger {Logger} - 传入驱动的日志对象
+            query_cache {dict} - 查询结果缓存配置, 不传代表不启用缓存(传入{}代表使用默认参数启用)
+                ttl {float} - 缓存有效时间, 单位为秒, 默认为60
+                max_size {int} - 最大缓存的查询数量, 默认为1000
+                max_memory {int} - 缓存结果的最大内存占用(估算), 单位为字节, 默认为64MB
+                copy_result {bool} - 命中缓存时是否返回结果的深拷贝, 默认为True
+                注1: 仅缓存未指定session的query_list、query_count、query_group_by结果, 可传入query_cache=False参数指定当次查询不使用缓存
+                注2: 通过当前驱动执行的写操作会清除对应集合的缓存, 其他途径(包括run_native_cmd)修改的数据需等待缓存过期或调用clear_query_cache
         """
         raise NotImplementedError()
 
@@ -173,7 +184,8 @@ class NosqlDriverFW(object):
                     }
                 },
             }
-        @param {dict} fixed_col_define=None - 固定字段定义(只有固定字段才能进行索引), 格式如下:
+        @param {dict} fixed_col_define=None - 固定字段定义(非固定字段的索引字段将视为json检索路径, 例如'e_str'或'c_json.key1', 创建对应的表达式索引,
+            可在索引字段参数中通过'type'指定检索值的类型str/int/float, 默认为str), 格式如下:
             {
                 '字段名': {
                     'type': '字段类型(str, int, float, bool, json)',
@@ -323,6 +335,24 @@ class NosqlDriverFW(object):
         """
         raise NotImplementedError()
 
+    async def bulk_write(self, collection: str, ops: list, ordered: bool = True,
+            session: Any = None, **kwargs) -> list:
+        """
+        批量执行写入操作
+
+        @param {str} collection - 集合(表)
+        @param {list} ops - 要执行的操作清单, 每个操作为一个字典, 支持的格式如下:
+            {'op': 'insert_one', 'row': {行记录字典}}
+            {'op': 'update', 'filter': {查询条件}, 'update': {更新信息}, 'multi': True, 'upsert': False, 'hint': None}
+            {'op': 'delete', 'filter': {查询条件}, 'multi': True, 'hint': None}
+            注: update和delete的其他参数与对应函数的参数一致
+        @param {bool} ordered=True - 是否按顺序执行操作, 如果为False驱动可以调整操作的执行顺序以获得更好的性能
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 与ops一一对应的操作结果清单, insert_one为插入记录的_id, update为更新的记录数, delete为删除的记录数
+        """
+        raise NotImplementedError()
+
     #############################
     # 数据查询
     #############################
@@ -432,6 +462,67 @@ class NosqlDriverFW(object):
         """
         raise NotImplementedError()
 
+    async def query_columns(self, collection: str, filter: dict = None, projection: Union[dict, list] = None,
+            sort: list = None, skip: int = None, limit: int = None, hint: dict = None,
+            left_join: list = None, fetch_each: int = 10000, column_type: str = 'list',
+            session: Any = None, **kwargs) -> Any:
+        """
+        查询记录并按列返回结果
+        注: 直接从数据库游标的记录元组按批次填充列数组, 不生成每条记录的字典, 适用于大数据量的分析处理
+
+        @param {str} collection - 集合(表)
+        @param {dict} filter=None - 查询条件字典, 与mongodb的查询条件设置方法一样, 参考如下:
+            {} : 查询全部记录
+            {'id': 'info', 'ver': '0.0.1'} : where id = 'info' and 'ver' = '0.0.1'
+            {'ver': {$lt: '0.0.1'}} : where ver < '0.0.1'
+                注: $lt - 小于, $lte - 小于或等于, $gt - 大于, $gte - 大于或等于, $ne - 不等于
+            {'id': {$gt:50}, $or: [{'name': 'lhj'},{'title': 'book'}]} :
+                where id > 50 and (name='lhj' or 'title' = 'book')
+            {'name': {'$regex': 'likestr'}} : where name like '%likestr%', 正则表达式
+            {'name': {'$in': ['a', 'b', 'c']}} : where name in ('a', 'b', 'c')
+            {'name': {'$nin': ['a', 'b', 'c']}} : where name not in ('a', 'b', 'c')
+            {'col_json.sub_col': 'test'}: 查询json字段的指定字典key, 可以支持多级
+            {'col_json.0': 'test'}: 查询json字段的指定数组索引, 可以支持多级
+            注: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始)
+        @param {dict|list} projection=None - 指定结果返回的字段信息
+            列表模式: ['col1','col2', ...]  注意: 该模式一定会返回 _id 这个主键
+            字典模式: {'_id': False, 'col1': True, ...}  该方式可以通过设置False屏蔽 _id 的返回
+            注1: 只有 _id 字段可以设置为False, 其他字段不可设置为False(如果要屏蔽可以不放入字典)
+            注2: 可以通过字典模式的值设置为$开头的字段名或json检索路径的方式, 进行字段别名处理, 例如{'as_name': '$real_name'}或{'as_name': '$real_name.key.key'}
+            注3: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始)
+        @param {list} sort=None - 查询结果的排序方式
+            例: [('col1', 1), ('#0.join_col1', -1)...]
+            注1: 参数的第1个值可以支持'col1.key1'的方式指定json值进行排序
+            注2: 参数的第2个值指定是否升序(1为升序, -1为降序)
+            注3: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始)
+        @param {int} skip=None - 指定跳过返回结果的前面记录的数量
+        @param {int} limit=None - 指定限定返回结果记录的数量
+        @param {dict} hint=None - 指定查询使用索引的名字清单
+            例: {'index_name1': 1, 'index_name2': 1}
+        @param {list} left_join=None - 指定左关联(left outer join)集合信息, 每个数组为一个关联表, 格式如下:
+            [
+                {
+                    'db_name': '指定集合的db',  # 如果不设置则代表和主表是同一个数据库
+                    'collection': '要关联的集合(表)名',
+                    'as': '关联后的别名',  # 如果不设置默认为集合名
+                    'join_fields': [(主表字段名, 关联表字段名), ...],  # 要关联的字段列表, 仅支持完全相等的关联条件
+                    'filter': ..., # 关联表数据的过滤条件(仅用于内部过滤需要关联的数据), 注意字段无需添加集合的别名
+                },
+                ...
+            ]
+        @param {int} fetch_each=10000 - 每次从数据库获取的记录数量
+        @param {str} column_type='list' - 返回的列数组类型
+            list - 每列为python列表
+            numpy - 每列为numpy.ndarray(需安装numpy)
+            arrow - 返回pyarrow.Table对象(需安装pyarrow)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {dict|pyarrow.Table} - 返回的列数据字典, key为列名, value为列数组, 各列的数组长度均为记录数
+            注1: 记录中没有的字段, 对应位置的值为None; 查询结果无记录时返回空字典
+            注2: 扩展字段与固定字段(或其他关联表字段)重名时, 列名会增加"_序号"后缀
+        """
+        raise NotImplementedError()
+
     async def query_count(self, collection: str, filter: dict = None,
             skip: int = None, limit: int = None, hint: dict = None, overtime: float = None,
             left_join: list = None, session: Any = None, **kwargs) -> int:
@@ -586,6 +677,89 @@ class NosqlDriverFW(object):
             left_join=left_join, session=session
         )
 
+    def _build_columns(self, columns: dict, row_num: int, column_type: str = 'list') -> Any:
+        """
+        生成query_columns的返回结果
+
+        @param {dict} columns - 列数据字典, key为列名, value为列值列表
+        @param {int} row_num - 记录数, 长度不足的列将在后面补充None
+        @param {str} column_type='list' - 返回的列数组类型, list/numpy/arrow
+
+        @returns {dict|pyarrow.Table} - 返回的列数据
+        """
+        for _column in columns.values():
+            if len(_column) < row_num:
+                _column.extend([None] * (row_num - len(_column)))
+
+        if column_type == 'list':
+            return columns
+        elif column_type == 'numpy':
+            import numpy
+
+            _ret = {}
+            for _name, _column in columns.items():
+                _array = numpy.asarray(_column)
+                if _array.ndim != 1:
+                    # 值为等长数组的情况, 按对象数组处理
+                    _array = numpy.empty(len(_column), dtype=object)
+                    for _i in range(len(_column)):
+                        _array[_i] = _column[_i]
+                _ret[_name] = _array
+            return _ret
+        elif column_type == 'arrow':
+            import pyarrow
+
+            return pyarrow.table(columns)
+        else:
+            raise ValueError('query_columns not support column type [%s]' % column_type)
+
+    #############################
+    # 查询结果缓存
+    #############################
+    def get_query_cache_stats(self) -> dict:
+        """
+        获取查询结果缓存的统计信息
+
+        @returns {dict} - 统计信息字典(未启用缓存返回None)
+            hits {int} - 命中次数
+            misses {int} - 未命中次数
+            hit_rate {float} - 命中率
+            size {int} - 当前缓存的查询数量
+            memory {int} - 当前缓存结果的内存占用(估算), 单位为字节
+            evictions {int} - 因超出限制或过期被移除的缓存数量
+            invalidations {int} - 因写操作被清除的缓存数量
+        """
+        _cache = getattr(self, '_query_cache', None)
+        return None if _cache is None else _cache.stats
+
+    def clear_query_cache(self, collection: str = None, db_name: str = None):
+        """
+        清除查询结果缓存
+
+        @param {str} collection=None - 要清除缓存的集合(表), 不传代表清除所有缓存
+        @param {str} db_name=None - 集合所在的数据库名, 不传代表当前数据库
+        """
+        _cache = getattr(self, '_query_cache', None)
+        if _cache is None:
+            return
+
+        if collection is None:
+            _cache.clear()
+        else:
+            _cache.invalidate(self.db_name if db_name is None else db_name, collection)
+
+    def _init_query_cache(self, driver_config: dict):
+        """
+        初始化查询结果缓存(在实现类的构造函数中调用)
+
+        @param {dict} driver_config - 驱动配置
+        """
+        _config = driver_config.get('query_cache', None)
+        self._query_cache = None if _config is None else QueryResultCache(**_config)
+
+        # 事务涉及的集合登记, key为session的id, value为(数据库名, 集合名)的集合
+        self._query_cache_sessions = {}
+
     #############################
     # 原生命令执行
     #############################
@@ -688,6 +862,18 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         else:
             return TestTool.cmp_dict(query_ret[0], cmp_val, print_if_diff=False)
 
+    @classmethod
+    def cmp_func_equal_rowcount(cls, query_ret, cmp_val: int) -> bool:
+        """
+        比较函数-非查询语句影响的记录数与比较值相等
+
+        @param {int} query_ret - 非查询语句返回的影响记录数
+        @param {int} cmp_val - 比较值
+
+        @returns {bool} - 比较结果(True代表通过)
+        """
+        return query_ret == cmp_val
+
     @classmethod
     def cmp_func_lt_value(cls, query_ret, cmp_val: Any) -> bool:
         """
@@ -774,10 +960,22 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             logger {Logger} - 传入驱动的日志对象
             ignore_index_error {bool} - 是否忽略索引创建的异常, 默认为True
             debug {bool} - 指定是否debug模式, 默认为False
+            query_iter_fetch_max {int} - query_iter每次从数据库获取记录的最大数量, 默认为1000
+                注: 获取数量从fetch_each开始按倍数自适应增加到该值, 返回时仍按fetch_each分批返回
+            query_cache {dict} - 查询结果缓存配置, 不传代表不启用缓存(传入{}代表使用默认参数启用)
+                ttl {float} - 缓存有效时间, 单位为秒, 默认为60
+                max_size {int} - 最大缓存的查询数量, 默认为1000
+                max_memory {int} - 缓存结果的最大内存占用(估算), 单位为字节, 默认为64MB
+                copy_result {bool} - 命中缓存时是否返回结果的深拷贝, 默认为True
+                注1: 仅缓存未指定session的query_list、query_count、query_group_by结果, 可传入query_cache=False参数指定当次查询不使用缓存
+                注2: 通过当前驱动执行的写操作会清除对应集合的缓存, 其他途径(包括run_native_cmd)修改的数据需等待缓存过期或调用clear_query_cache
         """
         # 指定是否使用insert_many的单独生成语句, Fasle代表使用insert_one逐条插入替代(存在性能问题)
         self._use_insert_many_generate_sqls = False
 
+        # 指定驱动是否支持upsert操作生成原生的单语句更新(需实现'upsert'的sql生成), False代表使用查询+更新+插入的方式处理
+        self._support_native_upsert = False
+
         # 公共参数处理
         self._connect_config = copy.deepcopy(connect_config)
         self._driver_config = copy.deepcopy(driver_config)
@@ -785,6 +983,8 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         self._transaction_share_cursor = self._connect_config.pop('transaction_share_cursor', True)
         self._debug = self._driver_config.get('debug', False)
         self._ignore_index_error = self._driver_config.get('ignore_index_error', True)
+        self._query_iter_fetch_max = self._driver_config.get('query_iter_fetch_max', 1000)
+        self._init_query_cache(self._driver_config)
         self._logger = driver_config.get('logger', None)
         if self._logger is None:
             logging.basicConfig()
@@ -854,9 +1054,12 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         # 启动连接池后驱动需要执行的后处理
         AsyncTools.sync_run_coroutine(self._driver_after_init_pool())
 
-        # 数据表的字段信息字典, {'数据库名': {'表名': {'cols': [固定字段列表], 'define': {固定字段定义}}}}
+        # 数据表的字段信息字典, {'数据库名': {'表名': {'cols': [固定字段列表], 'define': {固定字段定义}, 'json_index_cols': {json检索路径索引}}}}
         self._fixed_col_define = {}
 
+        # 数据表的唯一索引字段缓存, {'数据库名': {'表名': [[唯一索引字段列表], ...]}}
+        self._unique_keys = {}
+
         # 启动驱动时创建集合(表)
         AsyncTools.sync_run_coroutine(
             self._init_collections(_init_collections)
@@ -932,6 +1135,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         # 需要将字典形式的列表转换为数据库名列表, 注意查询结果的字段名必须为name
         return [_db['name'] for _db in _ret]
 
+    @invalidate_query_cache_db
     async def drop_db(self, name: str, *args, **kwargs):
         """
         删除数据库
@@ -976,7 +1180,8 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
                     }
                 },
             }
-        @param {dict} fixed_col_define=None - 固定字段定义(只有固定字段才能进行索引), 格式如下:
+        @param {dict} fixed_col_define=None - 固定字段定义(非固定字段的索引字段将视为json检索路径, 例如'e_str'或'c_json.key1', 创建对应的表达式索引,
+            可在索引字段参数中通过'type'指定检索值的类型str/int/float, 默认为str), 格式如下:
             {
                 '字段名': {
                     'type': '字段类型(str, int, float, bool, json)',
@@ -990,6 +1195,13 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         @param {str} comment=None - 集合注释
         @param {kwargs} - 实现驱动自定义支持的参数
         """
+        self._unique_keys.get(self._db_name, {}).pop(collection, None)
+        _cache_define = self._fixed_col_define.get(self._db_name, {}).get(collection, None)
+        if _cache_define is not None:
+            _cache_define.setdefault('json_index_cols', {}).update(
+                self._get_index_json_cols(indexs, fixed_col_define)
+            )
+
         _sqls, _sql_paras, _execute_paras, _checks = await AsyncTools.async_run_coroutine(
             self._generate_sqls(
                 'create_collection', collection, indexs=indexs, fixed_col_define=fixed_col_define,
@@ -1018,6 +1230,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         # 需要将字典形式的列表转换为数据库名列表, 注意查询结果的字段名必须为name
         return [_tab['name'] for _tab in _ret]
 
+    @invalidate_query_cache
     async def drop_collection(self, collection: str, *args, **kwargs):
         """
         删除集合
@@ -1025,6 +1238,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
 
         @param {str} collection - 集合名(表名)
         """
+        self._unique_keys.get(self._db_name, {}).pop(collection, None)
         _sqls, _sql_paras, _execute_paras, _checks = await AsyncTools.async_run_coroutine(
             self._generate_sqls('drop_collection', collection)
         )
@@ -1036,6 +1250,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             _sqls, paras=_sql_paras, checks=_checks, **_execute_paras
         )
 
+    @invalidate_query_cache
     async def turncate_collection(self, collection: str, *args, **kwargs):
         """
         清空集合记录
@@ -1079,6 +1294,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
 
         return (_conn, _cursor)
 
+    @invalidate_query_cache_session
     async def commit_transaction(self, session, *args, **kwargs):
         """
         提交事务
@@ -1097,6 +1313,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         # 关闭连接
         await AsyncTools.async_run_coroutine(_conn.close())
 
+    @invalidate_query_cache_session
     async def abort_transaction(self, session, *args, **kwargs):
         """
         回滚事务
@@ -1118,6 +1335,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
     #############################
     # 数据操作
     #############################
+    @invalidate_query_cache
     async def insert_one(self, collection: str, row: dict, session: Any = None, **kwargs) -> str:
         """
         插入一条记录
@@ -1173,6 +1391,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         if _ret == 1:
             return _id
 
+    @invalidate_query_cache
     async def insert_many(self, collection: str, rows: list, session: Any = None, **kwargs) -> int:
         """
         插入多条记录
@@ -1280,6 +1499,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
 
         return len(rows)
 
+    @invalidate_query_cache
     async def update(self, collection: str, filter: dict, update: dict, multi: bool = True,
              upsert: bool = False, hint: dict = None, session: Any = None, **kwargs) -> int:
         """
@@ -1298,6 +1518,10 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             {'$rename': {'old_name': 'new_name', ...}}: 将字段名修改为新字段名
         @param {bool} multi=True - 是否更新全部找到的记录, 如果为Fasle只更新找到的第一条记录
         @param {bool} upsert=False - 指定如果记录不存在是否插入
+            注: 如果驱动支持原生upsert, 且查询条件包含_id或某个唯一索引全部字段的等值条件, 将使用数据库原生的
+                upsert语句一次完成查找、更新和插入(并发执行也不会插入重复记录), 否则使用查询+更新+插入的方式处理;
+                使用原生upsert时, 如果唯一索引冲突的记录不满足查询条件中的其他条件, 将不更新也不插入, 返回0
+                (查询+更新+插入的方式会因插入重复记录抛出异常)
         @param {dict} hint=None - 指定查询使用索引的名字清单
         @param {Any} session=None - 指定事务连接对象
         @param {list|str} partition=None - MySQL, PostgreSQL专有参数, 指定操作的分区
@@ -1330,12 +1554,34 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         _fixed_col_define = await self._get_fixed_col_define(collection, session=session)
 
         _filter = {} if filter is None else filter
+        if upsert and self._support_native_upsert and kwargs.get('partition', None) is None:
+            # 条件可以确定唯一记录的情况, 使用数据库原生的upsert语句处理
+            _conflict_cols = await self._get_upsert_conflict_cols(
+                collection, _filter, _fixed_col_define, session=session
+            )
+            if _conflict_cols is not None:
+                _row = self._get_upsert_row(_filter, update)
+                if _row.get('_id', None) is None:
+                    _row['_id'] = str(ObjectId())
+
+                _sqls, _sql_paras, _execute_paras, _checks = await AsyncTools.async_run_coroutine(
+                    self._generate_sqls(
+                        'upsert', collection, _filter, update, _row, conflict_cols=_conflict_cols,
+                        hint=hint, fixed_col_define=_fixed_col_define, **kwargs
+                    )
+                )
+                _execute_paras.update(_upd_execute_paras)
+                _ret = await self._execute_sqls(
+                    _sqls, paras=_sql_paras, checks=_checks, conn=_conn, cursor=_cursor, **_execute_paras
+                )
+                return await AsyncTools.async_run_coroutine(self._get_upsert_update_count(_ret))
+
         _no_match = False
         if not multi and '_id' not in _filter.keys():
             # 只更新一条记录, 但又没有送主键进来, 需要查询记录的主键再更新
             _ret = await self.query_list(
                 collection, filter=_filter, projection={'_id': True}, limit=1, hint=hint,
-                session=session
+                session=session, query_cache=False
             )
             if len(_ret) == 0:
                 # 没有找到记录
@@ -1362,26 +1608,13 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
 
         if upsert:
             # 没有更新成功, 改为用insert_one插入
-            _row = {}
-            if _filter is not None:
-                for _key, _val in _filter.items():
-                    if _key[0] != '$' and not isinstance(_val, dict):
-                        _row[_key] = _val
-
-            for _op, _para in update.items():
-                if _op in ('$set', '$inc', '$min', '$max'):
-                    _row.update(_para)
-                elif _op == '$mul':
-                    # 设置为0
-                    for _key, _val in _para.items():
-                        _row[_key] = 0
-
-            await self.insert_one(collection, _row, session=session)
+            await self.insert_one(collection, self._get_upsert_row(_filter, update), session=session)
             return 0
         else:
             # 没有更新成功且无需插入
             return 0
 
+    @invalidate_query_cache
     async def delete(self, collection: str, filter: dict, multi: bool = True, hint: dict = None,
             session: Any = None, **kwargs) -> int:
         """
@@ -1426,7 +1659,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             # 只删除一条记录, 但又没有送主键进来, 需要查询记录的主键再删除
             _ret = await self.query_list(
                 collection, filter=_filter, projection={'_id': True}, limit=1, hint=hint,
-                session=session
+                session=session, query_cache=False
             )
             if len(_ret) == 0:
                 # 没有找到记录
@@ -1448,9 +1681,139 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             _sqls, paras=_sql_paras, checks=_checks, conn=_conn, cursor=_cursor, **_execute_paras
         )
 
+    @invalidate_query_cache
+    async def bulk_write(self, collection: str, ops: list, ordered: bool = True,
+            session: Any = None, **kwargs) -> list:
+        """
+        批量执行写入操作
+        注: 所有操作在同一个事务中执行(未传入session时自动启动事务, 出现异常将回滚全部操作并抛出异常);
+            相同语句结构的连续insert_one操作合并为一次executemany执行, update和delete操作复用事务连接逐个执行,
+            以返回每个操作的记录数
+
+        @param {str} collection - 集合(表)
+        @param {list} ops - 要执行的操作清单, 每个操作为一个字典, 支持的格式如下:
+            {'op': 'insert_one', 'row': {行记录字典}}
+            {'op': 'update', 'filter': {查询条件}, 'update': {更新信息}, 'multi': True, 'upsert': False, 'hint': None}
+            {'op': 'delete', 'filter': {查询条件}, 'multi': True, 'hint': None}
+            注: update和delete的其他参数与对应函数的参数一致
+        @param {bool} ordered=True - 是否按顺序执行操作
+            注: 如果为False, 将先执行全部insert_one操作(相同语句结构的插入不论位置均合并执行), 再按顺序执行其他操作
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 与ops一一对应的操作结果清单, insert_one为插入记录的_id, update为更新的记录数, delete为删除的记录数
+        """
+        _results = [None for _op in ops]
+        if len(ops) == 0:
+            return _results
+
+        # 获取固定字段信息
+        _fixed_col_define = await self._get_fixed_col_define(collection, session=session)
+
+        # 按顺序形成执行分组, 每个分组为字典:
+        #   合并执行的插入语句: {'sql': 插入语句, 'paras_list': [参数, ...]}
+        #   独立执行的语句: {'sqls': [语句, ...], 'paras': [参数, ...], 'execute_paras': {}, 'checks': []}
+        #   更新或删除操作: {'op': 操作字典, 'index': 操作序号}
+        _groups = []
+        _insert_groups = {}  # 插入语句与合并执行分组的对应关系
+        for _index, _op in enumerate(ops):
+            if _op['op'] != 'insert_one':
+                if _op['op'] not in ('update', 'delete'):
+                    raise ValueError('bulk_write not support operation [%s]' % _op['op'])
+
+                _groups.append({'op': _op, 'index': _index})
+                if ordered:
+                    # 有序执行的情况, 后续插入语句不能与之前的插入语句合并
+                    _insert_groups.clear()
+                continue
+
+            _row = copy.copy(_op['row'])  # 浅复制即可
+            if _row.get('_id', None) is None:
+                _row['_id'] = str(ObjectId())
+            _results[_index] = _row['_id']
+
+            _sqls, _sql_paras, _execute_paras, _checks = await AsyncTools.async_run_coroutine(
+                self._generate_sqls(
+                    'insert_one', collection, _row, fixed_col_define=_fixed_col_define
+                )
+            )
+            if len(_sqls) != 1 or _checks is not None or _execute_paras.get('is_query', False):
+                # 无法合并执行的插入语句
+                _groups.append({
+                    'sqls': _sqls, 'paras': _sql_paras, 'execute_paras': _execute_paras, 'checks': _checks
+                })
+                continue
+
+            _group = _insert_groups.get(_sqls[0], None)
+            if _group is None:
+                _group = {'sql': _sqls[0], 'paras_list': []}
+                _insert_groups[_sqls[0]] = _group
+                _groups.append(_group)
+
+            _group['paras_list'].append(_sql_paras[0])
+
+        if not ordered:
+            # 插入语句优先执行
+            _groups.sort(key=lambda _group: 1 if 'op' in _group.keys() else 0)
+
+        # 获取执行的事务连接
+        _session = session
+        if _session is None:
+            _session = await self.start_transaction()
+
+        _conn = _session[0]
+        _cursor = _session[1]
+        _close_cursor = False
+        if _cursor is None:
+            _cursor = await AsyncTools.async_run_coroutine(_conn.cursor())
+            _close_cursor = True
+
+        # 更新或删除操作使用的事务连接
+        # 注: 内部操作会以该对象登记事务涉及的集合, 执行完成后须清除(由bulk_write自身清除缓存)
+        _op_session = (_conn, _cursor)
+        try:
+            for _group in _groups:
+                if 'op' in _group.keys():
+                    # 更新或删除操作
+                    _op = copy.copy(_group['op'])
+                    _op_name = _op.pop('op')
+                    _results[_group['index']] = await getattr(self, _op_name)(
+                        collection, session=_op_session, **_op
+                    )
+                elif 'sql' in _group.keys():
+                    await self._execute_many_sql(_group['sql'], _group['paras_list'], _cursor)
+                else:
+                    _execute_paras = copy.copy(_group['execute_paras'])
+                    _execute_paras.update({
+                        'commit_on_finished': False, 'rollback_on_exception': False,
+                        'close_cursor': False, 'close_conn': False
+                    })
+                    await self._execute_sqls(
+                        _group['sqls'], paras=_group['paras'], checks=_group['checks'],
+                        conn=_conn, cursor=_cursor, **_execute_paras
+                    )
+
+            if _close_cursor:
+                await AsyncTools.async_run_coroutine(_cursor.close())
+                _close_cursor = False
+
+            if session is None:
+                await self.commit_transaction(_session)
+        except:
+            if _close_cursor:
+                await AsyncTools.async_run_coroutine(_cursor.close())
+
+            if session is None:
+                await self.abort_transaction(_session)
+            raise
+        finally:
+            self._query_cache_sessions.pop(id(_op_session), None)
+
+        return _results
+
     #############################
     # 数据查询
     #############################
+    @cache_query
     async def query_list(self, collection: str, filter: dict = None, projection: Union[dict, list] = None,
             sort: list = None, skip: int = None, limit: int = None, hint: dict = None,
             left_join: list = None,
@@ -1598,118 +1961,119 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
 
         @returns {list} - 返回的结果列表迭代器
         """
-        # 执行连接的固定参数
-        _upd_execute_paras = {
-            'commit_on_finished': True,
-            'rollback_on_exception': True,
-            'close_cursor': True,
-            'close_conn': True,
-        }
-
-        # 获取session
-        if session is not None:
-            _conn = session[0]
-            _cursor = session[1]
-            _upd_execute_paras['commit_on_finished'] = False
-            _upd_execute_paras['rollback_on_exception'] = False
-            _upd_execute_paras['close_conn'] = False
-            if _cursor is not None:
-                _upd_execute_paras['close_cursor'] = False
-        else:
-            _conn = None
-            _cursor = None
-
-        # 获取固定字段信息
-        _fixed_col_define = await self._get_fixed_col_define(collection, session=session)
-        _filter = {} if filter is None else filter
-
-        _sqls, _sql_paras, _execute_paras, _checks = await AsyncTools.async_run_coroutine(
-            self._generate_sqls(
-                'query', collection, filter=_filter, projection=projection, sort=sort,
-                skip=skip, limit=limit, hint=hint, fixed_col_define=_fixed_col_define,
-                left_join=left_join, session=session, **kwargs
-            )
-        )
-        _execute_is_query = _execute_paras.get('is_query', True)
-        _execute_paras.update(_upd_execute_paras)
-
-        if _cursor is None:
-            _conn = await self._get_connection(conn=_conn)
-            _cursor = await AsyncTools.async_run_coroutine(_conn.cursor())
-
-        try:
-            # 上一个语句执行结果和是否异常的标识
-            _prev_return = None
-            _prev_error = False
-
-            # 遍历执行语句
-            _index = 0
-            _lask_index = len(_sqls) - 1
-            for _sql in _sqls:
-                # 参数准备
-                _is_last = (_index >= _lask_index)
-                _sql_paras = None if _sql_paras is None else _sql_paras[_index]
-                _run_check = {}
-                if _checks is not None and _checks[_index] is not None:
-                    _run_check = _checks[_index]
+        async for _rows in self._query_iter_rows(
+            collection, filter=filter, projection=projection, sort=sort, skip=skip, limit=limit,
+            hint=hint, left_join=left_join, fetch_each=fetch_each, session=session, **kwargs
+        ):
+            yield _rows
 
-                _is_query = False
-                if type(_execute_is_query) in (list, tuple):
-                    _is_query = _execute_is_query[_index]
-                elif _is_last:
-                    _is_query = True
+    async def query_columns(self, collection: str, filter: dict = None, projection: Union[dict, list] = None,
+            sort: list = None, skip: int = None, limit: int = None, hint: dict = None,
+            left_join: list = None, fetch_each: int = 10000, column_type: str = 'list',
+            session: Any = None, **kwargs) -> Any:
+        """
+        查询记录并按列返回结果
+        注: 直接从数据库游标的记录元组按批次填充列数组, 不生成每条记录的字典, 适用于大数据量的分析处理
 
-                _index += 1  # 跳转下一个标识
+        @param {str} collection - 集合(表)
+        @param {dict} filter=None - 查询条件字典, 与mongodb的查询条件设置方法一样, 参考如下:
+            {} : 查询全部记录
+            {'id': 'info', 'ver': '0.0.1'} : where id = 'info' and 'ver' = '0.0.1'
+            {'ver': {$lt: '0.0.1'}} : where ver < '0.0.1'
+                注: $lt - 小于, $lte - 小于或等于, $gt - 大于, $gte - 大于或等于, $ne - 不等于
+            {'id': {$gt:50}, $or: [{'name': 'lhj'},{'title': 'book'}]} :
+                where id > 50 and (name='lhj' or 'title' = 'book')
+            {'name': {'$regex': 'likestr'}} : where name like '%likestr%', 正则表达式
+            {'name': {'$in': ['a', 'b', 'c']}} : where name in ('a', 'b', 'c')
+            {'name': {'$nin': ['a', 'b', 'c']}} : where name not in ('a', 'b', 'c')
+            {'col_json.sub_col': 'test'}: 查询json字段的指定字典key, 可以支持多级
+            {'col_json.0': 'test'}: 查询json字段的指定数组索引, 可以支持多级
+            注: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始)
+        @param {dict|list} projection=None - 指定结果返回的字段信息
+            列表模式: ['col1','col2', ...]  注意: 该模式一定会返回 _id 这个主键
+            字典模式: {'_id': False, 'col1': True, ...}  该方式可以通过设置False屏蔽 _id 的返回
+            注1: 只有 _id 字段可以设置为False, 其他字段不可设置为False(如果要屏蔽可以不放入字典)
+            注2: 可以通过字典模式的值设置为$开头的字段名或json检索路径的方式, 进行字段别名处理, 例如{'as_name': '$real_name'}或{'as_name': '$real_name.key.key'}
+            注3: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始)
+        @param {list} sort=None - 查询结果的排序方式
+            例: [('col1', 1), ('#0.join_col1', -1)...]
+            注1: 参数的第1个值可以支持'col1.key1'的方式指定json值进行排序
+            注2: 参数的第2个值指定是否升序(1为升序, -1为降序)
+            注3: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始)
+        @param {int} skip=None - 指定跳过返回结果的前面记录的数量
+        @param {int} limit=None - 指定限定返回结果记录的数量
+        @param {dict} hint=None - 指定查询使用索引的名字清单
+            例: {'index_name1': 1, 'index_name2': 1}
+        @param {list} left_join=None - 指定左关联(left outer join)集合信息, 每个数组为一个关联表, 格式如下:
+            [
+                {
+                    'db_name': '指定集合的db',  # 如果不设置则代表和主表是同一个数据库
+                    'collection': '要关联的集合(表)名',
+                    'as': '关联后的别名',  # 如果不设置默认为集合名
+                    'join_fields': [(主表字段名, 关联表字段名), ...],  # 要关联的字段列表, 仅支持完全相等的关联条件
+                    'filter': ..., # 关联表数据的过滤条件(仅用于内部过滤需要关联的数据), 注意字段无需添加集合的别名
+                },
+                ...
+            ]
+        @param {int} fetch_each=10000 - 每次从数据库获取的记录数量
+        @param {str} column_type='list' - 返回的列数组类型
+            list - 每列为python列表
+            numpy - 每列为numpy.ndarray(需安装numpy)
+            arrow - 返回pyarrow.Table对象(需安装pyarrow)
+        @param {Any} session=None - 指定事务连接对象
+        @param {list|str} partition=None - MySQL, PostgreSQL专有参数, 指定操作的分区
+            注: MySQL支持送入分区列表名, 例如(p1, s3); PostgreSQL仅支持送入单个分区后缀名, 例如'p1'
 
-                # 执行前判断
-                if not self._execute_sql_pre_check(_run_check, _prev_return, _prev_error):
-                    # 检查不通过, 跳过执行, 当作空执行成功
-                    _prev_return = None
-                    _prev_error = False
+        @returns {dict|pyarrow.Table} - 返回的列数据字典, key为列名, value为列数组, 各列的数组长度均为记录数
+            注1: 记录中没有的字段, 对应位置的值为None; 查询结果无记录时返回空字典
+            注2: 扩展字段与固定字段(或其他关联表字段)重名时, 列名会增加"_序号"后缀
+        """
+        _columns = {}
+        _row_num = 0
+        _ext_names = {}  # 扩展字段对应的列名, key为(扩展字段列序号, 字段名)
+        async for _col_index, _rows in self._query_iter_rows(
+            collection, filter=filter, projection=projection, sort=sort, skip=skip, limit=limit,
+            hint=hint, left_join=left_join, fetch_each=fetch_each, to_dict=False, session=session, **kwargs
+        ):
+            if _row_num == 0:
+                # 先登记固定字段的列, 扩展字段重名时增加后缀
+                for _col_name in _col_index:
+                    if _col_name != 'nosql_driver_extend_tags':
+                        _columns[_col_name] = []
+
+            # 按列转换值并放入列数组
+            for _i, _values in enumerate(zip(*_rows)):
+                _values = await AsyncTools.async_run_coroutine(self._format_row_value(_values))
+                if _col_index[_i] != 'nosql_driver_extend_tags':
+                    _columns[_col_index[_i]].extend(_values)
                     continue
 
-                try:
-                    if _is_last:
-                        # 最后一个查询
-                        _prev_return = self._execute_sql_query_iter(
-                            _sql, paras=_sql_paras, fetch_each=fetch_each, conn=_conn, cursor=_cursor,
-                            commit_on_finished=False, rollback_on_exception=False,
-                            close_cursor=False, close_conn=False
-                        )
-                    else:
-                        _prev_return = await self._execute_sql(
-                            _sql, paras=_sql_paras, is_query=_is_query, conn=_conn, cursor=_cursor,
-                            commit_on_finished=False, rollback_on_exception=False,
-                            close_cursor=False, close_conn=False
-                        )
+                # 扩展字段, 展开为列
+                for _offset, _tags in enumerate(_values):
+                    if not _tags:
+                        continue
 
-                    _prev_error = False
-                except:
-                    _prev_error = True
-                    _prev_return = None
-                    if not _run_check.get('after_check', {}).get('ignore_current_error', False):
-                        # 不忽略执行异常
-                        raise
+                    for _key, _val in _tags.items():
+                        _name = _ext_names.get((_i, _key), None)
+                        if _name is None:
+                            _name = _key
+                            _copy_index = 0
+                            while _name in _columns:
+                                _copy_index += 1
+                                _name = '%s_%d' % (_key, _copy_index)
+                            _ext_names[(_i, _key)] = _name
+                            _columns[_name] = []
 
-            # 最后一个语句为异步迭代器
-            async for _rows in _prev_return:
-                yield _rows
+                        _column = _columns[_name]
+                        if len(_column) < _row_num + _offset:
+                            _column.extend([None] * (_row_num + _offset - len(_column)))
+                        _column.append(_val)
 
-            # 判断是否需要自动提交
-            if _execute_paras['commit_on_finished']:
-                await AsyncTools.async_run_coroutine(_conn.commit())
-        except:
-            # 出现异常, 判断是否要回滚
-            if _execute_paras['rollback_on_exception']:
-                await AsyncTools.async_run_coroutine(_conn.rollback())
-            raise
-        finally:
-            # 判断是否关闭游标和连接
-            if _execute_paras['close_cursor']:
-                await AsyncTools.async_run_coroutine(_cursor.close())
-            if _execute_paras['close_conn']:
-                await AsyncTools.async_run_coroutine(_conn.close())
+            _row_num += len(_rows)
+
+        return self._build_columns(_columns, _row_num, column_type=column_type)
 
+    @cache_query
     async def query_count(self, collection: str, filter: dict = None,
             skip: int = None, limit: int = None, hint: dict = None, overtime: float = None,
             left_join: list = None, session: Any = None, **kwargs) -> int:
@@ -1781,6 +2145,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         # 返回第0行第0个记录
         return list(_ret[0].values())[0]
 
+    @cache_query
     async def query_group_by(self, collection: str, group: dict = None, filter: dict = None,
             projection: Union[dict, list] = None, sort: list = None,
             overtime: float = None, session: Any = None, **kwargs) -> list:
@@ -1915,7 +2280,10 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             for _collection, _info in _collections.items():
                 self._fixed_col_define[_db_name][_collection] = {
                     'cols': list(_info.get('fixed_col_define', {}).keys()),
-                    'define': _info.get('fixed_col_define', {})
+                    'define': _info.get('fixed_col_define', {}),
+                    'json_index_cols': self._get_index_json_cols(
+                        _info.get('indexs', None), _info.get('fixed_col_define', None)
+                    )
                 }
 
     #############################
@@ -1938,7 +2306,7 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             _cols_define = await AsyncTools.async_run_coroutine(
                 self._get_cols_info(collection, db_name=db_name, session=session)
             )
-            _fixed_col_define = {'cols': [], 'define': {}}
+            _fixed_col_define = {'cols': [], 'define': {}, 'json_index_cols': {}}
             for _info in _cols_define:
                 if _info['name'] in ('_id', 'nosql_driver_extend_tags'):
                     continue
@@ -1948,6 +2316,9 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
 
             # 添加到数据表的字段信息字典缓存
             if len(_cols_define) > 0:
+                _fixed_col_define['json_index_cols'] = await AsyncTools.async_run_coroutine(
+                    self._get_json_index_cols_info(collection, db_name=db_name, session=session)
+                )
                 if _db_name not in self._fixed_col_define.keys():
                     self._fixed_col_define[_db_name] = {}
 
@@ -1955,6 +2326,105 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
 
         return _fixed_col_define
 
+    def _get_index_json_cols(self, indexs: dict, fixed_col_define: dict) -> dict:
+        """
+        从索引定义中获取json检索路径索引的字段信息
+
+        @param {dict} indexs - 索引字典, 格式与create_collection的indexs参数一致
+        @param {dict} fixed_col_define - 固定字段定义, 格式与create_collection的fixed_col_define参数一致
+
+        @returns {dict} - json检索路径索引的字段信息, key为检索路径(例如'e_str', 'c_json.key1'), value为检索值类型
+        """
+        _json_index_cols = {}
+        if indexs is None:
+            return _json_index_cols
+
+        _fixed_cols = {} if fixed_col_define is None else fixed_col_define
+        for _index_def in indexs.values():
+            for _col_name, _para in _index_def['keys'].items():
+                if _col_name != '_id' and _col_name not in _fixed_cols.keys():
+                    _json_index_cols[_col_name] = _para.get('type', 'str')
+
+        return _json_index_cols
+
+    async def _get_unique_keys(self, collection: str, db_name: str = None, session: Any = None) -> list:
+        """
+        获取指定集合(表)的唯一索引字段清单(包括主键)
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 唯一索引字段清单, 格式为[[字段名, ...], ...]
+        """
+        _db_name = self._db_name if db_name is None else db_name
+        _unique_keys = self._unique_keys.get(_db_name, {}).get(collection, None)
+        if _unique_keys is None:
+            _unique_keys = await AsyncTools.async_run_coroutine(
+                self._get_unique_keys_info(collection, db_name=db_name, session=session)
+            )
+            if _db_name not in self._unique_keys.keys():
+                self._unique_keys[_db_name] = {}
+
+            self._unique_keys[_db_name][collection] = _unique_keys
+
+        return _unique_keys
+
+    async def _get_upsert_conflict_cols(self, collection: str, filter: dict, fixed_col_define: dict,
+            session: Any = None) -> list:
+        """
+        获取原生upsert语句判断记录冲突所使用的唯一索引字段
+
+        @param {str} collection - 集合名(表)
+        @param {dict} filter - 查询条件字典
+        @param {dict} fixed_col_define - 表的固定字段配置信息字典
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 唯一索引字段清单, 如果查询条件中的等值条件无法确定唯一记录则返回None
+        """
+        # 查询条件中固定字段的等值条件
+        _fixed_cols = fixed_col_define.get('cols', [])
+        _eq_cols = set()
+        for _key, _val in filter.items():
+            if _key[0] != '$' and _val is not None and not isinstance(_val, (dict, list, tuple)) and (
+                _key == '_id' or _key in _fixed_cols
+            ):
+                _eq_cols.add(_key)
+
+        if '_id' in _eq_cols:
+            return ['_id']
+
+        for _keys in await self._get_unique_keys(collection, session=session):
+            if len(_keys) > 0 and set(_keys).issubset(_eq_cols):
+                return _keys
+
+        return None
+
+    def _get_upsert_row(self, filter: dict, update: dict) -> dict:
+        """
+        获取upsert找不到记录时要插入的记录
+
+        @param {dict} filter - 查询条件字典
+        @param {dict} update - 更新信息字典
+
+        @returns {dict} - 要插入的行记录字典
+        """
+        _row = {}
+        if filter is not None:
+            for _key, _val in filter.items():
+                if _key[0] != '$' and not isinstance(_val, dict):
+                    _row[_key] = _val
+
+        for _op, _para in update.items():
+            if _op in ('$set', '$inc', '$min', '$max'):
+                _row.update(_para)
+            elif _op == '$mul':
+                # 设置为0
+                for _key, _val in _para.items():
+                    _row[_key] = 0
+
+        return _row
+
     async def _get_connection(self, conn: Any = None) -> Any:
         """
         从连接池获取数据库连接
@@ -2279,10 +2749,166 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             if _close_conn:
                 await AsyncTools.async_run_coroutine(_conn.close())
 
+    async def _execute_many_sql(self, sql: str, paras_list: list, cursor: Any) -> int:
+        """
+        使用多组参数批量执行同一个SQL语句(不处理提交和回滚)
+
+        @param {str} sql - 要执行的SQL语句
+        @param {list} paras_list - SQL参数清单, 每组参数执行一次
+        @param {Any} cursor - 已打开连接的游标
+
+        @returns {int} - 返回语句影响的记录数, 数据库驱动不支持返回的情况返回None
+        """
+        try:
+            if self._debug:
+                # debug模式, 打印sql
+                self._logger.debug('run sql many: %s, para count: %d' % (sql, len(paras_list)))
+
+            await AsyncTools.async_run_coroutine(cursor.executemany(sql, paras_list))
+            _rowcount = cursor.rowcount
+            return None if _rowcount == -1 else _rowcount
+        except:
+            # 异常输出日志
+            self._logger.error(
+                'execute many sql error, sql=%s para count=%d error: %s' % (
+                    sql, len(paras_list), traceback.format_exc()
+                )
+            )
+            raise
+
+    async def _query_iter_rows(self, collection: str, filter: dict = None, projection: Union[dict, list] = None,
+            sort: list = None, skip: int = None, limit: int = None, hint: dict = None,
+            left_join: list = None, fetch_each: int = 1, to_dict: bool = True,
+            session: Any = None, **kwargs):
+        """
+        查询记录并通过迭代对象依次返回(query_iter和query_columns的公共处理)
+
+        @param {bool} to_dict=True - 是否将记录转换为字典返回
+            注: 为False时每次返回(列名列表, 原始记录列表), 不做值转换, 且每次固定获取fetch_each条记录
+        注: 其他参数与query_iter一致
+
+        @returns {async_generator} - 返回可异步迭代获取的查询结果
+        """
+        # 执行连接的固定参数
+        _upd_execute_paras = {
+            'commit_on_finished': True,
+            'rollback_on_exception': True,
+            'close_cursor': True,
+            'close_conn': True,
+        }
+
+        # 获取session
+        if session is not None:
+            _conn = session[0]
+            _cursor = session[1]
+            _upd_execute_paras['commit_on_finished'] = False
+            _upd_execute_paras['rollback_on_exception'] = False
+            _upd_execute_paras['close_conn'] = False
+            if _cursor is not None:
+                _upd_execute_paras['close_cursor'] = False
+        else:
+            _conn = None
+            _cursor = None
+
+        # 获取固定字段信息
+        _fixed_col_define = await self._get_fixed_col_define(collection, session=session)
+        _filter = {} if filter is None else filter
+
+        _sqls, _sql_paras, _execute_paras, _checks = await AsyncTools.async_run_coroutine(
+            self._generate_sqls(
+                'query', collection, filter=_filter, projection=projection, sort=sort,
+                skip=skip, limit=limit, hint=hint, fixed_col_define=_fixed_col_define,
+                left_join=left_join, session=session, **kwargs
+            )
+        )
+        _execute_is_query = _execute_paras.get('is_query', True)
+        _execute_paras.update(_upd_execute_paras)
+
+        if _cursor is None:
+            _conn = await self._get_connection(conn=_conn)
+            if session is None and len(_sqls) == 1:
+                # 独占连接的单语句查询, 使用流式游标, 避免在返回第一条记录前将全部结果加载到内存
+                _cursor = await AsyncTools.async_run_coroutine(self._get_stream_cursor(_conn))
+            else:
+                _cursor = await AsyncTools.async_run_coroutine(_conn.cursor())
+
+        try:
+            # 上一个语句执行结果和是否异常的标识
+            _prev_return = None
+            _prev_error = False
+
+            # 遍历执行语句
+            _index = 0
+            _lask_index = len(_sqls) - 1
+            for _sql in _sqls:
+                # 参数准备
+                _is_last = (_index >= _lask_index)
+                _sql_paras = None if _sql_paras is None else _sql_paras[_index]
+                _run_check = {}
+                if _checks is not None and _checks[_index] is not None:
+                    _run_check = _checks[_index]
+
+                _is_query = False
+                if type(_execute_is_query) in (list, tuple):
+                    _is_query = _execute_is_query[_index]
+                elif _is_last:
+                    _is_query = True
+
+                _index += 1  # 跳转下一个标识
+
+                # 执行前判断
+                if not self._execute_sql_pre_check(_run_check, _prev_return, _prev_error):
+                    # 检查不通过, 跳过执行, 当作空执行成功
+                    _prev_return = None
+                    _prev_error = False
+                    continue
+
+                try:
+                    if _is_last:
+                        # 最后一个查询
+                        _prev_return = self._execute_sql_query_iter(
+                            _sql, paras=_sql_paras, fetch_each=fetch_each, conn=_conn, cursor=_cursor,
+                            commit_on_finished=False, rollback_on_exception=False,
+                            close_cursor=False, close_conn=False, to_dict=to_dict
+                        )
+                    else:
+                        _prev_return = await self._execute_sql(
+                            _sql, paras=_sql_paras, is_query=_is_query, conn=_conn, cursor=_cursor,
+                            commit_on_finished=False, rollback_on_exception=False,
+                            close_cursor=False, close_conn=False
+                        )
+
+                    _prev_error = False
+                except:
+                    _prev_error = True
+                    _prev_return = None
+                    if not _run_check.get('after_check', {}).get('ignore_current_error', False):
+                        # 不忽略执行异常
+                        raise
+
+            # 最后一个语句为异步迭代器
+            async for _rows in _prev_return:
+                yield _rows
+
+            # 判断是否需要自动提交
+            if _execute_paras['commit_on_finished']:
+                await AsyncTools.async_run_coroutine(_conn.commit())
+        except:
+            # 出现异常, 判断是否要回滚
+            if _execute_paras['rollback_on_exception']:
+                await AsyncTools.async_run_coroutine(_conn.rollback())
+            raise
+        finally:
+            # 判断是否关闭游标和连接
+            if _execute_paras['close_cursor']:
+                await AsyncTools.async_run_coroutine(_cursor.close())
+            if _execute_paras['close_conn']:
+                await AsyncTools.async_run_coroutine(_conn.close())
+
     async def _execute_sql_query_iter(self, sql: str, paras: tuple = None,
             fetch_each: int = 1, conn: Any = None, cursor: Any = None,
             commit_on_finished: bool = True, rollback_on_exception: bool = True,
-            close_cursor: bool = False, close_conn: bool = False):
+            close_cursor: bool = False, close_conn: bool = False, to_dict: bool = True):
         """
         执行查询SQL语句(迭代获取模式)
 
@@ -2295,6 +2921,8 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         @param {bool} rollback_on_exception=True - 出现异常时是否执行rollback操作
         @param {bool} close_cursor=False - 是否关闭所传入的游标
         @param {bool} close_conn=False - 是否关闭所传入的连接
+        @param {bool} to_dict=True - 是否将记录转换为字典返回
+            注: 为False时每次固定获取fetch_each条记录, 返回(列名列表, 原始记录列表), 供按列处理的场景使用
 
         @returns {async_generator} - 返回可异步迭代获取的查询结果
             通过 async for 遍历返回的迭代结果列表, 或使用RunTool.AsyncTools工具遍历处理
@@ -2331,16 +2959,33 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
                 await AsyncTools.async_run_coroutine(_cursor.execute(sql, paras))
 
             # 查询语句, 分批次返回查询结果
-            _col_index = await self._cursor_description_to_col_index(_cursor.description)
+            # 注: 每次获取的数量从fetch_each开始按倍数增加到query_iter_fetch_max, 减少逐条获取的交互开销;
+            #     获取的记录全部返回后才获取下一批, 内存中最多只保留一批记录
+            _fetch_each = max(fetch_each, 1)
+            _fetch_size = _fetch_each
+            _col_index = None
             while True:
-                _rows = await AsyncTools.async_run_coroutine(_cursor.fetchmany(fetch_each))
+                _rows = await AsyncTools.async_run_coroutine(_cursor.fetchmany(_fetch_size))
                 if _rows is None or len(_rows) == 0:
                     # 已无记录获取
                     break
 
-                # 返回转换后的处理结果
-                _fetchs = await self._rows_to_dict(_col_index, _rows)
-                yield _fetchs
+                if _col_index is None:
+                    # 部分服务端游标在获取记录后才有字段信息
+                    _col_index = await self._cursor_description_to_col_index(_cursor.description)
+
+                if not to_dict:
+                    # 直接返回原始记录, 由调用方按列处理
+                    yield _col_index, _rows
+                    continue
+
+                # 按fetch_each分批返回转换后的处理结果
+                for _start in range(0, len(_rows), _fetch_each):
+                    _fetchs = await self._rows_to_dict(_col_index, _rows[_start: _start + _fetch_each])
+                    yield _fetchs
+
+                if _fetch_size * 2 <= self._query_iter_fetch_max:
+                    _fetch_size *= 2
 
             # 判断是否需要自动提交
             if commit_on_finished:
@@ -2388,7 +3033,10 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
             for _collection, _info in _collections.items():
                 self._fixed_col_define[_db_name][_collection] = {
                     'cols': list(_info.get('fixed_col_define', {}).keys()),
-                    'define': _info.get('fixed_col_define', {})
+                    'define': _info.get('fixed_col_define', {}),
+                    'json_index_cols': self._get_index_json_cols(
+                        _info.get('indexs', None), _info.get('fixed_col_define', None)
+                    )
                 }
 
                 if _info.get('index_only', True):
@@ -2472,6 +3120,17 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         """
         pass
 
+    async def _get_stream_cursor(self, conn: Any) -> Any:
+        """
+        获取query_iter流式查询使用的游标对象(同步或异步函数)
+        注: 默认为普通游标, 支持服务端游标(不缓存全部结果)的驱动需重载
+
+        @param {Any} conn - 连接对象
+
+        @returns {Any} - 游标对象
+        """
+        return await AsyncTools.async_run_coroutine(conn.cursor())
+
     async def _get_cols_info(self, collection: str, db_name: str = None, session: Any = None) -> list:
         """
         获取制定集合(表)的列信息(同步或异步函数)
@@ -2493,3 +3152,41 @@ class NosqlAIOPoolDriver(NosqlDriverFW):
         @returns {str} - 数据库名
         """
         return None
+
+    async def _get_unique_keys_info(self, collection: str, db_name: str = None, session: Any = None) -> list:
+        """
+        获取制定集合(表)的唯一索引字段信息(同步或异步函数)
+        注: 支持原生upsert的驱动需实现, 不包含表达式字段和带条件的唯一索引
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 唯一索引字段清单(包括主键), 格式为[[字段名, ...], ...]
+        """
+        return []
+
+    async def _get_json_index_cols_info(self, collection: str, db_name: str = None, session: Any = None) -> dict:
+        """
+        获取制定集合(表)的json检索路径索引的字段信息(同步或异步函数)
+        注: 支持json检索路径索引的驱动需实现
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {dict} - json检索路径索引的字段信息, key为检索路径(例如'e_str', 'c_json.key1'), value为检索值类型
+        """
+        return {}
+
+    async def _get_upsert_update_count(self, ret: Any) -> int:
+        """
+        将原生upsert语句的执行结果转换为更新的记录数(同步或异步函数)
+        注: 默认处理为'upsert'生成的最后一个语句为插入语句, 仅在更新语句没有更新记录时执行, 否则跳过执行返回None;
+            由于冲突字段为唯一索引, 最多只会更新1条记录
+
+        @param {Any} ret - 执行'upsert'语句的返回结果
+
+        @returns {int} - 更新的记录数, 插入记录的情况返回0
+        """
+        return 1 if ret is None else 0
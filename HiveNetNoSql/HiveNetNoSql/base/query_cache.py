@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2022 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+nosql数据库驱动的查询结果缓存
+注: 缓存按集合(表)登记, 通过同一个驱动执行的写操作会清除对应集合的缓存
+
+@module query_cache
+@file query_cache.py
+"""
+import sys
+import copy
+import json
+import time
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any
+
+
+class QueryResultCache(object):
+    """
+    查询结果缓存(LRU), 支持有效时间、缓存数量和内存占用限制
+    """
+
+    #############################
+    # 构造函数
+    #############################
+    def __init__(self, ttl: float = 60, max_size: int = 1000, max_memory: int = 67108864,
+            copy_result: bool = True):
+        """
+        查询结果缓存
+
+        @param {float} ttl=60 - 缓存有效时间, 单位为秒, <=0代表不过期
+        @param {int} max_size=1000 - 最大缓存的查询数量
+        @param {int} max_memory=67108864 - 缓存结果的最大内存占用(估算), 单位为字节, 默认为64MB
+        @param {bool} copy_result=True - 命中缓存时是否返回结果的深拷贝
+            注: 如果调用方不会修改查询结果, 可设置为False以提升性能
+        """
+        self._ttl = ttl
+        self._max_size = max_size
+        self._max_memory = max_memory
+        self._copy_result = copy_result
+
+        # 缓存数据, key为缓存标识, value为(结果, 过期时间, 内存占用, 涉及集合列表)
+        self._cache = OrderedDict()
+        # 集合对应的缓存标识, key为(数据库名, 集合名), value为缓存标识集合
+        self._collection_keys = {}
+        # 集合的数据版本, 每次清除集合缓存时增加, 用于避免写操作前发起的查询将旧数据放入缓存
+        self._versions = {}
+        self._memory = 0
+        self._lock = threading.RLock()
+
+        # 统计信息
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    #############################
+    # 公共函数
+    #############################
+    @property
+    def stats(self) -> dict:
+        """
+        获取缓存统计信息
+
+        @returns {dict} - 统计信息字典
+            hits {int} - 命中次数
+            misses {int} - 未命中次数
+            hit_rate {float} - 命中率
+            size {int} - 当前缓存的查询数量
+            memory {int} - 当前缓存结果的内存占用(估算), 单位为字节
+            evictions {int} - 因超出限制或过期被移除的缓存数量
+            invalidations {int} - 因写操作被清除的缓存数量
+        """
+        with self._lock:
+            _total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': 0.0 if _total == 0 else self._hits / _total,
+                'size': len(self._cache),
+                'memory': self._memory,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations
+            }
+
+    def get_versions(self, collections: list) -> tuple:
+        """
+        获取集合的数据版本
+
+        @param {list} collections - 集合清单, [(数据库名, 集合名), ...]
+
+        @returns {tuple} - 数据版本
+        """
+        with self._lock:
+            return tuple([self._versions.get(_collection, 0) for _collection in collections])
+
+    def get(self, key: str) -> tuple:
+        """
+        获取缓存结果
+
+        @param {str} key - 缓存标识
+
+        @returns {tuple} - (是否命中, 缓存结果)
+        """
+        with self._lock:
+            _item = self._cache.get(key, None)
+            if _item is not None and self._ttl > 0 and _item[1] < time.monotonic():
+                # 已过期
+                self._remove(key)
+                self._evictions += 1
+                _item = None
+
+            if _item is None:
+                self._misses += 1
+                return False, None
+
+            self._hits += 1
+            self._cache.move_to_end(key)
+            _result = _item[0]
+
+        return True, (copy.deepcopy(_result) if self._copy_result else _result)
+
+    def set(self, key: str, result: Any, collections: list, versions: tuple = None):
+        """
+        放入缓存结果
+
+        @param {str} key - 缓存标识
+        @param {Any} result - 查询结果
+        @param {list} collections - 结果涉及的集合清单, [(数据库名, 集合名), ...]
+        @param {tuple} versions=None - 发起查询前获取的集合数据版本, 如果已变化则不放入缓存
+        """
+        _size = self._get_size(result)
+        if _size > self._max_memory:
+            return
+
+        # 放入缓存的结果需与返回给调用方的结果隔离
+        _result = copy.deepcopy(result) if self._copy_result else result
+        with self._lock:
+            if versions is not None and versions != self.get_versions(collections):
+                # 查询期间集合已有写操作
+                return
+
+            if key in self._cache:
+                self._remove(key)
+
+            _expire = time.monotonic() + self._ttl
+            self._cache[key] = (_result, _expire, _size, collections)
+            self._memory += _size
+            for _collection in collections:
+                self._collection_keys.setdefault(_collection, set()).add(key)
+
+            # 超出限制, 移除最久未使用的缓存
+            while len(self._cache) > self._max_size or self._memory > self._max_memory:
+                self._remove(next(iter(self._cache)))
+                self._evictions += 1
+
+    def invalidate(self, db_name: str, collection: str = None):
+        """
+        清除集合的缓存
+
+        @param {str} db_name - 数据库名
+        @param {str} collection=None - 集合名, 不传代表清除数据库的所有缓存
+        """
+        with self._lock:
+            if collection is None:
+                _collections = [_key for _key in self._versions.keys() if _key[0] == db_name]
+                _collections.extend([
+                    _key for _key in self._collection_keys.keys() if _key[0] == db_name and _key not in _collections
+                ])
+            else:
+                _collections = [(db_name, collection)]
+
+            for _collection in _collections:
+                self._versions[_collection] = self._versions.get(_collection, 0) + 1
+                for _key in list(self._collection_keys.get(_collection, [])):
+                    self._remove(_key)
+                    self._invalidations += 1
+
+    def clear(self):
+        """
+        清除所有缓存
+        """
+        with self._lock:
+            for _collection in self._collection_keys.keys():
+                self._versions[_collection] = self._versions.get(_collection, 0) + 1
+
+            self._cache.clear()
+            self._collection_keys.clear()
+            self._memory = 0
+
+    #############################
+    # 内部函数
+    #############################
+    def _remove(self, key: str):
+        """
+        移除缓存(需在锁内调用)
+
+        @param {str} key - 缓存标识
+        """
+        _item = self._cache.pop(key, None)
+        if _item is None:
+            return
+
+        self._memory -= _item[2]
+        for _collection in _item[3]:
+            _keys = self._collection_keys.get(_collection, None)
+            if _keys is not None:
+                _keys.discard(key)
+                if len(_keys) == 0:
+                    self._collection_keys.pop(_collection)
+
+    def _get_size(self, obj: Any) -> int:
+        """
+        估算对象的内存占用
+
+        @param {Any} obj - 要估算的对象
+
+        @returns {int} - 内存占用字节数
+        """
+        _size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            for _key, _val in obj.items():
+                _size += sys.getsizeof(_key) + self._get_size(_val)
+        elif isinstance(obj, (list, tuple)):
+            for _val in obj:
+                _size += self._get_size(_val)
+
+        return _size
+
+
+#############################
+# 驱动函数的缓存处理装饰器
+#############################
+def _key_default(obj: Any) -> str:
+    """
+    生成缓存标识时对无法json序列化的对象的转换函数
+    """
+    return '%s:%s' % (type(obj).__name__, str(obj))
+
+
+def _get_arg_getter(func, name: str):
+    """
+    获取从函数调用参数中取得指定参数值的函数
+
+    @param {function} func - 函数对象
+    @param {str} name - 参数名
+
+    @returns {function} - 取值函数, 传入(args, kwargs)返回参数值(不包含self)
+    """
+    _names = list(inspect.signature(func).parameters.keys())[1:]
+    _index = _names.index(name) if name in _names else None
+
+    def _getter(args: tuple, kwargs: dict):
+        if _index is not None and len(args) > _index:
+            return args[_index]
+
+        return kwargs.get(name, None)
+
+    return _getter
+
+
+def cache_query(func):
+    """
+    查询函数的结果缓存装饰器
+    注1: 装饰的函数第1个参数须为集合名, 驱动对象的_query_cache为None时不使用缓存
+    注2: 指定了session(事务)的查询不使用缓存; 可传入query_cache=False参数指定当次查询不使用缓存
+    """
+    _signature = inspect.signature(func)
+    _get_session = _get_arg_getter(func, 'session')
+
+    @functools.wraps(func)
+    async def _wrapper(self, *args, **kwargs):
+        _use_cache = kwargs.pop('query_cache', True)
+        _cache = getattr(self, '_query_cache', None)
+        if _cache is None or not _use_cache or _get_session(args, kwargs) is not None:
+            return await func(self, *args, **kwargs)
+
+        # 生成缓存标识
+        _bound = _signature.bind(self, *args, **kwargs)
+        _bound.apply_defaults()
+        _paras = _bound.arguments
+        _collection = _paras.pop('collection')
+        _db_name = self.db_name
+        for _name in ('self', 'session', 'overtime'):
+            _paras.pop(_name, None)
+
+        try:
+            _key = json.dumps(
+                [func.__name__, _db_name, _collection, _paras], sort_keys=True, ensure_ascii=False,
+                default=_key_default
+            )
+        except TypeError:
+            # 参数无法转换为缓存标识
+            return await func(self, *args, **kwargs)
+
+        _hit, _ret = _cache.get(_key)
+        if _hit:
+            return _ret
+
+        # 关联查询涉及的集合同样需要登记
+        _collections = [(_db_name, _collection)]
+        for _join_para in (_paras.get('left_join', None) or []):
+            _collections.append((_join_para.get('db_name', None) or _db_name, _join_para['collection']))
+
+        _versions = _cache.get_versions(_collections)
+        _ret = await func(self, *args, **kwargs)
+        _cache.set(_key, _ret, _collections, versions=_versions)
+        return _ret
+
+    return _wrapper
+
+
+def invalidate_query_cache(func):
+    """
+    写操作函数清除集合查询结果缓存的装饰器
+    注: 装饰的函数第1个参数须为集合名; 事务中的写操作在提交或回滚时会再次清除缓存
+    """
+    _get_session = _get_arg_getter(func, 'session')
+
+    @functools.wraps(func)
+    async def _wrapper(self, collection: str, *args, **kwargs):
+        _cache = getattr(self, '_query_cache', None)
+        if _cache is None:
+            return await func(self, collection, *args, **kwargs)
+
+        _db_name = self.db_name
+        try:
+            return await func(self, collection, *args, **kwargs)
+        finally:
+            _cache.invalidate(_db_name, collection)
+            _session = _get_session((collection, ) + args, kwargs)
+            if _session is not None:
+                # 登记事务涉及的集合
+                self._query_cache_sessions.setdefault(id(_session), set()).add((_db_name, collection))
+
+    return _wrapper
+
+
+def invalidate_query_cache_session(func):
+    """
+    事务提交或回滚函数清除事务涉及集合的查询结果缓存的装饰器
+    注: 装饰的函数第1个参数须为session
+    """
+    @functools.wraps(func)
+    async def _wrapper(self, session, *args, **kwargs):
+        _cache = getattr(self, '_query_cache', None)
+        if _cache is None:
+            return await func(self, session, *args, **kwargs)
+
+        try:
+            return await func(self, session, *args, **kwargs)
+        finally:
+            for _db_name, _collection in self._query_cache_sessions.pop(id(session), []):
+                _cache.invalidate(_db_name, _collection)
+
+    return _wrapper
+
+
+def invalidate_query_cache_db(func):
+    """
+    删除数据库函数清除数据库所有查询结果缓存的装饰器
+    注: 装饰的函数第1个参数须为数据库名
+    """
+    @functools.wraps(func)
+    async def _wrapper(self, name: str, *args, **kwargs):
+        _cache = getattr(self, '_query_cache', None)
+        try:
+            return await func(self, name, *args, **kwargs)
+        finally:
+            if _cache is not None:
+                _cache.invalidate(name)
+
+    return _wrapper
@@ -27,6 +27,7 @@ while True:
     try:
         from motor.motor_asyncio import AsyncIOMotorClient
         from pymongo import IndexModel, ASCENDING, DESCENDING
+        from pymongo import InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany
         break
     except ImportError:
         if process_install_motor:
@@ -37,6 +38,9 @@ while True:
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetNoSql.base.driver_fw import NosqlDriverFW
+from HiveNetNoSql.base.query_cache import (
+    cache_query, invalidate_query_cache, invalidate_query_cache_session, invalidate_query_cache_db
+)
 
 
 class MongoNosqlDriver(NosqlDriverFW):
@@ -98,6 +102,13 @@ class MongoNosqlDriver(NosqlDriverFW):
                 注1: 该参数用于将init_db和init_collections参数内容放置的配置文件中, 如果参数有值则忽略前面两个参数
                 注2: 配置文件为init_db和init_collections两个字典, 内容与这两个参数一致
             logger {Logger} - 传入驱动的日志对象
+            query_cache {dict} - 查询结果缓存配置, 不传代表不启用缓存(传入{}代表使用默认参数启用)
+                ttl {float} - 缓存有效时间, 单位为秒, 默认为60
+                max_size {int} - 最大缓存的查询数量, 默认为1000
+                max_memory {int} - 缓存结果的最大内存占用(估算), 单位为字节, 默认为64MB
+                copy_result {bool} - 命中缓存时是否返回结果的深拷贝, 默认为True
+                注1: 仅缓存未指定session的query_list、query_count、query_group_by结果, 可传入query_cache=False参数指定当次查询不使用缓存
+                注2: 通过当前驱动执行的写操作会清除对应集合的缓存, 其他途径(包括run_native_cmd)修改的数据需等待缓存过期或调用clear_query_cache
         """
         # 参数处理
         self._driver_config = copy.deepcopy(driver_config)
@@ -105,6 +116,7 @@ class MongoNosqlDriver(NosqlDriverFW):
         if self._logger is None:
             logging.basicConfig()
             self._logger = logging.getLogger(__name__)
+        self._init_query_cache(self._driver_config)
 
         # 生成连接uri
         self._db_uri = connect_config.get('host', 'localhost')
@@ -241,6 +253,7 @@ class MongoNosqlDriver(NosqlDriverFW):
         _result = await self._client.list_database_names()
         return _result
 
+    @invalidate_query_cache_db
     async def drop_db(self, name: str, *args, **kwargs):
         """
         删除数据库
@@ -333,6 +346,7 @@ class MongoNosqlDriver(NosqlDriverFW):
         """
         return await self._db.list_collection_names(filter=filter)
 
+    @invalidate_query_cache
     async def drop_collection(self, collection: str, *args, **kwargs):
         """
         删除集合
@@ -342,6 +356,7 @@ class MongoNosqlDriver(NosqlDriverFW):
         """
         await self._db.drop_collection(collection)
 
+    @invalidate_query_cache
     async def turncate_collection(self, collection: str, *args, **kwargs):
         """
         清空集合记录
@@ -376,6 +391,7 @@ class MongoNosqlDriver(NosqlDriverFW):
         _session.start_transaction()
         return _session
 
+    @invalidate_query_cache_session
     async def commit_transaction(self, session, *args, **kwargs):
         """
         提交事务
@@ -387,6 +403,7 @@ class MongoNosqlDriver(NosqlDriverFW):
         # 关闭session
         await session.end_session()
 
+    @invalidate_query_cache_session
     async def abort_transaction(self, session, *args, **kwargs):
         """
         回滚事务
@@ -401,6 +418,7 @@ class MongoNosqlDriver(NosqlDriverFW):
     #############################
     # 数据操作
     #############################
+    @invalidate_query_cache
     async def insert_one(self, collection: str, row: dict, session: Any = None, **kwargs) -> str:
         """
         插入一条记录
@@ -415,6 +433,7 @@ class MongoNosqlDriver(NosqlDriverFW):
         _result = await self._db.get_collection(collection).insert_one(row, session=session)
         return str(_result.inserted_id)
 
+    @invalidate_query_cache
     async def insert_many(self, collection: str, rows: list, session: Any = None, **kwargs) -> int:
         """
         插入多条记录
@@ -429,6 +448,7 @@ class MongoNosqlDriver(NosqlDriverFW):
         _result = await self._db.get_collection(collection).insert_many(rows, session=session)
         return len(_result.inserted_ids)
 
+    @invalidate_query_cache
     async def update(self, collection: str, filter: dict, update: dict, multi: bool = True,
              upsert: bool = False, hint: dict = None, session: Any = None, **kwargs) -> int:
         """
@@ -469,6 +489,7 @@ class MongoNosqlDriver(NosqlDriverFW):
 
         return _result.modified_count
 
+    @invalidate_query_cache
     async def delete(self, collection: str, filter: dict, multi: bool = True,
             hint: dict = None, session: Any = None, **kwargs) -> int:
         """
@@ -496,9 +517,100 @@ class MongoNosqlDriver(NosqlDriverFW):
 
         return _result.deleted_count
 
+    @invalidate_query_cache
+    async def bulk_write(self, collection: str, ops: list, ordered: bool = True,
+            session: Any = None, **kwargs) -> list:
+        """
+        批量执行写入操作
+        注: 使用mongodb的bulk_write执行, 由于bulk_write只返回汇总的更新和删除数量, 将操作拆分为多批执行,
+            每批为连续的insert_one操作加上最多一个update或delete操作, 从而可以按批次的汇总数量获取每个操作的记录数;
+            ordered为False时先执行全部insert_one操作再按顺序执行其他操作, 出现异常也会执行完其他批次再抛出第一个异常
+
+        @param {str} collection - 集合(表)
+        @param {list} ops - 要执行的操作清单, 每个操作为一个字典, 支持的格式如下:
+            {'op': 'insert_one', 'row': {行记录字典}}
+            {'op': 'update', 'filter': {查询条件}, 'update': {更新信息}, 'multi': True, 'upsert': False, 'hint': None}
+            {'op': 'delete', 'filter': {查询条件}, 'multi': True, 'hint': None}
+        @param {bool} ordered=True - 是否按顺序执行操作
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 与ops一一对应的操作结果清单, insert_one为插入记录的_id, update为更新的记录数(upsert插入记录时为0),
+            delete为删除的记录数
+        """
+        _results = [None for _op in ops]
+        if len(ops) == 0:
+            return _results
+
+        _insert_rows = {}  # 插入的记录, key为操作序号, 插入后可获取生成的_id
+        _batchs = []  # 执行批次清单, 每个批次为(请求清单, 最后一个update或delete操作的序号, 没有为None)
+        _requests = []
+        for _index, _op in enumerate(ops):
+            if _op['op'] == 'insert_one':
+                _insert_rows[_index] = copy.copy(_op['row'])  # 浅复制即可
+                _requests.append(InsertOne(_insert_rows[_index]))
+                continue
+            elif _op['op'] == 'update':
+                _filter = self._std_filter(copy.deepcopy(_op.get('filter', None)))
+                _filter = {} if _filter is None else _filter
+                _class = UpdateMany if _op.get('multi', True) else UpdateOne
+                _request = _class(
+                    _filter, _op['update'], upsert=_op.get('upsert', False), hint=_op.get('hint', None)
+                )
+            elif _op['op'] == 'delete':
+                _filter = self._std_filter(copy.deepcopy(_op.get('filter', None)))
+                _filter = {} if _filter is None else _filter
+                _class = DeleteMany if _op.get('multi', True) else DeleteOne
+                _request = _class(_filter, hint=_op.get('hint', None))
+            else:
+                raise ValueError('bulk_write not support operation [%s]' % _op['op'])
+
+            if ordered:
+                _requests.append(_request)
+                _batchs.append((_requests, _index))
+                _requests = []
+            else:
+                _batchs.append(([_request], _index))
+
+        if len(_requests) > 0:
+            if ordered:
+                _batchs.append((_requests, None))
+            else:
+                _batchs.insert(0, (_requests, None))
+
+        # 按批次执行
+        _error = None
+        _collection = self._db.get_collection(collection)
+        for _requests, _index in _batchs:
+            try:
+                _result = await _collection.bulk_write(_requests, ordered=ordered, session=session)
+            except Exception as _e:
+                if ordered:
+                    raise
+                _error = _e if _error is None else _error
+                continue
+
+            if _index is None:
+                continue
+            elif ops[_index]['op'] == 'delete':
+                _results[_index] = _result.deleted_count
+            elif _result.upserted_count > 0:
+                _results[_index] = 0
+            else:
+                _results[_index] = _result.modified_count
+
+        if _error is not None:
+            raise _error
+
+        # 处理插入记录的_id
+        for _index, _row in _insert_rows.items():
+            _results[_index] = str(_row['_id'])
+
+        return _results
+
     #############################
     # 数据查询
     #############################
+    @cache_query
     async def query_list(self, collection: str, filter: dict = None, projection: Union[dict, list] = None,
             sort: list = None, skip: int = None, limit: int = None, hint: dict = None,
             left_join: list = None,
@@ -688,6 +800,88 @@ class MongoNosqlDriver(NosqlDriverFW):
                 # 返回下一次结果
                 _fetchs = await _cursor.to_list(fetch_each)
 
+    async def query_columns(self, collection: str, filter: dict = None, projection: Union[dict, list] = None,
+            sort: list = None, skip: int = None, limit: int = None, hint: dict = None,
+            left_join: list = None, fetch_each: int = 10000, column_type: str = 'list',
+            session: Any = None, **kwargs) -> Any:
+        """
+        查询记录并按列返回结果
+        注: 按批次从游标获取记录并填充列数组, 不保留每条记录的字典, 适用于大数据量的分析处理
+
+        @param {str} collection - 集合(表)
+        @param {dict} filter=None - 查询条件字典, 与mongodb的查询条件设置方法一样, 参考如下:
+            {} : 查询全部记录
+            {'id': 'info', 'ver': '0.0.1'} : where id = 'info' and 'ver' = '0.0.1'
+            {'ver': {'$lt': '0.0.1'}} : where ver < '0.0.1'
+                注: $lt - 小于, $lte - 小于或等于, $gt - 大于, $gte - 大于或等于, $ne - 不等于
+            {'id': {'$gt':50}, '$or': [{'name': 'lhj'},{'title': 'book'}]} :
+                where id > 50 and (name='lhj' or 'title' = 'book')
+            {'name': {'$regex': 'likestr'}} : where name like '%likestr%', 正则表达式
+            {'name': {'$in': ['a', 'b', 'c']}} : where name in ('a', 'b', 'c')
+            {'name': {'$nin': ['a', 'b', 'c']}} : where name not in ('a', 'b', 'c')
+            {'col_json.sub_col': 'test'}: 查询json字段的指定字典key, 可以支持多级
+            {'col_json.0': 'test'}: 查询json字段的指定数组索引, 可以支持多级
+            注: 如果条件中涉及_id字段, 应传入ObjectId对象, 例如传入ObjectId('...')
+            注: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始)
+        @param {dict|list} projection=None - 指定结果返回的字段信息
+            列表模式: ['col1','col2', ...]  注意: 该模式一定会返回 _id 这个主键
+            字典模式: {'_id': False, 'col1': True, ...}  该方式可以通过设置False屏蔽 _id 的返回
+                注1: 只有 _id 字段可以设置为False, 其他字段不可设置为False(如果要屏蔽可以不放入字典)
+                注2: 可以通过字典模式的值设置为$开头的字段名或json检索路径的方式, 进行字段别名处理, 例如{'as_name': '$real_name'}或{'as_name': '$real_name.key.key'}
+                注3: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始), 例如{'#0.col1': True, 'as_name': '$#0.col2'}
+                注4: mongo的别名形式, 不支持数组索引
+        @param {list} sort=None - 查询结果的排序方式
+            例: [('col1', 1), ...]  注: 参数的第2个值指定是否升序(1为升序, -1为降序)
+            注1: 参数的第1个值可以支持'col1.key1'的方式指定json值进行排序
+            注2: 参数的第2个值指定是否升序(1为升序, -1为降序)
+            注3: 可以在字段名前面加 "#序号." 用于与left_join参数配合使用, 指定当前排序字段所属的关联表索引(序号从0开始)
+        @param {int} skip=None - 指定跳过返回结果的前面记录的数量
+        @param {int} limit=None - 指定限定返回结果记录的数量
+        @param {dict} hint=None - 指定查询使用索引的名字清单
+            例: {'index_name1': 1, 'index_name2': 1}
+        @param {list} left_join=None - 指定左关联(left outer join)集合信息, 每个数组为一个关联表, 格式如下:
+            [
+                {
+                    'db_name': '指定集合的db',  # 如果不设置则代表和主表是同一个数据库
+                    'collection': '要关联的集合(表)名',
+                    'as': '关联后的别名',  # 如果不设置默认为集合名
+                    'join_fields': [(主表字段名, 关联表字段名), ...],  # 要关联的字段列表, 仅支持完全相等的关联条件
+                    'filter': ..., # 关联表数据的过滤条件(仅用于内部过滤需要关联的数据), 注意字段无需添加集合的别名
+                },
+                ...
+            ]
+        @param {int} fetch_each=10000 - 每次从数据库获取的记录数量
+        @param {str} column_type='list' - 返回的列数组类型
+            list - 每列为python列表
+            numpy - 每列为numpy.ndarray(需安装numpy)
+            arrow - 返回pyarrow.Table对象(需安装pyarrow)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {dict|pyarrow.Table} - 返回的列数据字典, key为列名, value为列数组, 各列的数组长度均为记录数
+            注: 记录中没有的字段, 对应位置的值为None; 查询结果无记录时返回空字典
+        """
+        _columns = {}
+        _row_num = 0
+        async for _rows in self.query_iter(
+            collection, filter=filter, projection=projection, sort=sort, skip=skip, limit=limit,
+            hint=hint, left_join=left_join, fetch_each=fetch_each, session=session, **kwargs
+        ):
+            for _row in _rows:
+                for _key, _val in _row.items():
+                    _column = _columns.get(_key, None)
+                    if _column is None:
+                        _column = []
+                        _columns[_key] = _column
+
+                    if len(_column) < _row_num:
+                        _column.extend([None] * (_row_num - len(_column)))
+                    _column.append(_val)
+
+                _row_num += 1
+
+        return self._build_columns(_columns, _row_num, column_type=column_type)
+
+    @cache_query
     async def query_count(self, collection: str, filter: dict = None,
             skip: int = None, limit: int = None, hint: dict = None, left_join: list = None,
             overtime: float = None,
@@ -757,6 +951,7 @@ class MongoNosqlDriver(NosqlDriverFW):
             _ret = await _cursor.to_list(None)
             return _ret[0]['docs_count']
 
+    @cache_query
     async def query_group_by(self, collection: str, group: dict = None, filter: dict = None,
             projection: Union[dict, list] = None, sort: list = None,
             overtime: float = None, session: Any = None, **kwargs) -> list:
@@ -1093,11 +1288,29 @@ class MongoNosqlDriver(NosqlDriverFW):
 
         # 分离和标准化过滤条件, 将主表和关联表的过滤条件拆成两个, 分别放在最开始和最后进行过滤
         _main_filter, _join_filter = self._split_filter(filter, left_join)
+        _sort = None if sort is None else self._std_sort(sort, left_join)
+        _project = self._std_project(projection, left_join)
+        _as_names = [] if left_join is None else [
+            _join_para['collection'] if _join_para.get('as', None) is None else _join_para['as']
+            for _join_para in left_join
+        ]
 
         # 主表的过滤条件
         if len(_main_filter) > 0:
             _pipeline.append({'$match': _main_filter})
 
+        # 没有关联表过滤条件且排序只涉及主表字段时, 将排序和记录数限制提前到关联之前, 减少需关联的记录
+        # 注: 关联表可能匹配多条记录(展开后记录数只增不减), 因此只能提前限制skip+limit的记录数, skip仍在关联后处理
+        _push_down = len(_as_names) > 0 and len(_join_filter) == 0 and (
+            _sort is None or not self._is_join_fields(_sort.keys(), _as_names)
+        )
+        if _push_down:
+            if _sort is not None:
+                _pipeline.append({'$sort': _sort})
+
+            if limit is not None:
+                _pipeline.append({'$limit': limit + (0 if skip is None else skip)})
+
         # 处理关联
         if left_join is not None:
             for _join_para in left_join:
@@ -1124,6 +1337,11 @@ class MongoNosqlDriver(NosqlDriverFW):
                     '$match': {'$expr': {'$and': _match}}
                 })
 
+                # 只返回关联表需要使用的字段
+                _sub_project = self._get_join_sub_project(_as_name, _project, _sort, _join_filter)
+                if _sub_project is not None:
+                    _sub_pipeline.append({'$project': _sub_project})
+
                 # 指定集合
                 if _join_para.get('db_name', None) is None:
                     _from = _join_para['collection']
@@ -1151,14 +1369,11 @@ class MongoNosqlDriver(NosqlDriverFW):
         if len(_join_filter) > 0:
             _pipeline.append({'$match': _join_filter})
 
-        # 排序处理
-        if sort is not None:
-            _pipeline.append({
-                '$sort': self._std_sort(sort, left_join)
-            })
+        # 排序处理, 已提前排序的情况关联处理不会改变记录顺序
+        if _sort is not None and not _push_down:
+            _pipeline.append({'$sort': _sort})
 
         # 返回字段处理: {'id': 0} - 显示所有字段, 排除id; {'id': True} - 只显示id字段，排除其他所有字段
-        _project = self._std_project(projection, left_join)
         if _project is not None:
             _pipeline.append({'$project': _project})
 
@@ -1172,6 +1387,88 @@ class MongoNosqlDriver(NosqlDriverFW):
         # 返回结果
         return _pipeline
 
+    def _is_join_fields(self, fields, as_names: list) -> bool:
+        """
+        判断字段清单中是否有关联表的字段
+
+        @param {Iterable} fields - 标准化后的字段清单(关联表字段为"关联表别名.字段"的形式)
+        @param {list} as_names - 关联表的别名清单
+
+        @returns {bool} - 是否有关联表的字段
+        """
+        for _field in fields:
+            if _field.split('.')[0] in as_names:
+                return True
+
+        return False
+
+    def _get_join_sub_project(self, as_name: str, project: dict, sort: dict, join_filter: dict) -> dict:
+        """
+        获取关联表子聚合管道的返回字段参数
+
+        @param {str} as_name - 关联表别名
+        @param {dict} project - 标准化后的返回字段参数
+        @param {dict} sort - 标准化后的排序参数
+        @param {dict} join_filter - 关联表过滤条件
+
+        @returns {dict} - 返回字段参数, 如果需返回全部字段则返回None
+        """
+        if project is None or len([_key for _key in project.keys() if _key != '_id']) == 0:
+            # 没有指定返回字段或只屏蔽_id, 需返回全部字段
+            return None
+
+        _prefix = '%s.' % as_name
+        _fields = []
+
+        def _add_field(field: str):
+            if field.startswith(_prefix):
+                _fields.append(field[len(_prefix):])
+
+        def _add_filter_fields(filter: dict) -> bool:
+            for _key, _val in filter.items():
+                if _key in ('$or', '$and', '$nor'):
+                    for _sub_filter in _val:
+                        if not _add_filter_fields(_sub_filter):
+                            return False
+                elif _key[0] == '$':
+                    # 其他无法识别字段的条件(例如$expr)
+                    return False
+                else:
+                    _add_field(_key)
+
+            return True
+
+        for _key, _show in project.items():
+            if type(_show) == str and _show[0] == '$':
+                _add_field(_show[1:])
+            else:
+                _add_field(_key)
+
+        if sort is not None:
+            for _key in sort.keys():
+                _add_field(_key)
+
+        if not _add_filter_fields(join_filter):
+            return None
+
+        # 去掉重复及上级字段已包含的字段(避免返回字段路径冲突)
+        _sub_project = {'_id': 1 if '_id' in _fields else 0}
+        for _field in sorted(set(_fields)):
+            if _field == '_id':
+                continue
+
+            _paths = _field.split('.')
+            if len([_i for _i in range(1, len(_paths)) if '.'.join(_paths[0: _i]) in _sub_project]) > 0:
+                continue
+
+            _sub_project[_field] = 1
+
+        if len(_sub_project) == 1:
+            # 不需要关联表的任何字段, 只保留_id用于判断是否关联成功
+            _sub_project = {'_id': 1}
+
+        return _sub_project
+
     def _std_left_join_result(self, result: list, left_join: list = None) -> list:
         """
         标准化关联表返回的结果
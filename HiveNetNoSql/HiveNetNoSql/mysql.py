@@ -146,6 +146,9 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
         # 指定使用独立的insert_many语句, 性能更高
         self._use_insert_many_generate_sqls = True
 
+        # 指定使用原生的upsert语句
+        self._support_native_upsert = True
+
     #############################
     # 特殊的重载函数
     #############################
@@ -187,7 +190,8 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
                     }
                 },
             }
-        @param {dict} fixed_col_define=None - 固定字段定义(只有固定字段才能进行索引), 格式如下:
+        @param {dict} fixed_col_define=None - 固定字段定义(非固定字段的索引字段将视为json检索路径, 例如'e_str'或'c_json.key1', 创建对应的表达式索引,
+            可在索引字段参数中通过'type'指定检索值的类型str/int/float, 默认为str), 格式如下:
             {
                 '字段名': {
                     'type': '字段类型(str, int, float, bool, json)',
@@ -323,6 +327,7 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
             'insert_one': self._sql_fun_insert_one,
             'insert_many': self._sql_fun_insert_many,
             'update': self._sql_fun_update,
+            'upsert': self._sql_fun_upsert,
             'delete': self._sql_fun_delete,
             'query': self._sql_fun_query,
             'query_count': self._sql_fun_query_count,
@@ -415,6 +420,17 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
         """
         pass
 
+    async def _get_stream_cursor(self, conn: Any) -> Any:
+        """
+        获取query_iter流式查询使用的游标对象
+        注: 使用不缓存结果的SSCursor, 每次fetchmany才从服务器读取记录; 提前关闭游标时会读取并丢弃剩余记录
+
+        @param {Any} conn - 连接对象
+
+        @returns {Any} - 游标对象
+        """
+        return await AsyncTools.async_run_coroutine(conn.cursor(aiomysql.SSCursor))
+
     async def _get_cols_info(self, collection: str, db_name: str = None, session: Any = None) -> list:
         """
         获取制定集合(表)的列信息
@@ -450,6 +466,128 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
 
         return _ret
 
+    async def _get_unique_keys_info(self, collection: str, db_name: str = None, session: Any = None) -> list:
+        """
+        获取制定集合(表)的唯一索引字段信息
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 唯一索引字段清单(包括主键), 格式为[[字段名, ...], ...]
+        """
+        if session is not None:
+            _conn = session[0]
+            _cursor = session[1]
+        else:
+            _conn = None
+            _cursor = None
+
+        _db_name = self._db_name if db_name is None else db_name
+        _sql = "select index_name as index_name, column_name as col_name from information_schema.statistics where table_schema='%s' and table_name='%s' and non_unique=0 order by index_name, seq_in_index" % (
+            _db_name, collection
+        )
+        _ret = await self._execute_sql(
+            _sql, paras=None, is_query=True, conn=_conn, cursor=_cursor
+        )
+
+        _unique_keys = {}
+        for _row in _ret:
+            if _row.get('col_name', None) is None:
+                # 表达式索引, 标记为不可用
+                _unique_keys[str(_row['index_name'])] = None
+            elif str(_row['index_name']) not in _unique_keys.keys():
+                _unique_keys[str(_row['index_name'])] = [str(_row['col_name'])]
+            elif _unique_keys[str(_row['index_name'])] is not None:
+                _unique_keys[str(_row['index_name'])].append(str(_row['col_name']))
+
+        return [_keys for _keys in _unique_keys.values() if _keys is not None]
+
+    async def _get_json_index_cols_info(self, collection: str, db_name: str = None, session: Any = None) -> dict:
+        """
+        获取制定集合(表)的json检索路径索引的字段信息
+        注: 函数索引需MySQL 8.0.13及以上版本支持, 低版本返回空字典
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {dict} - json检索路径索引的字段信息, key为检索路径(例如'e_str', 'c_json.key1'), value为检索值类型
+        """
+        if session is not None:
+            _conn = session[0]
+            _cursor = session[1]
+        else:
+            _conn = None
+            _cursor = None
+
+        _db_name = self._db_name if db_name is None else db_name
+        _sql = "select expression from information_schema.statistics where table_schema='%s' and table_name='%s' and expression is not null" % (
+            _db_name, collection
+        )
+        try:
+            _ret = await self._execute_sql(
+                _sql, paras=None, is_query=True, conn=_conn, cursor=_cursor
+            )
+        except:
+            return {}
+
+        # 解析函数索引表达式, 例如: cast(json_extract(`nosql_driver_extend_tags`,_utf8mb4\'$.e_int\') as signed)
+        _type_mapping = {'signed': 'int', 'double': 'float'}
+        _json_index_cols = {}
+        for _row in _ret:
+            for _col_name, _path, _cast in re.findall(
+                r"json_extract\(`(\w+)`,\s*(?:_\w+)?\\?'\$\.([^'\\]+)\\?'\)\)?\s+as\s+(\w+)",
+                str(_row['expression'])
+            ):
+                _path = _path.replace('[', '.').replace(']', '').lstrip('.')
+                if _col_name != 'nosql_driver_extend_tags':
+                    _path = '%s.%s' % (_col_name, _path)
+
+                _json_index_cols[_path] = _type_mapping.get(_cast, 'str')
+
+        return _json_index_cols
+
+    async def _get_upsert_conflict_cols(self, collection: str, filter: dict, fixed_col_define: dict,
+            session: Any = None) -> list:
+        """
+        获取原生upsert语句判断记录冲突所使用的唯一索引字段
+        注: on duplicate key update不支持附加条件, 且任意唯一索引冲突都会触发更新, 因此仅支持查询条件只有冲突字段,
+            且集合(表)除主键外最多只有一个唯一索引的情况
+
+        @param {str} collection - 集合名(表)
+        @param {dict} filter - 查询条件字典
+        @param {dict} fixed_col_define - 表的固定字段配置信息字典
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 唯一索引字段清单, 不支持原生upsert时返回None
+        """
+        _conflict_cols = await super()._get_upsert_conflict_cols(
+            collection, filter, fixed_col_define, session=session
+        )
+        if _conflict_cols is None or len(filter) != len(_conflict_cols):
+            return None
+
+        _other_keys = [
+            _keys for _keys in await self._get_unique_keys(collection, session=session)
+            if _keys != ['_id'] and _keys != _conflict_cols
+        ]
+        if len(_other_keys) > 0:
+            return None
+
+        return _conflict_cols
+
+    async def _get_upsert_update_count(self, ret: Any) -> int:
+        """
+        将原生upsert语句的执行结果转换为更新的记录数
+        注: on duplicate key update影响的记录数, 插入为1, 更新为2, 更新后值没有变化为0
+
+        @param {Any} ret - 执行'upsert'语句的返回结果
+
+        @returns {int} - 更新的记录数, 插入记录的情况返回0
+        """
+        return 0 if ret == 1 else 1
+
     async def _get_current_db_name(self, session: Any = None) -> str:
         """
         获取当前数据库名
@@ -595,11 +733,13 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
         # 根据字段判断是主表还是关联表
         _key = key
         _fixed_cols = None
+        _json_index_cols = {}
         if _key[0] != '#':
             # 主表的过滤条件
             _as_name = ''
             if fixed_col_define is not None:
                 _fixed_cols = copy.deepcopy(fixed_col_define.get('cols', []))
+                _json_index_cols = fixed_col_define.get('json_index_cols', {})
         else:
             # 关联表的过滤条件
             _index = _key.find('.')
@@ -615,6 +755,7 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
             ))
             if _fixed_col_define is not None:
                 _fixed_cols = copy.deepcopy(_fixed_col_define.get('cols', []))
+                _json_index_cols = _fixed_col_define.get('json_index_cols', {})
 
         # 判断是否处理json的值, 形成最后比较的 key 值
         _is_json = False
@@ -622,7 +763,12 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
             if _key != '_id' and _key not in _fixed_cols:
                 _is_json = True
                 _path_cols = _key.split('.')
-                if len(_path_cols) > 1 and _path_cols[0] in _fixed_cols:
+                if _key in _json_index_cols.keys():
+                    # 有json检索路径索引, 使用与索引完全一致的表达式, 以便查询可以使用索引
+                    _key = self._get_json_index_sql(
+                        _key, _json_index_cols[_key], fixed_cols=_fixed_cols, as_name=_as_name
+                    )
+                elif len(_path_cols) > 1 and _path_cols[0] in _fixed_cols:
                     # json固定字段
                     _path = self._convert_path_array(_path_cols[1:])
                     _key = "%s`%s`->'$.%s'" % (_as_name, _path_cols[0], _path)
@@ -1533,19 +1679,28 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
         # 建索引脚本
         _support_desc_index = self._driver_config.get('support_desc_index', False)
         if kwargs.get('indexs', None) is not None:
+            _fixed_cols = list(kwargs.get('fixed_col_define', None) or {})
             for _index_name, _index_def in kwargs['indexs'].items():
                 _support_unique = True
                 _cols = []
                 for _col_name, _para in _index_def['keys'].items():
-                    if _col_name not in _partition_cols:
-                        # 索引中存在非分区条件的字段, 则不支持唯一索引
+                    if _partition_sql is not None and _col_name not in _partition_cols:
+                        # 分区表的索引中存在非分区条件的字段, 则不支持唯一索引
                         _support_unique = False
 
+                    if _col_name != '_id' and _col_name not in _fixed_cols:
+                        # json检索路径索引(函数索引), 表达式需与查询条件生成的表达式完全一致
+                        _col_sql = '(%s)' % self._get_json_index_sql(
+                            _col_name, _para.get('type', 'str'), fixed_cols=_fixed_cols
+                        )
+                    else:
+                        _col_sql = '`%s`' % _col_name
+
                     if _support_desc_index and _para.get('asc', 1) == -1:
                         # 降序索引
-                        _cols.append('`%s` desc' % _col_name)
+                        _cols.append('%s desc' % _col_sql)
                     else:
-                        _cols.append('`%s`' % _col_name)
+                        _cols.append(_col_sql)
 
                 _sql = 'create %sindex `%s` on %s`%s`(%s)' % (
                     'UNIQUE ' if _index_def.get('paras', {}).get('unique', False) and _support_unique else '',
@@ -1713,6 +1868,27 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
         # 返回语句
         return ([_sql], [_update_sql_paras], {})
 
+    def _sql_fun_upsert(self, op: str, *args, **kwargs) -> tuple:
+        """
+        生成原生upsert的sql语句数组
+        注: 使用insert ... on duplicate key update, 更新表达式中的字段对应已存在的记录
+        """
+        _collection = args[0]
+        _update = args[2]
+        _row = copy.copy(args[3])  # 浅复制即可
+        _fixed_col_define = kwargs.get('fixed_col_define', None)
+
+        _insert_sqls, _insert_paras, _ = self._sql_fun_insert_one(
+            'insert_one', _collection, _row, fixed_col_define=_fixed_col_define
+        )
+        _sql_paras = _insert_paras[0]
+        _update_sql = self._get_update_sql(
+            _update, fixed_col_define=_fixed_col_define, sql_paras=_sql_paras
+        )
+        _sql = '%s on duplicate key update %s' % (_insert_sqls[0], _update_sql)
+
+        return ([_sql], [_sql_paras], {})
+
     def _sql_fun_delete(self, op: str, *args, **kwargs) -> tuple:
         """
         生成删除数据的sql语句数组
@@ -1969,6 +2145,34 @@ class MySQLNosqlDriver(NosqlAIOPoolDriver):
     #############################
     # 其他内部函数
     #############################
+    def _get_json_index_sql(self, col_name: str, col_type: str, fixed_cols: list = [], as_name: str = '') -> str:
+        """
+        获取json检索路径索引的表达式(查询条件使用相同的表达式才能使用函数索引)
+
+        @param {str} col_name - 检索路径(x.x.x形式)
+        @param {str} col_type - 检索值类型(str/int/float/bool)
+        @param {list} fixed_cols=[] - 固定字段定义清单
+        @param {str} as_name='' - 表别名前缀, 例如'`tab_as`.'
+
+        @returns {str} - 索引表达式
+        """
+        _path_cols = col_name.split('.')
+        if len(_path_cols) > 1 and _path_cols[0] in fixed_cols:
+            # json固定字段
+            _path = self._convert_path_array(_path_cols[1:])
+            _col_name = _path_cols[0]
+        else:
+            _path = self._convert_path_array(_path_cols)
+            _col_name = 'nosql_driver_extend_tags'
+
+        if col_type in ('int', 'bool'):
+            return "cast(%s`%s`->'$.%s' as signed)" % (as_name, _col_name, _path)
+        elif col_type == 'float':
+            return "cast(%s`%s`->'$.%s' as double)" % (as_name, _col_name, _path)
+        else:
+            # 字符串需指定与json_unquote一致的排序规则
+            return "(cast(%s`%s`->>'$.%s' as char(255)) collate utf8mb4_bin)" % (as_name, _col_name, _path)
+
     def _convert_path_array(self, path_list: list) -> str:
         """
         将json查询路径数组转换为sqlite支持的json查询路径字符串
@@ -15,6 +15,7 @@ PostgreSQL的HiveNetNoSql实现模块
 import os
 import sys
 import copy
+import re
 import json
 from bson.objectid import ObjectId
 from typing import Any, Union
@@ -160,6 +161,9 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
         # 指定使用独立的insert_many语句, 性能更高
         self._use_insert_many_generate_sqls = True
 
+        # 指定使用原生的upsert语句
+        self._support_native_upsert = True
+
     #############################
     # 特殊的重载函数
     #############################
@@ -185,7 +189,8 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
                     }
                 },
             }
-        @param {dict} fixed_col_define=None - 固定字段定义(只有固定字段才能进行索引), 格式如下:
+        @param {dict} fixed_col_define=None - 固定字段定义(非固定字段的索引字段将视为json检索路径, 例如'e_str'或'c_json.key1', 创建对应的表达式索引,
+            可在索引字段参数中通过'type'指定检索值的类型str/int/float, 默认为str), 格式如下:
             {
                 '字段名': {
                     'type': '字段类型(str, int, float, bool, json)',
@@ -322,6 +327,7 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
             'insert_one': self._sql_fun_insert_one,
             'insert_many': self._sql_fun_insert_many,
             'update': self._sql_fun_update,
+            'upsert': self._sql_fun_upsert,
             'delete': self._sql_fun_delete,
             'query': self._sql_fun_query,
             'query_count': self._sql_fun_query_count,
@@ -414,6 +420,17 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
         """
         pass
 
+    def _get_stream_cursor(self, conn: Any) -> Any:
+        """
+        获取query_iter流式查询使用的游标对象
+        注: 使用命名的服务端游标(在事务中执行), 每次fetchmany才从服务器读取记录
+
+        @param {Any} conn - 连接对象
+
+        @returns {Any} - 游标对象
+        """
+        return conn.cursor(name='nosql_iter_%s' % str(ObjectId()))
+
     async def _get_cols_info(self, collection: str, db_name: str = None, session: Any = None) -> list:
         """
         获取制定集合(表)的列信息
@@ -455,6 +472,93 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
 
         return _ret
 
+    async def _get_unique_keys_info(self, collection: str, db_name: str = None, session: Any = None) -> list:
+        """
+        获取制定集合(表)的唯一索引字段信息
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 唯一索引字段清单(包括主键), 格式为[[字段名, ...], ...]
+        """
+        if session is not None:
+            _conn = session[0]
+            _cursor = session[1]
+        else:
+            _conn = None
+            _cursor = None
+
+        # 获取唯一索引字段(忽略表达式索引和带条件的索引)
+        _db_name = self._db_name if db_name is None else db_name
+        _sql = "select ix.indexrelid::regclass::text as index_name, a.attname as col_name from pg_index ix join pg_class t on t.oid = ix.indrelid join pg_namespace n on n.oid = t.relnamespace join pg_attribute a on a.attrelid = t.oid and a.attnum = any(ix.indkey) where ix.indisunique and ix.indpred is null and ix.indexprs is null and n.nspname = '%s' and t.relname = '%s'" % (
+            _db_name, collection
+        )
+        _ret = await self._execute_sql(
+            _sql, paras=None, is_query=True, conn=_conn, cursor=_cursor
+        )
+
+        _unique_keys = {}
+        for _row in _ret:
+            _unique_keys.setdefault(str(_row['index_name']), []).append(str(_row['col_name']))
+
+        return list(_unique_keys.values())
+
+    async def _get_json_index_cols_info(self, collection: str, db_name: str = None, session: Any = None) -> dict:
+        """
+        获取制定集合(表)的json检索路径索引的字段信息
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {dict} - json检索路径索引的字段信息, key为检索路径(例如'e_str', 'c_json.key1'), value为检索值类型
+        """
+        if session is not None:
+            _conn = session[0]
+            _cursor = session[1]
+        else:
+            _conn = None
+            _cursor = None
+
+        _db_name = self._db_name if db_name is None else db_name
+        _sql = "select indexdef from pg_indexes where schemaname = '%s' and tablename = '%s'" % (
+            _db_name, collection
+        )
+        _ret = await self._execute_sql(
+            _sql, paras=None, is_query=True, conn=_conn, cursor=_cursor
+        )
+
+        # 解析索引定义, 例如: ((nosql_driver_extend_tags #>> '{e_str}'::text[])), ((c_json #> '{k,0}'::text[]))::integer
+        _type_mapping = {'integer': 'int', 'real': 'float', 'double precision': 'float', 'boolean': 'bool'}
+        _json_index_cols = {}
+        for _row in _ret:
+            for _col_name, _op, _path, _cast in re.findall(
+                r'"?(\w+)"? (#>>?) \'\{([^}]*)\}\'::text\[\]\)*(?:::(integer|real|double precision|boolean))?',
+                _row['indexdef']
+            ):
+                _path = '.'.join([_key.strip().strip('"') for _key in _path.split(',')])
+                if _col_name != 'nosql_driver_extend_tags':
+                    _path = '%s.%s' % (_col_name, _path)
+
+                _json_index_cols[_path] = 'str' if _op == '#>>' else _type_mapping.get(_cast, 'str')
+
+        return _json_index_cols
+
+    async def _get_upsert_update_count(self, ret: Any) -> int:
+        """
+        将原生upsert语句的执行结果转换为更新的记录数
+
+        @param {Any} ret - 执行'upsert'语句的返回结果
+
+        @returns {int} - 更新的记录数, 插入记录的情况返回0
+        """
+        if len(ret) == 0 or ret[0].get('upsert_inserted', False):
+            # 冲突记录不满足其他条件或插入了新记录
+            return 0
+
+        return 1
+
     async def _get_current_db_name(self, session: Any = None) -> str:
         """
         获取当前数据库名
@@ -570,7 +674,7 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
             '\n', '\\n').replace('\t', '\\t').replace("'", "''").replace('"', '\\"')
 
     def _get_filter_unit_sql(self, key: str, val: Any, fixed_col_define: dict = None,
-            sql_paras: list = [], left_join: list = None, session=None) -> str:
+            sql_paras: list = [], left_join: list = None, session=None, as_name: str = None) -> str:
         """
         获取兼容mongodb过滤条件规则的单个规则对应的sql
 
@@ -584,17 +688,20 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
         @param {list} sql_paras=[] - 返回sql对应的占位参数
         @param {list} left_join=None - 左关联配置
         @param {Any} session=None - 数据库事务连接对象
+        @param {str} as_name=None - 主表字段对应的表别名
 
         @returns {str} - 单个规则对应的sql
         """
         # 根据字段判断是主表还是关联表
         _key = key
         _fixed_cols = None
+        _json_index_cols = {}
         if _key[0] != '#':
             # 主表的过滤条件
-            _as_name = ''
+            _as_name = '' if as_name is None else '"%s".' % as_name
             if fixed_col_define is not None:
                 _fixed_cols = copy.deepcopy(fixed_col_define.get('cols', []))
+                _json_index_cols = fixed_col_define.get('json_index_cols', {})
         else:
             # 关联表的过滤条件
             _index = _key.find('.')
@@ -610,6 +717,7 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
             ))
             if _fixed_col_define is not None:
                 _fixed_cols = copy.deepcopy(_fixed_col_define.get('cols', []))
+                _json_index_cols = _fixed_col_define.get('json_index_cols', {})
 
         # 判断是否处理json的值, 形成最后比较的 key 值
         _col_type = None
@@ -628,6 +736,10 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
                     _col_name = 'nosql_driver_extend_tags'
 
                 _col_type = fixed_col_define.get('define', {}).get(_key, {}).get('type', None)
+                if _col_type is None:
+                    # 有json检索路径索引的情况按索引的类型处理, 生成与索引一致的表达式
+                    _col_type = _json_index_cols.get(_key, None)
+
                 if _col_type is None:
                     _key = "%s\"%s\"#>'{%s}'" % (_as_name, _col_name, _path)
                     # _key = "jsonb_path_query_first(\"%s\", '$.%s')" % (_col_name, _path)
@@ -714,7 +826,7 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
         return _sql
 
     def _get_filter_sql(self, filter: dict, fixed_col_define: dict = None,
-            sql_paras: list = [], left_join: list = None, session=None) -> str:
+            sql_paras: list = [], left_join: list = None, session=None, as_name: str = None) -> str:
         """
         获取兼容mongodb过滤条件规则的sql语句
 
@@ -727,6 +839,7 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
         @param {list} sql_paras=[] - 返回sql对应的占位参数
         @param {list} left_join=None - 左关联配置
         @param {Any} session=None - 数据库事务连接对象
+        @param {str} as_name=None - 主表字段对应的表别名
 
         @returns {str} - 返回的sql语句, 如果没有条件则返回None
         """
@@ -743,7 +856,7 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
                     # 逐个条件处理
                     _where = self._get_filter_sql(
                         _condition, fixed_col_define=fixed_col_define, sql_paras=sql_paras,
-                        left_join=left_join, session=session
+                        left_join=left_join, session=session, as_name=as_name
                     )
                     if len(_condition) > 1:
                         # 多条件的情况，需要增加括号进行集合处理
@@ -760,7 +873,7 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
                 # 正常的and条件
                 _where = self._get_filter_unit_sql(
                     _col, _val, fixed_col_define=fixed_col_define, sql_paras=sql_paras,
-                    left_join=left_join, session=session
+                    left_join=left_join, session=session, as_name=as_name
                 )
                 # 添加条件
                 _condition_list.append(_where)
@@ -769,7 +882,7 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
         return ' and '.join(_condition_list)
 
     def _get_update_sql(self, update: dict, fixed_col_define: dict = None,
-            sql_paras: list = []) -> str:
+            sql_paras: list = [], as_name: str = None) -> str:
         """
         获取兼容mongodb更新语句的sql语句
 
@@ -780,9 +893,12 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
                 'define': {'字段名': {'type': 'str|bool|int|...'}}
             }
         @param {list} sql_paras=[] - 返回sql对应的占位参数
+        @param {str} as_name=None - 更新值表达式引用字段时对应的表别名(注: 更新的目标字段不能带表名)
 
         @returns {str} - 返回更新部分语句sql
         """
+        _as_name = '' if as_name is None else '"%s".' % as_name
+
         # 更新辅助字典, key为要更新的字段名, value为{'sql': '对应的sql语句, 比如%s', 'paras': [传入sql的参数列表]}
         _upd_dict = {}
 
@@ -801,17 +917,17 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
                     elif _op == '$unset':
                         _upd_dict[_key] = {'sql': 'null', 'paras': []}
                     elif _op == '$inc':
-                        _upd_dict[_key] = {'sql': 'COALESCE("%s",0) + %s' % (_key, '%s'), 'paras': [_val]}
+                        _upd_dict[_key] = {'sql': 'COALESCE(%s"%s",0) + %s' % (_as_name, _key, '%s'), 'paras': [_val]}
                     elif _op == '$mul':
-                        _upd_dict[_key] = {'sql': 'COALESCE("%s",0) * %s' % (_key, '%s'), 'paras': [_val]}
+                        _upd_dict[_key] = {'sql': 'COALESCE(%s"%s",0) * %s' % (_as_name, _key, '%s'), 'paras': [_val]}
                     elif _op == '$min':
                         _upd_dict[_key] = {
-                            'sql': 'case when COALESCE("{key}", {pos}) < {pos} then COALESCE("{key}",0) else {pos} end'.format(key=_key, pos='%s'),
+                            'sql': 'case when COALESCE({as_name}"{key}", {pos}) < {pos} then COALESCE({as_name}"{key}",0) else {pos} end'.format(as_name=_as_name, key=_key, pos='%s'),
                             'paras': [_val, _val, _val]
                         }
                     elif _op == '$max':
                         _upd_dict[_key] = {
-                            'sql': 'case when COALESCE("{key}", {pos}) > {pos} then COALESCE("{key}",0) else {pos} end'.format(key=_key, pos='%s'),
+                            'sql': 'case when COALESCE({as_name}"{key}", {pos}) > {pos} then COALESCE({as_name}"{key}",0) else {pos} end'.format(as_name=_as_name, key=_key, pos='%s'),
                             'paras': [_val, _val, _val]
                         }
                     else:
@@ -851,19 +967,19 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
                         _dbtype, _dbval = self._python_to_dbtype(_val, is_json=True)
                         # 需要取值出来, 添加查询字段
                         if _op == '$inc':
-                            _sql = "'{{{path}}}', to_jsonb(COALESCE(cast(\"{col_name}\"#>'{{{path}}}' as float), 0) + {val})"
+                            _sql = "'{{{path}}}', to_jsonb(COALESCE(cast({as_name}\"{col_name}\"#>'{{{path}}}' as float), 0) + {val})"
                         elif _op == '$mul':
-                            _sql = "'{{{path}}}', to_jsonb(COALESCE(cast(\"{col_name}\"#>'{{{path}}}' as float), 0) * {val})"
+                            _sql = "'{{{path}}}', to_jsonb(COALESCE(cast({as_name}\"{col_name}\"#>'{{{path}}}' as float), 0) * {val})"
                         elif _op == '$min':
-                            _sql = "'{{{path}}}', case when COALESCE(cast(\"{col_name}\"#>'{{{path}}}' as float), {val}) < {val} then to_jsonb(COALESCE(cast(\"{col_name}\"#>'{{{path}}}' as float), 0)) else '{val}' end"
+                            _sql = "'{{{path}}}', case when COALESCE(cast({as_name}\"{col_name}\"#>'{{{path}}}' as float), {val}) < {val} then to_jsonb(COALESCE(cast({as_name}\"{col_name}\"#>'{{{path}}}' as float), 0)) else '{val}' end"
                         elif _op == '$max':
-                            _sql = "'{{{path}}}', case when COALESCE(cast(\"{col_name}\"#>'{{{path}}}' as float), {val}) > {val} then to_jsonb(COALESCE(cast(\"{col_name}\"#>'{{{path}}}' as float), 0)) else '{val}' end"
+                            _sql = "'{{{path}}}', case when COALESCE(cast({as_name}\"{col_name}\"#>'{{{path}}}' as float), {val}) > {val} then to_jsonb(COALESCE(cast({as_name}\"{col_name}\"#>'{{{path}}}' as float), 0)) else '{val}' end"
                     else:
                         raise pgadapter.NotSupportedError('psycopg not support this update operation [%s]' % _op)
 
                     # 处理格式化
                     _extend[_col_name]['set_dict']['sqls'].append(
-                        _sql.format(col_name=_col_name, path=_path, pos='%s', val=str(_dbval))
+                        _sql.format(as_name=_as_name, col_name=_col_name, path=_path, pos='%s', val=str(_dbval))
                     )
 
         # 开始生成sql语句和返回参数
@@ -881,10 +997,10 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
 
             if len(_extend_para['set_dict']['sqls']) == 0:
                 if _remove_sql != '':
-                    _sqls.append('"%s"="%s"%s' % (_col_name, _col_name, _remove_sql))
+                    _sqls.append('"%s"=%s"%s"%s' % (_col_name, _as_name, _col_name, _remove_sql))
             else:
                 # 嵌套更新值
-                _set_sql = _col_name
+                _set_sql = '%s"%s"' % (_as_name, _col_name)
                 for _sql in _extend_para['set_dict']['sqls']:
                     _set_sql = 'jsonb_set(%s, %s, true)' % (_set_sql, _sql)
 
@@ -1650,19 +1766,28 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
 
         # 建索引脚本
         if kwargs.get('indexs', None) is not None:
+            _fixed_cols = list(kwargs.get('fixed_col_define', None) or {})
             for _index_name, _index_def in kwargs['indexs'].items():
                 _support_unique = True
                 _cols = []
                 for _col_name, _para in _index_def['keys'].items():
-                    if _col_name not in _partition_cols:
-                        # 索引中存在非分区条件的字段, 则不支持唯一索引
+                    if _partition_sql is not None and _col_name not in _partition_cols:
+                        # 分区表的索引中存在非分区条件的字段, 则不支持唯一索引
                         _support_unique = False
 
+                    if _col_name != '_id' and _col_name not in _fixed_cols:
+                        # json检索路径索引, 表达式需与查询条件生成的表达式一致
+                        _col_sql = '(%s)' % self._get_json_index_sql(
+                            _col_name, _para.get('type', 'str'), fixed_cols=_fixed_cols
+                        )
+                    else:
+                        _col_sql = '"%s"' % _col_name
+
                     if _para.get('asc', 1) == -1:
                         # 降序索引
-                        _cols.append('"%s" desc' % _col_name)
+                        _cols.append('%s desc' % _col_sql)
                     else:
-                        _cols.append('"%s"' % _col_name)
+                        _cols.append(_col_sql)
                 _sql = 'create %sindex%s if not exists "%s" on "%s"."%s" %s(%s)%s' % (
                     'UNIQUE ' if _index_def.get('paras', {}).get('unique', False) and _support_unique else '',
                     ' CONCURRENTLY' if _index_concurrently else '',
@@ -1831,6 +1956,43 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
         # 返回语句
         return ([_sql], [_update_sql_paras], {})
 
+    def _sql_fun_upsert(self, op: str, *args, **kwargs) -> tuple:
+        """
+        生成原生upsert的sql语句数组
+        注: 1、使用insert ... on conflict do update, 通过returning的xmax判断是插入还是更新;
+            2、do update和where中引用的字段需带表名, 否则与excluded的字段存在歧义;
+            3、冲突记录不满足唯一索引以外的查询条件时, 不更新也不插入, 返回空结果
+        """
+        _collection = args[0]
+        _filter = args[1]
+        _update = args[2]
+        _row = copy.copy(args[3])  # 浅复制即可
+        _fixed_col_define = kwargs.get('fixed_col_define', None)
+
+        _insert_sqls, _insert_paras, _ = self._sql_fun_insert_one(
+            'insert_one', _collection, _row, fixed_col_define=_fixed_col_define
+        )
+        _sql_paras = _insert_paras[0]
+
+        # 冲突时的更新语句, 更新表达式中的字段对应已存在的记录
+        _update_sql = self._get_update_sql(
+            _update, fixed_col_define=_fixed_col_define, sql_paras=_sql_paras, as_name=_collection
+        )
+        _sql = '%s on conflict(%s) do update set %s' % (
+            _insert_sqls[0], ','.join(['"%s"' % _col for _col in kwargs['conflict_cols']]), _update_sql
+        )
+
+        # 冲突记录需满足的其他条件, 条件只有唯一索引字段的情况无需处理
+        if set(_filter.keys()) != set(kwargs['conflict_cols']):
+            _where_sql = self._get_filter_sql(
+                _filter, fixed_col_define=_fixed_col_define, sql_paras=_sql_paras, as_name=_collection
+            )
+            _sql = '%s where %s' % (_sql, _where_sql)
+
+        _sql = '%s returning (xmax = 0) as upsert_inserted' % _sql
+
+        return ([_sql], [_sql_paras], {'is_query': True})
+
     def _sql_fun_delete(self, op: str, *args, **kwargs) -> tuple:
         """
         生成删除数据的sql语句数组
@@ -2079,6 +2241,30 @@ class PgSQLNosqlDriver(NosqlAIOPoolDriver):
     #############################
     # 其他内部函数
     #############################
+    def _get_json_index_sql(self, col_name: str, col_type: str, fixed_cols: list = []) -> str:
+        """
+        获取json检索路径索引的表达式(与查询条件中指定类型的json字段表达式一致)
+
+        @param {str} col_name - 检索路径(x.x.x形式)
+        @param {str} col_type - 检索值类型(str/int/float/bool)
+        @param {list} fixed_cols=[] - 固定字段定义清单
+
+        @returns {str} - 索引表达式
+        """
+        _path_cols = col_name.split('.')
+        if len(_path_cols) > 1 and _path_cols[0] in fixed_cols:
+            # json固定字段
+            _path = self._convert_jsonset_array(_path_cols[1:])
+            _col_name = _path_cols[0]
+        else:
+            _path = self._convert_jsonset_array(_path_cols)
+            _col_name = 'nosql_driver_extend_tags'
+
+        if col_type == 'str':
+            return "\"%s\"#>>'{%s}'" % (_col_name, _path)
+        else:
+            return "cast(\"%s\"#>'{%s}' as %s)" % (_col_name, _path, self._dbtype_cast_mapping[col_type])
+
     def _convert_jsonset_array(self, path_list: list) -> str:
         """
         将json查询路径数组转换为pgsql支持的json_set查询路径字符串
@@ -15,6 +15,7 @@ import os
 import sys
 import copy
 import re
+import functools
 from typing import Any, Union
 import sqlite3
 import json
@@ -33,6 +34,7 @@ except ImportError:
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetNoSql.base.driver_fw import NosqlAIOPoolDriver
+from HiveNetNoSql.base.query_cache import invalidate_query_cache_db
 
 
 class SQLitePoolConnection(PoolConnectionFW):
@@ -136,7 +138,13 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
             ignore_index_error {bool} - 是否忽略索引创建的异常, 默认为True
             debug {bool} - 指定是否debug模式, 默认为False
             close_action {str} - 关闭连接时自动处理动作, None-不处理, 'commit'-自动提交, 'rollback'-自动回滚
+            regexp_cache_size {int} - $regex查询的正则表达式编译对象缓存数量, 默认为128
         """
+        # 正则表达式编译对象的缓存(LRU), 避免REGEXP函数对每行记录重复编译
+        self._regexp_compile = functools.lru_cache(
+            maxsize=driver_config.get('regexp_cache_size', 128)
+        )(re.compile)
+
         # 记录数据库所在路径, 创建无文件参数的数据库时默认使用该路径
         _host = connect_config.get('host', ':memory:')
         if _host == ':memory:':
@@ -154,6 +162,9 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
         # 指定使用独立的insert_many语句, 性能更高
         self._use_insert_many_generate_sqls = True
 
+        # 指定使用原生的upsert语句
+        self._support_native_upsert = True
+
     #############################
     # 需要继承类实现的内部函数
     #############################
@@ -235,6 +246,7 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
             'insert_one': self._sql_fun_insert_one,
             'insert_many': self._sql_fun_insert_many,
             'update': self._sql_fun_update,
+            'upsert': self._sql_fun_upsert,
             'delete': self._sql_fun_delete,
             'query': self._sql_fun_query,
             'query_count': self._sql_fun_query_count,
@@ -325,8 +337,8 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
 
         @param {Any} conn - 传入连接对象
         """
-        # 注入正则表达式的支持函数
-        AsyncTools.sync_run_coroutine(conn.create_function("REGEXP", 2, self._regexp))
+        # 注入正则表达式的支持函数(相同输入返回相同结果, 注册为确定性函数以便SQLite优化)
+        AsyncTools.sync_run_coroutine(conn.create_function("REGEXP", 2, self._regexp, deterministic=True))
 
     async def _get_cols_info(self, collection: str, db_name: str = None, session: Any = None) -> list:
         """
@@ -364,6 +376,82 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
 
         return _ret
 
+    async def _get_unique_keys_info(self, collection: str, db_name: str = None, session: Any = None) -> list:
+        """
+        获取制定集合(表)的唯一索引字段信息
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {list} - 唯一索引字段清单(包括主键), 格式为[[字段名, ...], ...]
+        """
+        if session is not None:
+            _conn = session[0]
+            _cursor = session[1]
+        else:
+            _conn = None
+            _cursor = None
+
+        _db_name = self._db_name if db_name is None else db_name
+        _db_prefix = '' if _db_name == 'main' else ('%s.' % _db_name)
+        _indexs = await self._execute_sql(
+            "PRAGMA %sindex_list('%s')" % (_db_prefix, collection), paras=None, is_query=True,
+            conn=_conn, cursor=_cursor
+        )
+
+        _unique_keys = []
+        for _index in _indexs:
+            if _index.get('unique', 0) != 1 or _index.get('partial', 0) == 1:
+                continue
+
+            _index_cols = await self._execute_sql(
+                "PRAGMA %sindex_info('%s')" % (_db_prefix, str(_index['name'])), paras=None,
+                is_query=True, conn=_conn, cursor=_cursor
+            )
+            _keys = [str(_col.get('name', '')) for _col in _index_cols]
+            if '' not in _keys:
+                # 忽略包含表达式的索引
+                _unique_keys.append(_keys)
+
+        return _unique_keys
+
+    async def _get_json_index_cols_info(self, collection: str, db_name: str = None, session: Any = None) -> dict:
+        """
+        获取制定集合(表)的json检索路径索引的字段信息
+
+        @param {str} collection - 集合名(表)
+        @param {str} db_name=None - 数据库名(不指定代表默认当前数据库)
+        @param {Any} session=None - 指定事务连接对象
+
+        @returns {dict} - json检索路径索引的字段信息, key为检索路径(例如'e_str', 'c_json.key1'), value为检索值类型
+        """
+        if session is not None:
+            _conn = session[0]
+            _cursor = session[1]
+        else:
+            _conn = None
+            _cursor = None
+
+        _db_name = self._db_name if db_name is None else db_name
+        _db_prefix = '' if _db_name == 'main' else ('%s.' % _db_name)
+        _indexs = await self._execute_sql(
+            "select sql from %ssqlite_master where type='index' and tbl_name=? and sql is not null" % _db_prefix,
+            paras=(collection, ), is_query=True, conn=_conn, cursor=_cursor
+        )
+
+        _json_index_cols = {}
+        for _index in _indexs:
+            for _col_name, _path in re.findall(r'json_extract\((\w+), "\$\.([^"]+)"\)', _index['sql']):
+                # 检索路径 'key1.key2[10]' 转换为 'key1.key2.10' 的形式
+                _path = _path.replace('[', '.').replace(']', '').lstrip('.')
+                if _col_name != 'nosql_driver_extend_tags':
+                    _path = '%s.%s' % (_col_name, _path)
+
+                _json_index_cols[_path] = 'str'
+
+        return _json_index_cols
+
     #############################
     # 需要单独重载的函数
     #############################
@@ -398,6 +486,7 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
         # 切换数据库
         await self.switch_db(name)
 
+    @invalidate_query_cache_db
     async def drop_db(self, name: str, *args, **kwargs):
         """
         删除数据库
@@ -433,8 +522,65 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
 
         @returns {Any} - 返回匹配结果
         """
-        reg = re.compile(expr)
-        return reg.search(item) is not None
+        if item is None:
+            return None
+
+        return self._regexp_compile(expr).search(item) is not None
+
+    def _get_regex_glob_paras(self, expr: Any) -> list:
+        """
+        将只包含字面文本(可带^和$锚定)的正则表达式转换为等价的GLOB匹配表达式
+        注: GLOB区分大小写, 与正则表达式的匹配规则一致; 前缀匹配可以使用字段索引
+
+        @param {Any} expr - 正则表达式文本
+
+        @returns {list} - 转换后的GLOB表达式清单(任意一个匹配即代表匹配), 无法转换返回None
+        """
+        if not isinstance(expr, str):
+            return None
+
+        _expr = expr
+        _start_anchor = _expr.startswith('^')
+        if _start_anchor:
+            _expr = _expr[1:]
+        elif _expr.startswith('.*'):
+            _expr = _expr[2:]
+
+        _end_anchor = False
+        if _expr.endswith('$') and not _expr.endswith('\\$'):
+            _end_anchor = True
+            _expr = _expr[:-1]
+        elif _expr.endswith('.*') and not _expr.endswith('\\.*'):
+            _expr = _expr[:-2]
+
+        # 解析字面文本
+        _text = ''
+        _index = 0
+        while _index < len(_expr):
+            _char = _expr[_index]
+            if _char == '\\':
+                # 只支持标点符号的转义
+                if _index + 1 >= len(_expr) or _expr[_index + 1].isalnum() or _expr[_index + 1] == '_':
+                    return None
+
+                _char = _expr[_index + 1]
+                _index += 1
+            elif _char in '.^$*+?{}[]|()':
+                return None
+
+            # GLOB的特殊字符处理
+            _text += '[%s]' % _char if _char in '*?[' else _char
+            _index += 1
+
+        if _text == '':
+            return None
+
+        _glob = '%s%s%s' % ('' if _start_anchor else '*', _text, '' if _end_anchor else '*')
+        if _end_anchor:
+            # 正则表达式的$可以匹配结尾的换行符之前
+            return [_glob, '%s\n' % _glob]
+
+        return [_glob]
 
     #############################
     # 支持SQL处理的通用函数
@@ -554,12 +700,14 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
         # 根据字段判断是主表还是关联表
         _key = key
         _fixed_cols = None
+        _json_index_cols = {}
         if _key[0] != '#':
             # 主表的过滤条件
             _as_name = '_main_table' if as_name is None else as_name
             _col_as_name = '' if unuse_as_name else '%s.' % _as_name
             if fixed_col_define is not None:
                 _fixed_cols = copy.deepcopy(fixed_col_define.get('cols', []))
+                _json_index_cols = fixed_col_define.get('json_index_cols', {})
         else:
             # 关联表的过滤条件
             _index = _key.find('.')
@@ -576,6 +724,7 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
             ))
             if _fixed_col_define is not None:
                 _fixed_cols = copy.deepcopy(_fixed_col_define.get('cols', []))
+                _json_index_cols = _fixed_col_define.get('json_index_cols', {})
 
         # 判断是否处理json的值, 形成最后比较的 key 值
         _is_json = False
@@ -584,7 +733,12 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
             if _key not in _fixed_cols:
                 # 非固定字段或json字段的处理
                 _is_json = True
-                if _as_name in ('_main_table', '_inner_temp_as_name'):
+                if _key in _json_index_cols.keys():
+                    # 有json检索路径索引, 使用与索引完全一致的表达式, 以便查询可以使用索引
+                    _key = self._get_json_extract_sql(
+                        _key, fixed_cols=_fixed_cols, as_name=_as_name, unuse_as_name=(_col_as_name == '')
+                    )
+                elif _as_name in ('_main_table', '_inner_temp_as_name'):
                     _key = self._add_to_json_query_cols(
                         _key, json_query_cols_dict=json_query_cols_dict, fixed_cols=_fixed_cols,
                         as_name=_as_name, unuse_as_name=(_col_as_name == '')
@@ -617,8 +771,15 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
                         _dbtype, _cmp_val = self._python_to_dbtype(_item)
                         sql_paras.append(_cmp_val)
                 elif _op == '$regex':
-                    _cds.append("%s REGEXP ?" % (_key if _is_json else '%s%s' % (_col_as_name, _key)))
-                    sql_paras.append(_para)
+                    _col_sql = _key if _is_json else '%s%s' % (_col_as_name, _key)
+                    _globs = self._get_regex_glob_paras(_para)
+                    if _globs is None:
+                        _cds.append("%s REGEXP ?" % _col_sql)
+                        sql_paras.append(_para)
+                    else:
+                        # 字面文本的匹配转换为GLOB处理, 无需调用python函数
+                        _cds.append('(%s)' % ' or '.join(['%s GLOB ?' % _col_sql for _glob in _globs]))
+                        sql_paras.extend(_globs)
                 else:
                     raise aiosqlite.NotSupportedError('sqlite3 not support this search operation [%s]' % _op)
             _sql = ' and '.join(_cds)
@@ -1316,10 +1477,17 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
 
         # 建索引脚本, 创建索引时, 索引名带数据库前缀, 表名无需带前缀
         if kwargs.get('indexs', None) is not None:
+            _fixed_cols = list(kwargs.get('fixed_col_define', None) or {})
             for _index_name, _index_def in kwargs['indexs'].items():
                 _cols = []
                 for _col_name, _para in _index_def['keys'].items():
-                    _cols.append(_col_name)
+                    if _col_name != '_id' and _col_name not in _fixed_cols:
+                        # json检索路径索引, 表达式需与查询条件生成的表达式完全一致
+                        _cols.append(self._get_json_extract_sql(
+                            _col_name, fixed_cols=_fixed_cols, unuse_as_name=True
+                        ))
+                    else:
+                        _cols.append(_col_name)
                 _sql = 'create %sindex if not exists %s%s on %s(%s)' % (
                     'UNIQUE ' if _index_def.get('paras', {}).get('unique', False) else '',
                     _db_prefix, _index_name, _collection, ','.join(_cols)
@@ -1507,6 +1675,36 @@ class SQLiteNosqlDriver(NosqlAIOPoolDriver):
         # 返回语句
         return ([_sql], [_update_sql_paras], {})
 
+    def _sql_fun_upsert(self, op: str, *args, **kwargs) -> tuple:
+        """
+        生成原生upsert的sql语句数组
+        注: sqlite的returning无法区分插入和更新的记录, 因此在同一事务中先执行更新语句, 没有更新记录时再执行
+            insert ... on conflict do nothing; 更新语句开始执行时事务已持有写锁, 两个语句之间不会有其他写入
+        """
+        _collection = args[0]
+        _filter = args[1]
+        _update = args[2]
+        _row = copy.copy(args[3])  # 浅复制即可
+        _fixed_col_define = kwargs.get('fixed_col_define', None)
+
+        # 更新语句
+        _update_sqls, _update_paras, _ = self._sql_fun_update(
+            'update', _collection, _filter, _update, fixed_col_define=_fixed_col_define
+        )
+
+        # 插入语句, 仅在没有更新记录时执行, 存在冲突记录时不处理
+        _insert_sqls, _insert_paras, _ = self._sql_fun_insert_one(
+            'insert_one', _collection, _row, fixed_col_define=_fixed_col_define
+        )
+        _insert_sql = '%s on conflict(%s) do nothing' % (
+            _insert_sqls[0], ','.join(kwargs['conflict_cols'])
+        )
+
+        return (
+            [_update_sqls[0], _insert_sql], [_update_paras[0], _insert_paras[0]], {},
+            [None, {'pre_check': {'cmp_prev_return': [0, self.cmp_func_equal_rowcount]}}]
+        )
+
     def _sql_fun_delete(self, op: str, *args, **kwargs) -> tuple:
         """
         生成删除数据的sql语句数组
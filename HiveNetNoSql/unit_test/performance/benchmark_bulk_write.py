@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+NosqlAIOPoolDriver批量写入性能测试
+@module benchmark_bulk_write
+@file benchmark_bulk_write.py
+
+执行步骤:
+python benchmark_bulk_write.py [op_num] [batch_size]
+
+注: 使用SQLite文件数据库, 执行op_num个混合写入操作(每10个操作中8个insert_one、1个update、1个delete),
+    统计每秒处理的操作数量;
+    single为逐个调用insert_one/update/delete的处理方式, bulk为每batch_size个操作调用一次bulk_write的处理方式
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.utils.run_tool import AsyncTools
+from HiveNetNoSql.sqlite import SQLiteNosqlDriver
+
+
+def get_ops(op_num: int) -> list:
+    """
+    生成混合写入操作清单
+    """
+    _ops = []
+    for _i in range(op_num):
+        _mod = _i % 10
+        if _mod == 8:
+            _ops.append({
+                'op': 'update', 'filter': {'c_key': 'key%d' % (_i - 1)},
+                'update': {'$inc': {'c_count': 1}, '$set': {'e_str': 'updated'}}
+            })
+        elif _mod == 9:
+            _ops.append({'op': 'delete', 'filter': {'c_key': 'key%d' % (_i - 9)}})
+        else:
+            _ops.append({'op': 'insert_one', 'row': {
+                'c_key': 'key%d' % _i, 'c_count': _i, 'e_str': 'value%d' % _i
+            }})
+
+    return _ops
+
+
+async def run_case(name: str, path: str, ops: list, batch_size: int):
+    """
+    执行测试场景
+    """
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': os.path.join(path, '%s.db' % name), 'check_same_thread': False},
+        driver_config={'init_collections': {'main': {'tb_bulk': {
+            'index_only': False,
+            'indexs': {'idx_tb_bulk_c_key': {'keys': {'c_key': {'asc': 1}}}},
+            'fixed_col_define': {'c_key': {'type': 'str', 'len': 20}, 'c_count': {'type': 'int'}}
+        }}}}
+    )
+
+    _start = time.perf_counter()
+    if batch_size <= 1:
+        for _op in ops:
+            _paras = dict(_op)
+            _op_name = _paras.pop('op')
+            if _op_name == 'insert_one':
+                await _driver.insert_one('tb_bulk', _paras['row'])
+            else:
+                await getattr(_driver, _op_name)('tb_bulk', **_paras)
+    else:
+        for _i in range(0, len(ops), batch_size):
+            await _driver.bulk_write('tb_bulk', ops[_i: _i + batch_size])
+    _use = time.perf_counter() - _start
+
+    _count = await _driver.query_count('tb_bulk')
+    print('%-8s ops: %7d  use: %7.3fs  ops/s: %10.1f  rows: %7d' % (
+        name, len(ops), _use, len(ops) / _use, _count
+    ))
+    await _driver.destroy()
+
+
+if __name__ == '__main__':
+    _op_num = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    _batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    AsyncTools.nest_asyncio_apply()
+    _ops = get_ops(_op_num)
+    _path = tempfile.mkdtemp()
+    try:
+        for _name, _size in (('single', 1), ('bulk', _batch_size)):
+            AsyncTools.sync_run_coroutine(run_case(_name, _path, _ops, _size))
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+NosqlAIOPoolDriver扩展字段json检索路径索引查询性能测试
+@module benchmark_json_index
+@file benchmark_json_index.py
+
+执行步骤:
+python benchmark_json_index.py [row_num] [query_num]
+
+注: 使用SQLite文件数据库, 插入row_num条记录(扩展字段e_str、e_int未定义为固定字段),
+    按扩展字段e_str的等值条件和e_int的范围条件分别执行query_num次查询, 统计每秒查询数量;
+    no index为未建立索引(json_tree全表扫描)的处理方式, json index为在indexs中指定json检索路径建立表达式索引的处理方式
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.utils.run_tool import AsyncTools
+from HiveNetNoSql.sqlite import SQLiteNosqlDriver
+
+
+async def run_case(name: str, use_index: bool, path: str, row_num: int, query_num: int):
+    """
+    执行测试场景
+    """
+    _indexs = None
+    if use_index:
+        _indexs = {
+            'idx_tb_json_e_str': {'keys': {'e_str': {'asc': 1}}},
+            'idx_tb_json_e_int': {'keys': {'e_int': {'asc': 1, 'type': 'int'}}}
+        }
+
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': os.path.join(path, '%s.db' % name.replace(' ', '_')), 'check_same_thread': False},
+        driver_config={'init_collections': {'main': {'tb_json': {
+            'index_only': False, 'indexs': _indexs,
+            'fixed_col_define': {'c_key': {'type': 'str', 'len': 20}}
+        }}}}
+    )
+
+    for _start in range(0, row_num, 500):
+        await _driver.insert_many('tb_json', [
+            {'c_key': 'key%d' % _i, 'e_str': 'value%d' % _i, 'e_int': _i}
+            for _i in range(_start, min(_start + 500, row_num))
+        ])
+
+    _start = time.perf_counter()
+    for _i in range(query_num):
+        _index = (_i * 7919) % row_num
+        _ret = await _driver.query_list('tb_json', filter={'e_str': 'value%d' % _index})
+        assert len(_ret) == 1 and _ret[0]['c_key'] == 'key%d' % _index
+    _eq_use = time.perf_counter() - _start
+
+    _start = time.perf_counter()
+    for _i in range(query_num):
+        _index = (_i * 7919) % max(row_num - 10, 1)
+        _ret = await _driver.query_list('tb_json', filter={'e_int': {'$gte': _index, '$lt': _index + 10}})
+        assert len(_ret) == min(10, row_num)
+    _range_use = time.perf_counter() - _start
+
+    print('%-10s rows: %8d  queries: %6d  eq qps: %10.1f  range qps: %10.1f' % (
+        name, row_num, query_num, query_num / _eq_use, query_num / _range_use
+    ))
+    await _driver.destroy()
+
+
+if __name__ == '__main__':
+    _row_num = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    _query_num = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    AsyncTools.nest_asyncio_apply()
+    _path = tempfile.mkdtemp()
+    try:
+        for _name, _use_index in (('no index', False), ('json index', True)):
+            AsyncTools.sync_run_coroutine(run_case(_name, _use_index, _path, _row_num, _query_num))
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+MongoNosqlDriver关联查询(left_join)聚合管道性能测试
+@module benchmark_mongo_left_join
+@file benchmark_mongo_left_join.py
+
+执行步骤:
+python benchmark_mongo_left_join.py [row_num] [page_size] [query_num]
+
+注: 无需MongoDB服务, 使用内存中的简化聚合管道执行器(仅支持驱动生成的关联查询管道阶段)模拟执行,
+    主表row_num条记录, 两个关联表各row_num条记录(每条记录带1KB的扩展字段), 按主表字段排序分页查询page_size条记录,
+    执行query_num次(翻页), 统计每次查询的平均耗时和关联查找的次数;
+    legacy为所有关联均在排序和分页前处理、关联表返回全部字段的管道, push down为排序和分页提前到关联前、
+    关联表只返回需要字段的管道
+"""
+
+import os
+import sys
+import time
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetNoSql.mongo import MongoNosqlDriver
+
+
+class MemoryAggregate(object):
+    """
+    内存中的简化聚合管道执行器
+    """
+
+    def __init__(self, collections: dict):
+        """
+        构造函数
+
+        @param {dict} collections - 集合数据字典, key为集合名, value为记录列表
+        """
+        self.collections = collections
+        self.lookup_count = 0
+        # 关联表按关联字段建立的索引, 模拟数据库使用索引查找
+        self._indexs = {}
+
+    def aggregate(self, collection: str, pipeline: list) -> list:
+        """
+        执行聚合管道
+        """
+        return self._run(list(self.collections[collection]), pipeline, {})
+
+    def _get_value(self, row: dict, path: str):
+        _val = row
+        for _key in path.split('.'):
+            if not isinstance(_val, dict):
+                return None
+            _val = _val.get(_key, None)
+
+        return _val
+
+    def _run(self, rows: list, pipeline: list, variables: dict) -> list:
+        for _stage in pipeline:
+            _op, _para = list(_stage.items())[0]
+            if _op == '$match':
+                if '$expr' in _para:
+                    rows = [_row for _row in rows if all(
+                        self._get_value(_row, _eq[0][1:]) == variables[_eq[1][2:]]
+                        for _eq in [_item['$eq'] for _item in _para['$expr']['$and']]
+                    )]
+                else:
+                    rows = [_row for _row in rows if all(
+                        self._get_value(_row, _key) == _val for _key, _val in _para.items()
+                    )]
+            elif _op == '$sort':
+                for _key, _asc in reversed(list(_para.items())):
+                    rows.sort(key=lambda _row: self._get_value(_row, _key), reverse=(_asc == -1))
+            elif _op == '$skip':
+                rows = rows[_para:]
+            elif _op == '$limit':
+                rows = rows[0: _para]
+            elif _op == '$lookup':
+                rows = [self._lookup(_row, _para) for _row in rows]
+            elif _op == '$unwind':
+                _path = _para['path'][1:]
+                _new_rows = []
+                for _row in rows:
+                    if len(_row[_path]) == 0:
+                        _new_row = dict(_row)
+                        _new_row.pop(_path)
+                        _new_rows.append(_new_row)
+                    for _item in _row[_path]:
+                        _new_row = dict(_row)
+                        _new_row[_path] = _item
+                        _new_rows.append(_new_row)
+                rows = _new_rows
+            elif _op == '$project':
+                rows = [self._project(_row, _para) for _row in rows]
+
+        return rows
+
+    def _lookup(self, row: dict, para: dict) -> dict:
+        self.lookup_count += 1
+        _variables = {_key: self._get_value(row, _val[1:]) for _key, _val in para['let'].items()}
+
+        # 通过索引获取关联字段匹配的记录
+        _eq = para['pipeline'][0]['$match']['$expr']['$and'][0]['$eq']
+        _index_key = (para['from'], _eq[0][1:])
+        if _index_key not in self._indexs:
+            _index = {}
+            for _join_row in self.collections[para['from']]:
+                _index.setdefault(self._get_value(_join_row, _eq[0][1:]), []).append(_join_row)
+            self._indexs[_index_key] = _index
+
+        _rows = list(self._indexs[_index_key].get(_variables[_eq[1][2:]], []))
+        _new_row = dict(row)
+        _new_row[para['as']] = self._run(_rows, para['pipeline'], _variables)
+        return _new_row
+
+    def _project(self, row: dict, para: dict) -> dict:
+        _new_row = {}
+        if para.get('_id', 1):
+            _new_row['_id'] = row.get('_id', None)
+
+        for _key, _show in para.items():
+            if _key == '_id' or not _show:
+                continue
+
+            _val = self._get_value(row, _show[1:] if type(_show) == str else _key)
+            if _val is None:
+                continue
+
+            # 按路径放入新记录
+            _paths = _key.split('.')
+            _upper = _new_row
+            for _path in _paths[0: -1]:
+                _upper = _upper.setdefault(_path, {})
+            _upper[_paths[-1]] = _val
+
+        return _new_row
+
+
+def run_case(name: str, legacy: bool, db: MemoryAggregate, page_size: int, query_num: int):
+    """
+    执行测试场景
+    """
+    _driver = MongoNosqlDriver(connect_config={'host': '127.0.0.1', 'port': 27017, 'dbname': 'admin'})
+    if legacy:
+        # 模拟原处理方式
+        _driver._is_join_fields = lambda fields, as_names: True
+        _driver._get_join_sub_project = lambda as_name, project, sort, join_filter: None
+
+    _left_join = [
+        {'collection': 't_join1', 'join_fields': [('c_id', 'c_main_id')]},
+        {'collection': 't_join2', 'join_fields': [('c_id', 'c_main_id')]}
+    ]
+    _projection = ['c_id', 'c_time', '#0.c_name', '#1.c_name']
+
+    db.lookup_count = 0
+    _start = time.perf_counter()
+    for _i in range(query_num):
+        _pipeline = _driver._get_left_join_aggregate(
+            filter={'c_type': 1}, projection=_projection, sort=[('c_time', -1)],
+            skip=_i * page_size, limit=page_size, left_join=_left_join
+        )
+        _ret = _driver._std_left_join_result(db.aggregate('t_main', _pipeline), left_join=_left_join)
+        assert len(_ret) == page_size and 'c_name' in _ret[0] and 'c_name_1' in _ret[0]
+    _use = time.perf_counter() - _start
+
+    print('%-10s queries: %4d  avg use: %9.2fms  lookups per query: %8d' % (
+        name, query_num, _use / query_num * 1000, db.lookup_count // query_num
+    ))
+
+
+if __name__ == '__main__':
+    _row_num = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    _page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    _query_num = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    _db = MemoryAggregate({
+        't_main': [
+            {'_id': _i, 'c_id': 'id%d' % _i, 'c_type': _i % 2, 'c_time': _i} for _i in range(_row_num)
+        ],
+        't_join1': [
+            {'_id': _i, 'c_main_id': 'id%d' % _i, 'c_name': 'join1_%d' % _i, 'e_data': 'x' * 1024}
+            for _i in range(_row_num)
+        ],
+        't_join2': [
+            {'_id': _i, 'c_main_id': 'id%d' % _i, 'c_name': 'join2_%d' % _i, 'e_data': 'x' * 1024}
+            for _i in range(_row_num)
+        ]
+    })
+    print('rows: %d, page size: %d' % (_row_num, _page_size))
+    for _name, _legacy in (('legacy', True), ('push down', False)):
+        run_case(_name, _legacy, _db, _page_size, _query_num)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+NosqlAIOPoolDriver查询结果缓存性能测试
+@module benchmark_query_cache
+@file benchmark_query_cache.py
+
+执行步骤:
+python benchmark_query_cache.py [query_num] [key_num] [write_every]
+
+注: 使用SQLite文件数据库, 参照表插入1000条记录, 循环使用key_num种不同的查询参数执行query_num次query_list查询,
+    每write_every次查询执行一次update写操作(会清除该表的缓存), 统计每秒查询数量和缓存命中率;
+    no cache为不启用缓存的处理方式, cache为启用缓存(命中时返回结果深拷贝)的处理方式,
+    cache no copy为启用缓存且命中时直接返回缓存结果的处理方式
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.utils.run_tool import AsyncTools
+from HiveNetNoSql.sqlite import SQLiteNosqlDriver
+
+
+async def run_case(name: str, query_cache: dict, db_file: str, query_num: int, key_num: int, write_every: int):
+    """
+    执行测试场景
+    """
+    _driver_config = {}
+    if query_cache is not None:
+        _driver_config['query_cache'] = query_cache
+
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': db_file, 'check_same_thread': False}, driver_config=_driver_config
+    )
+
+    _start = time.perf_counter()
+    for _i in range(query_num):
+        if write_every > 0 and _i % write_every == write_every - 1:
+            await _driver.update('tb_ref', {'c_key': 'key%d' % (_i % 1000)}, {'$set': {'c_value': _i}})
+
+        _ret = await _driver.query_list(
+            'tb_ref', filter={'c_group': _i % key_num}, sort=[('c_key', 1)]
+        )
+        assert len(_ret) > 0
+    _use = time.perf_counter() - _start
+
+    _stats = _driver.get_query_cache_stats()
+    print('%-14s queries: %7d  use: %7.3fs  qps: %10.1f  hit rate: %s' % (
+        name, query_num, _use, query_num / _use,
+        '-' if _stats is None else '%.3f' % _stats['hit_rate']
+    ))
+    await _driver.destroy()
+
+
+async def init_data(db_file: str, key_num: int):
+    """
+    初始化测试数据
+    """
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': db_file, 'check_same_thread': False},
+        driver_config={'init_collections': {'main': {'tb_ref': {
+            'index_only': False,
+            'indexs': {'idx_tb_ref_c_group': {'keys': {'c_group': {'asc': 1}}}},
+            'fixed_col_define': {
+                'c_key': {'type': 'str', 'len': 20}, 'c_group': {'type': 'int'}, 'c_value': {'type': 'int'}
+            }
+        }}}}
+    )
+    for _start in range(0, 1000, 500):
+        await _driver.insert_many('tb_ref', [
+            {'c_key': 'key%d' % _i, 'c_group': _i % key_num, 'c_value': _i, 'e_name': 'name%d' % _i}
+            for _i in range(_start, _start + 500)
+        ])
+    await _driver.destroy()
+
+
+if __name__ == '__main__':
+    _query_num = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    _key_num = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    _write_every = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    AsyncTools.nest_asyncio_apply()
+    _path = tempfile.mkdtemp()
+    _db_file = os.path.join(_path, 'query_cache.db')
+    try:
+        AsyncTools.sync_run_coroutine(init_data(_db_file, _key_num))
+        print('queries: %d, distinct queries: %d, write every: %d' % (_query_num, _key_num, _write_every))
+        for _name, _query_cache in (
+            ('no cache', None), ('cache', {}), ('cache no copy', {'copy_result': False})
+        ):
+            AsyncTools.sync_run_coroutine(run_case(
+                _name, _query_cache, _db_file, _query_num, _key_num, _write_every
+            ))
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
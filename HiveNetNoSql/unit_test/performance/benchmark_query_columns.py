@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+NosqlAIOPoolDriver按列返回查询结果(query_columns)性能测试
+@module benchmark_query_columns
+@file benchmark_query_columns.py
+
+执行步骤:
+python benchmark_query_columns.py [row_num] [fetch_each]
+
+注: 使用SQLite文件数据库, 插入row_num条记录(3个固定字段和1个扩展字段), 统计获取全部记录的耗时和内存峰值;
+    query_list为一次性获取字典列表的处理方式, columns list为query_columns返回python列表的处理方式,
+    columns numpy为query_columns返回numpy数组的处理方式(未安装numpy时跳过);
+    耗时和内存峰值分别执行一次查询统计(内存峰值通过tracemalloc统计)
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.utils.run_tool import AsyncTools
+from HiveNetNoSql.sqlite import SQLiteNosqlDriver
+
+
+async def query(name: str, driver: SQLiteNosqlDriver, fetch_each: int) -> int:
+    """
+    执行查询并返回记录数
+    """
+    if name == 'query_list':
+        return len(await driver.query_list('tb_columns'))
+    else:
+        _ret = await driver.query_columns('tb_columns', fetch_each=fetch_each, column_type=name.split(' ')[1])
+        return len(_ret['c_index'])
+
+
+async def run_case(name: str, db_file: str, fetch_each: int):
+    """
+    执行测试场景
+    """
+    _driver = SQLiteNosqlDriver(connect_config={'host': db_file, 'check_same_thread': False})
+
+    # 统计耗时
+    _start = time.perf_counter()
+    _count = await query(name, _driver, fetch_each)
+    _use = time.perf_counter() - _start
+
+    # 统计内存峰值
+    tracemalloc.start()
+    await query(name, _driver, fetch_each)
+    _peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print('%-14s rows: %8d  use: %7.3fs  rows/s: %10.1f  peak memory: %8.1fMB' % (
+        name, _count, _use, _count / _use, _peak / 1024 / 1024
+    ))
+    await _driver.destroy()
+
+
+async def init_data(db_file: str, row_num: int):
+    """
+    初始化测试数据
+    """
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': db_file, 'check_same_thread': False},
+        driver_config={'init_collections': {'main': {'tb_columns': {
+            'index_only': False,
+            'fixed_col_define': {
+                'c_index': {'type': 'int'}, 'c_str': {'type': 'str', 'len': 20}, 'c_float': {'type': 'float'}
+            }
+        }}}}
+    )
+    _session = await _driver.start_transaction()
+    for _start in range(0, row_num, 500):
+        await _driver.insert_many('tb_columns', [
+            {'c_index': _i, 'c_str': 'str%d' % _i, 'c_float': _i / 10, 'e_int': _i % 100}
+            for _i in range(_start, min(_start + 500, row_num))
+        ], session=_session)
+    await _driver.commit_transaction(_session)
+    await _driver.destroy()
+
+
+if __name__ == '__main__':
+    _row_num = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    _fetch_each = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    try:
+        import numpy
+        _cases = ('query_list', 'columns list', 'columns numpy')
+    except ImportError:
+        _cases = ('query_list', 'columns list')
+
+    AsyncTools.nest_asyncio_apply()
+    _path = tempfile.mkdtemp()
+    _db_file = os.path.join(_path, 'query_columns.db')
+    try:
+        AsyncTools.sync_run_coroutine(init_data(_db_file, _row_num))
+        print('rows: %d, fetch_each: %d' % (_row_num, _fetch_each))
+        for _name in _cases:
+            AsyncTools.sync_run_coroutine(run_case(_name, _db_file, _fetch_each))
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+NosqlAIOPoolDriver流式查询(query_iter)性能测试
+@module benchmark_query_iter
+@file benchmark_query_iter.py
+
+执行步骤:
+python benchmark_query_iter.py [row_num] [fetch_each]
+
+注: 使用SQLite文件数据库, 插入row_num条记录(每条记录带200字节的扩展字段), 统计遍历全部记录的每秒记录数和内存峰值;
+    list为query_list一次性获取的处理方式, fixed为query_iter每次固定从数据库获取fetch_each条记录的处理方式
+    (query_iter_fetch_max设置为fetch_each), adaptive为获取数量自适应增加到query_iter_fetch_max的处理方式
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.utils.run_tool import AsyncTools
+from HiveNetNoSql.sqlite import SQLiteNosqlDriver
+
+
+async def run_case(name: str, db_file: str, fetch_each: int, fetch_max: int):
+    """
+    执行测试场景
+    """
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': db_file, 'check_same_thread': False},
+        driver_config={'query_iter_fetch_max': fetch_max}
+    )
+
+    tracemalloc.start()
+    _start = time.perf_counter()
+    _count = 0
+    if name == 'list':
+        _count = len(await _driver.query_list('tb_iter'))
+    else:
+        async for _rows in _driver.query_iter('tb_iter', fetch_each=fetch_each):
+            _count += len(_rows)
+    _use = time.perf_counter() - _start
+    _peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print('%-8s rows: %8d  use: %7.3fs  rows/s: %10.1f  peak memory: %8.1fMB' % (
+        name, _count, _use, _count / _use, _peak / 1024 / 1024
+    ))
+    await _driver.destroy()
+
+
+async def init_data(db_file: str, row_num: int):
+    """
+    初始化测试数据
+    """
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': db_file, 'check_same_thread': False},
+        driver_config={'init_collections': {'main': {'tb_iter': {
+            'index_only': False,
+            'fixed_col_define': {'c_index': {'type': 'int'}}
+        }}}}
+    )
+    _session = await _driver.start_transaction()
+    for _start in range(0, row_num, 500):
+        await _driver.insert_many('tb_iter', [
+            {'c_index': _i, 'e_str': 'x' * 200} for _i in range(_start, min(_start + 500, row_num))
+        ], session=_session)
+    await _driver.commit_transaction(_session)
+    await _driver.destroy()
+
+
+if __name__ == '__main__':
+    _row_num = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    _fetch_each = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    AsyncTools.nest_asyncio_apply()
+    _path = tempfile.mkdtemp()
+    _db_file = os.path.join(_path, 'query_iter.db')
+    try:
+        AsyncTools.sync_run_coroutine(init_data(_db_file, _row_num))
+        print('rows: %d, fetch_each: %d' % (_row_num, _fetch_each))
+        for _name, _fetch_max in (('list', 1000), ('fixed', _fetch_each), ('adaptive', 1000)):
+            AsyncTools.sync_run_coroutine(run_case(_name, _db_file, _fetch_each, _fetch_max))
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
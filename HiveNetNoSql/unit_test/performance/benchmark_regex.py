@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+SQLiteNosqlDriver正则表达式($regex)查询性能测试
+@module benchmark_regex
+@file benchmark_regex.py
+
+执行步骤:
+python benchmark_regex.py [row_num] [query_num]
+
+注: 使用SQLite文件数据库, 插入row_num条记录(c_str为带索引的固定字段), 分别按前缀匹配、包含匹配和真正的正则表达式
+    执行query_num次$regex查询, 统计每次查询的平均耗时;
+    legacy为所有条件均通过python的REGEXP函数逐行匹配(每次调用re.compile)的处理方式,
+    glob为字面文本转换为GLOB处理、正则表达式使用缓存编译对象的处理方式
+"""
+
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.utils.run_tool import AsyncTools
+from HiveNetNoSql.sqlite import SQLiteNosqlDriver
+
+
+CASES = [
+    ('prefix', '^value12345'),
+    ('contains', 'lue9999'),
+    ('regex', r'^value\d*99$')
+]
+
+
+async def run_case(name: str, legacy: bool, db_file: str, query_num: int):
+    """
+    执行测试场景
+    """
+    _driver = SQLiteNosqlDriver(connect_config={'host': db_file, 'check_same_thread': False})
+    if legacy:
+        # 模拟原处理方式
+        _driver._regexp_compile = re.compile
+        _driver._get_regex_glob_paras = lambda expr: None
+
+    _results = []
+    for _case_name, _expr in CASES:
+        _start = time.perf_counter()
+        for _ in range(query_num):
+            _count = await _driver.query_count('tb_regex', filter={'c_str': {'$regex': _expr}})
+        _results.append('%s: %8.1fms (%d)' % (_case_name, (time.perf_counter() - _start) / query_num * 1000, _count))
+
+    print('%-8s %s' % (name, '  '.join(_results)))
+    await _driver.destroy()
+
+
+async def init_data(db_file: str, row_num: int):
+    """
+    初始化测试数据
+    """
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': db_file, 'check_same_thread': False},
+        driver_config={'init_collections': {'main': {'tb_regex': {
+            'index_only': False,
+            'indexs': {'idx_tb_regex_c_str': {'keys': {'c_str': {'asc': 1}}}},
+            'fixed_col_define': {'c_str': {'type': 'str', 'len': 30}}
+        }}}}
+    )
+    _session = await _driver.start_transaction()
+    for _start in range(0, row_num, 500):
+        await _driver.insert_many('tb_regex', [
+            {'c_str': 'value%d' % _i} for _i in range(_start, min(_start + 500, row_num))
+        ], session=_session)
+    await _driver.commit_transaction(_session)
+    await _driver.destroy()
+
+
+if __name__ == '__main__':
+    _row_num = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    _query_num = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    AsyncTools.nest_asyncio_apply()
+    _path = tempfile.mkdtemp()
+    _db_file = os.path.join(_path, 'regex.db')
+    try:
+        AsyncTools.sync_run_coroutine(init_data(_db_file, _row_num))
+        print('rows: %d, queries per case: %d' % (_row_num, _query_num))
+        for _name, _legacy in (('legacy', True), ('glob', False)):
+            AsyncTools.sync_run_coroutine(run_case(_name, _legacy, _db_file, _query_num))
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
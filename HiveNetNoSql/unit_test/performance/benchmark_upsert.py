@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+NosqlAIOPoolDriver并发upsert性能测试
+@module benchmark_upsert
+@file benchmark_upsert.py
+
+执行步骤:
+python benchmark_upsert.py [upsert_num] [key_num] [concurrency]
+
+注: 使用SQLite文件数据库, 以concurrency个协程并发对key_num个唯一键执行共upsert_num次upsert($inc固定字段和扩展字段),
+    统计每秒处理数量、异常数量, 以及计数合计是否与执行次数一致;
+    legacy为原查询+更新+插入的处理方式, native为原生upsert语句的处理方式
+"""
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetCore.utils.run_tool import AsyncTools
+from HiveNetNoSql.sqlite import SQLiteNosqlDriver
+
+
+async def run_case(name: str, native: bool, path: str, upsert_num: int, key_num: int, concurrency: int):
+    """
+    执行测试场景
+    """
+    _driver = SQLiteNosqlDriver(
+        connect_config={'host': os.path.join(path, '%s.db' % name), 'check_same_thread': False},
+        driver_config={'init_collections': {'main': {'tb_counter': {
+            'index_only': False,
+            'indexs': {'idx_tb_counter_c_key': {'keys': {'c_key': {'asc': 1}}, 'paras': {'unique': True}}},
+            'fixed_col_define': {'c_key': {'type': 'str', 'len': 20}, 'c_count': {'type': 'int'}}
+        }}}}
+    )
+    _driver._support_native_upsert = native
+
+    _semaphore = asyncio.Semaphore(concurrency)
+    _errors = []
+
+    async def _upsert(index: int):
+        async with _semaphore:
+            try:
+                await _driver.update(
+                    'tb_counter', {'c_key': 'key%d' % (index % key_num)},
+                    {'$inc': {'c_count': 1, 'e_count': 1}, '$max': {'e_last': index}}, multi=False, upsert=True
+                )
+            except Exception as _e:
+                _errors.append(_e)
+
+    _start = time.perf_counter()
+    await asyncio.gather(*[_upsert(_i) for _i in range(upsert_num)])
+    _use = time.perf_counter() - _start
+
+    _rows = await _driver.query_list('tb_counter')
+    _total = sum([_row.get('c_count', 0) for _row in _rows])
+    print('%-8s upserts: %6d  use: %7.3fs  ops/s: %9.1f  errors: %5d  rows: %5d  total count: %6d' % (
+        name, upsert_num, _use, upsert_num / _use, len(_errors), len(_rows), _total
+    ))
+    await _driver.destroy()
+
+
+if __name__ == '__main__':
+    _upsert_num = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    _key_num = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    _concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    AsyncTools.nest_asyncio_apply()
+    _path = tempfile.mkdtemp()
+    try:
+        for _name, _native in (('legacy', False), ('native', True)):
+            AsyncTools.sync_run_coroutine(
+                run_case(_name, _native, _path, _upsert_num, _key_num, _concurrency)
+            )
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
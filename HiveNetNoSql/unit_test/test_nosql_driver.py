@@ -7,13 +7,17 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 import os
 import sys
+import re
+import asyncio
 import unittest
+import tracemalloc
 from HiveNetCore.utils.run_tool import AsyncTools
 from HiveNetCore.utils.test_tool import TestTool
 from HiveNetCore.utils.file_tool import FileTool
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetNoSql.base.driver_fw import NosqlDriverFW
+from HiveNetNoSql.base.query_cache import QueryResultCache
 from HiveNetNoSql.sqlite import SQLiteNosqlDriver
 from HiveNetNoSql.mongo import MongoNosqlDriver
 from HiveNetNoSql.mysql import MySQLNosqlDriver
@@ -128,10 +132,13 @@ class DriverTestCaseFW(object):
             'test_update_3',
             'test_update_4',
             'test_delete_5',
+            'test_upsert_6',
+            'test_bulk_write_7',
             'test_query_list_1',
             'test_query_list_2',
             'test_query_aggregate_3',
             'test_query_aggregate_4',
+            'test_query_columns_5',
             'test_page_1',
             'test_data_type_1',
             'test_special_char2',
@@ -880,6 +887,168 @@ class DriverTestCaseFW(object):
     # 查询相关
     #############################
 
+    def test_upsert_6(self):
+        _tips = '集合数据操作6: 更新记录(upsert)'
+
+        # 获取测试库清单
+        _test_dbs = [_db_info[0] for _db_info in self.test_db_info]
+        AsyncTools.sync_run_coroutine(self.driver.switch_db(_test_dbs[0]))
+
+        # 创建带唯一索引的测试表
+        try:
+            AsyncTools.sync_run_coroutine(self.driver.drop_collection('tb_upsert'))
+        except:
+            pass
+
+        AsyncTools.sync_run_coroutine(
+            self.driver.create_collection(
+                'tb_upsert', indexs={
+                    'idx_tb_upsert_c_key': {
+                        'keys': {'c_key': {'asc': 1}}, 'paras': {'unique': True}
+                    }
+                },
+                fixed_col_define={
+                    'c_key': {'type': 'str', 'len': 20},
+                    'c_int': {'type': 'int'},
+                    'c_float': {'type': 'float'}
+                }
+            )
+        )
+
+        # 记录不存在, 插入
+        _update = {
+            '$set': {'c_float': 1.5, 'e_str': 'v1'},
+            '$inc': {'c_int': 2, 'e_inc': 3}, '$min': {'e_min': 5}, '$max': {'e_max': 5}
+        }
+        _ret = AsyncTools.sync_run_coroutine(self.driver.update(
+            'tb_upsert', filter={'c_key': 'k1'}, update=_update, upsert=True
+        ))
+        if _ret != 0:
+            return (False, _tips, 'upsert insert error: %s' % str(_ret))
+
+        # 记录存在, 更新固定字段和扩展字段
+        _update = {
+            '$set': {'e_str': 'v2'},
+            '$inc': {'c_int': 2, 'e_inc': 3}, '$min': {'e_min': 1}, '$max': {'e_max': 1}
+        }
+        _ret = AsyncTools.sync_run_coroutine(self.driver.update(
+            'tb_upsert', filter={'c_key': 'k1'}, update=_update, upsert=True
+        ))
+        if _ret != 1:
+            return (False, _tips, 'upsert update error: %s' % str(_ret))
+
+        _ret = AsyncTools.sync_run_coroutine(self.driver.query_list('tb_upsert', filter={'c_key': 'k1'}))
+        if len(_ret) != 1:
+            return (False, _tips, 'upsert query error: %s' % str(_ret))
+        _ret[0].pop('_id', None)
+        if not TestTool.cmp_dict(_ret[0], {
+            'c_key': 'k1', 'c_int': 4, 'c_float': 1.5, 'e_str': 'v2', 'e_inc': 6, 'e_min': 1, 'e_max': 5
+        }):
+            return (False, _tips, 'upsert query value error: %s' % str(_ret))
+
+        # 并发upsert同一条记录
+        async def _concurrent_upsert():
+            await asyncio.gather(*[
+                self.driver.update(
+                    'tb_upsert', filter={'c_key': 'k2'}, update={'$inc': {'c_int': 1, 'e_inc': 1}}, upsert=True
+                ) for _i in range(20)
+            ])
+
+        AsyncTools.sync_run_coroutine(_concurrent_upsert())
+        _ret = AsyncTools.sync_run_coroutine(self.driver.query_list('tb_upsert', filter={'c_key': 'k2'}))
+        if len(_ret) != 1 or _ret[0]['c_int'] != 20 or _ret[0]['e_inc'] != 20:
+            return (False, _tips, 'concurrent upsert error: %s' % str(_ret))
+
+        # 通过_id进行upsert
+        for _i in range(2):
+            _ret = AsyncTools.sync_run_coroutine(self.driver.update(
+                'tb_upsert', filter={'_id': 'upsert_id'}, update={'$set': {'c_key': 'k3'}, '$inc': {'e_inc': 1}},
+                upsert=True
+            ))
+            if _ret != _i:
+                return (False, _tips, 'upsert by _id error: %s' % str(_ret))
+
+        _ret = AsyncTools.sync_run_coroutine(self.driver.query_list('tb_upsert', filter={'_id': 'upsert_id'}))
+        if len(_ret) != 1 or _ret[0]['c_key'] != 'k3' or _ret[0]['e_inc'] != 2:
+            return (False, _tips, 'upsert by _id query error: %s' % str(_ret))
+
+        return (True, _tips, '')
+
+    def test_bulk_write_7(self):
+        _tips = '集合数据操作7: 批量写入(bulk_write)'
+
+        # 获取测试库清单
+        _test_dbs = [_db_info[0] for _db_info in self.test_db_info]
+        AsyncTools.sync_run_coroutine(self.driver.switch_db(_test_dbs[0]))
+
+        # 创建测试表
+        try:
+            AsyncTools.sync_run_coroutine(self.driver.drop_collection('tb_bulk'))
+        except:
+            pass
+
+        AsyncTools.sync_run_coroutine(
+            self.driver.create_collection(
+                'tb_bulk', fixed_col_define={
+                    'c_key': {'type': 'str', 'len': 20},
+                    'c_int': {'type': 'int'}
+                }
+            )
+        )
+
+        # 有序的混合操作
+        _ret = AsyncTools.sync_run_coroutine(self.driver.bulk_write('tb_bulk', [
+            {'op': 'insert_one', 'row': {'_id': 'b1', 'c_key': 'k1', 'c_int': 1}},
+            {'op': 'insert_one', 'row': {'_id': 'b2', 'c_key': 'k2', 'c_int': 2, 'e_str': 'e2'}},
+            {'op': 'insert_one', 'row': {'c_key': 'k3', 'c_int': 3}},
+            {'op': 'update', 'filter': {'c_int': {'$gte': 2}}, 'update': {'$inc': {'c_int': 10}}},
+            {'op': 'insert_one', 'row': {'_id': 'b4', 'c_key': 'k4', 'c_int': 4}},
+            {'op': 'update', 'filter': {'c_key': 'k5'}, 'update': {'$set': {'c_int': 5}}, 'upsert': True},
+            {'op': 'delete', 'filter': {'c_key': 'k1'}}
+        ]))
+        if len(_ret) != 7 or _ret[0:2] != ['b1', 'b2'] or not _ret[2] or _ret[3:] != [2, 'b4', 0, 1]:
+            return (False, _tips, 'ordered bulk_write result error: %s' % str(_ret))
+
+        _ret = AsyncTools.sync_run_coroutine(self.driver.query_list(
+            'tb_bulk', projection={'_id': False, 'c_key': True, 'c_int': True}, sort=[('c_key', 1)]
+        ))
+        if _ret != [
+            {'c_key': 'k2', 'c_int': 12}, {'c_key': 'k3', 'c_int': 13}, {'c_key': 'k4', 'c_int': 4},
+            {'c_key': 'k5', 'c_int': 5}
+        ]:
+            return (False, _tips, 'ordered bulk_write query error: %s' % str(_ret))
+
+        # 无序执行, 插入操作优先
+        _ret = AsyncTools.sync_run_coroutine(self.driver.bulk_write('tb_bulk', [
+            {'op': 'update', 'filter': {'c_key': {'$in': ['k6', 'k7']}}, 'update': {'$set': {'c_int': 0}}},
+            {'op': 'insert_one', 'row': {'_id': 'b6', 'c_key': 'k6', 'c_int': 6}},
+            {'op': 'insert_one', 'row': {'_id': 'b7', 'c_key': 'k7', 'c_int': 7}}
+        ], ordered=False))
+        if _ret != [2, 'b6', 'b7']:
+            return (False, _tips, 'unordered bulk_write result error: %s' % str(_ret))
+
+        # 执行出错时回滚全部操作
+        _error = None
+        try:
+            AsyncTools.sync_run_coroutine(self.driver.bulk_write('tb_bulk', [
+                {'op': 'delete', 'filter': {'c_key': 'k2'}},
+                {'op': 'insert_one', 'row': {'_id': 'b8', 'c_key': 'k8', 'c_int': 8}},
+                {'op': 'insert_one', 'row': {'_id': 'b6', 'c_key': 'k6', 'c_int': 6}}
+            ]))
+        except Exception as _e:
+            _error = _e
+
+        if _error is None:
+            return (False, _tips, 'bulk_write duplicate _id should raise error')
+
+        _ret = AsyncTools.sync_run_coroutine(self.driver.query_count(
+            'tb_bulk', filter={'c_key': {'$in': ['k2', 'k8']}}
+        ))
+        if _ret != 1:
+            return (False, _tips, 'bulk_write rollback error: %s' % str(_ret))
+
+        return (True, _tips, '')
+
     def test_query_list_1(self):
         _tips = '集合数据查询1: 列表查询(无固定字段)'
 
@@ -1494,6 +1663,76 @@ class DriverTestCaseFW(object):
 
         return (True, _tips, '')
 
+    def test_query_columns_5(self):
+        _tips = '集合数据查询5: 按列返回查询结果'
+
+        # 获取测试库清单
+        _test_dbs = [_db_info[0] for _db_info in self.test_db_info]
+        AsyncTools.sync_run_coroutine(self.driver.switch_db(_test_dbs[0]))
+
+        # 清空测试表
+        _table_name = 'tb_full_type'
+        AsyncTools.sync_run_coroutine(self.driver.turncate_collection(_table_name))
+
+        # 扩展字段在部分记录中不存在
+        _rows = []
+        for _i in range(25):
+            _row = {'c_index': 'i%02d' % _i, 'c_str': 'str%d' % (_i % 3), 'c_int': _i, 'n_int': _i * 10}
+            if _i % 4 == 0:
+                _row['n_str'] = 'nstr%d' % _i
+            _rows.append(_row)
+
+        _ret = AsyncTools.sync_run_coroutine(self.driver.insert_many(_table_name, _rows))
+        if _ret != 25:
+            return (False, _tips, 'insert test data error: %s' % str(_ret))
+
+        # 与query_list的结果比较
+        _list = AsyncTools.sync_run_coroutine(
+            self.driver.query_list(_table_name, filter={'c_int': {'$gte': 2}}, sort=[('c_index', 1)])
+        )
+        _columns = AsyncTools.sync_run_coroutine(
+            self.driver.query_columns(_table_name, filter={'c_int': {'$gte': 2}}, sort=[('c_index', 1)], fetch_each=4)
+        )
+        for _key in ('_id', 'c_index', 'c_str', 'c_int', 'n_int', 'n_str'):
+            if len(_columns.get(_key, [])) != len(_list):
+                return (False, _tips, 'query columns 1 length error: %s' % _key)
+            for _i in range(len(_list)):
+                if _columns[_key][_i] != _list[_i].get(_key, None):
+                    return (False, _tips, 'query columns 1 value error: %s[%d] %s' % (
+                        _key, _i, str(_columns[_key][_i])
+                    ))
+
+        # 字段选择和分页
+        _columns = AsyncTools.sync_run_coroutine(
+            self.driver.query_columns(
+                _table_name, projection={'_id': False, 'c_index': True, 'n_int': True},
+                sort=[('c_index', -1)], skip=2, limit=5
+            )
+        )
+        if not TestTool.cmp_dict(_columns, {
+            'c_index': ['i22', 'i21', 'i20', 'i19', 'i18'], 'n_int': [220, 210, 200, 190, 180]
+        }):
+            return (False, _tips, 'query columns 2 error: %s' % str(_columns))
+
+        # 无记录
+        _columns = AsyncTools.sync_run_coroutine(
+            self.driver.query_columns(_table_name, filter={'c_int': -1})
+        )
+        if _columns != {}:
+            return (False, _tips, 'query columns 3 error: %s' % str(_columns))
+
+        # numpy数组
+        _columns = AsyncTools.sync_run_coroutine(
+            self.driver.query_columns(
+                _table_name, projection={'_id': False, 'c_int': True}, sort=[('c_int', 1)],
+                column_type='numpy'
+            )
+        )
+        if type(_columns['c_int']).__name__ != 'ndarray' or _columns['c_int'].tolist() != list(range(25)):
+            return (False, _tips, 'query columns 4 error: %s' % str(_columns))
+
+        return (True, _tips, '')
+
     #############################
     # 数据类型及特殊字符相关
     #############################
@@ -2452,7 +2691,10 @@ class SQLiteDriverTestCase(DriverTestCaseFW):
         """
         当前驱动自有的测试清单
         """
-        return ['self_test_attach_dbs_1']
+        return [
+            'self_test_attach_dbs_1', 'self_test_json_index_2', 'self_test_regex_3',
+            'self_test_query_iter_4', 'self_test_query_cache_5'
+        ]
 
     #############################
     # 可能有个性的测试数据
@@ -2507,6 +2749,286 @@ class SQLiteDriverTestCase(DriverTestCaseFW):
             _dbs
         )
 
+    def self_test_json_index_2(self) -> tuple:
+        _tips = '测试json检索路径索引2'
+        try:
+            AsyncTools.sync_run_coroutine(self.driver.drop_collection('tb_json_index'))
+        except:
+            pass
+
+        AsyncTools.sync_run_coroutine(self.driver.create_collection(
+            'tb_json_index', indexs={
+                'idx_tb_json_index_e_str': {'keys': {'e_str': {'asc': 1}}},
+                'idx_tb_json_index_c_json': {'keys': {'c_json.k.0': {'asc': 1}}}
+            },
+            fixed_col_define={'c_key': {'type': 'str', 'len': 20}, 'c_json': {'type': 'json'}}
+        ))
+        AsyncTools.sync_run_coroutine(self.driver.insert_many('tb_json_index', [
+            {'c_key': 'k%d' % _i, 'c_json': {'k': [_i]}, 'e_str': 's%d' % _i, 'e_int': _i} for _i in range(10)
+        ]))
+
+        # 从数据库获取json检索路径索引信息
+        self.driver._fixed_col_define.get(self.driver._db_name, {}).pop('tb_json_index', None)
+        _fixed_col_define = AsyncTools.sync_run_coroutine(self.driver._get_fixed_col_define('tb_json_index'))
+        if not TestTool.cmp_dict(_fixed_col_define['json_index_cols'], {'e_str': 'str', 'c_json.k.0': 'str'}):
+            return (False, _tips, 'json_index_cols error: %s' % str(_fixed_col_define))
+
+        for _filter, _keys, _index_name in (
+            ({'e_str': 's3'}, ['k3'], 'idx_tb_json_index_e_str'),
+            ({'c_json.k.0': {'$gte': 8}}, ['k8', 'k9'], 'idx_tb_json_index_c_json'),
+            ({'e_int': 3}, ['k3'], None)
+        ):
+            _ret = AsyncTools.sync_run_coroutine(self.driver.query_list(
+                'tb_json_index', filter=_filter, sort=[('c_key', 1)]
+            ))
+            if [_row['c_key'] for _row in _ret] != _keys:
+                return (False, _tips, 'query %s error: %s' % (str(_filter), str(_ret)))
+
+            # 检查查询计划是否使用索引
+            _sqls, _sql_paras, _execute_paras, _checks = self.driver._generate_sqls(
+                'query', 'tb_json_index', filter=_filter, fixed_col_define=_fixed_col_define
+            )
+            _plan = AsyncTools.sync_run_coroutine(self.driver.run_native_cmd(
+                'explain query plan %s' % _sqls[0], paras=_sql_paras[0]
+            ))
+            _plan = ' '.join([_row['detail'] for _row in _plan])
+            if (_index_name is None and 'USING INDEX' in _plan) or (
+                _index_name is not None and ('USING INDEX %s' % _index_name) not in _plan
+            ):
+                return (False, _tips, 'query %s plan error: %s' % (str(_filter), _plan))
+
+        # 更新和删除
+        _ret = AsyncTools.sync_run_coroutine(self.driver.update(
+            'tb_json_index', {'e_str': 's4'}, {'$set': {'e_int': 100}}
+        ))
+        if _ret != 1:
+            return (False, _tips, 'update error: %s' % str(_ret))
+
+        _ret = AsyncTools.sync_run_coroutine(self.driver.delete('tb_json_index', {'e_str': 's5'}))
+        if _ret != 1:
+            return (False, _tips, 'delete error: %s' % str(_ret))
+
+        return (True, _tips, '')
+
+    def self_test_regex_3(self) -> tuple:
+        _tips = '测试正则表达式查询3'
+        try:
+            AsyncTools.sync_run_coroutine(self.driver.drop_collection('tb_regex'))
+        except:
+            pass
+
+        AsyncTools.sync_run_coroutine(self.driver.create_collection(
+            'tb_regex', indexs={'idx_tb_regex_c_str': {'keys': {'c_str': {'asc': 1}}}},
+            fixed_col_define={'c_str': {'type': 'str', 'len': 20}}
+        ))
+        _values = ['abc', 'abcd', 'xabc', 'ABC', 'a.c', 'a*c', 'abc\n', 'bc']
+        AsyncTools.sync_run_coroutine(self.driver.insert_many('tb_regex', [
+            {'c_str': _val, 'e_str': _val} for _val in _values
+        ]))
+
+        # 字面文本转换为GLOB的结果需与正则表达式一致
+        for _expr in ('abc', '^abc', 'abc$', '^abc$', r'a\.c', r'a\*c', 'a.c', '^a[bc]', '.*bc'):
+            _expect = sorted([_val for _val in _values if re.search(_expr, _val) is not None])
+            for _col in ('c_str', 'e_str'):
+                _ret = AsyncTools.sync_run_coroutine(self.driver.query_list(
+                    'tb_regex', filter={_col: {'$regex': _expr}}
+                ))
+                _ret = sorted([_row[_col] for _row in _ret])
+                if _ret != _expect:
+                    return (False, _tips, 'regex %s on %s error: %s' % (_expr, _col, str(_ret)))
+
+        # 前缀匹配可以使用索引
+        _fixed_col_define = AsyncTools.sync_run_coroutine(self.driver._get_fixed_col_define('tb_regex'))
+        _sqls, _sql_paras, _execute_paras, _checks = self.driver._generate_sqls(
+            'query', 'tb_regex', filter={'c_str': {'$regex': '^ab'}}, fixed_col_define=_fixed_col_define
+        )
+        _plan = AsyncTools.sync_run_coroutine(self.driver.run_native_cmd(
+            'explain query plan %s' % _sqls[0], paras=_sql_paras[0]
+        ))
+        _plan = ' '.join([_row['detail'] for _row in _plan])
+        if 'REGEXP' in _sqls[0] or 'USING INDEX idx_tb_regex_c_str' not in _plan:
+            return (False, _tips, 'regex prefix plan error: %s, %s' % (_sqls[0], _plan))
+
+        return (True, _tips, '')
+
+    def self_test_query_iter_4(self) -> tuple:
+        _tips = '测试流式查询内存占用4'
+        try:
+            AsyncTools.sync_run_coroutine(self.driver.drop_collection('tb_query_iter'))
+        except:
+            pass
+
+        AsyncTools.sync_run_coroutine(self.driver.create_collection(
+            'tb_query_iter', fixed_col_define={'c_index': {'type': 'int'}}
+        ))
+        _row_num = 20000
+        _session = AsyncTools.sync_run_coroutine(self.driver.start_transaction())
+        for _start in range(0, _row_num, 500):
+            AsyncTools.sync_run_coroutine(self.driver.insert_many('tb_query_iter', [
+                {'c_index': _i, 'e_str': 'x' * 200} for _i in range(_start, _start + 500)
+            ], session=_session))
+        AsyncTools.sync_run_coroutine(self.driver.commit_transaction(_session))
+
+        async def _iter_rows(batchs: list) -> int:
+            _count = 0
+            async for _rows in self.driver.query_iter(
+                'tb_query_iter', sort=[('c_index', 1)], fetch_each=100
+            ):
+                batchs.append(len(_rows))
+                for _row in _rows:
+                    if _row['c_index'] != _count:
+                        raise ValueError('row order error: %s' % str(_row))
+                    _count += 1
+
+            return _count
+
+        async def _list_rows() -> int:
+            _rows = await self.driver.query_list('tb_query_iter', sort=[('c_index', 1)])
+            return len(_rows)
+
+        tracemalloc.start()
+        try:
+            _batchs = []
+            tracemalloc.reset_peak()
+            _iter_count = AsyncTools.sync_run_coroutine(_iter_rows(_batchs))
+            _iter_peak = tracemalloc.get_traced_memory()[1]
+
+            tracemalloc.reset_peak()
+            _list_count = AsyncTools.sync_run_coroutine(_list_rows())
+            _list_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        if _iter_count != _row_num or _list_count != _row_num:
+            return (False, _tips, 'count error: %d, %d' % (_iter_count, _list_count))
+
+        # 除最后一批外, 每批返回的记录数量均为fetch_each
+        if len(_batchs) != _row_num // 100 or len(set(_batchs)) != 1:
+            return (False, _tips, 'batchs error: %s' % str(_batchs))
+
+        # 流式查询的内存占用与记录总数无关
+        if _iter_peak * 4 > _list_peak:
+            return (False, _tips, 'memory error: iter %d, list %d' % (_iter_peak, _list_peak))
+
+        return (True, _tips, '')
+
+    def self_test_query_cache_5(self) -> tuple:
+        _tips = '测试查询结果缓存5'
+        try:
+            AsyncTools.sync_run_coroutine(self.driver.drop_collection('tb_query_cache'))
+        except:
+            pass
+
+        AsyncTools.sync_run_coroutine(self.driver.create_collection(
+            'tb_query_cache', fixed_col_define={
+                'c_key': {'type': 'str', 'len': 20}, 'c_num': {'type': 'int'}, 'c_json': {'type': 'json'}
+            }
+        ))
+        _driver = SQLiteNosqlDriver(
+            connect_config={
+                'host': os.path.join(self._path, 'sqlite_test.db'),
+                'check_same_thread': False
+            },
+            driver_config={'query_cache': {'ttl': 60}}
+        )
+        try:
+            AsyncTools.sync_run_coroutine(_driver.insert_many('tb_query_cache', [
+                {'c_key': 'k%d' % _i, 'c_num': _i % 2, 'c_json': {'v': _i}} for _i in range(4)
+            ]))
+
+            # 相同参数的查询命中缓存, 修改返回结果不影响缓存
+            _query_paras = {
+                'filter': {'c_num': 0}, 'sort': [('c_key', 1)],
+                'projection': {'_id': False, 'c_key': True, 'c_num': True, 'c_json': True}
+            }
+            _ret1 = AsyncTools.sync_run_coroutine(_driver.query_list('tb_query_cache', **_query_paras))
+            _ret1[0]['c_json']['v'] = 100
+            _ret2 = AsyncTools.sync_run_coroutine(_driver.query_list('tb_query_cache', **_query_paras))
+            _ret2[0]['c_key'] = 'changed'
+            _ret3 = AsyncTools.sync_run_coroutine(_driver.query_list('tb_query_cache', **_query_paras))
+            if _ret3 != [{'c_key': 'k0', 'c_num': 0, 'c_json': {'v': 0}}, {'c_key': 'k2', 'c_num': 0, 'c_json': {'v': 2}}]:
+                return (False, _tips, 'query list cache error: %s' % str(_ret3))
+
+            _stats = _driver.get_query_cache_stats()
+            if _stats['hits'] != 2 or _stats['misses'] != 1 or _stats['size'] != 1:
+                return (False, _tips, 'stats error: %s' % str(_stats))
+
+            # 写操作清除对应集合的缓存
+            for _ in range(2):
+                _count = AsyncTools.sync_run_coroutine(_driver.query_count('tb_query_cache', filter={'c_num': 0}))
+            AsyncTools.sync_run_coroutine(_driver.insert_one('tb_query_cache', {'c_key': 'k4', 'c_num': 0}))
+            _count = AsyncTools.sync_run_coroutine(_driver.query_count('tb_query_cache', filter={'c_num': 0}))
+            if _count != 3:
+                return (False, _tips, 'insert invalidate error: %s' % str(_count))
+
+            _ret = AsyncTools.sync_run_coroutine(_driver.query_group_by(
+                'tb_query_cache', group={'c_num': '$c_num', 'count': {'$sum': 1}}, sort=[('c_num', 1)]
+            ))
+            AsyncTools.sync_run_coroutine(_driver.delete('tb_query_cache', {'c_key': 'k4'}))
+            _ret = AsyncTools.sync_run_coroutine(_driver.query_group_by(
+                'tb_query_cache', group={'c_num': '$c_num', 'count': {'$sum': 1}}, sort=[('c_num', 1)]
+            ))
+            if [_row['count'] for _row in _ret] != [2, 2]:
+                return (False, _tips, 'delete invalidate error: %s' % str(_ret))
+
+            # 事务中的写操作同样清除缓存
+            AsyncTools.sync_run_coroutine(_driver.query_count('tb_query_cache', filter={'c_num': 0}))
+            _session = AsyncTools.sync_run_coroutine(_driver.start_transaction())
+            AsyncTools.sync_run_coroutine(_driver.update(
+                'tb_query_cache', {'c_key': 'k1'}, {'$set': {'c_num': 0}}, session=_session
+            ))
+            AsyncTools.sync_run_coroutine(_driver.commit_transaction(_session))
+            if len(_driver._query_cache_sessions) != 0:
+                return (False, _tips, 'transaction sessions error: %s' % str(_driver._query_cache_sessions))
+            _count = AsyncTools.sync_run_coroutine(_driver.query_count('tb_query_cache', filter={'c_num': 0}))
+            if _count != 3:
+                return (False, _tips, 'transaction invalidate error: %s' % str(_count))
+
+            # 批量写入的内部更新删除操作不遗留事务登记
+            AsyncTools.sync_run_coroutine(_driver.bulk_write('tb_query_cache', [
+                {'op': 'update', 'filter': {'c_key': 'k1'}, 'update': {'$set': {'c_num': 1}}},
+                {'op': 'insert_one', 'row': {'c_key': 'k5', 'c_num': 1}},
+                {'op': 'delete', 'filter': {'c_key': 'k5'}},
+                {'op': 'update', 'filter': {'c_key': 'k1'}, 'update': {'$set': {'c_num': 0}}}
+            ]))
+            if len(_driver._query_cache_sessions) != 0:
+                return (False, _tips, 'bulk write sessions error: %s' % str(_driver._query_cache_sessions))
+            _count = AsyncTools.sync_run_coroutine(_driver.query_count('tb_query_cache', filter={'c_num': 0}))
+            if _count != 3:
+                return (False, _tips, 'bulk write invalidate error: %s' % str(_count))
+
+            # 其他途径修改的数据, 可指定不使用缓存或主动清除缓存
+            AsyncTools.sync_run_coroutine(self.driver.update(
+                'tb_query_cache', {'c_key': 'k3'}, {'$set': {'c_num': 0}}
+            ))
+            _counts = [
+                AsyncTools.sync_run_coroutine(_driver.query_count('tb_query_cache', filter={'c_num': 0})),
+                AsyncTools.sync_run_coroutine(_driver.query_count(
+                    'tb_query_cache', filter={'c_num': 0}, query_cache=False
+                ))
+            ]
+            _driver.clear_query_cache('tb_query_cache')
+            _counts.append(AsyncTools.sync_run_coroutine(_driver.query_count('tb_query_cache', filter={'c_num': 0})))
+            if _counts != [3, 4, 4]:
+                return (False, _tips, 'external update error: %s' % str(_counts))
+
+            _stats = _driver.get_query_cache_stats()
+            if _stats['invalidations'] < 4 or _stats['hit_rate'] <= 0:
+                return (False, _tips, 'stats error: %s' % str(_stats))
+        finally:
+            AsyncTools.sync_run_coroutine(_driver.destroy())
+
+        # 缓存数量和内存占用限制
+        _cache = QueryResultCache(ttl=0, max_size=2, max_memory=2000)
+        for _i in range(3):
+            _cache.set('key%d' % _i, [_i], [('main', 'tb')])
+        _cache.set('big', ['x' * 3000], [('main', 'tb')])
+        _hits = [_cache.get('key%d' % _i)[0] for _i in range(3)] + [_cache.get('big')[0]]
+        if _hits != [False, True, True, False] or _cache.stats['evictions'] != 1:
+            return (False, _tips, 'cache limit error: %s, %s' % (str(_hits), str(_cache.stats)))
+
+        return (True, _tips, '')
+
 
 class MySQLDriverTestCase(DriverTestCaseFW):
     """
@@ -3018,11 +3540,70 @@ class PgSQLDriverTestCase(DriverTestCaseFW):
         """
         当前驱动自有的测试清单
         """
-        return ['self_test_partition_1', 'self_test_partition_2']
+        return ['self_test_partition_1', 'self_test_partition_2', 'self_test_upsert_3']
 
     #############################
     # 自有的测试函数
     #############################
+    def self_test_upsert_3(self) -> tuple:
+        _tips = '自有测试3: 原生upsert带唯一索引以外的条件'
+
+        # 创建带唯一索引的测试表
+        AsyncTools.sync_run_coroutine(self.driver.switch_db('public'))
+        _collection = 'tb_upsert_filter'
+        try:
+            AsyncTools.sync_run_coroutine(self.driver.drop_collection(_collection))
+        except:
+            pass
+
+        AsyncTools.sync_run_coroutine(
+            self.driver.create_collection(
+                _collection, indexs={
+                    'idx_tb_upsert_filter_c_key': {
+                        'keys': {'c_key': {'asc': 1}}, 'paras': {'unique': True}
+                    }
+                },
+                fixed_col_define={
+                    'c_key': {'type': 'str', 'len': 20},
+                    'c_status': {'type': 'str', 'len': 20},
+                    'c_int': {'type': 'int'}
+                }
+            )
+        )
+
+        # 插入及更新, 更新表达式和条件都引用已存在记录的字段
+        _update = {'$inc': {'c_int': 1, 'e_inc': 1}, '$max': {'e_max': 1}}
+        for _i in range(2):
+            _ret = AsyncTools.sync_run_coroutine(self.driver.update(
+                _collection, filter={'c_key': 'k1', 'c_status': 'open'}, update=_update, upsert=True
+            ))
+            if _ret != _i:
+                return (False, _tips, 'upsert with filter error: %s' % str(_ret))
+
+        _ret = AsyncTools.sync_run_coroutine(self.driver.update(
+            _collection, filter={'c_key': 'k1', 'c_int': {'$gte': 2}, 'e_inc': 2},
+            update={'$mul': {'c_int': 3}, '$unset': {'e_max': 1}}, upsert=True
+        ))
+        if _ret != 1:
+            return (False, _tips, 'upsert with compare filter error: %s' % str(_ret))
+
+        # 冲突记录不满足其他条件, 不更新也不插入
+        _ret = AsyncTools.sync_run_coroutine(self.driver.update(
+            _collection, filter={'c_key': 'k1', 'c_status': 'closed'}, update=_update, upsert=True
+        ))
+        if _ret != 0:
+            return (False, _tips, 'upsert not match filter error: %s' % str(_ret))
+
+        _ret = AsyncTools.sync_run_coroutine(self.driver.query_list(_collection))
+        AsyncTools.sync_run_coroutine(self.driver.drop_collection(_collection))
+        if len(_ret) != 1:
+            return (False, _tips, 'upsert query error: %s' % str(_ret))
+        _ret[0].pop('_id', None)
+        if not TestTool.cmp_dict(_ret[0], {'c_key': 'k1', 'c_status': 'open', 'c_int': 6, 'e_inc': 2}):
+            return (False, _tips, 'upsert query value error: %s' % str(_ret))
+
+        return (True, _tips, '')
+
     def self_test_partition_1(self) -> tuple:
         _tips = '自有测试1: 测试分区处理'
 
@@ -3382,6 +3963,25 @@ class TestPgSQLDriver(unittest.TestCase):
             _case.destroy()
 
 
+class TestPgSQLUpsert(unittest.TestCase):
+
+    def test(self):
+        # 初始化驱动, 没有PostgreSQL数据库时跳过
+        try:
+            _case = PgSQLDriverTestCase()
+        except Exception as _e:
+            self.skipTest('PostgreSQL not available: %s' % str(_e))
+
+        try:
+            _is_success, _tips, _show_info = _case.self_test_upsert_3()
+            self.assertTrue(_is_success, msg='%s -> self case[self_test_upsert_3] %s error: %s' % (
+                _case.driver_id, _tips, str(_show_info))
+            )
+        finally:
+            # 销毁连接
+            _case.destroy()
+
+
 class TestMongoDriver(unittest.TestCase):
 
     def test(self):
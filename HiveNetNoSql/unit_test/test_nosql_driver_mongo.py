@@ -241,6 +241,70 @@ class TestMongoNosqlDriver(unittest.TestCase):
         # print(_ret)
 
 
+
+class TestMongoLeftJoinAggregate(unittest.TestCase):
+    """
+    测试关联查询的聚合管道生成(无需连接数据库)
+    """
+
+    def test(self):
+        _driver = MongoNosqlDriver(
+            connect_config={'host': '127.0.0.1', 'port': 27017, 'dbname': 'admin'}
+        )
+        _left_join = [
+            {'collection': 't_join1', 'join_fields': [('c_id', 'c_main_id')]},
+            {'collection': 't_join2', 'as': 'j2', 'join_fields': [('c_id', 'c_main_id')]}
+        ]
+
+        def _stages(pipeline: list) -> list:
+            return [list(_stage.keys())[0] for _stage in pipeline]
+
+        # 只涉及主表字段的排序和分页, 提前到关联之前处理
+        _pipeline = _driver._get_left_join_aggregate(
+            filter={'c_type': 1}, sort=[('c_time', -1)], skip=20, limit=10, left_join=_left_join
+        )
+        self.assertEqual(_stages(_pipeline), [
+            '$match', '$sort', '$limit', '$lookup', '$unwind', '$lookup', '$unwind', '$skip', '$limit'
+        ])
+        self.assertEqual(_pipeline[1]['$sort'], {'c_time': -1})
+        self.assertEqual(_pipeline[2]['$limit'], 30)
+        self.assertEqual(_pipeline[-2:], [{'$skip': 20}, {'$limit': 10}])
+
+        # 统计数量同样提前限制记录数
+        _pipeline = _driver._get_left_join_aggregate(limit=5, left_join=_left_join)
+        self.assertEqual(_stages(_pipeline), ['$limit', '$lookup', '$unwind', '$lookup', '$unwind', '$limit'])
+
+        # 按关联表字段排序, 不能提前处理
+        _pipeline = _driver._get_left_join_aggregate(
+            sort=[('#1.c_name', 1)], skip=20, limit=10, left_join=_left_join
+        )
+        self.assertEqual(_stages(_pipeline), [
+            '$lookup', '$unwind', '$lookup', '$unwind', '$sort', '$skip', '$limit'
+        ])
+        self.assertEqual(_pipeline[4]['$sort'], {'j2.c_name': 1})
+
+        # 有关联表过滤条件, 不能提前处理
+        _pipeline = _driver._get_left_join_aggregate(
+            filter={'c_type': 1, '#0.c_status': 'ok'}, sort=[('c_time', 1)], limit=10, left_join=_left_join
+        )
+        self.assertEqual(_stages(_pipeline), [
+            '$match', '$lookup', '$unwind', '$lookup', '$unwind', '$match', '$sort', '$limit'
+        ])
+
+        # 关联表子管道只返回需要的字段
+        _pipeline = _driver._get_left_join_aggregate(
+            filter={'#0.c_status': 'ok'}, projection={'c_id': True, 'c_name': '$#1.c_info.name', '#0.c_desc': True},
+            left_join=_left_join
+        )
+        self.assertEqual(_pipeline[0]['$lookup']['pipeline'][-1], {'$project': {'_id': 0, 'c_desc': 1, 'c_status': 1}})
+        self.assertEqual(_pipeline[2]['$lookup']['pipeline'][-1], {'$project': {'_id': 0, 'c_info.name': 1}})
+
+        # 只屏蔽_id或未指定返回字段, 关联表返回全部字段
+        for _projection in (None, {'_id': False}):
+            _pipeline = _driver._get_left_join_aggregate(projection=_projection, left_join=_left_join)
+            self.assertEqual(_stages(_pipeline[0]['$lookup']['pipeline']), ['$match'])
+
+
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作
     unittest.main()
@@ -2,7 +2,7 @@
 # -*- coding: UTF-8 -*-
 
 __all__ = [
-    'embed_router', 'pipeline'
+    'embed_router', 'pipeline', 'scheduler', 'checkpoint'
 ]
 
 import os
@@ -10,6 +10,8 @@ import sys
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetPipeline.pipeline import Tools, PipelinePredealer, PipelineProcesser, PipelineRouter, SubPipeLineProcesser, Pipeline
+from HiveNetPipeline.scheduler import PipelineScheduler, ThreadPoolScheduler, AsyncioScheduler
+from HiveNetPipeline.checkpoint import CheckpointStore, SQLiteCheckpointStore
 
 
 
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2022 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+管道检查点存储
+(在节点执行边界按运行增量保存运行状态, 替代save_checkpoint整体导出所有运行状态的处理方式)
+
+@module checkpoint
+@file checkpoint.py
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import traceback
+from collections import OrderedDict
+# 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+
+
+__MOUDLE__ = 'checkpoint'  # 模块名
+__DESCRIPT__ = u'管道检查点存储'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2022.10.19'  # 发布日期
+
+
+class CheckpointStore(object):
+    """
+    管道检查点存储框架
+    每个运行的状态(不含追踪列表)整体覆盖保存, 追踪列表只追加保存新增的记录;
+    异步模式下保存请求放入待写入队列, 由后台线程批量写入, 同一运行未写入的多次保存将合并为一次
+
+    实际的存储方式由继承类通过_write_records、_read_runs、_prune_runs实现
+    """
+
+    #############################
+    # 构造函数
+    #############################
+    def __init__(self, is_async: bool = True, max_trace_num: int = 0, logger=None):
+        """
+        构造函数
+
+        @param {bool} is_async=True - 是否异步写入(由后台线程批量写入, 不阻塞管道运行)
+        @param {int} max_trace_num=0 - 每个运行最多保留的追踪记录数(保留最新的记录), 0代表不限制
+        @param {Logger} logger=None - 日志对象, 用于登记后台写入的异常
+        """
+        self.is_async = is_async
+        self.max_trace_num = max_trace_num
+        self.logger = logger
+
+        # 待写入的记录, key为(pipeline_name, run_id), value为记录字典:
+        #   pipeline_name {str} - 管道名称
+        #   run_id {str} - 运行id
+        #   is_remove {bool} - 是否删除运行
+        #   status {str} - 管道运行状态
+        #   state {str} - 运行状态(不含追踪列表)的json字符串
+        #   trace_start {int} - 追踪记录的起始序号, 存储中大于等于该序号的记录将被替换
+        #   traces {list} - 从起始序号开始的追踪记录json字符串清单
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._writing = False  # 后台线程是否正在写入
+        self._closed = False
+
+        self._writer_thread = None
+        if is_async:
+            self._writer_thread = threading.Thread(
+                target=self._writer_thread_fun, name='Thread-Pipeline-CheckpointWriter', daemon=True
+            )
+            self._writer_thread.start()
+
+    #############################
+    # 属性
+    #############################
+    @property
+    def pending_num(self) -> int:
+        """
+        获取待写入的运行数
+        @property {int}
+        """
+        return len(self._pending)
+
+    @property
+    def closed(self) -> bool:
+        """
+        存储是否已关闭
+        @property {bool}
+        """
+        return self._closed
+
+    #############################
+    # 公共函数
+    #############################
+    def save_run(self, pipeline_name: str, run_id: str, status: str, state: str,
+                 trace_start: int = 0, traces: list = None):
+        """
+        保存运行状态
+
+        @param {str} pipeline_name - 管道名称
+        @param {str} run_id - 运行id
+        @param {str} status - 管道运行状态
+        @param {str} state - 运行状态(不含追踪列表)的json字符串
+        @param {int} trace_start=0 - 追踪记录的起始序号, 存储中大于等于该序号的记录将被替换
+            注: 送0代表重新保存整个追踪列表
+        @param {list} traces=None - 从起始序号开始新增的追踪记录json字符串清单
+        """
+        self._put_record({
+            'pipeline_name': pipeline_name, 'run_id': run_id, 'is_remove': False,
+            'status': status, 'state': state, 'trace_start': trace_start,
+            'traces': [] if traces is None else list(traces)
+        })
+
+    def remove_run(self, pipeline_name: str, run_id: str):
+        """
+        删除运行状态
+
+        @param {str} pipeline_name - 管道名称
+        @param {str} run_id - 运行id
+        """
+        self._put_record({
+            'pipeline_name': pipeline_name, 'run_id': run_id, 'is_remove': True
+        })
+
+    def load_runs(self, pipeline_name: str) -> OrderedDict:
+        """
+        装载指定管道的所有运行状态
+
+        @param {str} pipeline_name - 管道名称
+
+        @returns {OrderedDict} - 按保存顺序的运行状态字典, key为run_id, value为(run_cache, trace_seq)
+            run_cache {dict} - 运行缓存字典(含trace_list)
+            trace_seq {int} - trace_list第一条记录在存储中的序号(限制了保留记录数时不为0)
+        """
+        self.flush()
+        _runs = OrderedDict()
+        for _run_id, _state, _trace_seq, _traces in self._read_runs(pipeline_name):
+            _run_cache = json.loads(_state)
+            _run_cache['trace_list'] = [json.loads(_trace) for _trace in _traces]
+            _runs[_run_id] = (_run_cache, _trace_seq)
+
+        return _runs
+
+    def prune(self, pipeline_name: str = None, status_list: tuple = ('S', ),
+              before_time: float = None) -> int:
+        """
+        清理运行状态(例如已完成的运行)
+
+        @param {str} pipeline_name=None - 管道名称, None代表所有管道
+        @param {tuple} status_list=('S', ) - 要清理的运行状态清单
+        @param {float} before_time=None - 只清理最后保存时间早于该时间戳的运行, None代表不限制
+
+        @returns {int} - 清理的运行数
+        """
+        self.flush()
+        return self._prune_runs(pipeline_name, status_list, before_time)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待待写入的记录写入完成
+
+        @param {float} timeout=None - 超时时间(秒), None代表一直等待
+
+        @returns {bool} - 是否已全部写入
+        """
+        if not self.is_async:
+            return True
+
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: len(self._pending) == 0 and not self._writing, timeout=timeout
+            )
+
+    def close(self):
+        """
+        关闭存储(等待待写入的记录写入完成)
+        """
+        if self._closed:
+            return
+
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        if self._writer_thread is not None:
+            self._writer_thread.join()
+
+        self._close_store()
+
+    #############################
+    # 内部函数
+    #############################
+    def _write_records(self, records: list):
+        """
+        写入记录(继承类实现)
+
+        @param {list} records - 要写入的记录清单, 记录格式参考_pending的说明
+        """
+        raise NotImplementedError()
+
+    def _read_runs(self, pipeline_name: str) -> list:
+        """
+        读取指定管道的所有运行状态(继承类实现)
+
+        @param {str} pipeline_name - 管道名称
+
+        @returns {list} - 按保存顺序的运行清单, 每个元素为(run_id, state, trace_seq, traces)
+        """
+        raise NotImplementedError()
+
+    def _prune_runs(self, pipeline_name: str, status_list: tuple, before_time: float) -> int:
+        """
+        清理运行状态(继承类实现)
+
+        @param {str} pipeline_name - 管道名称, None代表所有管道
+        @param {tuple} status_list - 要清理的运行状态清单
+        @param {float} before_time - 只清理最后保存时间早于该时间戳的运行, None代表不限制
+
+        @returns {int} - 清理的运行数
+        """
+        raise NotImplementedError()
+
+    def _close_store(self):
+        """
+        关闭存储的资源(继承类实现)
+        """
+        pass
+
+    def _put_record(self, record: dict):
+        """
+        放入待写入记录
+
+        @param {dict} record - 要写入的记录
+        """
+        if self._closed:
+            raise RuntimeError('Checkpoint store is closed!')
+
+        if not self.is_async:
+            self._write_records([record])
+            return
+
+        _key = (record['pipeline_name'], record['run_id'])
+        with self._cond:
+            _old = self._pending.pop(_key, None)
+            if _old is not None and not _old['is_remove'] and not record['is_remove']:
+                # 合并未写入的追踪记录
+                _offset = record['trace_start'] - _old['trace_start']
+                if 0 <= _offset <= len(_old['traces']):
+                    record['traces'] = _old['traces'][0: _offset] + record['traces']
+                    record['trace_start'] = _old['trace_start']
+
+            self._pending[_key] = record
+            self._cond.notify_all()
+
+    def _writer_thread_fun(self):
+        """
+        后台写入线程
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) > 0 or self._closed)
+                if len(self._pending) == 0:
+                    # 已关闭且没有待写入的记录
+                    return
+
+                _records = list(self._pending.values())
+                self._pending.clear()
+                self._writing = True
+
+            try:
+                self._write_records(_records)
+            except:
+                if self.logger is not None:
+                    self.logger.error('Error: [CheckpointStore] write records error: %s' % traceback.format_exc())
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    SQLite检查点存储
+    运行状态保存在pipeline_run表, 追踪记录按序号保存在pipeline_trace表
+    """
+
+    def __init__(self, db_file: str, is_async: bool = True, max_trace_num: int = 0, logger=None):
+        """
+        构造函数
+
+        @param {str} db_file - 数据库文件路径(不存在将自动创建)
+        @param {bool} is_async=True - 是否异步写入(由后台线程批量写入, 不阻塞管道运行)
+        @param {int} max_trace_num=0 - 每个运行最多保留的追踪记录数(保留最新的记录), 0代表不限制
+        @param {Logger} logger=None - 日志对象, 用于登记后台写入的异常
+        """
+        self.db_file = db_file
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pipeline_run (pipeline_name TEXT NOT NULL, run_id TEXT NOT NULL, '
+            'status TEXT, update_time REAL, state TEXT, PRIMARY KEY (pipeline_name, run_id))'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pipeline_trace (pipeline_name TEXT NOT NULL, run_id TEXT NOT NULL, '
+            'seq INTEGER NOT NULL, trace TEXT, PRIMARY KEY (pipeline_name, run_id, seq))'
+        )
+
+        super().__init__(is_async=is_async, max_trace_num=max_trace_num, logger=logger)
+
+    #############################
+    # 内部函数
+    #############################
+    def _write_records(self, records: list):
+        """
+        写入记录(一批记录在同一个事务中处理)
+
+        @param {list} records - 要写入的记录清单
+        """
+        _update_time = time.time()
+        with self._db_lock:
+            self._conn.execute('BEGIN')
+            try:
+                for _record in records:
+                    _key = (_record['pipeline_name'], _record['run_id'])
+                    if _record['is_remove']:
+                        self._conn.execute(
+                            'DELETE FROM pipeline_run WHERE pipeline_name=? AND run_id=?', _key
+                        )
+                        self._conn.execute(
+                            'DELETE FROM pipeline_trace WHERE pipeline_name=? AND run_id=?', _key
+                        )
+                        continue
+
+                    self._conn.execute(
+                        'INSERT INTO pipeline_run (pipeline_name, run_id, status, update_time, state) '
+                        'VALUES (?, ?, ?, ?, ?) ON CONFLICT (pipeline_name, run_id) DO UPDATE SET '
+                        'status=excluded.status, update_time=excluded.update_time, state=excluded.state',
+                        _key + (_record['status'], _update_time, _record['state'])
+                    )
+
+                    # 追踪记录只替换起始序号之后的部分
+                    _start = _record['trace_start']
+                    self._conn.execute(
+                        'DELETE FROM pipeline_trace WHERE pipeline_name=? AND run_id=? AND seq>=?',
+                        _key + (_start, )
+                    )
+                    self._conn.executemany(
+                        'INSERT INTO pipeline_trace (pipeline_name, run_id, seq, trace) VALUES (?, ?, ?, ?)',
+                        [_key + (_start + _i, _trace) for _i, _trace in enumerate(_record['traces'])]
+                    )
+                    if self.max_trace_num > 0:
+                        # 只保留最新的追踪记录
+                        self._conn.execute(
+                            'DELETE FROM pipeline_trace WHERE pipeline_name=? AND run_id=? AND seq<?',
+                            _key + (_start + len(_record['traces']) - self.max_trace_num, )
+                        )
+
+                self._conn.execute('COMMIT')
+            except:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _read_runs(self, pipeline_name: str) -> list:
+        """
+        读取指定管道的所有运行状态
+
+        @param {str} pipeline_name - 管道名称
+
+        @returns {list} - 按保存顺序的运行清单, 每个元素为(run_id, state, trace_seq, traces)
+        """
+        with self._db_lock:
+            _runs = self._conn.execute(
+                'SELECT run_id, state FROM pipeline_run WHERE pipeline_name=? ORDER BY rowid',
+                (pipeline_name, )
+            ).fetchall()
+            _traces = dict()
+            for _run_id, _seq, _trace in self._conn.execute(
+                'SELECT run_id, seq, trace FROM pipeline_trace WHERE pipeline_name=? ORDER BY run_id, seq',
+                (pipeline_name, )
+            ):
+                if _run_id not in _traces:
+                    _traces[_run_id] = (_seq, [])
+                _traces[_run_id][1].append(_trace)
+
+        return [(_run_id, _state) + _traces.get(_run_id, (0, [])) for _run_id, _state in _runs]
+
+    def _prune_runs(self, pipeline_name: str, status_list: tuple, before_time: float) -> int:
+        """
+        清理运行状态
+
+        @param {str} pipeline_name - 管道名称, None代表所有管道
+        @param {tuple} status_list - 要清理的运行状态清单
+        @param {float} before_time - 只清理最后保存时间早于该时间戳的运行, None代表不限制
+
+        @returns {int} - 清理的运行数
+        """
+        if len(status_list) == 0:
+            return 0
+
+        _where = 'status IN (%s)' % ','.join(['?'] * len(status_list))
+        _paras = list(status_list)
+        if pipeline_name is not None:
+            _where += ' AND pipeline_name=?'
+            _paras.append(pipeline_name)
+        if before_time is not None:
+            _where += ' AND update_time<?'
+            _paras.append(before_time)
+
+        with self._db_lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute(
+                    'DELETE FROM pipeline_trace WHERE (pipeline_name, run_id) IN '
+                    '(SELECT pipeline_name, run_id FROM pipeline_run WHERE %s)' % _where, _paras
+                )
+                _count = self._conn.execute('DELETE FROM pipeline_run WHERE %s' % _where, _paras).rowcount
+                self._conn.execute('COMMIT')
+            except:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        return _count
+
+    def _close_store(self):
+        """
+        关闭数据库连接
+        """
+        with self._db_lock:
+            self._conn.close()
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
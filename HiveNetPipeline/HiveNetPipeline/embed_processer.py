@@ -84,5 +84,5 @@ class SubPipeline(SubPipeLineProcesser):
             asyn_notify_fun=pipeline_obj.asyn_notify_fun,
             running_notify_fun=pipeline_obj.running_notify_fun,
             end_running_notify_fun=pipeline_obj.end_running_notify_fun,
-            logger=pipeline_obj.logger
+            logger=pipeline_obj.logger, parallel_executor=pipeline_obj._get_parallel_executor()
         )
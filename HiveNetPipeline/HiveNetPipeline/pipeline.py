@@ -17,13 +17,18 @@ import os
 import sys
 import json
 import copy
+import time
+import logging
+import asyncio
 import inspect
 import datetime
 import threading
 import traceback
 from typing import List
 import uuid
+from types import MappingProxyType
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from HiveNetCore.utils.run_tool import RunTool, AsyncTools
 from HiveNetCore.utils.import_tool import ImportTool
 from HiveNetCore.utils.file_tool import FileTool
@@ -33,6 +38,18 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.
 
 PIPELINE_PLUGINS_VAR_NAME = 'PIPELINE_PLUGINS'  # 插件装载全局变量名
 
+# 单调时钟与系统时间的差值, 运行状态中的时间使用单调时钟换算的时间戳, 查询时再格式化
+_MONOTONIC_BASE = time.time() - time.monotonic()
+
+
+def _timestamp() -> float:
+    """
+    获取基于单调时钟的当前时间戳
+
+    @returns {float} - 时间戳(秒)
+    """
+    return _MONOTONIC_BASE + time.monotonic()
+
 
 class Tools(object):
     """
@@ -381,7 +398,8 @@ class Pipeline(object):
     #############################
     def __init__(self, name: str, pipeline_config, is_asyn=False, asyn_notify_fun=None,
                  running_notify_fun=None, end_running_notify_fun=None,
-                 logger=None):
+                 logger=None, scheduler=None, parallel_max_workers: int = 32, checkpoint_store=None,
+                 parallel_executor: ThreadPoolExecutor = None):
         """
         构造函数
 
@@ -405,6 +423,26 @@ class Pipeline(object):
                     "exception_router": "", 执行处理器出现异常时执行的路由器名, 置空或不设置值将抛出异常并结束管道执行
                     "exception_router_para": {}  # 异常路由器的传入参数,  作为**kwargs传入路由器, 置空或不设置值的情况传入{}
                 }
+               并行节点(同时执行多个分支处理器, 并按汇合策略合并输出)的配置说明如下, 路由相关的配置与普通节点一致:
+               {
+                    "name": "节点配置名",
+                    "is_parallel": True,  # 是否并行节点, 并行节点无需设置processor
+                    "parallel_branches": [  # 并行执行的分支清单, 每个分支使用相同的输入数据
+                        {
+                            "name": "分支名",
+                            "processor": "处理器名",  # 不支持异步处理器(is_asyn为True)
+                            "processor_execute_para": {},  # 处理器执行的传入参数
+                            "context": {}  # 分支的上下文更新, 每个分支使用上下文的浅复制对象, 汇合成功后按分支顺序合并回管道上下文
+                            # 注: 浅复制只隔离上下文的第一层key, 分支不应直接修改上下文中的可变对象(dict/list等), 应替换为新对象
+                        },
+                        ...
+                    ],
+                    "join_policy": "all",  # 汇合策略, all - 所有分支成功, first_success - 第一个成功的分支, quorum - 指定数量的分支成功
+                                           # 注: 已不可能满足汇合策略时(例如all策略有分支失败)不再等待其他分支, 直接汇合失败
+                    "join_quorum": 2,  # quorum策略要求成功的分支数量, 不设置默认为过半数
+                    ...
+               }
+               注: 并行节点的输出, first_success策略为第一个成功分支的输出, 其他策略为成功分支输出按分支顺序组成的数组
         @param {bool} is_asyn=False - 是否异步返回结果
         @param {function} asyn_notify_fun=None - 异步结果通知函数, 格式如下:
             fun(name, run_id, status, context, output, pipeline)
@@ -434,26 +472,44 @@ class Pipeline(object):
                 pipeline {Pipeline} - 管道对象
             注: 该函数可以为同步也可以为异步函数
         @param {Simple_log.Logger} logger=None - 日志对象
+        @param {HiveNetPipeline.scheduler.PipelineScheduler} scheduler=None - 异步模式的运行调度器
+            注: 不传入时每次异步运行都单独创建一个线程执行; 传入时将运行任务提交到调度器执行,
+                可以多个管道共享同一个调度器(例如ThreadPoolScheduler/AsyncioScheduler)
+        @param {int} parallel_max_workers=32 - 执行并行节点分支的线程池最大线程数
+            注: 管道自行创建的线程池需通过close函数关闭
+        @param {ThreadPoolExecutor} parallel_executor=None - 执行并行节点分支的共享线程池
+            注: 传入时不再自行创建线程池(parallel_max_workers无效), 可以多个管道共享同一个线程池, 管道的close函数不会关闭该线程池
+        @param {HiveNetPipeline.checkpoint.CheckpointStore} checkpoint_store=None - 检查点存储
+            注: 传入时在每个节点执行完成(以及启动、暂停、异常)时自动增量保存该运行的状态, 只追加保存新增的追踪记录;
+                可以多个管道共享同一个存储对象(按管道名称区分), 通过load_checkpoint_store恢复运行状态
         """
         self.logger = logger
         self.name = name
-
-        # 处理节点配置参数
+        self.scheduler = scheduler
+        self.checkpoint_store = checkpoint_store
+        # 检查点存储已保存的追踪记录情况, key为run_id, value为(trace_list第一条记录在存储中的序号, 已保存的记录数)
+        self._checkpoint_traces = dict()
+        self.parallel_max_workers = parallel_max_workers
+        self._parallel_executor = parallel_executor  # 执行并行分支的线程池, 未传入时在使用时才创建
+        self._is_own_executor = parallel_executor is None  # 是否管道自行创建的线程池
+        self._parallel_executor_lock = threading.Lock()
+
+        # 处理节点配置参数, 只复制节点配置字典, 运行时使用编译后的不可变节点图
         _temp_pipeline = None
         if type(pipeline_config) == str:
             _temp_pipeline = json.loads(pipeline_config)
         else:
-            _temp_pipeline = copy.deepcopy(pipeline_config)
+            _temp_pipeline = pipeline_config
 
         if isinstance(_temp_pipeline, (frozenset, list, set, tuple,)):
             # 数组处理
             self.pipeline = dict()
             _current_index = 1
-            for _node_config in pipeline_config:
-                self.pipeline[str(_current_index)] = _node_config
+            for _node_config in _temp_pipeline:
+                self.pipeline[str(_current_index)] = dict(_node_config)
                 _current_index += 1
         else:
-            self.pipeline = _temp_pipeline
+            self.pipeline = {_key: dict(_node_config) for _key, _node_config in _temp_pipeline.items()}
 
         # 其他参数设置
         self.is_asyn = is_asyn  # 是否异步
@@ -461,11 +517,10 @@ class Pipeline(object):
         self.running_notify_fun = running_notify_fun
         self.end_running_notify_fun = end_running_notify_fun
 
-        # 如果是同步模式, 检查每个节点的插件是否有异步的情况
-        if not self.is_asyn:
-            for _node in self.pipeline.values():
-                if self.get_plugin('processer', _node['processor']).is_asyn():
-                    raise AttributeError('Pipeline has asynchronous processor!')
+        # 编译节点图, key为节点id, value为不可变的节点信息字典(绑定插件及合并参数)
+        # 注: 编译时将检查同步模式下是否有异步处理器, 以及并行节点的分支是否有异步处理器;
+        #     异步管道的处理器在运行节点时才获取, 同步管道及并行分支的处理器需在构造前装载
+        self._graph = self._compile_graph()
 
         # 管道状态及临时变量缓存字典(采取有序字典), key为run_id, value为字典:
         #   status_lock {Lock} - 异步运行的线程锁, threading.Lock()
@@ -482,22 +537,33 @@ class Pipeline(object):
         #   running_sub_node_id {str} - 正在执行的子管道节点id
         #   is_resume {bool} - 是否通过resume恢复执行
         #   run_to_end {bool} - resume的run_to_end参数值
+        #   parallel_results {dict} - 并行节点已完成的分支执行结果, key为节点id, value为按分支顺序的结果数组(未完成为None)
+        #       注: 节点汇合成功后删除, 汇合失败或中断时保留, 恢复执行时只重新执行未成功的分支
         #   trace_list {list} - 执行追踪列表, 按顺序放入执行信息, 每个执行信息包括
         #       node_id {str} 节点配置id
         #       node_name {str} 节点配置名
         #       processor_name {str} 处理器名
-        #       start_time {str} 开始时间, 格式为'%Y-%m-%d %H:%M:%S.%f'
-        #       end_time {str} 结束时间, 格式为'%Y-%m-%d %H:%M:%S.%f'
+        #       start_time {float} 开始时间戳, 通过trace_list获取时格式化为'%Y-%m-%d %H:%M:%S.%f'
+        #       end_time {float} 结束时间戳, 通过trace_list获取时格式化为'%Y-%m-%d %H:%M:%S.%f'
         #       status {str} 执行状态, 'S' - 成功, 'E' - 出现异常, 'K' - 跳过节点
         #       status_msg {str} 状态描述, 当异常时送入异常信息
         #       router_name : 路由名(直线路由可以不设置路由器)
         #       is_sub_pipeline {bool} 是否子管道执行
         #       sub_name {str} - 子管道名称
         #       sub_trace_list {list} 子管道执行的trace_list
+        #       is_parallel {bool} 是否并行节点
+        #       branch_trace_list {list} 并行节点各分支的执行信息, 每个执行信息包括
+        #           branch_index {int} 分支序号
+        #           branch_name {str} 分支名
+        #           processor_name {str} 处理器名
+        #           start_time {str} 开始时间
+        #           end_time {str} 结束时间
+        #           status {str} 执行状态, 'S' - 成功, 'E' - 出现异常, 'C' - 汇合完成时未执行完成
+        #           status_msg {str} 状态描述
         #   node_id {str} 当前节点配置id
         #   node_status {str} I-初始化, R-正在执行, E-执行失败,  S-执行成功, P-子管道暂停
         #   node_status_msg {str} - 当前节点执行状态信息
-        #   start_time {str} 当前节点执行开始时间, 格式为'%Y-%m-%d %H:%M:%S.%f'
+        #   start_time {float} 当前节点执行开始时间戳
         self._cache = OrderedDict()
 
         # 管道线程锁对象, 主要目的是要将线程锁对象从缓存中剥离出来, 保证缓存的可序列化
@@ -577,13 +643,13 @@ class Pipeline(object):
         @param {str} run_id=None - 要获取的管道运行ID
             注: 如果不传入则获取最后执行的管道ID
 
-        @returns {list} - 当前执行追踪列表
+        @returns {list} - 当前执行追踪列表(复制对象, 时间格式化为'%Y-%m-%d %H:%M:%S.%f')
         """
         _run_id, _run_cache = self._get_run_cache(run_id)
         if _run_cache is None:
             raise RuntimeError("Run id not exists!")
 
-        return _run_cache['trace_list']
+        return self._render_trace_list(_run_cache['trace_list'])
 
     def current_node_id(self, run_id: str = None) -> str:
         """
@@ -692,9 +758,13 @@ class Pipeline(object):
             _run_cache['running_sub_node_id'] = ''
             _run_cache['is_resume'] = False
             _run_cache['run_to_end'] = False
+            _run_cache['parallel_results'] = dict()
         finally:
             self._status_locks[_run_id].release()
 
+        # 保存检查点(重新开始执行需要重新保存追踪列表)
+        self._save_run_checkpoint(_run_id, _run_cache, is_reset=True)
+
         if self.is_asyn:
             # 异步执行, 启动任务执行线程
             self._start_running_thread(_run_id)
@@ -737,6 +807,8 @@ class Pipeline(object):
             # 等待运行线程结束
             RunTool.sleep(0.01)
 
+        self._save_run_checkpoint(_run_id, _run_cache)
+
         # 记录日志
         self.log_info('Pipeline [%s] pause!' % self.name)
 
@@ -806,6 +878,9 @@ class Pipeline(object):
         try:
             self._cache.pop(_run_id)
             self._status_locks.pop(_run_id)
+            if self.checkpoint_store is not None:
+                self._checkpoint_traces.pop(_run_id, None)
+                self.checkpoint_store.remove_run(self.name, _run_id)
             if _run_id == self._last_run_id:
                 # 将最后一个id置值
                 if len(self._cache) > 0:
@@ -871,26 +946,47 @@ class Pipeline(object):
                 # 如果运行id已存在, 不处理
                 continue
 
-            # 正在运行的子管道支持
-            _sub_pipeline_json = _run_cache.get('running_sub_pipeline', None)
-            if _sub_pipeline_json is not None:
-                # 装载子管道
-                _node_config = self.pipeline[_run_cache['node_id']]
-                _processer = self.get_plugin('processer', _node_config['processor'])
-                _sub_pipeline = _processer.get_sub_pipeline(
-                    _run_cache['current_input'], _run_cache['context'], self, _run_id,
-                    _node_config.get('sub_pipeline_para', {}),
-                    **_node_config.get('processor_execute_para', {})
-                )
-                _sub_pipeline.load_checkpoint(_sub_pipeline_json, ignore_exists)
-                self.running_sub_pipeline[_run_id] = _sub_pipeline
+            self._load_run_cache(_run_id, _run_cache, ignore_exists)
 
-                # 移除配置子管道配置
-                _run_cache.pop('running_sub_pipeline')
+    def load_checkpoint_store(self, ignore_exists: bool = False) -> list:
+        """
+        从检查点存储装载当前管道(按管道名称)所保存的运行状态
+        注: 保存时正在运行的管道(例如进程异常退出), 装载后状态为暂停(P), 可以通过resume从最后保存的节点继续执行
 
-            self._cache[_run_id] = _run_cache
-            self._status_locks[_run_id] = threading.Lock()
-            self._change_last_run_id(_run_id)
+        @param {bool} ignore_exists=False - 是否忽略已存在运行管道, 如果不忽略, run_id重复时抛出异常
+
+        @returns {list} - 装载的运行id清单
+        """
+        if self.checkpoint_store is None:
+            raise RuntimeError('Pipeline [%s] checkpoint store not set!' % self.name)
+
+        _runs = self.checkpoint_store.load_runs(self.name)
+
+        # 检查是否run_id已存在
+        if not ignore_exists:
+            for _run_id in _runs.keys():
+                if _run_id in self._cache.keys():
+                    # 如果运行id已存在则抛出异常
+                    raise RuntimeError('run id [%s] already exists!' % _run_id)
+
+        _run_id_list = list()
+        for _run_id, (_run_cache, _trace_seq) in _runs.items():
+            if _run_id in self._cache.keys():
+                # 如果运行id已存在, 不处理
+                continue
+
+            # 中断的运行, 从最后保存的节点重新执行
+            if _run_cache['status'] == 'R':
+                _run_cache['status'] = 'P'
+            if _run_cache.get('node_status', 'I') == 'R':
+                _run_cache['node_status'] = 'I'
+            _run_cache['thread_running'] = False
+
+            self._load_run_cache(_run_id, _run_cache, ignore_exists)
+            self._checkpoint_traces[_run_id] = (_trace_seq, len(_run_cache['trace_list']))
+            _run_id_list.append(_run_id)
+
+        return _run_id_list
 
     def asyn_node_feeback(self, run_id: str, node_id: str, output=None, status: str = 'S',
                           status_msg: str = 'S', context: dict = {}):
@@ -923,9 +1019,11 @@ class Pipeline(object):
             _run_cache['node_id'] = _next_id
             _run_cache['node_status'] = 'I'
 
-            # 启动处理线程
-            if _run_cache['status'] == 'R':
-                self._start_running_thread(_run_id)
+        self._save_run_checkpoint(_run_id, _run_cache)
+
+        # 启动处理线程
+        if _next_id is not None and _run_cache['status'] == 'R':
+            self._start_running_thread(_run_id)
 
     def node_process_feeback(self, run_id: str, node_id: str,
                              total: int = None, done: int = None, job_msg: str = None):
@@ -985,6 +1083,25 @@ class Pipeline(object):
             # 非当前节点, 返回完成状态
             return 1, 1, ''
 
+    def close(self, wait: bool = True):
+        """
+        关闭管道, 释放管道自行创建的并行分支线程池以及缓存的子管道对象
+
+        @param {bool} wait=True - 是否等待线程池中正在执行的分支完成
+        """
+        for _sub_pipeline in list(self.running_sub_pipeline.values()):
+            _sub_pipeline.close(wait=wait)
+
+        if not self._is_own_executor:
+            return
+
+        with self._parallel_executor_lock:
+            _executor = self._parallel_executor
+            self._parallel_executor = None
+
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+
     #############################
     # 日志函数
     #############################
@@ -995,7 +1112,7 @@ class Pipeline(object):
 
         @param {str} msg - 要输出的日志
         """
-        if self.logger:
+        if self.logger and self._is_log_enabled(logging.INFO):
             if 'extra' not in kwargs:
                 kwargs['extra'] = {'callFunLevel': 2}
 
@@ -1007,7 +1124,7 @@ class Pipeline(object):
 
         @param {str} msg - 要输出的日志
         """
-        if self.logger:
+        if self.logger and self._is_log_enabled(logging.DEBUG):
             if 'extra' not in kwargs:
                 kwargs['extra'] = {'callFunLevel': 2}
 
@@ -1019,7 +1136,7 @@ class Pipeline(object):
 
         @param {str} msg - 要输出的日志
         """
-        if self.logger:
+        if self.logger and self._is_log_enabled(logging.ERROR):
             if 'extra' not in kwargs:
                 kwargs['extra'] = {'callFunLevel': 2}
 
@@ -1031,16 +1148,172 @@ class Pipeline(object):
 
         @param {str} msg - 要输出的日志
         """
-        if self.logger:
+        if self.logger and self._is_log_enabled(logging.WARNING):
             if 'extra' not in kwargs:
                 kwargs['extra'] = {'callFunLevel': 2}
 
             self.logger.warning(msg, *args, **kwargs)
 
+    def _is_log_enabled(self, level: int) -> bool:
+        """
+        判断日志级别是否需要输出(避免不输出的日志也进行日志参数的处理)
+
+        @param {int} level - 日志级别
+
+        @returns {bool} - 是否需要输出
+        """
+        _logger = getattr(self.logger, 'base_logger', self.logger)
+        _is_enabled_for = getattr(_logger, 'isEnabledFor', None)
+        return _is_enabled_for is None or _is_enabled_for(level)
+
     #############################
     # 内部函数
     #############################
 
+    def _compile_graph(self) -> dict:
+        """
+        将管道配置编译为节点图, 绑定插件并合并参数, 避免每次执行节点时重复处理
+
+        @returns {dict} - 节点图, key为节点id, value为不可变的节点信息字典
+            node_id {str} - 节点id
+            name {str} - 节点配置名
+            processor_name {str} - 处理器名(并行节点为'')
+            processer {PipelineProcesser} - 处理器类, 异步管道为None(运行时获取)
+            execute {function} - 处理器的execute函数, 异步管道为None
+            is_asyn {bool} - 处理器是否异步处理, 异步管道为None
+            processor_para {dict} - 处理器执行参数
+            context {dict} - 要更新的上下文, 没有设置为None
+            is_sub_pipeline {bool} - 是否子管道节点
+            sub_pipeline_para {dict} - 生成子管道的参数
+            predealer_name {str} - 预处理器名, 没有设置为None
+            predealer {PipelinePredealer} - 预处理器类, 编译时未装载为None
+            predealer_para {dict} - 预处理器执行参数
+            router_name {str} - 路由器名
+            router {PipelineRouter} - 路由器类, 编译时未装载为None
+            router_para {dict} - 路由器执行参数
+            exception_router_name {str} - 异常路由器名
+            exception_router {PipelineRouter} - 异常路由器类, 编译时未装载为None
+            exception_router_para {dict} - 异常路由器执行参数
+            next_id {str} - 按顺序执行的下一节点id, 已是最后节点为None
+            is_parallel {bool} - 是否并行节点
+            branches {tuple} - 并行节点的分支信息, 每个分支为不可变字典
+                (name, processor_name, execute, is_coroutine, processor_para, context)
+            join_policy {str} - 并行节点的汇合策略
+            join_need {int} - 并行节点汇合成功需要的成功分支数
+
+        @throws {AttributeError} - 同步管道有异步处理器、并行分支有异步处理器、汇合策略不支持时抛出异常
+        @throws {ModuleNotFoundError} - 同步管道的处理器、并行分支的处理器未装载时抛出异常
+            注: 同步管道及并行分支的处理器需在构造管道前装载; 异步管道的处理器在运行节点时获取
+        """
+        _graph = dict()
+        for _node_id, _node_config in self.pipeline.items():
+            _node = {
+                'node_id': _node_id,
+                'name': _node_config.get('name', ''),
+                'processor_name': _node_config.get('processor', ''),
+                'processer': None,
+                'execute': None,
+                'is_asyn': None,
+                'processor_para': MappingProxyType(dict(_node_config.get('processor_execute_para', None) or {})),
+                'context': MappingProxyType(dict(_node_config['context'])) if _node_config.get('context', None) else None,
+                'is_sub_pipeline': _node_config.get('is_sub_pipeline', False),
+                'sub_pipeline_para': _node_config.get('sub_pipeline_para', None) or {},
+                'predealer_name': _node_config.get('predealer', None),
+                'predealer': None,
+                'predealer_para': MappingProxyType(dict(_node_config.get('predealer_execute_para', None) or {})),
+                'router_name': _node_config.get('router', None) or '',
+                'router': None,
+                'router_para': MappingProxyType(dict(_node_config.get('router_para', None) or {})),
+                'exception_router_name': _node_config.get('exception_router', None) or '',
+                'exception_router': None,
+                'exception_router_para': MappingProxyType(dict(_node_config.get('exception_router_para', None) or {})),
+                'next_id': None,
+                'is_parallel': _node_config.get('is_parallel', False),
+                'branches': tuple(),
+                'join_policy': _node_config.get('join_policy', 'all'),
+                'join_need': 0
+            }
+
+            # 下一节点
+            _next_id = str(int(_node_id) + 1)
+            if _next_id in self.pipeline.keys():
+                _node['next_id'] = _next_id
+
+            # 绑定插件
+            if _node['predealer_name'] is not None:
+                _node['predealer'] = self.get_plugin('predealer', _node['predealer_name'])
+            if _node['router_name'] != '':
+                _node['router'] = self.get_plugin('router', _node['router_name'])
+            if _node['exception_router_name'] != '':
+                _node['exception_router'] = self.get_plugin('router', _node['exception_router_name'])
+
+            if _node['is_parallel']:
+                # 并行节点的分支, 不支持异步处理器
+                _branches = list()
+                for _branch in _node_config.get('parallel_branches', []):
+                    _processer: PipelineProcesser = self.get_plugin('processer', _branch['processor'])
+                    if _processer is None:
+                        raise ModuleNotFoundError('processer [%s] is not found' % _branch['processor'])
+                    if _processer.is_asyn():
+                        raise AttributeError('Parallel branch has asynchronous processor!')
+                    _branches.append(MappingProxyType({
+                        'name': _branch.get('name', ''),
+                        'processor_name': _branch['processor'],
+                        'execute': _processer.execute,
+                        'is_coroutine': inspect.iscoroutinefunction(_processer.execute),
+                        'processor_para': MappingProxyType(dict(_branch.get('processor_execute_para', None) or {})),
+                        'context': MappingProxyType(dict(_branch['context'])) if _branch.get('context', None) else None
+                    }))
+                _node['branches'] = tuple(_branches)
+
+                _total = len(_branches)
+                if _node['join_policy'] == 'all':
+                    _node['join_need'] = _total
+                elif _node['join_policy'] == 'first_success':
+                    _node['join_need'] = min(1, _total)
+                elif _node['join_policy'] == 'quorum':
+                    _node['join_need'] = _node_config.get('join_quorum', _total // 2 + 1)
+                else:
+                    raise AttributeError('join policy [%s] not support!' % _node['join_policy'])
+            elif not self.is_asyn:
+                # 如果是同步模式, 检查每个节点的插件是否有异步的情况
+                # 注: 异步管道不绑定处理器, 在运行节点时再获取(允许构造后再装载或替换处理器)
+                _processer: PipelineProcesser = self.get_plugin('processer', _node['processor_name'])
+                if _processer is None:
+                    raise ModuleNotFoundError('processer [%s] is not found' % _node['processor_name'])
+                _node['processer'] = _processer
+                _node['execute'] = _processer.execute
+                _node['is_asyn'] = _processer.is_asyn()
+                if _node['is_asyn']:
+                    raise AttributeError('Pipeline has asynchronous processor!')
+
+            _graph[_node_id] = MappingProxyType(_node)
+
+        return _graph
+
+    @classmethod
+    def _render_trace_list(cls, trace_list: list) -> list:
+        """
+        将执行追踪列表的时间戳格式化为'%Y-%m-%d %H:%M:%S.%f'格式(返回复制对象)
+
+        @param {list} trace_list - 执行追踪列表
+            注: 兼容旧版本检查点中已格式化为字符串的时间
+
+        @returns {list} - 格式化后的执行追踪列表
+        """
+        _list = list()
+        for _trace in trace_list:
+            _trace = dict(_trace)
+            for _key in ('start_time', 'end_time'):
+                if isinstance(_trace.get(_key, None), (int, float)):
+                    _trace[_key] = datetime.datetime.fromtimestamp(_trace[_key]).strftime('%Y-%m-%d %H:%M:%S.%f')
+            for _key in ('sub_trace_list', 'branch_trace_list'):
+                if _trace.get(_key, None):
+                    _trace[_key] = cls._render_trace_list(_trace[_key])
+            _list.append(_trace)
+
+        return _list
+
     def _get_run_cache(self, run_id: str) -> dict:
         """
         获取指定管道运行id的运行缓存
@@ -1055,6 +1328,24 @@ class Pipeline(object):
             _run_id = None
         return _run_id, _run_cache
 
+    def _get_running_cache(self, run_id: str) -> dict:
+        """
+        获取指定管道运行id的运行缓存, 获取不到抛出异常
+
+        @param {str} run_id - 要获取的管道运行id
+
+        @returns {str, dict} - 运行id, 运行缓存字典
+
+        @throws {RuntimeError} - 运行id不存在时抛出异常
+        """
+        _run_id, _run_cache = self._get_run_cache(run_id)
+        if _run_cache is None:
+            _msg = '[Pipeline:%s] run_id [%s] not exists!' % (self.name, run_id)
+            self.log_error('Error: %s' % _msg)
+            raise RuntimeError(_msg)
+
+        return _run_id, _run_cache
+
     def _change_last_run_id(self, run_id: str):
         """
         更新最后一个run_id的值
@@ -1091,131 +1382,213 @@ class Pipeline(object):
 
         @returns {str} - 返回下一节点ID, 返回None代表结束管道执行, 返回空字符串''代表异步处理
         """
-        _run_id, _run_cache = self._get_run_cache(run_id)
-        if _run_cache is None:
-            _msg = '[Pipeline:%s] run_id [%s] not exists!' % (self.name, run_id)
-            self.log_error('Error: ' % _msg)
-            raise RuntimeError(_msg)
+        _run_id, _run_cache = self._get_running_cache(run_id)
+        try:
+            _step = self._prepare_run_node(_run_id, _run_cache, node_id)
+            if _step['is_skip']:
+                return _step['next_id']
 
-        _node_config = self.pipeline[node_id]
-        # 执行节点处理器
+            # 执行节点处理器
+            if _step['is_parallel']:
+                _result = self._run_parallel_node(_run_id, _run_cache, node_id)
+            else:
+                _result = AsyncTools.sync_run_coroutine(
+                    _step['execute'](*_step['args'], **_step['kwargs'])
+                )
+            return self._finish_run_node(_run_id, node_id, _step, _result)
+        except:
+            return self._run_node_exception(_run_id, _run_cache, node_id)
+
+    async def _async_run_node(self, run_id: str, node_id: str):
+        """
+        执行处理节点(协程模式, 直接在事件循环中await处理器的execute函数)
+
+        @param {str} run_id - 运行id
+        @param {str} node_id - 要执行的节点ID
+
+        @returns {str} - 返回下一节点ID, 返回None代表结束管道执行, 返回空字符串''代表异步处理
+        """
+        _run_id, _run_cache = self._get_running_cache(run_id)
         try:
-            _run_cache['node_id'] = node_id
-            _run_cache['node_status'] = 'R'
-            _run_cache['start_time'] = datetime.datetime.now().strftime(
-                '%Y-%m-%d %H:%M:%S.%f')
-            _run_cache['current_process_info']['total'] = 1
-            _run_cache['current_process_info']['done'] = 0
-            _run_cache['current_process_info']['job_msg'] = ''
-            _run_cache['context'].update(_node_config.get('context', {}))
-
-            # 通知开始运行节点
-            self.log_debug('[Pipeline:%s] Start running [%s] node [%s]' %
-                           (self.name, _run_id, node_id))
-            if self.running_notify_fun is not None:
-                AsyncTools.sync_run_coroutine(
-                    self.running_notify_fun(
-                        self.name, _run_id, node_id,
-                        _node_config.get('name', ''), self
-                    )
+            _step = self._prepare_run_node(_run_id, _run_cache, node_id)
+            if _step['is_skip']:
+                return _step['next_id']
+
+            # 执行节点处理器
+            if _step['is_parallel']:
+                _result = await self._async_run_parallel_node(_run_id, _run_cache, node_id)
+            else:
+                _result = await AsyncTools.async_run_coroutine(
+                    _step['execute'](*_step['args'], **_step['kwargs'])
                 )
+            return self._finish_run_node(_run_id, node_id, _step, _result)
+        except:
+            return self._run_node_exception(_run_id, _run_cache, node_id)
+
+    def _prepare_run_node(self, run_id: str, run_cache: dict, node_id: str) -> dict:
+        """
+        执行处理节点的前置处理(登记状态、通知、预处理, 并准备处理器的执行参数)
 
-            # 执行节点的预处理
-            _predealer_name = _node_config.get('predealer', None)
-            if _predealer_name is not None:
-                _predealer: PipelinePredealer = self.get_plugin('predealer', _predealer_name)
+        @param {str} run_id - 运行id
+        @param {dict} run_cache - 运行缓存
+        @param {str} node_id - 要执行的节点ID
+
+        @returns {dict} - 返回执行步骤信息字典
+            is_skip {bool} - 是否跳过节点执行, 如果为True, 只有next_id一个要素
+            next_id {str} - 跳过节点执行时的下一节点ID
+            is_parallel {bool} - 是否并行节点, 如果为True, 没有处理器相关的要素
+            execute {function} - 要执行的处理器execute函数
+            args {tuple} - 处理器execute函数的固定位置入参
+            kwargs {dict} - 处理器execute函数的kv入参
+            is_asyn {bool} - 处理器是否异步处理
+            sub_pipeline {Pipeline} - 子管道对象, 非子管道节点为None
+        """
+        _node = self._graph[node_id]
+        run_cache['node_id'] = node_id
+        run_cache['node_status'] = 'R'
+        run_cache['start_time'] = _timestamp()
+        _process_info = run_cache['current_process_info']
+        _process_info['total'] = 1
+        _process_info['done'] = 0
+        _process_info['job_msg'] = ''
+        if _node['context'] is not None:
+            run_cache['context'].update(_node['context'])
+
+        # 通知开始运行节点
+        self.log_debug('[Pipeline:%s] Start running [%s] node [%s]', self.name, run_id, node_id)
+        if self.running_notify_fun is not None:
+            AsyncTools.sync_run_coroutine(
+                self.running_notify_fun(
+                    self.name, run_id, node_id, _node['name'], self
+                )
+            )
+
+        # 执行节点的预处理
+        _predealer_name = _node['predealer_name']
+        if _predealer_name is not None:
+            _predealer: PipelinePredealer = _node['predealer']
+            if _predealer is None:
+                # 编译时未装载的插件, 重新获取
+                _predealer = self.get_plugin('predealer', _predealer_name)
                 if _predealer is None:
                     raise ModuleNotFoundError('predealer [%s] is not found' % _predealer_name)
 
-                # 执行获取当前节点的处理指令
-                self.log_debug('[Pipeline:%s] Running [%s] node [%s] predealer [%s]' %
-                    (self.name, _run_id, node_id, _predealer_name)
-                )
-                _predeal_result = _predealer.pre_deal(
-                    _run_cache['current_input'], _run_cache['context'], self, _run_id,
-                    **_node_config.get('predealer_execute_para', {})
-                )
+            # 执行获取当前节点的处理指令
+            self.log_debug(
+                '[Pipeline:%s] Running [%s] node [%s] predealer [%s]', self.name, run_id, node_id, _predealer_name
+            )
+            _predeal_result = _predealer.pre_deal(
+                run_cache['current_input'], run_cache['context'], self, run_id,
+                **_node['predealer_para']
+            )
 
-                if not _predeal_result:
-                    # 需要跳过当前节点的执行
-                    return self._run_router(
-                        _run_id, node_id, output=_run_cache['current_input'], status='K', status_msg='skip'
+            if not _predeal_result:
+                # 需要跳过当前节点的执行
+                return {
+                    'is_skip': True,
+                    'next_id': self._run_router(
+                        run_id, node_id, output=run_cache['current_input'], status='K', status_msg='skip'
                     )
+                }
 
-            # 运行节点
-            _processer: PipelineProcesser = self.get_plugin('processer', _node_config['processor'])
-            if _node_config.get('is_sub_pipeline', False):
-                # 运行的是子管道, 首先获取当前管道对象, 如果是已存在的管道对象, 按恢复方式获取
-                _sub_pipeline = self.running_sub_pipeline.get(_run_id, None)
-                if _sub_pipeline is None:
-                    _sub_pipeline = _processer.get_sub_pipeline(
-                        _run_cache['current_input'], _run_cache['context'], self, _run_id,
-                        _node_config.get('sub_pipeline_para', {}),
-                        **_node_config.get('processor_execute_para', {})
-                    )
-                    self.running_sub_pipeline[_run_id] = _sub_pipeline  # 缓存子管道
-
-                # 检查启动参数是否与当前节点一致, 如果不一致修改为准确的值
-                if _run_cache.get('running_sub_node_id', '-1') != node_id:
-                    _run_cache['running_sub_node_id'] = node_id
-                    _run_cache['is_resume'] = False
-                    _run_cache['run_to_end'] = False
-
-                if _processer.is_asyn():
-                    # 异步处理, 发起执行后直接返回''
-                    AsyncTools.sync_run_coroutine(
-                        _processer.execute(
-                            _run_cache['current_input'], _run_cache['context'], self, _run_id,
-                            _sub_pipeline, is_step_by_step=_run_cache['is_step_by_step'],
-                            is_resume=_run_cache.get('is_resume', False),
-                            run_to_end=_run_cache.get('run_to_end', False),
-                            **_node_config.get('processor_execute_para', {})
-                        )
-                    )
-                    return ''
-                else:
-                    # 同步处理, 获取执行3个返回要素
-                    _, _status, _output = AsyncTools.sync_run_coroutine(
-                        _processer.execute(
-                            _run_cache['current_input'], _run_cache['context'], self, _run_id,
-                            _sub_pipeline, is_step_by_step=_run_cache['is_step_by_step'],
-                            is_resume=_run_cache.get('is_resume', False),
-                            run_to_end=_run_cache.get('run_to_end', False),
-                            **_node_config.get('processor_execute_para', {})
-                        )
-                    )
-                    return self._run_router(
-                        _run_id, node_id, output=_output, status=_status,
-                        status_msg=_sub_pipeline.current_node_status_msg(run_id=_run_id)
-                    )
-            else:
-                # 运行当前管道任务
-                if _processer.is_asyn():
-                    # 异步处理, 发起执行后直接返回''
-                    AsyncTools.sync_run_coroutine(
-                        _processer.execute(
-                            _run_cache['current_input'], _run_cache['context'], self, _run_id,
-                            **_node_config.get('processor_execute_para', {})
-                        )
-                    )
-                    return ''
-                else:
-                    # 同步处理
-                    _output = AsyncTools.sync_run_coroutine(
-                        _processer.execute(
-                            _run_cache['current_input'], _run_cache['context'], self, _run_id,
-                            **_node_config.get('processor_execute_para', {})
-                        )
-                    )
-                    return self._run_router(_run_id, node_id, output=_output, status='S', status_msg='success')
-        except:
-            _status_msg = traceback.format_exc()
-            self.log_warning('Warning: [Pipeline:%s] Running [%s] node [%s] error: %s' %
-                             (self.name, _run_id, node_id, _status_msg))
-            # 异常情况, output跟原来的input一致
-            return self._run_router(_run_id, node_id, output=_run_cache['current_input'], status='E', status_msg=_status_msg)
+        if _node['is_parallel']:
+            # 并行节点, 由_run_parallel_node执行分支处理
+            return {'is_skip': False, 'is_parallel': True}
+
+        # 准备处理器的执行参数
+        _processer: PipelineProcesser = _node['processer']
+        if _processer is None:
+            # 异步管道在运行时获取处理器
+            _processer = self.get_plugin('processer', _node['processor_name'])
+            if _processer is None:
+                raise ModuleNotFoundError('processer [%s] is not found' % _node['processor_name'])
+
+        _step = {
+            'is_skip': False,
+            'is_parallel': False,
+            'execute': _processer.execute,
+            'args': (run_cache['current_input'], run_cache['context'], self, run_id),
+            'kwargs': _node['processor_para'],
+            'is_asyn': _processer.is_asyn(),
+            'sub_pipeline': None
+        }
+        if _node['is_sub_pipeline']:
+            # 运行的是子管道, 首先获取当前管道对象, 如果是已存在的管道对象, 按恢复方式获取
+            _sub_pipeline = self.running_sub_pipeline.get(run_id, None)
+            if _sub_pipeline is None:
+                _sub_pipeline = _processer.get_sub_pipeline(
+                    run_cache['current_input'], run_cache['context'], self, run_id,
+                    _node['sub_pipeline_para'], **_node['processor_para']
+                )
+                self.running_sub_pipeline[run_id] = _sub_pipeline  # 缓存子管道
+
+            # 检查启动参数是否与当前节点一致, 如果不一致修改为准确的值
+            if run_cache.get('running_sub_node_id', '-1') != node_id:
+                run_cache['running_sub_node_id'] = node_id
+                run_cache['is_resume'] = False
+                run_cache['run_to_end'] = False
+
+            _step['sub_pipeline'] = _sub_pipeline
+            _step['args'] = _step['args'] + (_sub_pipeline, )
+            _step['kwargs'] = dict(
+                _step['kwargs'], is_step_by_step=run_cache['is_step_by_step'],
+                is_resume=run_cache.get('is_resume', False),
+                run_to_end=run_cache.get('run_to_end', False)
+            )
+
+        return _step
+
+    def _finish_run_node(self, run_id: str, node_id: str, step: dict, result) -> str:
+        """
+        处理器执行完成后的处理(执行路由判断)
+
+        @param {str} run_id - 运行id
+        @param {str} node_id - 执行的节点ID
+        @param {dict} step - _prepare_run_node返回的执行步骤信息字典
+        @param {object} result - 处理器execute函数的返回值(并行节点为汇合处理的返回值)
+
+        @returns {str} - 返回下一节点ID, 返回None代表结束管道执行, 返回空字符串''代表异步处理
+        """
+        if step['is_parallel']:
+            # 并行节点, 执行结果为汇合后的4个要素
+            _status, _output, _status_msg, _branch_trace_list = result
+            return self._run_router(
+                run_id, node_id, output=_output, status=_status, status_msg=_status_msg,
+                branch_trace_list=_branch_trace_list
+            )
+
+        if step['is_asyn']:
+            # 异步处理, 发起执行后直接返回''
+            return ''
+
+        if step['sub_pipeline'] is not None:
+            # 子管道同步处理, 获取执行3个返回要素
+            _, _status, _output = result
+            return self._run_router(
+                run_id, node_id, output=_output, status=_status,
+                status_msg=step['sub_pipeline'].current_node_status_msg(run_id=run_id)
+            )
+
+        return self._run_router(run_id, node_id, output=result, status='S', status_msg='success')
+
+    def _run_node_exception(self, run_id: str, run_cache: dict, node_id: str) -> str:
+        """
+        执行处理节点出现异常的处理
+
+        @param {str} run_id - 运行id
+        @param {dict} run_cache - 运行缓存
+        @param {str} node_id - 执行的节点ID
 
-    def _run_router(self, run_id: str, node_id: str, output=None, status: str = 'S', status_msg: str = 'success') -> str:
+        @returns {str} - 返回下一节点ID, 返回None代表结束管道执行
+        """
+        _status_msg = traceback.format_exc()
+        self.log_warning('Warning: [Pipeline:%s] Running [%s] node [%s] error: %s',
+                         self.name, run_id, node_id, _status_msg)
+        # 异常情况, output跟原来的input一致
+        return self._run_router(run_id, node_id, output=run_cache['current_input'], status='E', status_msg=_status_msg)
+
+    def _run_router(self, run_id: str, node_id: str, output=None, status: str = 'S', status_msg: str = 'success',
+                    branch_trace_list: list = None) -> str:
         """
         执行路由判断
 
@@ -1224,6 +1597,7 @@ class Pipeline(object):
         @param {object} output=None - 节点执行输出结果
         @param {str} status='S' - 节点运行状态, 'S' - 成功, 'E' - 出现异常, 'P' - 子管道暂停, 'K' - 跳过节点执行
         @param {str} status_msg='success' - 运行状态描述
+        @param {list} branch_trace_list=None - 并行节点各分支的执行信息
 
         @returns {str} - 返回下一节点ID, 如果已是最后节点返回None
         """
@@ -1236,33 +1610,33 @@ class Pipeline(object):
         # 登记执行任务
         _run_cache['node_status_msg'] = status_msg
 
-        _node_config = self.pipeline[node_id]
+        _node = self._graph[node_id]
         _router_name = ''
-        _router_para = {}
-        if status == 'E' and _node_config.get('exception_router', '') != '':
-            _router_name = _node_config['exception_router']
-            _router_para = _node_config.get('exception_router_para', {})
+        _router = None
+        _router_para = None
+        if status == 'E' and _node['exception_router_name'] != '':
+            _router_name = _node['exception_router_name']
+            _router = _node['exception_router']
+            _router_para = _node['exception_router_para']
         elif status == 'S':
-            _router_name = _node_config.get('router', '')
-            _router_para = _node_config.get('router_para', {})
-        elif status == 'K':
-            # 跳过节点
-            _router_name = ''
-            _router_para = {}
+            _router_name = _node['router_name']
+            _router = _node['router']
+            _router_para = _node['router_para']
 
         # 对子管道执行进行处理
-        _is_sub_pipeline = _node_config.get('is_sub_pipeline', False)
+        _is_sub_pipeline = _node['is_sub_pipeline']
         _sub_name = ''
         _sub_trace_list = []
         if status != 'K' and _is_sub_pipeline:
             _sub_name = self.running_sub_pipeline[_run_id].name
-            _sub_trace_list = copy.deepcopy(
-                self.running_sub_pipeline[_run_id].trace_list(run_id=_run_id)
+            # 追踪记录登记后不会再修改, 只需复制列表
+            _sub_trace_list = list(
+                self.running_sub_pipeline[_run_id]._get_running_cache(_run_id)[1]['trace_list']
             )
             if status == 'S' or _router_name != '':
                 # 无需再使用子管道
                 self.running_sub_pipeline[_run_id].remove(run_id=_run_id)
-                self.running_sub_pipeline.pop(_run_id, None)
+                self.running_sub_pipeline.pop(_run_id).close(wait=False)
                 _run_cache['running_sub_node_id'] = node_id
                 _run_cache['is_resume'] = False
                 _run_cache['run_to_end'] = False
@@ -1270,25 +1644,27 @@ class Pipeline(object):
         # 登记记录
         _run_cache['trace_list'].append({
             'node_id': node_id,
-            'node_name': _node_config.get('name', ''),
-            'processor_name': _node_config['processor'],
+            'node_name': _node['name'],
+            'processor_name': _node['processor_name'],
             'start_time': _run_cache['start_time'],
-            'end_time': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'),
+            'end_time': _timestamp(),
             'status': status,
             'status_msg': status_msg,
             'router_name': _router_name,
             'is_sub_pipeline': _is_sub_pipeline,
             'sub_name': _sub_name,
-            'sub_trace_list': _sub_trace_list
+            'sub_trace_list': _sub_trace_list,
+            'is_parallel': _node['is_parallel'],
+            'branch_trace_list': branch_trace_list if branch_trace_list is not None else []
         })
 
         # 通知运行结束节点
-        self.log_debug('[Pipeline:%s]Running [%s] node [%s] end: status[%s] status_msg[%s]' %
-                       (self.name, _run_id, node_id, status, status_msg))
+        self.log_debug('[Pipeline:%s]Running [%s] node [%s] end: status[%s] status_msg[%s]',
+                       self.name, _run_id, node_id, status, status_msg)
         if self.end_running_notify_fun is not None:
             AsyncTools.sync_run_coroutine(
                 self.end_running_notify_fun(
-                    self.name, _run_id, node_id, _node_config.get('name', ''), status, status_msg, self
+                    self.name, _run_id, node_id, _node['name'], status, status_msg, self
                 )
             )
 
@@ -1308,11 +1684,11 @@ class Pipeline(object):
             # 获取下一个节点
             if _router_name == '':
                 # 没有设置路由器, 按顺序获取下一个节点(已排除了异常情况)
-                _temp_id = str(int(node_id) + 1)
-                if _temp_id in self.pipeline.keys():
-                    _next_id = _temp_id
+                _next_id = _node['next_id']
             else:
-                _router: PipelineRouter = self.get_plugin('router', _router_name)
+                if _router is None:
+                    # 编译时未装载的插件, 重新获取
+                    _router = self.get_plugin('router', _router_name)
                 _next_id = _router.get_next(
                     output, _run_cache['context'], self, _run_id, **_router_para)
 
@@ -1336,7 +1712,18 @@ class Pipeline(object):
         启动运行线程
 
         @param {str} run_id - 运行id
+            注: 如果指定了调度器, 将运行任务提交到调度器执行, 不再单独创建线程
         """
+        if self.scheduler is not None:
+            try:
+                self.scheduler.submit(self, run_id)
+            except:
+                # 提交失败(例如调度器繁忙超时), 结束掉执行
+                _run_id, _run_cache = self._get_running_cache(run_id)
+                self._set_running_exception(_run_id, _run_cache)
+                raise
+            return
+
         # 启动运行线程
         _running_thread = threading.Thread(
             target=self._running_thread_fun,
@@ -1352,44 +1739,445 @@ class Pipeline(object):
 
         @param {str} run_id - 运行id
         """
-        _run_id, _run_cache = self._get_run_cache(run_id)
-        if _run_cache is None:
-            _msg = '[Pipeline:%s] run_id [%s] not exists!' % (self.name, run_id)
-            self.log_error('Error: ' % _msg)
-            raise RuntimeError(_msg)
-
+        _run_id, _run_cache = self._get_running_cache(run_id)
         _run_cache['thread_running'] = True
         try:
-            while _run_cache['status'] == 'R':
-                if _run_cache['node_status'] == 'R':
-                    # 当前节点正在执行, 未返回执行结果
-                    break
-
+            while _run_cache['status'] == 'R' and _run_cache['node_status'] != 'R':
                 # 执行当前节点
                 _next_id = self._run_node(_run_id, _run_cache['node_id'])
-                if _next_id is None:
-                    # 已经是最后一个节点
+                _is_continue = self._goto_next_node(_run_id, _run_cache, _next_id)
+                self._save_run_checkpoint(_run_id, _run_cache)
+                if not _is_continue:
                     break
-                else:
-                    # 判断是否要逐步执行
-                    if _run_cache['is_step_by_step']:
-                        # 执行一步就设置状态为暂停
-                        self._set_status('P', _run_id)
+        except:
+            self._set_running_exception(_run_id, _run_cache)
+            raise
+        finally:
+            _run_cache['thread_running'] = False
 
-                    if _next_id == '':
-                        # 异步模式, 直接退出线程处理
-                        break
-                    else:
-                        # 设置上下文, 执行下一个节点
-                        _run_cache['node_id'] = _next_id
-                        _run_cache['node_status'] = 'I'
-                        _run_cache['node_status_msg'] = ''
-                        RunTool.sleep(0.0001)
+    async def _async_running_fun(self, run_id: str):
+        """
+        管道运行协程(由协程调度器在事件循环中执行)
+
+        @param {str} run_id - 运行id
+        """
+        _run_id, _run_cache = self._get_running_cache(run_id)
+        _run_cache['thread_running'] = True
+        try:
+            while _run_cache['status'] == 'R' and _run_cache['node_status'] != 'R':
+                # 执行当前节点
+                _next_id = await self._async_run_node(_run_id, _run_cache['node_id'])
+                _is_continue = self._goto_next_node(_run_id, _run_cache, _next_id)
+                self._save_run_checkpoint(_run_id, _run_cache)
+                if not _is_continue:
+                    break
         except:
-            # 如果在线程中出了异常, 结束掉执行
-            _run_cache['node_status'] = 'E'
-            self._set_status('E', _run_id)
-            _run_cache['output'] = None
+            self._set_running_exception(_run_id, _run_cache)
             raise
         finally:
             _run_cache['thread_running'] = False
+
+    def _goto_next_node(self, run_id: str, run_cache: dict, next_id: str) -> bool:
+        """
+        节点执行完成后切换到下一节点
+
+        @param {str} run_id - 运行id
+        @param {dict} run_cache - 运行缓存
+        @param {str} next_id - _run_node返回的下一节点ID
+
+        @returns {bool} - 是否继续执行下一节点
+        """
+        if next_id is None:
+            # 已经是最后一个节点
+            return False
+
+        # 判断是否要逐步执行
+        if run_cache['is_step_by_step']:
+            # 执行一步就设置状态为暂停
+            self._set_status('P', run_id)
+
+        if next_id == '':
+            # 异步模式, 直接退出线程处理
+            return False
+
+        # 设置上下文, 执行下一个节点
+        run_cache['node_id'] = next_id
+        run_cache['node_status'] = 'I'
+        run_cache['node_status_msg'] = ''
+        return True
+
+    def _set_running_exception(self, run_id: str, run_cache: dict):
+        """
+        运行线程出现异常的处理, 结束掉执行
+
+        @param {str} run_id - 运行id
+        @param {dict} run_cache - 运行缓存
+        """
+        run_cache['node_status'] = 'E'
+        self._set_status('E', run_id)
+        run_cache['output'] = None
+        self._save_run_checkpoint(run_id, run_cache)
+
+    def _load_run_cache(self, run_id: str, run_cache: dict, ignore_exists: bool):
+        """
+        装载检查点中的单个运行状态
+
+        @param {str} run_id - 运行id
+        @param {dict} run_cache - 运行缓存
+        @param {bool} ignore_exists - 子管道装载是否忽略已存在运行管道
+        """
+        # 正在运行的子管道支持
+        _sub_pipeline_json = run_cache.get('running_sub_pipeline', None)
+        if _sub_pipeline_json is not None:
+            # 装载子管道
+            _node_config = self.pipeline[run_cache['node_id']]
+            _processer = self.get_plugin('processer', _node_config['processor'])
+            _sub_pipeline = _processer.get_sub_pipeline(
+                run_cache['current_input'], run_cache['context'], self, run_id,
+                _node_config.get('sub_pipeline_para', {}),
+                **_node_config.get('processor_execute_para', {})
+            )
+            _sub_pipeline.load_checkpoint(_sub_pipeline_json, ignore_exists)
+            self.running_sub_pipeline[run_id] = _sub_pipeline
+
+            # 移除配置子管道配置
+            run_cache.pop('running_sub_pipeline')
+
+        self._cache[run_id] = run_cache
+        self._status_locks[run_id] = threading.Lock()
+        self._change_last_run_id(run_id)
+
+    def _save_run_checkpoint(self, run_id: str, run_cache: dict, is_reset: bool = False):
+        """
+        将运行状态增量保存到检查点存储
+        注: 运行状态(不含追踪列表)整体保存, 追踪列表只保存上次保存后新增的记录; 保存失败只登记日志, 不影响管道执行
+
+        @param {str} run_id - 运行id
+        @param {dict} run_cache - 运行缓存
+        @param {bool} is_reset=False - 是否重新保存整个追踪列表
+        """
+        if self.checkpoint_store is None:
+            return
+
+        try:
+            _state = dict(run_cache)
+            _trace_list = _state.pop('trace_list')
+
+            # 增加对暂停的子管道的保存
+            _sub_pipeline = self.running_sub_pipeline.get(run_id, None)
+            _sub_run_cache = None if _sub_pipeline is None else _sub_pipeline._get_run_cache(run_id)[1]
+            if _sub_run_cache is not None and _sub_run_cache['status'] != 'R':
+                _state['running_sub_pipeline'] = _sub_pipeline.save_checkpoint(run_id=run_id)
+
+            _trace_seq, _saved_num = self._checkpoint_traces.get(run_id, (0, 0))
+            if is_reset or _saved_num > len(_trace_list):
+                _trace_seq, _saved_num = 0, 0
+
+            self.checkpoint_store.save_run(
+                self.name, run_id, run_cache['status'], json.dumps(_state, ensure_ascii=False),
+                trace_start=_trace_seq + _saved_num,
+                traces=[json.dumps(_trace, ensure_ascii=False) for _trace in _trace_list[_saved_num:]]
+            )
+            self._checkpoint_traces[run_id] = (_trace_seq, len(_trace_list))
+        except:
+            self.log_error('Error: [Pipeline:%s] Save [%s] checkpoint error: %s',
+                           self.name, run_id, traceback.format_exc())
+
+    #############################
+    # 并行节点处理
+    #############################
+    def _get_parallel_executor(self) -> ThreadPoolExecutor:
+        """
+        获取执行并行分支的线程池
+
+        @returns {ThreadPoolExecutor} - 线程池对象
+        """
+        if self._parallel_executor is None:
+            with self._parallel_executor_lock:
+                if self._parallel_executor is None:
+                    self._parallel_executor = ThreadPoolExecutor(
+                        max_workers=self.parallel_max_workers,
+                        thread_name_prefix='Thread-Pipeline-Parallel'
+                    )
+
+        return self._parallel_executor
+
+    def _prepare_parallel_results(self, run_cache: dict, node_id: str) -> list:
+        """
+        获取并行节点的分支执行结果, 并清除未成功分支的结果以便重新执行
+
+        @param {dict} run_cache - 运行缓存
+        @param {str} node_id - 并行节点ID
+
+        @returns {list} - 按分支顺序的执行结果数组, 需执行的分支为None
+        """
+        _branch_num = len(self._graph[node_id]['branches'])
+        _parallel_results = run_cache.setdefault('parallel_results', dict())
+        _results = _parallel_results.get(node_id, None)
+        if _results is None or len(_results) != _branch_num:
+            _results = [None] * _branch_num
+            _parallel_results[node_id] = _results
+        else:
+            for _index in range(_branch_num):
+                if _results[_index] is not None and _results[_index]['status'] != 'S':
+                    _results[_index] = None
+
+        return _results
+
+    def _get_branch_context(self, run_cache: dict, node_id: str, index: int) -> dict:
+        """
+        获取分支执行的上下文(管道上下文的浅复制对象)
+        注: 只隔离上下文的第一层key, 上下文中的可变对象仍由各分支及管道共享
+
+        @param {dict} run_cache - 运行缓存
+        @param {str} node_id - 并行节点ID
+        @param {int} index - 分支序号
+
+        @returns {dict} - 分支上下文
+        """
+        _context = dict(run_cache['context'])
+        _branch_context = self._graph[node_id]['branches'][index]['context']
+        if _branch_context is not None:
+            _context.update(_branch_context)
+        return _context
+
+    def _run_parallel_branch(self, run_id: str, node_id: str, index: int, input_data, context: dict) -> dict:
+        """
+        执行并行节点的分支(同步模式, 在线程池中执行)
+
+        @param {str} run_id - 运行id
+        @param {str} node_id - 并行节点ID
+        @param {int} index - 分支序号
+        @param {object} input_data - 输入数据
+        @param {dict} context - 分支上下文
+
+        @returns {dict} - 分支执行结果, 包括start_time, end_time, status, status_msg, output, context
+        """
+        _branch = self._graph[node_id]['branches'][index]
+        _result = {
+            'start_time': _timestamp(),
+            'status': 'S', 'status_msg': 'success', 'output': None, 'context': context
+        }
+        try:
+            _result['output'] = AsyncTools.sync_run_coroutine(
+                _branch['execute'](input_data, context, self, run_id, **_branch['processor_para'])
+            )
+        except:
+            self._set_branch_exception(run_id, node_id, index, _result)
+
+        _result['end_time'] = _timestamp()
+        return _result
+
+    async def _async_run_parallel_branch(self, run_id: str, node_id: str, index: int, input_data, context: dict) -> dict:
+        """
+        执行并行节点的分支(协程模式)
+        注: 处理器的execute为协程函数时直接await, 否则放入线程池执行
+
+        @param {str} run_id - 运行id
+        @param {str} node_id - 并行节点ID
+        @param {int} index - 分支序号
+        @param {object} input_data - 输入数据
+        @param {dict} context - 分支上下文
+
+        @returns {dict} - 分支执行结果, 包括start_time, end_time, status, status_msg, output, context
+        """
+        _branch = self._graph[node_id]['branches'][index]
+        if not _branch['is_coroutine']:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_parallel_executor(), self._run_parallel_branch,
+                run_id, node_id, index, input_data, context
+            )
+
+        _result = {
+            'start_time': _timestamp(),
+            'status': 'S', 'status_msg': 'success', 'output': None, 'context': context
+        }
+        try:
+            _result['output'] = await _branch['execute'](
+                input_data, context, self, run_id, **_branch['processor_para']
+            )
+        except asyncio.CancelledError:
+            raise
+        except:
+            self._set_branch_exception(run_id, node_id, index, _result)
+
+        _result['end_time'] = _timestamp()
+        return _result
+
+    def _set_branch_exception(self, run_id: str, node_id: str, index: int, result: dict):
+        """
+        登记分支执行异常
+
+        @param {str} run_id - 运行id
+        @param {str} node_id - 并行节点ID
+        @param {int} index - 分支序号
+        @param {dict} result - 分支执行结果
+        """
+        result['status'] = 'E'
+        result['status_msg'] = traceback.format_exc()
+        result['context'] = None
+        self.log_warning('Warning: [Pipeline:%s] Running [%s] node [%s] branch [%d] error: %s',
+                         self.name, run_id, node_id, index, result['status_msg'])
+
+    def _check_parallel_join(self, node_id: str, results: list) -> str:
+        """
+        检查并行节点是否满足汇合条件
+
+        @param {str} node_id - 并行节点ID
+        @param {list} results - 按分支顺序的执行结果数组
+
+        @returns {str} - 'S' - 汇合成功, 'E' - 汇合失败(剩余分支全部成功也无法满足汇合策略), '' - 需继续等待
+        """
+        _need = self._graph[node_id]['join_need']
+        _total = len(results)
+        _finished = 0
+        _success = 0
+        for _result in results:
+            if _result is not None:
+                _finished += 1
+                if _result['status'] == 'S':
+                    _success += 1
+
+        if _success >= _need:
+            return 'S'
+        elif _success + _total - _finished < _need:
+            return 'E'
+        else:
+            return ''
+
+    def _join_parallel_results(self, run_cache: dict, node_id: str, results: list, done_order: list) -> tuple:
+        """
+        按汇合策略合并并行节点的分支执行结果
+
+        @param {dict} run_cache - 运行缓存
+        @param {str} node_id - 并行节点ID
+        @param {list} results - 按分支顺序的执行结果数组
+        @param {list} done_order - 本次执行的分支完成顺序(分支序号数组)
+
+        @returns {str, object, str, list} - 返回 status, output, status_msg, branch_trace_list
+        """
+        _node = self._graph[node_id]
+        _branches = _node['branches']
+        _branch_trace_list = list()
+        for _index in range(len(_branches)):
+            _result = results[_index]
+            if _result is None:
+                _result = {'start_time': '', 'end_time': '', 'status': 'C', 'status_msg': 'cancelled'}
+            _branch_trace_list.append({
+                'branch_index': _index,
+                'branch_name': _branches[_index]['name'],
+                'processor_name': _branches[_index]['processor_name'],
+                'start_time': _result['start_time'],
+                'end_time': _result['end_time'],
+                'status': _result['status'],
+                'status_msg': _result['status_msg']
+            })
+
+        if self._check_parallel_join(node_id, results) != 'S':
+            # 汇合失败, 保留分支执行结果, 输出跟原来的input一致
+            _status_msg = 'parallel join [%s] failed: %s' % (
+                _node['join_policy'],
+                '; '.join([
+                    'branch [%d] %s' % (_trace['branch_index'], _trace['status_msg'])
+                    for _trace in _branch_trace_list if _trace['status'] != 'S'
+                ])
+            )
+            return 'E', run_cache['current_input'], _status_msg, _branch_trace_list
+
+        # 汇合成功, 获取输出并按分支顺序合并上下文
+        _success_index = [
+            _index for _index in range(len(results))
+            if results[_index] is not None and results[_index]['status'] == 'S'
+        ]
+        if _node['join_policy'] == 'first_success' and len(_success_index) > 0:
+            for _index in done_order:
+                if results[_index]['status'] == 'S':
+                    _success_index = [_index]
+                    break
+            else:
+                _success_index = _success_index[0: 1]
+            _output = results[_success_index[0]]['output']
+        else:
+            _output = [results[_index]['output'] for _index in _success_index]
+
+        for _index in _success_index:
+            run_cache['context'].update(results[_index]['context'])
+
+        run_cache['parallel_results'].pop(node_id, None)
+        return 'S', _output, 'success', _branch_trace_list
+
+    def _run_parallel_node(self, run_id: str, run_cache: dict, node_id: str) -> tuple:
+        """
+        执行并行节点(同步模式, 分支在线程池中并发执行)
+        注: 满足汇合条件后不再等待其他分支, 但已在执行的分支线程无法中止
+
+        @param {str} run_id - 运行id
+        @param {dict} run_cache - 运行缓存
+        @param {str} node_id - 并行节点ID
+
+        @returns {str, object, str, list} - 返回 status, output, status_msg, branch_trace_list
+        """
+        _results = self._prepare_parallel_results(run_cache, node_id)
+        _done_order = list()
+        if self._check_parallel_join(node_id, _results) == '':
+            _executor = self._get_parallel_executor()
+            _futures = dict()
+            for _index in range(len(_results)):
+                if _results[_index] is None:
+                    _future = _executor.submit(
+                        self._run_parallel_branch, run_id, node_id, _index,
+                        run_cache['current_input'], self._get_branch_context(run_cache, node_id, _index)
+                    )
+                    _futures[_future] = _index
+
+            try:
+                for _future in as_completed(_futures):
+                    _index = _futures[_future]
+                    _results[_index] = _future.result()
+                    _done_order.append(_index)
+                    if self._check_parallel_join(node_id, _results) != '':
+                        break
+            finally:
+                for _future in _futures.keys():
+                    _future.cancel()
+
+        return self._join_parallel_results(run_cache, node_id, _results, _done_order)
+
+    async def _async_run_parallel_node(self, run_id: str, run_cache: dict, node_id: str) -> tuple:
+        """
+        执行并行节点(协程模式, 分支作为协程任务并发执行)
+        注: 满足汇合条件后将取消未完成的分支任务
+
+        @param {str} run_id - 运行id
+        @param {dict} run_cache - 运行缓存
+        @param {str} node_id - 并行节点ID
+
+        @returns {str, object, str, list} - 返回 status, output, status_msg, branch_trace_list
+        """
+        _results = self._prepare_parallel_results(run_cache, node_id)
+        _done_order = list()
+        if self._check_parallel_join(node_id, _results) == '':
+            _tasks = dict()
+            for _index in range(len(_results)):
+                if _results[_index] is None:
+                    _task = asyncio.ensure_future(self._async_run_parallel_branch(
+                        run_id, node_id, _index,
+                        run_cache['current_input'], self._get_branch_context(run_cache, node_id, _index)
+                    ))
+                    _tasks[_task] = _index
+
+            _pending = set(_tasks.keys())
+            try:
+                while len(_pending) > 0:
+                    _done, _pending = await asyncio.wait(_pending, return_when=asyncio.FIRST_COMPLETED)
+                    for _task in sorted(_done, key=lambda _item: _tasks[_item]):
+                        _results[_tasks[_task]] = _task.result()
+                        _done_order.append(_tasks[_task])
+
+                    if self._check_parallel_join(node_id, _results) != '':
+                        break
+            finally:
+                for _task in _pending:
+                    _task.cancel()
+
+        return self._join_parallel_results(run_cache, node_id, _results, _done_order)
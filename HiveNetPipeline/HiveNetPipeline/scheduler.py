@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2022 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+管道运行调度器
+(异步模式下将管道运行任务放入共享的执行器运行, 替代每次运行单独创建一个线程的处理方式)
+
+@module scheduler
+@file scheduler.py
+"""
+
+import os
+import sys
+import asyncio
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from HiveNetCore.utils.run_tool import AsyncTools
+# 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+
+
+__MOUDLE__ = 'scheduler'  # 模块名
+__DESCRIPT__ = u'管道运行调度器'  # 模块描述
+__VERSION__ = '0.1.0'  # 版本
+__AUTHOR__ = u'黎慧剑'  # 作者
+__PUBLISH__ = '2022.10.19'  # 发布日期
+
+
+class PipelineScheduler(object):
+    """
+    管道运行调度器框架
+    提供运行任务排队的背压控制(限制未完成的运行任务数)以及单个管道的并发运行数限制,
+    实际的执行方式由继承类通过_dispatch实现
+    """
+
+    #############################
+    # 构造函数
+    #############################
+    def __init__(self, max_pending: int = 0, max_running_per_pipeline: int = 0,
+                 submit_timeout: float = None):
+        """
+        构造函数
+
+        @param {int} max_pending=0 - 最大未完成运行任务数(包括正在运行和排队中的任务), 0代表不限制
+            注: 达到上限时提交任务将阻塞等待, 从而对管道的start/resume调用方形成背压;
+                在调度器内部运行的任务(例如异步节点的反馈)不受该限制, 避免死锁
+        @param {int} max_running_per_pipeline=0 - 单个管道对象的最大并发运行数, 0代表不限制
+            注: 超过限制的运行任务将在该管道的等待队列中排队, 有运行任务完成后按顺序执行
+        @param {float} submit_timeout=None - 达到max_pending上限时提交任务的最长等待时间(秒), None代表一直等待
+        """
+        self.max_pending = max_pending
+        self.max_running_per_pipeline = max_running_per_pipeline
+        self.submit_timeout = submit_timeout
+
+        # 背压控制的信号量
+        self._pending_sem = None
+        if max_pending > 0:
+            self._pending_sem = threading.BoundedSemaphore(max_pending)
+
+        # 单管道并发控制, key为管道对象
+        self._lock = threading.Lock()
+        self._pipeline_running = dict()  # 正在运行的任务数
+        self._pipeline_waiting = dict()  # 等待执行的任务队列, value为deque
+        self._idle_cond = threading.Condition(self._lock)  # 所有任务完成的通知
+
+        self._local = threading.local()  # 用于识别是否在调度器内部执行
+        self._pending_num = 0  # 未完成的运行任务数
+        self._closed = False
+
+    #############################
+    # 属性
+    #############################
+    @property
+    def pending_num(self) -> int:
+        """
+        获取未完成的运行任务数(包括正在运行和排队中的任务)
+        @property {int}
+        """
+        return self._pending_num
+
+    @property
+    def closed(self) -> bool:
+        """
+        调度器是否已关闭
+        @property {bool}
+        """
+        return self._closed
+
+    #############################
+    # 公共函数
+    #############################
+    def submit(self, pipeline, run_id: str):
+        """
+        提交管道运行任务
+
+        @param {Pipeline} pipeline - 管道对象
+        @param {str} run_id - 运行id
+
+        @throws {RuntimeError} - 调度器已关闭或等待超时时抛出异常
+        """
+        if self._closed:
+            raise RuntimeError('Pipeline scheduler is closed!')
+
+        # 背压控制
+        _acquired = False
+        if self._pending_sem is not None and not self._is_in_scheduler():
+            if not self._pending_sem.acquire(timeout=self.submit_timeout):
+                raise RuntimeError('Pipeline scheduler is busy: pending [%d]!' % self.max_pending)
+            _acquired = True
+
+        _job = (pipeline, run_id, _acquired)
+        with self._lock:
+            self._pending_num += 1
+            _running = self._pipeline_running.get(pipeline, 0)
+            if self.max_running_per_pipeline > 0 and _running >= self.max_running_per_pipeline:
+                # 超过单管道并发限制, 放入等待队列
+                self._pipeline_waiting.setdefault(pipeline, deque()).append(_job)
+                return
+
+            self._pipeline_running[pipeline] = _running + 1
+
+        self._dispatch(_job)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """
+        等待所有已提交的运行任务执行完成
+
+        @param {float} timeout=None - 超时时间(秒), None代表一直等待
+
+        @returns {bool} - 是否所有任务已完成
+        """
+        with self._idle_cond:
+            return self._idle_cond.wait_for(lambda: self._pending_num <= 0, timeout=timeout)
+
+    def close(self, wait: bool = True):
+        """
+        关闭调度器
+
+        @param {bool} wait=True - 是否等待已提交的任务执行完成
+        """
+        self._closed = True
+        if wait and not self._is_in_scheduler():
+            self.wait_idle()
+
+    #############################
+    # 内部函数
+    #############################
+    def _dispatch(self, job: tuple):
+        """
+        将运行任务放入执行器执行(继承类实现)
+        注: 任务执行完成后必须调用_job_done
+
+        @param {tuple} job - 运行任务(pipeline, run_id, acquired)
+        """
+        raise NotImplementedError()
+
+    def _is_in_scheduler(self) -> bool:
+        """
+        判断当前是否在调度器内部执行
+
+        @returns {bool} - 是否内部执行
+        """
+        return getattr(self._local, 'is_worker', False)
+
+    def _job_done(self, job: tuple):
+        """
+        运行任务完成的处理
+
+        @param {tuple} job - 运行任务(pipeline, run_id, acquired)
+        """
+        _pipeline, _, _acquired = job
+        _next_job = None
+        with self._lock:
+            self._pending_num -= 1
+            _waiting = self._pipeline_waiting.get(_pipeline, None)
+            if _waiting:
+                # 该管道有排队的任务, 直接占用当前的运行名额
+                _next_job = _waiting.popleft()
+                if len(_waiting) == 0:
+                    self._pipeline_waiting.pop(_pipeline, None)
+            else:
+                _running = self._pipeline_running.get(_pipeline, 1) - 1
+                if _running <= 0:
+                    self._pipeline_running.pop(_pipeline, None)
+                else:
+                    self._pipeline_running[_pipeline] = _running
+
+            if self._pending_num <= 0:
+                self._idle_cond.notify_all()
+
+        if _acquired:
+            self._pending_sem.release()
+
+        if _next_job is not None:
+            self._dispatch(_next_job)
+
+    def _log_job_exception(self, job: tuple):
+        """
+        登记运行任务的异常日志
+
+        @param {tuple} job - 运行任务(pipeline, run_id, acquired)
+        """
+        _pipeline, _run_id, _ = job
+        _pipeline.log_error('Error: [Pipeline:%s] Running [%s] on scheduler error: %s' % (
+            _pipeline.name, _run_id, traceback.format_exc()
+        ))
+
+
+class ThreadPoolScheduler(PipelineScheduler):
+    """
+    线程池调度器
+    使用固定数量的线程执行管道运行任务, 每个工作线程复用自己的事件循环
+    """
+
+    def __init__(self, max_workers: int = 8, max_pending: int = 0, max_running_per_pipeline: int = 0,
+                 submit_timeout: float = None):
+        """
+        构造函数
+
+        @param {int} max_workers=8 - 最大工作线程数
+        @param {int} max_pending=0 - 最大未完成运行任务数(包括正在运行和排队中的任务), 0代表不限制
+        @param {int} max_running_per_pipeline=0 - 单个管道对象的最大并发运行数, 0代表不限制
+        @param {float} submit_timeout=None - 达到max_pending上限时提交任务的最长等待时间(秒), None代表一直等待
+        """
+        super().__init__(
+            max_pending=max_pending, max_running_per_pipeline=max_running_per_pipeline,
+            submit_timeout=submit_timeout
+        )
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='Thread-Pipeline-Scheduler'
+        )
+
+    def close(self, wait: bool = True):
+        """
+        关闭调度器
+
+        @param {bool} wait=True - 是否等待已提交的任务执行完成
+        """
+        super().close(wait=wait)
+        self._executor.shutdown(wait=wait)
+
+    #############################
+    # 内部函数
+    #############################
+    def _dispatch(self, job: tuple):
+        """
+        将运行任务放入线程池执行
+
+        @param {tuple} job - 运行任务(pipeline, run_id, acquired)
+        """
+        self._executor.submit(self._run_job, job)
+
+    def _run_job(self, job: tuple):
+        """
+        在工作线程中执行运行任务
+
+        @param {tuple} job - 运行任务(pipeline, run_id, acquired)
+        """
+        self._local.is_worker = True
+        try:
+            job[0]._running_thread_fun(job[1])
+        except:
+            self._log_job_exception(job)
+        finally:
+            self._job_done(job)
+
+
+class AsyncioScheduler(PipelineScheduler):
+    """
+    协程调度器
+    在一个独立线程中运行单一的事件循环, 所有管道运行任务作为协程在该循环中执行,
+    处理器的execute如果是协程函数将被直接await
+
+    注: 处理器的同步阻塞操作会阻塞整个事件循环, 适合处理器为协程函数或非常轻量的场景
+    """
+
+    def __init__(self, max_running: int = 0, max_pending: int = 0, max_running_per_pipeline: int = 0,
+                 submit_timeout: float = None):
+        """
+        构造函数
+
+        @param {int} max_running=0 - 最大同时运行的任务数, 0代表不限制
+        @param {int} max_pending=0 - 最大未完成运行任务数(包括正在运行和排队中的任务), 0代表不限制
+        @param {int} max_running_per_pipeline=0 - 单个管道对象的最大并发运行数, 0代表不限制
+        @param {float} submit_timeout=None - 达到max_pending上限时提交任务的最长等待时间(秒), None代表一直等待
+        """
+        super().__init__(
+            max_pending=max_pending, max_running_per_pipeline=max_running_per_pipeline,
+            submit_timeout=submit_timeout
+        )
+        self.max_running = max_running
+
+        # 启动事件循环线程
+        self._loop = asyncio.new_event_loop()
+        self._running_sem = None
+        self._tasks = set()  # 正在执行的任务, 避免任务对象被回收
+        _started = threading.Event()
+        self._loop_thread = threading.Thread(
+            target=self._loop_thread_fun, name='Thread-Pipeline-AsyncioScheduler',
+            args=(_started, ), daemon=True
+        )
+        self._loop_thread.start()
+        _started.wait()
+
+    @property
+    def loop(self):
+        """
+        获取调度器的事件循环
+        @property {AbstractEventLoop}
+        """
+        return self._loop
+
+    def close(self, wait: bool = True):
+        """
+        关闭调度器
+
+        @param {bool} wait=True - 是否等待已提交的任务执行完成
+        """
+        super().close(wait=wait)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if wait and not self._is_in_scheduler():
+            self._loop_thread.join()
+
+    #############################
+    # 内部函数
+    #############################
+    def _loop_thread_fun(self, started: threading.Event):
+        """
+        事件循环线程函数
+
+        @param {threading.Event} started - 启动完成的通知事件
+        """
+        self._local.is_worker = True
+        asyncio.set_event_loop(self._loop)
+        # 处理器或通知函数内部使用sync_run_coroutine执行协程时, 需允许嵌套执行
+        AsyncTools.nest_asyncio_apply(self._loop)
+        if self.max_running > 0:
+            self._running_sem = asyncio.Semaphore(self.max_running)
+
+        self._loop.call_soon(started.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    def _dispatch(self, job: tuple):
+        """
+        将运行任务放入事件循环执行
+
+        @param {tuple} job - 运行任务(pipeline, run_id, acquired)
+        """
+        if threading.current_thread() is self._loop_thread:
+            self._add_task(job)
+        else:
+            self._loop.call_soon_threadsafe(self._add_task, job)
+
+    def _add_task(self, job: tuple):
+        """
+        创建运行任务(在事件循环线程中执行)
+
+        @param {tuple} job - 运行任务(pipeline, run_id, acquired)
+        """
+        _task = self._loop.create_task(self._run_job(job))
+        self._tasks.add(_task)
+        _task.add_done_callback(self._tasks.discard)
+
+    async def _run_job(self, job: tuple):
+        """
+        在事件循环中执行运行任务
+
+        @param {tuple} job - 运行任务(pipeline, run_id, acquired)
+        """
+        try:
+            if self._running_sem is None:
+                await job[0]._async_running_fun(job[1])
+            else:
+                async with self._running_sem:
+                    await job[0]._async_running_fun(job[1])
+        except:
+            self._log_job_exception(job)
+        finally:
+            self._job_done(job)
+
+
+if __name__ == '__main__':
+    # 当程序自己独立运行时执行的操作
+    # 打印版本信息
+    print(('模块名：%s  -  %s\n'
+           '作者：%s\n'
+           '发布日期：%s\n'
+           '版本：%s' % (__MOUDLE__, __DESCRIPT__, __AUTHOR__, __PUBLISH__, __VERSION__)))
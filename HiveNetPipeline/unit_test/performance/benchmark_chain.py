@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+管道框架节点开销性能测试
+@module benchmark_chain
+@file benchmark_chain.py
+
+执行步骤:
+python benchmark_chain.py [node_num] [run_num]
+
+注: 使用直接返回输入值的处理器组成顺序执行的节点链, 计算每个节点的框架处理开销(微秒);
+    分别测试不设置日志对象、以及设置了日志对象(logging及HiveNetCore的Logger)但未开启DEBUG级别的场景
+"""
+
+import os
+import sys
+import time
+import logging
+from HiveNetCore.logging_hivenet import Logger
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetPipeline import PipelineProcesser, Pipeline
+
+
+class BenchEcho(PipelineProcesser):
+    """
+    直接返回输入值的处理器
+    """
+    @classmethod
+    def processer_name(cls) -> str:
+        return 'BenchEcho'
+
+    @classmethod
+    def execute(cls, input_data, context: dict, pipeline_obj, run_id: str, **kwargs):
+        return input_data
+
+
+def run_case(name: str, node_num: int, run_num: int, logger=None):
+    """
+    执行一个测试场景
+    """
+    _config = [
+        {'name': 'n%d' % _i, 'processor': 'BenchEcho', 'context': {'step': _i},
+         'processor_execute_para': {'para': _i}}
+        for _i in range(node_num)
+    ]
+    _pl = Pipeline('bench_chain', _config, logger=logger)
+    _pl.start(input_data=0)  # 预热
+
+    _start = time.perf_counter()
+    for _ in range(run_num):
+        _run_id, _status, _ = _pl.start(input_data=0)
+        _pl.remove(_run_id)
+    _use = time.perf_counter() - _start
+    assert _status == 'S'
+
+    print('%-24s nodes: %4d  runs: %5d  use: %7.3fs  per node: %7.2fus  runs/s: %8.1f' % (
+        name, node_num, run_num, _use, _use / (node_num * run_num) * 1000000, run_num / _use
+    ))
+
+
+if __name__ == '__main__':
+    _node_num = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    _run_num = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    Pipeline.add_plugin(BenchEcho)
+
+    _logger = logging.getLogger('benchmark_chain')
+    _logger.setLevel(logging.INFO)
+    run_case('no logger', _node_num, _run_num)
+    run_case('logger without debug', _node_num, _run_num, logger=_logger)
+    _hivenet_logger = Logger.create_logger_by_dict({
+        'conf_file_name': '', 'logger_name': 'Console', 'logfile_path': '', 'config_type': 'JSON_STR',
+        'json_str': '{"version": 1, "handlers": {"ConsoleHandler": {"class": "logging.StreamHandler", '
+                    '"level": "INFO"}}, "loggers": {"Console": {"level": "INFO", "handlers": ["ConsoleHandler"]}}}',
+        'auto_create_conf': False, 'is_create_logfile_by_day': False, 'call_fun_level': 0
+    })
+    run_case('hivenet logger (info)', _node_num, _run_num, logger=_hivenet_logger)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+管道检查点保存性能测试
+@module benchmark_checkpoint
+@file benchmark_checkpoint.py
+
+执行步骤:
+python benchmark_checkpoint.py [keep_runs] [node_num] [run_num]
+
+注: 管道中保留keep_runs个已完成的运行, 比较每个节点完成后通过save_checkpoint整体导出所有运行状态,
+    与使用检查点存储(同步写入/异步写入)增量保存当前运行状态的每节点耗时
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetPipeline import PipelineProcesser, Pipeline, SQLiteCheckpointStore
+
+
+class BenchContextAdd(PipelineProcesser):
+    """
+    加1处理器, 同时在上下文中登记处理数据
+    """
+    @classmethod
+    def processer_name(cls) -> str:
+        return 'BenchContextAdd'
+
+    @classmethod
+    def execute(cls, input_data, context: dict, pipeline_obj, run_id: str, **kwargs):
+        context['data_%d' % input_data] = 'x' * 64
+        return input_data + 1
+
+
+def run_case(name: str, keep_runs: int, node_num: int, run_num: int, store=None, full_dump: bool = False):
+    """
+    执行一个测试场景
+    """
+    _config = [{'name': 'n%d' % _i, 'processor': 'BenchContextAdd'} for _i in range(node_num)]
+    _dump_fun = None
+    _pl = Pipeline('bench_checkpoint', _config, checkpoint_store=store)
+    if full_dump:
+        # 每个节点完成后整体导出
+        _dump_fun = (lambda *args: len(_pl.save_checkpoint()))
+
+    for _ in range(keep_runs):
+        _pl.start(input_data=0)
+
+    _start = time.perf_counter()
+    for _ in range(run_num):
+        _run_id, _status, _ = _pl.start(input_data=0, is_step_by_step=full_dump)
+        while _status == 'P':
+            # 逐步执行, 每个节点暂停时导出
+            _dump_fun()
+            _, _status, _ = _pl.resume(_run_id)
+        _pl.remove(_run_id)
+    if store is not None:
+        store.flush()
+    _use = time.perf_counter() - _start
+    assert _status == 'S'
+
+    print('%-24s keep runs: %5d  nodes: %3d  runs: %4d  use: %7.3fs  per node: %8.2fus' % (
+        name, keep_runs, node_num, run_num, _use, _use / (node_num * run_num) * 1000000
+    ))
+
+
+if __name__ == '__main__':
+    _keep_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    _node_num = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    _run_num = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    Pipeline.add_plugin(BenchContextAdd)
+
+    _path = tempfile.mkdtemp()
+    try:
+        run_case('no checkpoint', _keep_runs, _node_num, _run_num)
+        run_case('save_checkpoint dump', _keep_runs, _node_num, _run_num, full_dump=True)
+        for _name, _is_async in (('sqlite store (sync)', False), ('sqlite store (async)', True)):
+            _store = SQLiteCheckpointStore(
+                os.path.join(_path, '%s.db' % _is_async), is_async=_is_async
+            )
+            run_case(_name, _keep_runs, _node_num, _run_num, store=_store)
+            _store.close()
+    finally:
+        shutil.rmtree(_path, ignore_errors=True)
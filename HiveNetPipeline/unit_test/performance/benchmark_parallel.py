@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+管道并行节点性能测试
+@module benchmark_parallel
+@file benchmark_parallel.py
+
+执行步骤:
+python benchmark_parallel.py [branch_num] [sleep_ms]
+
+注: 每个处理器模拟一次IO等待(同步time.sleep及协程asyncio.sleep两种), 比较N个节点顺序执行与
+    N个分支在一个并行节点中执行的单次管道运行延时
+"""
+
+import os
+import sys
+import time
+import asyncio
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetPipeline import PipelineProcesser, Pipeline, AsyncioScheduler
+
+
+class BenchSleep(PipelineProcesser):
+    """
+    模拟阻塞IO的处理器
+    """
+    @classmethod
+    def processer_name(cls) -> str:
+        return 'BenchSleep'
+
+    @classmethod
+    def execute(cls, input_data, context: dict, pipeline_obj, run_id: str, sleep: float = 0.05):
+        time.sleep(sleep)
+        return input_data + 1
+
+
+class BenchAsyncSleep(PipelineProcesser):
+    """
+    模拟协程IO的处理器
+    """
+    @classmethod
+    def processer_name(cls) -> str:
+        return 'BenchAsyncSleep'
+
+    @classmethod
+    async def execute(cls, input_data, context: dict, pipeline_obj, run_id: str, sleep: float = 0.05):
+        await asyncio.sleep(sleep)
+        return input_data + 1
+
+
+def get_config(processor: str, branch_num: int, sleep: float, is_parallel: bool) -> list:
+    """
+    生成管道配置
+    """
+    _nodes = [
+        {'name': 'n%d' % _i, 'processor': processor, 'processor_execute_para': {'sleep': sleep}}
+        for _i in range(branch_num)
+    ]
+    if is_parallel:
+        return [{'name': 'parallel', 'is_parallel': True, 'parallel_branches': _nodes}]
+    else:
+        return _nodes
+
+
+def run_case(name: str, config: list, scheduler=None, times: int = 5):
+    """
+    执行一个测试场景, 取多次运行的平均延时
+    """
+    _pl = Pipeline('bench', config, is_asyn=(scheduler is not None), scheduler=scheduler,
+                   asyn_notify_fun=lambda *args: None)
+    _total = 0.0
+    for _ in range(times):
+        _start = time.perf_counter()
+        _run_id, _status, _ = _pl.start(input_data=0)
+        if scheduler is not None:
+            scheduler.wait_idle()
+            _status = _pl.status(_run_id)
+        _total += time.perf_counter() - _start
+        assert _status == 'S'
+
+    print('%-34s latency: %8.1fms' % (name, _total / times * 1000))
+
+
+if __name__ == '__main__':
+    _branch_num = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    _sleep = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    Pipeline.add_plugin(BenchSleep)
+    Pipeline.add_plugin(BenchAsyncSleep)
+    print('branch num: %d, io wait: %.1fms' % (_branch_num, _sleep * 1000))
+
+    run_case('sequential thread', get_config('BenchSleep', _branch_num, _sleep, False))
+    run_case('parallel thread', get_config('BenchSleep', _branch_num, _sleep, True))
+    _scheduler = AsyncioScheduler()
+    run_case('sequential asyncio', get_config('BenchAsyncSleep', _branch_num, _sleep, False), _scheduler)
+    run_case('parallel asyncio', get_config('BenchAsyncSleep', _branch_num, _sleep, True), _scheduler)
+    _scheduler.close()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+管道运行调度器性能测试
+@module benchmark_scheduler
+@file benchmark_scheduler.py
+
+执行步骤:
+python benchmark_scheduler.py [run_num] [node_num]
+
+注: 使用简单的加法处理器(同步函数及协程函数两种), 比较每次运行单独创建线程、线程池调度器、
+    协程调度器三种方式下异步管道每秒完成的运行次数
+"""
+
+import os
+import sys
+import time
+import threading
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetPipeline import PipelineProcesser, Pipeline, ThreadPoolScheduler, AsyncioScheduler
+
+
+class BenchAdd(PipelineProcesser):
+    """
+    简单加1处理器
+    """
+    @classmethod
+    def processer_name(cls) -> str:
+        return 'BenchAdd'
+
+    @classmethod
+    def execute(cls, input_data, context: dict, pipeline_obj, run_id: str):
+        return input_data + 1
+
+
+class BenchCoroutineAdd(PipelineProcesser):
+    """
+    简单加1处理器(协程函数)
+    """
+    @classmethod
+    def processer_name(cls) -> str:
+        return 'BenchCoroutineAdd'
+
+    @classmethod
+    async def execute(cls, input_data, context: dict, pipeline_obj, run_id: str):
+        return input_data + 1
+
+
+def run_case(name: str, processor: str, scheduler, run_num: int, node_num: int):
+    """
+    执行一个测试场景
+    """
+    _done = threading.Event()
+    _finished = [0]
+    _max_threads = [0]
+    _lock = threading.Lock()
+
+    def _notify_fun(pl_name, run_id, status, context, output, pipeline_obj):
+        with _lock:
+            _finished[0] += 1
+            _max_threads[0] = max(_max_threads[0], threading.active_count())
+            if _finished[0] >= run_num:
+                _done.set()
+
+    _pl = Pipeline(
+        'bench', [{'name': 'n%d' % _i, 'processor': processor} for _i in range(node_num)],
+        is_asyn=True, asyn_notify_fun=_notify_fun, scheduler=scheduler
+    )
+    _start = time.perf_counter()
+    for _i in range(run_num):
+        _pl.start(input_data=0)
+
+    _done.wait()
+    _use = time.perf_counter() - _start
+    if scheduler is not None:
+        scheduler.close(wait=True)
+
+    print('%-32s runs: %6d  nodes: %3d  max threads: %4d  use: %7.3fs  runs/s: %9.1f' % (
+        name, run_num, node_num, _max_threads[0], _use, run_num / _use
+    ))
+
+
+if __name__ == '__main__':
+    _run_num = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    _node_num = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    Pipeline.add_plugin(BenchAdd)
+    Pipeline.add_plugin(BenchCoroutineAdd)
+
+    for _processor in ('BenchAdd', 'BenchCoroutineAdd'):
+        run_case('%s thread-per-run' % _processor, _processor, None, _run_num, _node_num)
+        run_case('%s thread-pool' % _processor, _processor, ThreadPoolScheduler(
+            max_workers=8, max_pending=256
+        ), _run_num, _node_num)
+        run_case('%s asyncio' % _processor, _processor, AsyncioScheduler(
+            max_pending=256
+        ), _run_num, _node_num)
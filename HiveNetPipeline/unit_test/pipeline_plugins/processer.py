@@ -10,6 +10,7 @@
 import os
 import sys
 import time
+import asyncio
 import threading
 import uuid
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
@@ -178,6 +179,108 @@ class ProcesserDivideBy(PipelineProcesser):
         return _output
 
 
+class ProcesserCoroutineAdd(PipelineProcesser):
+    """
+    将输入的对象加一个数值，从context获取num的值（协程模式, 模拟异步IO等待）
+    """
+    @classmethod
+    def initialize(cls):
+        """
+        初始化处理类，仅在装载的时候执行一次初始化动作
+        """
+        print('initialize processer ProcesserCoroutineAdd!')
+
+    @classmethod
+    def processer_name(cls) -> str:
+        """
+        处理器名称，唯一标识处理器
+
+        @returns {str} - 当前处理器名称
+        """
+        return 'ProcesserCoroutineAdd'
+
+    @classmethod
+    async def execute(cls, input_data, context: dict, pipeline_obj, run_id: str, sleep: float = 0.01):
+        """
+        执行处理
+
+        @param {object} input_data - 处理器输入数据值，除第一个处理器外，该信息为上一个处理器的输出值
+        @param {dict} context - 传递上下文，该字典信息将在整个管道处理过程中一直向下传递，可以在处理器中改变该上下文信息
+        @param {Pipeline} pipeline_obj - 管道对象
+        @param {float} sleep=0.01 - 模拟IO等待的时长(秒)
+
+        @returns {object} - 处理结果输出数据值，供下一个处理器处理
+        """
+        await asyncio.sleep(sleep)
+        return input_data + context.get('num', 0)
+
+
+class ProcesserSleepAdd(PipelineProcesser):
+    """
+    将输入的对象加一个数值，从context获取num的值（同步模式, 模拟阻塞IO等待）
+    """
+    @classmethod
+    def processer_name(cls) -> str:
+        """
+        处理器名称，唯一标识处理器
+
+        @returns {str} - 当前处理器名称
+        """
+        return 'ProcesserSleepAdd'
+
+    @classmethod
+    def execute(cls, input_data, context: dict, pipeline_obj, run_id: str, sleep: float = 0.01):
+        """
+        执行处理
+
+        @param {object} input_data - 处理器输入数据值，除第一个处理器外，该信息为上一个处理器的输出值
+        @param {dict} context - 传递上下文，该字典信息将在整个管道处理过程中一直向下传递，可以在处理器中改变该上下文信息
+        @param {Pipeline} pipeline_obj - 管道对象
+        @param {float} sleep=0.01 - 模拟IO等待的时长(秒)
+
+        @returns {object} - 处理结果输出数据值，供下一个处理器处理
+        """
+        time.sleep(sleep)
+        return input_data + context.get('num', 0)
+
+
+class ProcesserFailOnce(PipelineProcesser):
+    """
+    第一次执行抛出异常, 再次执行时将输入的对象加一个数值，从context获取num的值（用于测试恢复执行）
+    """
+    _executed = set()  # 已执行过的标识
+
+    @classmethod
+    def processer_name(cls) -> str:
+        """
+        处理器名称，唯一标识处理器
+
+        @returns {str} - 当前处理器名称
+        """
+        return 'ProcesserFailOnce'
+
+    @classmethod
+    def execute(cls, input_data, context: dict, pipeline_obj, run_id: str, key: str = '', sleep: float = 0):
+        """
+        执行处理
+
+        @param {object} input_data - 处理器输入数据值，除第一个处理器外，该信息为上一个处理器的输出值
+        @param {dict} context - 传递上下文，该字典信息将在整个管道处理过程中一直向下传递，可以在处理器中改变该上下文信息
+        @param {Pipeline} pipeline_obj - 管道对象
+        @param {str} key='' - 区分执行的标识
+        @param {float} sleep=0 - 执行前等待的时长(秒)
+
+        @returns {object} - 处理结果输出数据值，供下一个处理器处理
+        """
+        time.sleep(sleep)
+        _key = '%s-%s' % (run_id, key)
+        if _key not in cls._executed:
+            cls._executed.add(_key)
+            raise RuntimeError('ProcesserFailOnce first execute [%s]' % _key)
+
+        return input_data + context.get('num', 0)
+
+
 class ProcesserAsynAdd(PipelineProcesser):
     """
     将输入的对象加一个数值，从context获取num的值（异步模式）
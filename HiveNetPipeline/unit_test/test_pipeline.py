@@ -4,11 +4,14 @@
 import sys
 import os
 import time
+import shutil
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from HiveNetCore.logging_hivenet import Logger
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
-from HiveNetPipeline import Pipeline
+from HiveNetPipeline import Pipeline, ThreadPoolScheduler, AsyncioScheduler, SQLiteCheckpointStore
 
 
 _logger_config = {
@@ -103,7 +106,11 @@ TEST_SWITCH = {
     'test_pl_ex': False,
     'test_checkpoint': False,
     'test_sub': False,
-    'test_predealer': True
+    'test_predealer': True,
+    'test_scheduler': True,
+    'test_parallel': True,
+    'test_compiled_graph': True,
+    'test_checkpoint_store': True
 }
 
 
@@ -705,5 +712,291 @@ class Test(unittest.TestCase):
         )
 
 
+    def test_scheduler(self):
+        if not TEST_SWITCH['test_scheduler']:
+            return
+
+        _pl_config = [
+            {"name": "Add1", "processor": "ProcesserCoroutineAdd", "context": {'num': 1}},
+            {"name": "Add10", "processor": "ProcesserCoroutineAdd", "context": {'num': 10}},
+            {"name": "Add100", "processor": "ProcesserAdd", "context": {'num': 100}}
+        ]
+        _run_num = 20
+        for _tips, _scheduler in (
+            ('测试线程池调度器', ThreadPoolScheduler(max_workers=4, max_running_per_pipeline=3)),
+            ('测试协程调度器', AsyncioScheduler(max_running=10, max_running_per_pipeline=3))
+        ):
+            print(_tips)
+            _finished = list()
+            _pl = Pipeline(
+                'pl_scheduler', _pl_config, is_asyn=True,
+                asyn_notify_fun=lambda *args: _finished.append(args[1]),
+                logger=LOGGER, scheduler=_scheduler
+            )
+            _run_ids = [
+                _pl.start(input_data=_i)[0] for _i in range(_run_num)
+            ]
+            _scheduler.close(wait=True)
+            self.assertEqual(len(_finished), _run_num, '%s: finished num error' % _tips)
+            self.assertEqual(_scheduler.pending_num, 0, '%s: pending num error' % _tips)
+            for _i in range(_run_num):
+                self.assertEqual(
+                    (_pl.status(_run_ids[_i]), _pl.output(_run_ids[_i])), ('S', _i + 111),
+                    '%s: %s' % (_tips, _pl.trace_list(_run_ids[_i]))
+                )
+
+        _tips = '测试调度器背压'
+        print(_tips)
+        _scheduler = ThreadPoolScheduler(max_workers=1, max_pending=1, submit_timeout=0.001)
+        _pl = Pipeline('pl_busy', _pl_config, is_asyn=True, asyn_notify_fun=asyn_notify_fun,
+                       logger=LOGGER, scheduler=_scheduler)
+        _run_id, _, _ = _pl.start(input_data=0)
+        with self.assertRaises(RuntimeError):
+            _pl.start(input_data=0, run_id='busy')
+        self.assertEqual(_pl.status('busy'), 'E', '%s: status error' % _tips)
+        _scheduler.close(wait=True)
+        self.assertEqual(_pl.output(_run_id), 111, '%s: output error' % _tips)
+
+
+    def test_parallel(self):
+        if not TEST_SWITCH['test_parallel']:
+            return
+
+        def _parallel_config(branches: list, join_policy: str = 'all', **kwargs):
+            # 生成并行节点管道配置: 先加100, 再执行并行节点
+            _node = {"name": "Parallel", "is_parallel": True, "parallel_branches": [
+                {"name": "b%d" % _i, "processor": _processor, "context": {'num': _num},
+                 "processor_execute_para": _para}
+                for _i, (_processor, _num, _para) in enumerate(branches)
+            ], "join_policy": join_policy}
+            _node.update(kwargs)
+            return [
+                {"name": "Add100", "processor": "ProcesserAdd", "context": {'num': 100}},
+                _node
+            ]
+
+        _tips = '测试并行节点 - all'
+        print(_tips)
+        _pl = Pipeline('pl_parallel', _parallel_config([
+            ('ProcesserSleepAdd', 1, {'sleep': 0.3}), ('ProcesserSleepAdd', 2, {'sleep': 0.3}),
+            ('ProcesserCoroutineAdd', 3, {'sleep': 0.3})
+        ]), logger=LOGGER)
+        _start = time.time()
+        _run_id, _status, _output = _pl.start(input_data=0)
+        _use = time.time() - _start
+        self.assertEqual((_status, _output), ('S', [101, 102, 103]), '%s: %s' % (_tips, _pl.trace_list(_run_id)))
+        self.assertLess(_use, 0.8, '%s: branches not run in parallel: %s' % (_tips, _use))
+        _trace = _pl.trace_list(_run_id)[-1]
+        self.assertTrue(_trace['is_parallel'], '%s: trace error' % _tips)
+        self.assertEqual(
+            [_item['status'] for _item in _trace['branch_trace_list']], ['S', 'S', 'S'],
+            '%s: branch trace error' % _tips
+        )
+
+        _tips = '测试并行节点 - first_success'
+        print(_tips)
+        _pl = Pipeline('pl_parallel_first', _parallel_config([
+            ('ProcesserFailOnce', 1, {'key': 'first'}), ('ProcesserSleepAdd', 2, {'sleep': 0.5}),
+            ('ProcesserSleepAdd', 3, {'sleep': 0.05})
+        ], join_policy='first_success'), logger=LOGGER)
+        _run_id, _status, _output = _pl.start(input_data=0)
+        self.assertEqual((_status, _output), ('S', 103), '%s: %s' % (_tips, _pl.trace_list(_run_id)))
+        self.assertEqual(_pl.context(_run_id)['num'], 3, '%s: context error' % _tips)
+
+        _tips = '测试并行节点 - quorum'
+        print(_tips)
+        _pl = Pipeline('pl_parallel_quorum', _parallel_config([
+            ('ProcesserFailOnce', 1, {'key': 'quorum'}), ('ProcesserSleepAdd', 2, {}),
+            ('ProcesserSleepAdd', 3, {})
+        ], join_policy='quorum', join_quorum=2), logger=LOGGER)
+        _run_id, _status, _output = _pl.start(input_data=0)
+        self.assertEqual((_status, _output), ('S', [102, 103]), '%s: %s' % (_tips, _pl.trace_list(_run_id)))
+
+        _tips = '测试并行节点 - all策略分支失败后不再等待'
+        print(_tips)
+        _pl = Pipeline('pl_parallel_fail_fast', _parallel_config([
+            ('ProcesserFailOnce', 1, {'key': 'fail_fast'}), ('ProcesserSleepAdd', 2, {'sleep': 1})
+        ]), logger=LOGGER)
+        _start = time.time()
+        _run_id, _status, _output = _pl.start(input_data=0)
+        _use = time.time() - _start
+        self.assertEqual(_status, 'E', '%s: %s' % (_tips, _pl.trace_list(_run_id)))
+        self.assertLess(_use, 0.8, '%s: wait for other branches: %s' % (_tips, _use))
+        self.assertEqual(
+            [_item['status'] for _item in _pl.trace_list(_run_id)[-1]['branch_trace_list']], ['E', 'C'],
+            '%s: branch trace error' % _tips
+        )
+
+        _tips = '测试并行节点 - 关闭线程池'
+        print(_tips)
+        _pl.close(wait=True)
+        self.assertIsNone(_pl._parallel_executor, '%s: executor not closed' % _tips)
+        _executor = ThreadPoolExecutor(max_workers=2)
+        _pl = Pipeline('pl_parallel_shared', _parallel_config([
+            ('ProcesserSleepAdd', 1, {}), ('ProcesserSleepAdd', 2, {})
+        ]), logger=LOGGER, parallel_executor=_executor)
+        _run_id, _status, _output = _pl.start(input_data=0)
+        self.assertEqual((_status, _output), ('S', [101, 102]), '%s: %s' % (_tips, _pl.trace_list(_run_id)))
+        _pl.close()
+        self.assertIs(_pl._parallel_executor, _executor, '%s: shared executor should not be closed' % _tips)
+        _executor.shutdown()
+
+        _tips = '测试并行节点 - 异常后通过检查点恢复执行'
+        print(_tips)
+        _config = _parallel_config([
+            ('ProcesserFailOnce', 1, {'key': 'resume', 'sleep': 0.2}), ('ProcesserSleepAdd', 2, {})
+        ])
+        _pl = Pipeline('pl_parallel_resume', _config, is_asyn=True, asyn_notify_fun=asyn_notify_fun, logger=LOGGER)
+        _run_id, _, _ = _pl.start(input_data=0)
+        while _pl.status(run_id=_run_id) not in ['S', 'E']:
+            time.sleep(0.01)
+
+        self.assertEqual(_pl.status(_run_id), 'E', '%s: status error' % _tips)
+        _branch_trace_list = _pl.trace_list(_run_id)[-1]['branch_trace_list']
+        self.assertEqual(
+            [_item['status'] for _item in _branch_trace_list], ['E', 'S'], '%s: branch trace error' % _tips
+        )
+        _json = _pl.save_checkpoint(_run_id)
+        _pl = Pipeline('pl_parallel_resume', _config, is_asyn=True, asyn_notify_fun=asyn_notify_fun, logger=LOGGER)
+        _pl.load_checkpoint(_json)
+        _pl.resume(_run_id)
+        while _pl.status(run_id=_run_id) not in ['S', 'E']:
+            time.sleep(0.01)
+
+        self.assertEqual(
+            (_pl.status(_run_id), _pl.output(_run_id)), ('S', [101, 102]),
+            '%s: %s' % (_tips, _pl.trace_list(_run_id))
+        )
+        self.assertEqual(
+            _pl.trace_list(_run_id)[-1]['branch_trace_list'][1]['start_time'], _branch_trace_list[1]['start_time'],
+            '%s: success branch should not run again' % _tips
+        )
+
+        _tips = '测试并行节点 - 协程调度器'
+        print(_tips)
+        _scheduler = AsyncioScheduler()
+        _pl = Pipeline('pl_parallel_asyncio', _parallel_config([
+            ('ProcesserCoroutineAdd', 1, {'sleep': 0.3}), ('ProcesserCoroutineAdd', 2, {'sleep': 0.3}),
+            ('ProcesserSleepAdd', 3, {'sleep': 0.3})
+        ]), is_asyn=True, asyn_notify_fun=asyn_notify_fun, logger=LOGGER, scheduler=_scheduler)
+        _start = time.time()
+        _run_id, _, _ = _pl.start(input_data=0)
+        _scheduler.close(wait=True)
+        _use = time.time() - _start
+        self.assertEqual(
+            (_pl.status(_run_id), _pl.output(_run_id)), ('S', [101, 102, 103]),
+            '%s: %s' % (_tips, _pl.trace_list(_run_id))
+        )
+        self.assertLess(_use, 0.8, '%s: branches not run in parallel: %s' % (_tips, _use))
+
+
+    def test_compiled_graph(self):
+        if not TEST_SWITCH['test_compiled_graph']:
+            return
+
+        _tips = '测试编译节点图'
+        print(_tips)
+        _config = [
+            {"name": "Add1", "processor": "ProcesserAdd", "context": {'num': 1}},
+            {"name": "Add10", "processor": "ProcesserAdd", "context": {'num': 10}}
+        ]
+        _pl = Pipeline('pl_compiled', _config, logger=LOGGER)
+
+        # 创建后修改原配置不影响管道执行
+        _config[1]['context'] = {'num': 1000}
+        _run_id, _status, _output = _pl.start(input_data=0)
+        self.assertEqual((_status, _output), ('S', 11), '%s: %s' % (_tips, _pl.trace_list(_run_id)))
+
+        # 节点图不可修改
+        with self.assertRaises(TypeError):
+            _pl._graph['1']['processor_para']['num'] = 2
+
+        # 追踪列表的时间格式化输出, 检查点保存时间戳
+        _trace = _pl.trace_list(_run_id)[0]
+        self.assertRegex(_trace['start_time'], r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6}$', _tips)
+        self.assertLessEqual(_trace['start_time'], _trace['end_time'], _tips)
+        _pl2 = Pipeline('pl_compiled', _config, logger=LOGGER)
+        _pl2.load_checkpoint(_pl.save_checkpoint(_run_id))
+        self.assertEqual(_pl2.trace_list(_run_id), _pl.trace_list(_run_id), '%s: checkpoint trace error' % _tips)
+
+        _tips = '测试编译节点图 - 处理器装载'
+        print(_tips)
+        _config = [{"name": "Late", "processor": "ProcesserLateLoad", "context": {'num': 5}}]
+        # 同步管道的处理器需在构造前装载
+        with self.assertRaises(ModuleNotFoundError):
+            Pipeline('pl_late_sync', _config, logger=LOGGER)
+
+        # 异步管道在运行时获取处理器, 允许构造后再装载
+        _pl = Pipeline('pl_late_asyn', _config, is_asyn=True, asyn_notify_fun=asyn_notify_fun, logger=LOGGER)
+        _run_id, _, _ = _pl.start(input_data=0)
+        while _pl.status(run_id=_run_id) not in ['S', 'E']:
+            time.sleep(0.01)
+        self.assertEqual(_pl.status(_run_id), 'E', '%s: not loaded status error' % _tips)
+
+        Pipeline.add_plugin(type('ProcesserLateLoad', (Pipeline.get_plugin('processer', 'ProcesserAdd'), ), {
+            'processer_name': classmethod(lambda cls: 'ProcesserLateLoad')
+        }))
+        _run_id, _, _ = _pl.start(input_data=0)
+        while _pl.status(run_id=_run_id) not in ['S', 'E']:
+            time.sleep(0.01)
+        self.assertEqual(
+            (_pl.status(_run_id), _pl.output(_run_id)), ('S', 5), '%s: %s' % (_tips, _pl.trace_list(_run_id))
+        )
+
+
+    def test_checkpoint_store(self):
+        if not TEST_SWITCH['test_checkpoint_store']:
+            return
+
+        _tips = '测试检查点存储'
+        print(_tips)
+        _config = [
+            {"name": "Add1", "processor": "ProcesserAdd", "context": {'num': 1}},
+            {"name": "Add10", "processor": "ProcesserSleepAdd", "context": {'num': 10},
+             "processor_execute_para": {'sleep': 0.5}},
+            {"name": "Add100", "processor": "ProcesserAdd", "context": {'num': 100}}
+        ]
+        _path = tempfile.mkdtemp()
+        _db_file = os.path.join(_path, 'checkpoint.db')
+        try:
+            _store1 = SQLiteCheckpointStore(_db_file, max_trace_num=2)
+            _pl1 = Pipeline('pl_store', _config, is_asyn=True, asyn_notify_fun=asyn_notify_fun,
+                            logger=LOGGER, checkpoint_store=_store1)
+            _pl1.start(input_data=0, run_id='crash')
+            while _pl1.current_node_id('crash') != '2':
+                time.sleep(0.01)
+
+            # 模拟进程崩溃, 通过新的存储对象装载, 从正在执行的节点恢复
+            _store1.flush()
+            _store2 = SQLiteCheckpointStore(_db_file, is_async=False, max_trace_num=2)
+            _pl2 = Pipeline('pl_store', _config, is_asyn=True, asyn_notify_fun=asyn_notify_fun,
+                            logger=LOGGER, checkpoint_store=_store2)
+            self.assertEqual(_pl2.load_checkpoint_store(), ['crash'], '%s: load error' % _tips)
+            self.assertEqual(
+                (_pl2.status('crash'), _pl2.current_node_id('crash'), len(_pl2.trace_list('crash'))),
+                ('P', '2', 1), '%s: load status error' % _tips
+            )
+            _pl2.resume('crash', run_to_end=True)
+            while _pl2.status('crash') not in ['S', 'E'] or _pl1.status('crash') not in ['S', 'E']:
+                time.sleep(0.01)
+
+            self.assertEqual(_pl2.output('crash'), 111, '%s: %s' % (_tips, _pl2.trace_list('crash')))
+            _store1.close()
+
+            # 只保留最新的追踪记录
+            _run_cache, _trace_seq = _store2.load_runs('pl_store')['crash']
+            self.assertEqual(
+                (_run_cache['status'], _trace_seq, [_trace['node_id'] for _trace in _run_cache['trace_list']]),
+                ('S', 1, ['2', '3']), '%s: trace list error' % _tips
+            )
+
+            # 清理已完成的运行
+            self.assertEqual(_store2.prune(pipeline_name='pl_store'), 1, '%s: prune error' % _tips)
+            self.assertEqual(len(_store2.load_runs('pl_store')), 0, '%s: prune error' % _tips)
+            _store2.close()
+        finally:
+            shutil.rmtree(_path, ignore_errors=True)
+
+
 if __name__ == '__main__':
     unittest.main()
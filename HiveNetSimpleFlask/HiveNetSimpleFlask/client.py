@@ -18,6 +18,7 @@ import time
 import threading
 import queue
 import uuid
+from collections import deque
 import gevent
 import traceback
 import socketio
@@ -153,48 +154,40 @@ class SocketIOClient(ClientBaseFw):
             }
 
             # 先放置请求响应的字典信息
-            self._wait_resp_dict[_id] = {
+            _wait_resp_obj = {
                 'lock': threading.Lock(),
-                'resp': []
+                'event': threading.Event(),
+                'resp': deque()
             }
+            self._wait_resp_dict[_id] = _wait_resp_obj
 
             # 通过后台发送请求
             self.emit_bg(self.service_event, data=_request, namespace=namespace)
 
-            # 等待发送和响应
-            _start_time = time.time()
-            while len(self._wait_resp_dict[_id]['resp']) <= 0:
-                if (time.time() - _start_time) < _overtime:
-                    gevent.sleep(0.01)
-                else:
-                    # 超时退出循环
-                    break
+            # 等待响应通知
+            _resp = self._wait_service_resp(_wait_resp_obj, _overtime)
 
             # 处理返回结果
-            with self._wait_resp_dict[_id]['lock']:
-                if len(self._wait_resp_dict[_id]['resp']) == 0:
-                    # 超时
+            if _resp is None:
+                # 超时
+                self._wait_resp_dict.pop(_id, None)
+                return CResult(code='30403')
+            elif _resp['err_code'][0] == '0':
+                # 返回结果成功
+                _result = CResult(code=_resp['err_code'])
+                if _resp.get('is_end', True):
+                    # 已经完结
                     self._wait_resp_dict.pop(_id, None)
-                    return CResult(code='30403')
+                    _result.resp = _resp.get('data', None)
                 else:
-                    # 获取到结果
-                    _resp = self._wait_resp_dict[_id]['resp'][0]
-                    if _resp['err_code'][0] == '0':
-                        # 返回结果成功
-                        _result = CResult(code=_resp['err_code'])
-                        if _resp.get('is_end', True):
-                            # 已经完结
-                            self._wait_resp_dict.pop(_id, None)
-                            _result.resp = _resp.get('data', None)
-                        else:
-                            # 迭代方式, 不删除对象
-                            _result.resp = self._get_service_resp_iter(_id, _overtime)
-
-                        # 返回结果
-                        return _result
-                    else:
-                        self._wait_resp_dict.pop(_id, None)
-                        return CResult(code=_resp['err_code'], error=_resp['error'])
+                    # 迭代方式, 不删除对象
+                    _result.resp = self._get_service_resp_iter(_id, _overtime, first_resp=_resp)
+
+                # 返回结果
+                return _result
+            else:
+                self._wait_resp_dict.pop(_id, None)
+                return CResult(code=_resp['err_code'], error=_resp['error'])
         except:
             # 其他失败, 尝试删除等待数据
             self._wait_resp_dict.pop(_id, None)
@@ -248,7 +241,7 @@ class SocketIOClient(ClientBaseFw):
             # 转换为列表模式
             self.service_namespace = [self._conn_config['service_namespace']]
 
-        # 等待响应结果的字典, key为uuid, value为字典{'lock': 操作锁, 'resp': [按顺序放入的响应信息列表]}
+        # 等待响应结果的字典, key为uuid, value为字典{'lock': 操作锁, 'event': 收到响应的通知事件, 'resp': 按顺序放入的响应信息队列(deque)}
         self._wait_resp_dict = {}
 
         if not self.is_native_mode:
@@ -316,6 +309,14 @@ class SocketIOClient(ClientBaseFw):
         for _namespace, _queue in self._bg_emit_queues.items():
             _queue.clear()
 
+        # 通知所有等待响应的请求连接已断开, 无需等待至超时
+        for _id, _wait_resp_obj in list(self._wait_resp_dict.items()):
+            with _wait_resp_obj['lock']:
+                _wait_resp_obj['resp'].append({
+                    'id': _id, 'err_code': '20406', 'is_end': True, 'error': 'connection closed'
+                })
+                _wait_resp_obj['event'].set()
+
         # 关闭等待数据的线程
         try:
             if self._thread is not None:
@@ -446,8 +447,8 @@ class SocketIOClient(ClientBaseFw):
         while self.socketio.connected:
             # 连接状态才进行处理
             try:
-                # 从队列获取数据
-                _data = _queue.get()
+                # 从队列获取数据, 有数据时立即处理, 超时后重新检查连接状态
+                _data = _queue.get(block=True, timeout=0.1)
 
                 # 向服务器提交数据
                 self.emit(
@@ -457,9 +458,6 @@ class SocketIOClient(ClientBaseFw):
                 # 队列为空
                 pass
 
-            # 等待下一次处理
-            gevent.sleep(0.1)
-
     #############################
     # 自己的内部函数
     #############################
@@ -494,19 +492,48 @@ class SocketIOClient(ClientBaseFw):
         # 等待超时
         return CResult(code='20402')
 
-    def _get_service_resp_iter(self, id: str, overtime: float):
+    def _wait_service_resp(self, wait_resp_obj: dict, overtime: float) -> dict:
+        """
+        等待并获取下一个服务返回信息
+
+        @param {dict} wait_resp_obj - 等待响应的对象
+        @param {float} overtime - 超时时间, 单位为秒
+
+        @returns {dict} - 服务端返回的标准响应字典, 超时返回None
+        """
+        _end_time = time.time() + overtime
+        while True:
+            with wait_resp_obj['lock']:
+                if len(wait_resp_obj['resp']) > 0:
+                    return wait_resp_obj['resp'].popleft()
+
+                # 在锁内清除通知, 避免丢失清除前放入数据的通知
+                wait_resp_obj['event'].clear()
+
+            _remaining = _end_time - time.time()
+            if _remaining <= 0 or not wait_resp_obj['event'].wait(_remaining):
+                # 超时
+                return None
+
+    def _get_service_resp_iter(self, id: str, overtime: float, first_resp: dict = None):
         """
         将服务返回信息转换为迭代对象
 
         @param {str} id - 要获取的对象id
         @param {float} overtime - 超时时间, 单位为秒
+        @param {dict} first_resp=None - 已获取到的第一个返回信息
         """
-        _start_time = time.time()
-        while True:
-            if len(self._wait_resp_dict[id]['resp']) > 0:
-                # 有收取到数据
-                with self._wait_resp_dict[id]['lock']:
-                    _resp = self._wait_resp_dict[id]['resp'].pop(0)
+        _wait_resp_obj = self._wait_resp_dict[id]
+        _resp = first_resp
+        try:
+            while True:
+                if _resp is None:
+                    _resp = self._wait_service_resp(_wait_resp_obj, overtime)
+                    if _resp is None:
+                        # 超时，抛出异常
+                        raise RuntimeError(
+                            'Get service response stream overtime, id[%s], code[30403]' % id
+                        )
 
                 if _resp['err_code'][0] != '0':
                     # 出现异常
@@ -519,21 +546,17 @@ class SocketIOClient(ClientBaseFw):
                 if _resp.get('is_end', True):
                     # 数据获取已结束, 最后一个返回值只是结束标志
                     return
-                else:
-                    # 返回结果
-                    yield _resp.get('data', None)
 
-                    # 更新获取开始时间
-                    _start_time = time.time()
-            else:
-                # 获取不到数据
-                if (time.time() - _start_time) < overtime:
-                    gevent.sleep(0.01)
+                # 返回结果
+                if _resp.get('is_batch', False):
+                    # 服务端合并推送的多个数据项
+                    yield from _resp['data']
                 else:
-                    # 超时，抛出异常
-                    raise RuntimeError(
-                        'Get service response stream overtime, id[%s], code[30403]' % id
-                    )
+                    yield _resp.get('data', None)
+                _resp = None
+        finally:
+            # 迭代结束删除等待对象
+            self._wait_resp_dict.pop(id, None)
 
     def _service_resp_event_deal_func(self, resp: dict):
         """
@@ -544,6 +567,7 @@ class SocketIOClient(ClientBaseFw):
                 'id': '', # 事件请求id
                 'err_code': '00000', # 错误码, 0开头代表成功
                 'is_end': True,  # 是否还有下一个响应对象
+                'is_batch': False,  # 可选, 是否合并推送的多个数据项, 如果是则data为数据项列表
                 'data': ..., # 响应数据
                 'error': '',  # 失败时的错误信息
             }
@@ -554,9 +578,10 @@ class SocketIOClient(ClientBaseFw):
             # 找不到请求对象(可能超时或系统出了异常), 直接丢弃
             raise RuntimeError('Deal with response error: request id[%s] not found' % resp['id'])
 
-        # 将数据放入列表
+        # 将数据放入队列并通知等待的线程
         with _wait_resp_obj['lock']:
             _wait_resp_obj['resp'].append(resp)
+            _wait_resp_obj['event'].set()
 
     def _bg_tasks_func(self, event: str, namespace: str):
         """
@@ -15,23 +15,26 @@ import os
 import sys
 import inspect
 import math
+import time
 import logging
 import datetime
 import threading
 import asyncio
 import gevent
 import traceback
+from collections import deque
 from functools import wraps
 from typing import Callable
 from gevent import pywsgi
 import requests
-from flask import Flask, jsonify, request as flask_request
+from flask import Flask, jsonify, request as flask_request, current_app, has_app_context
 from flask_cors import CORS
 from flask.helpers import locked_cached_property
 from flask.logging import create_logger
 from flask.wrappers import Response
 from werkzeug.routing import Rule
 from flask_socketio import SocketIO, emit
+from socketio.packet import Packet as SocketIOPacket
 from HiveNetCore.generic import CResult
 from HiveNetCore.i18n import _
 from HiveNetCore.utils.run_tool import RunTool, AsyncTools
@@ -756,6 +759,97 @@ class FlaskServer(ServerBaseFW):
         RunTool.async_raise(self._thread.ident, FlaskServerExit)
 
 
+class PreEncodedData(object):
+    """
+    预编码的SocketIO推送数据
+    注: 数据按json预先转换为字符串, 推送时直接拼接到报文中, 同一数据多次推送(例如推送到多个命名空间)时只需转换一次
+    """
+
+    def __init__(self, data, json_obj=None):
+        """
+        构造函数
+
+        @param {Any} data - 要推送的数据(需支持json转换, 不支持二进制数据)
+        @param {object} json_obj=None - 进行json转换的对象, 不传代表使用当前应用SocketIO报文的json对象
+        """
+        _json = json_obj
+        if _json is None:
+            _json = PreEncodedJson.get_packet_json()
+            if isinstance(_json, PreEncodedJson):
+                _json = _json.json
+
+        self.data = data
+        self.encoded = _json.dumps(data, separators=(',', ':'))
+
+
+class PreEncodedJson(object):
+    """
+    支持预编码数据的SocketIO报文json对象
+    注: 替换服务器独立的SocketIO报文类的json对象, 非预编码数据仍由原json对象处理
+    """
+
+    def __init__(self, json_obj):
+        """
+        构造函数
+
+        @param {object} json_obj - 原json对象
+        """
+        self.json = json_obj
+
+    @classmethod
+    def install(cls, packet_class):
+        """
+        将SocketIO报文类的json对象替换为支持预编码数据的对象
+        注: 替换的是报文类的类属性, 不应传入全局的socketio.packet.Packet类, 否则将影响进程中的所有SocketIO服务器和客户端
+
+        @param {type} packet_class - SocketIO服务器使用的报文类
+        """
+        if not isinstance(packet_class.json, cls):
+            packet_class.json = cls(packet_class.json)
+
+    @classmethod
+    def get_packet_json(cls, app: Flask = None):
+        """
+        获取Flask应用的SocketIO报文json对象
+
+        @param {Flask} app=None - Flask应用对象, 不传代表使用当前上下文的应用
+            注: 无法获取到应用的SocketIO服务器时返回全局SocketIO报文类的json对象
+
+        @returns {object} - 报文json对象, 支持预编码数据时为PreEncodedJson对象
+        """
+        if app is None and has_app_context():
+            app = current_app
+
+        _socketio = None if app is None else app.extensions.get('socketio', None)
+        if _socketio is None or _socketio.server is None:
+            return SocketIOPacket.json
+
+        return _socketio.server.packet_class.json
+
+    def dumps(self, obj, *args, **kwargs) -> str:
+        """
+        转换为json字符串
+
+        @param {Any} obj - 要转换的对象, SocketIO报文为[event, data, ...]格式的列表
+        """
+        if type(obj) == list:
+            for _item in obj:
+                if isinstance(_item, PreEncodedData):
+                    # 存在预编码数据, 逐项拼接
+                    return '[%s]' % ','.join([
+                        _item.encoded if isinstance(_item, PreEncodedData) else self.json.dumps(_item, *args, **kwargs)
+                        for _item in obj
+                    ])
+
+        return self.json.dumps(obj, *args, **kwargs)
+
+    def loads(self, *args, **kwargs):
+        """
+        转换json字符串为对象
+        """
+        return self.json.loads(*args, **kwargs)
+
+
 class SocketIOServer(FlaskServer):
     """
     SocketIO服务器
@@ -793,6 +887,7 @@ class SocketIOServer(FlaskServer):
                 'cors_allowed_origins': '*'  # 解决跨域访问问题
                 'path': 'socket.io'  # 指定socketio的对外资源路径, 可以修改为其他值
                 'json': object # 指定自定义的json处理对象, 来支持默认json处理无法转换的特色对象, 该对象必须有兼容标准json模块的dumps和loads函数
+                    注: 服务器使用独立的SocketIO报文类, 传入的json对象及预编码处理不会影响全局的SocketIO报文类
             flask_run {dict} - SocketIoServer运行参数字典(请参考官方socketio.run文档), 常用参数包括:
                 host {str} - 绑定的主机地址, 可以为 '127.0.0.1' 或不传
                 port {int} - 监听端口, 默认为 5000
@@ -807,6 +902,13 @@ class SocketIOServer(FlaskServer):
             service_event {str} - 指定服务模式的事件标识, 默认为'socketio_service'
             service_namespace {str|list} - 指定服务模式对应的命名空间, 默认为None(全局命名空间)
                 注: 如果传入的类型是list, 则会在清单中的命名空间都进行服务事件的注册
+            service_worker_num {int} - 服务模式处理函数的工作任务数, 默认为0
+                注: 0代表在socket事件线程中直接执行处理函数; 大于0时将请求放入队列由固定数量的后台任务执行,
+                    同一连接的请求默认并发执行, 如需按请求顺序执行, 可在add_service时指定ordered=True
+            stream_batch_size {int} - 处理函数返回迭代对象时, 合并为一个消息推送的最大数据项数量, 默认为1(不合并)
+            stream_batch_interval {float} - 合并推送时一个消息的最长等待时间, 单位为秒, 默认为0.05
+                注: 合并推送时迭代对象由独立的后台任务获取数据项, 迭代对象获取数据阻塞时已合并的数据项到时间后也会推送;
+                    gevent模式下迭代对象的阻塞处理需为协程方式(例如gevent.sleep), 否则会阻塞推送
         @param {dict} support_auths=None - 服务器支持的验证对象字典, key为验证对象类型名(可以为类名), value为验证对象实例对象
             注意: 支持的auth对象必须有auth_required这个修饰符函数
         @param {function} before_server_start=None - 服务器启动前执行的函数对象, 传入服务自身(self)
@@ -843,6 +945,11 @@ class SocketIOServer(FlaskServer):
         if self._server_config.get('use_wsgi', False) and _socketio_config.get('async_mode', None) is None:
             _socketio_config['async_mode'] = 'gevent_uwsgi'
 
+        if _socketio_config.get('serializer', 'default') == 'default':
+            # 使用服务器独立的报文类, 避免传入的json对象及预编码处理修改全局的SocketIO报文类
+            _socketio_config = dict(_socketio_config)
+            _socketio_config['serializer'] = type('SocketIOServerPacket', (SocketIOPacket, ), {})
+
         self.socketio: SocketIO = SocketIO(
             app=self._app, **_socketio_config
         )
@@ -850,6 +957,19 @@ class SocketIOServer(FlaskServer):
         # 登记绑定的后台任务信息
         self._bg_tasks = dict()
 
+        # 服务模式处理参数
+        self.service_worker_num = self._server_config.get('service_worker_num', 0)
+        self.stream_batch_size = self._server_config.get('stream_batch_size', 1)
+        self.stream_batch_interval = self._server_config.get('stream_batch_interval', 0.05)
+        self._worker_queue = None  # 工作任务的请求队列, 启动工作任务时创建
+        self._worker_lock = threading.Lock()
+        self._ordered_tasks = dict()  # 按顺序执行的等待请求, key为连接sid, value为等待请求的队列(deque)
+
+        # SocketIO报文支持预编码数据
+        if self.socketio.server.packet_class is not SocketIOPacket and \
+                issubclass(self.socketio.server.packet_class, SocketIOPacket):
+            PreEncodedJson.install(self.socketio.server.packet_class)
+
         # 非原生模式需绑定事件处理
         if not self.is_native_mode:
             # 绑定服务处理事件
@@ -884,7 +1004,8 @@ class SocketIOServer(FlaskServer):
             注1: 如果返回的对象是iter, 则客户端也可以以iter方式处理返回值
             注2: 处理函数内部可以通过emit或broadcast函数进行向客户端推送其他事件(非当前请求的响应事件)
         @param {str|list} namespace=None - 要添加到的服务命名空间
-        @param {kwargs}  - 实现类的自定义扩展参数
+        @param {kwargs}  - 实现类的自定义扩展参数, 支持的参数包括:
+            ordered {bool} - 使用工作任务执行时, 同一连接的请求是否按请求顺序执行, 默认为False
 
         @returns {CResult} - 添加服务结果, result.code: '00000'-成功, 其他-异常
         """
@@ -1019,28 +1140,64 @@ class SocketIOServer(FlaskServer):
         关闭Flask服务器的方法
         注: 关闭方法要保证服务状态变更为stop, 否则关闭方法可能会循环等待无法退出
         """
+        # 通知工作任务退出
+        with self._worker_lock:
+            _queue = self._worker_queue
+            self._worker_queue = None
+            self._ordered_tasks.clear()
+
+        if _queue is not None:
+            for _ in range(self.service_worker_num):
+                _queue.put(None)
+
         self.socketio.stop()
 
     #############################
     # SocketIO的自有方法
     #############################
     @classmethod
-    def broadcast(cls, event: str, data: dict, namespace: str = None, with_context_app=None):
+    def broadcast(cls, event: str, data: dict, namespace: str = None, with_context_app=None,
+            pre_encode: bool = False):
         """
         发送消息给所有连接的客户端
         注意：该函数必须在绑定事件的函数内部使用
 
         @param {str} event - 事件名
-        @param {dict} data - 要通知的数据字典
-        @param {str} namespace=None - 命名空间, 例如'/'
+        @param {dict|PreEncodedData} data - 要通知的数据字典, 也可以传入通过pre_encode函数预编码的数据
+            注: 同一数据需要多次推送时, 可先通过pre_encode函数预编码, 每次推送无需再进行json转换
+        @param {str|list} namespace=None - 命名空间, 例如'/', 传入列表代表推送到列表中的所有命名空间
         @param {Flask} with_context_app=None - 指定上下文的Flask App对象
             注: 解决 Working outside of application context 的问题
+        @param {bool} pre_encode=False - 是否对数据进行预编码
+            注: 推送到多个命名空间时将自动进行预编码
         """
+        _namespace_list = namespace if type(namespace) in (list, tuple) else [namespace]
+        _json = PreEncodedJson.get_packet_json(app=with_context_app)
+        if isinstance(_json, PreEncodedJson):
+            if not isinstance(data, PreEncodedData) and (pre_encode or len(_namespace_list) > 1):
+                data = PreEncodedData(data, json_obj=_json.json)
+        elif isinstance(data, PreEncodedData):
+            # 报文不支持预编码数据(例如使用msgpack序列化), 使用原始数据
+            data = data.data
+
         if with_context_app is None:
-            emit(event, data, namespace=namespace, broadcast=True)
+            for _namespace in _namespace_list:
+                emit(event, data, namespace=_namespace, broadcast=True)
         else:
             with with_context_app.app_context():
-                emit(event, data, namespace=namespace, broadcast=True)
+                for _namespace in _namespace_list:
+                    emit(event, data, namespace=_namespace, broadcast=True)
+
+    @classmethod
+    def pre_encode(cls, data) -> PreEncodedData:
+        """
+        预编码要推送的数据
+
+        @param {Any} data - 要推送的数据(需支持json转换)
+
+        @returns {PreEncodedData} - 预编码数据, 可作为broadcast或emit的数据参数
+        """
+        return PreEncodedData(data)
 
     @classmethod
     def emit(cls, event, *args, **kwargs):
@@ -1111,7 +1268,41 @@ class SocketIOServer(FlaskServer):
             }
         """
         _namespace = flask_request.namespace
-        _handler = self._service_router.get(_namespace, {}).get(
+        _sid = flask_request.sid
+        if self.service_worker_num <= 0:
+            # 直接在socket事件线程中执行
+            self._deal_service_request(request, _namespace, _sid)
+            return
+
+        # 放入工作任务队列
+        _task = (request, _namespace, _sid, flask_request.environ)
+        _service_para = self._service_router.get(_namespace, {}).get(
+            request.get('service_uri', ''), {}
+        )
+        _queue = self._get_worker_queue()
+        if _service_para.get('kwargs', {}).get('ordered', False):
+            # 同一连接按顺序执行, 已有正在执行的请求时放入等待队列
+            with self._worker_lock:
+                _pending = self._ordered_tasks.get(_sid, None)
+                if _pending is not None:
+                    _pending.append(_task)
+                    return
+
+                self._ordered_tasks[_sid] = deque()
+
+            _queue.put((True, _task))
+        else:
+            _queue.put((False, _task))
+
+    def _deal_service_request(self, request: dict, namespace: str, sid: str):
+        """
+        执行服务请求并推送响应
+
+        @param {dict} request - 客户端送入的标准服务请求字典
+        @param {str} namespace - 请求的命名空间
+        @param {str} sid - 请求连接的sid
+        """
+        _handler = self._service_router.get(namespace, {}).get(
             request.get('service_uri', ''), {}
         ).get('handler', None)
 
@@ -1131,14 +1322,18 @@ class SocketIOServer(FlaskServer):
             if inspect.isgenerator(_resp):
                 # 迭代模式
                 _id = request.get('id', '')
-                for _item in _resp:
-                    _std_resp = {
-                        'id': _id,
-                        'err_code': '00000',
-                        'is_end': False,
-                        'data': _item
-                    }
-                    self.emit('%s_resp' % self.service_event, _std_resp, namespace=_namespace)
+                if self.stream_batch_size <= 1:
+                    for _item in _resp:
+                        _std_resp = {
+                            'id': _id,
+                            'err_code': '00000',
+                            'is_end': False,
+                            'data': _item
+                        }
+                        self._emit_service_resp(_std_resp, namespace, sid)
+                else:
+                    # 按数量和时间合并为一个消息推送
+                    self._emit_service_resp_batch(_resp, _id, namespace, sid)
 
                 # 发送结束的标记
                 _std_resp = {
@@ -1158,7 +1353,7 @@ class SocketIOServer(FlaskServer):
         except:
             # 执行出现异常
             self._logger.error('event execute error, namespace[%s], request[%s]: %s' % (
-                _namespace, str(request), traceback.format_exc()
+                namespace, str(request), traceback.format_exc()
             ))
             _std_resp = {
                 'id': request.get('id', ''),
@@ -1167,7 +1362,173 @@ class SocketIOServer(FlaskServer):
                 'error': str(sys.exc_info()[1])
             }
 
-        self.emit('%s_resp' % self.service_event, _std_resp, namespace=_namespace)
+        self._emit_service_resp(_std_resp, namespace, sid)
+
+    def _emit_service_resp_batch(self, resp, id: str, namespace: str, sid: str):
+        """
+        按数量和时间将迭代对象的数据项合并推送
+        注: 由后台任务获取迭代对象的数据项放入队列, 当前任务按等待时间从队列获取数据项,
+            因此迭代对象获取数据阻塞时, 已合并的数据项到等待时间后也会推送
+
+        @param {generator} resp - 处理函数返回的迭代对象
+        @param {str} id - 事件请求id
+        @param {str} namespace - 请求的命名空间
+        @param {str} sid - 请求连接的sid
+
+        @throws {Exception} - 迭代对象获取数据项出现异常时抛出该异常
+        """
+        _eio = self.socketio.server.eio
+        _empty_exception = _eio.get_queue_empty_exception()
+        # 队列元素为(is_end, item), is_end为True时item为None或出现异常时的异常对象
+        _queue = _eio.create_queue(self.stream_batch_size)
+        _stop_flag = {'stop': False}
+        self.socketio.start_background_task(
+            self._stream_batch_producer_func, resp, _queue, _stop_flag,
+            (flask_request.environ, namespace, sid, flask_request.event)
+        )
+
+        try:
+            _batch = list()
+            _batch_end_time = 0
+            while True:
+                try:
+                    _is_end, _item = _queue.get(
+                        timeout=None if len(_batch) == 0 else max(_batch_end_time - time.monotonic(), 0)
+                    )
+                except _empty_exception:
+                    # 到达等待时间, 推送已合并的数据项
+                    self._emit_service_resp({
+                        'id': id, 'err_code': '00000', 'is_end': False,
+                        'is_batch': True, 'data': _batch
+                    }, namespace, sid)
+                    _batch = list()
+                    continue
+
+                if _is_end:
+                    if _item is not None:
+                        raise _item
+                    break
+
+                if len(_batch) == 0:
+                    _batch_end_time = time.monotonic() + self.stream_batch_interval
+                _batch.append(_item)
+                if len(_batch) >= self.stream_batch_size:
+                    self._emit_service_resp({
+                        'id': id, 'err_code': '00000', 'is_end': False,
+                        'is_batch': True, 'data': _batch
+                    }, namespace, sid)
+                    _batch = list()
+
+            if len(_batch) > 0:
+                self._emit_service_resp({
+                    'id': id, 'err_code': '00000', 'is_end': False,
+                    'is_batch': True, 'data': _batch
+                }, namespace, sid)
+        finally:
+            # 通知后台任务停止, 并清空队列避免后台任务阻塞在放入队列的处理
+            _stop_flag['stop'] = True
+            while True:
+                try:
+                    _queue.get(block=False)
+                except _empty_exception:
+                    break
+
+    def _stream_batch_producer_func(self, resp, batch_queue, stop_flag: dict, request_info: tuple):
+        """
+        合并推送时获取迭代对象数据项的后台任务函数
+
+        @param {generator} resp - 处理函数返回的迭代对象
+        @param {Queue} batch_queue - 数据项队列, 放入(is_end, item)
+        @param {dict} stop_flag - 停止标记, stop为True时停止获取数据项
+        @param {tuple} request_info - 请求信息(environ, namespace, sid, event), 用于在请求上下文中执行迭代
+        """
+        _environ, _namespace, _sid, _event = request_info
+        try:
+            # 在请求上下文中执行, 让处理函数可以使用emit、broadcast等函数
+            with self._app.request_context(_environ):
+                flask_request.sid = _sid
+                flask_request.namespace = _namespace
+                flask_request.event = _event
+                for _item in resp:
+                    if stop_flag['stop']:
+                        break
+                    batch_queue.put((False, _item))
+                else:
+                    batch_queue.put((True, None))
+        except Exception as _e:
+            if not stop_flag['stop']:
+                batch_queue.put((True, _e))
+        finally:
+            resp.close()
+
+    def _emit_service_resp(self, resp: dict, namespace: str, sid: str):
+        """
+        推送服务响应
+
+        @param {dict} resp - 标准响应字典
+        @param {str} namespace - 请求的命名空间
+        @param {str} sid - 请求连接的sid
+        """
+        self.socketio.emit('%s_resp' % self.service_event, resp, namespace=namespace, to=sid)
+
+    def _get_worker_queue(self):
+        """
+        获取工作任务的请求队列, 未启动工作任务时启动
+
+        @returns {Queue} - 请求队列
+        """
+        _queue = self._worker_queue
+        if _queue is not None:
+            return _queue
+
+        with self._worker_lock:
+            if self._worker_queue is None:
+                # 使用与SocketIO异步模式匹配的队列和后台任务
+                _queue = self.socketio.server.eio.create_queue()
+                for _ in range(self.service_worker_num):
+                    self.socketio.start_background_task(self._service_worker_func, _queue)
+                self._worker_queue = _queue
+
+            return self._worker_queue
+
+    def _service_worker_func(self, worker_queue):
+        """
+        工作任务的执行函数
+
+        @param {Queue} worker_queue - 请求队列
+        """
+        while True:
+            _item = worker_queue.get()
+            if _item is None:
+                # 服务停止
+                return
+
+            _ordered, _task = _item
+            _request, _namespace, _sid, _environ = _task
+            try:
+                # 在请求上下文中执行, 让处理函数可以使用emit、broadcast等函数
+                with self._app.request_context(_environ):
+                    flask_request.sid = _sid
+                    flask_request.namespace = _namespace
+                    flask_request.event = {'message': self.service_event, 'args': (_request, )}
+                    self._deal_service_request(_request, _namespace, _sid)
+            except:
+                self._logger.error('service worker error, namespace[%s], request[%s]: %s' % (
+                    _namespace, str(_request), traceback.format_exc()
+                ))
+
+            if _ordered:
+                # 将同一连接的下一个请求放入队列
+                with self._worker_lock:
+                    _pending = self._ordered_tasks.get(_sid, None)
+                    if _pending is None:
+                        continue
+                    if len(_pending) == 0:
+                        self._ordered_tasks.pop(_sid, None)
+                        continue
+                    _next_task = _pending.popleft()
+
+                worker_queue.put((True, _next_task))
 
     def _bg_tasks_func(self):
         """
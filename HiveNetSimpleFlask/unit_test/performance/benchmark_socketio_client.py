@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+SocketIOClient请求响应性能测试
+@module benchmark_socketio_client
+@file benchmark_socketio_client.py
+
+执行步骤:
+python benchmark_socketio_client.py [request_num] [stream_item_num]
+
+注: 启动本地SocketIOServer, 测试SocketIOClient.call顺序调用的平均往返时延,
+    以及服务函数返回迭代对象时客户端每秒可获取的数据项数量
+"""
+
+import os
+import sys
+import time
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetSimpleFlask.server import SocketIOServer
+from HiveNetSimpleFlask.client import SocketIOClient
+
+
+TEST_PORT = 5011
+
+
+def echo_service(request: dict):
+    """
+    直接返回收到的信息
+    """
+    return request['data']
+
+
+def stream_service(request: dict):
+    """
+    返回指定数量的迭代数据
+    """
+    for _i in range(request['data']):
+        yield _i
+
+
+if __name__ == '__main__':
+    _request_num = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    _stream_item_num = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    _server = SocketIOServer(
+        'benchmark_sio_server', server_config={
+            'flask_run': {'host': '127.0.0.1', 'port': TEST_PORT},
+            'service_namespace': ['/bench']
+        }
+    )
+    _server.add_service('echo_service', echo_service, namespace='/bench')
+    _server.add_service('stream_service', stream_service, namespace='/bench')
+    _result = _server.start(is_asyn=True)
+    if not _result.is_success():
+        raise RuntimeError('start server error: %s' % str(_result))
+
+    try:
+        with SocketIOClient({
+            'url': 'http://127.0.0.1:%d' % TEST_PORT, 'service_namespace': ['/bench']
+        }) as _client:
+            # 预热
+            _client.call('echo_service', 'warm up', namespace='/bench')
+
+            _start = time.perf_counter()
+            for _i in range(_request_num):
+                _result = _client.call('echo_service', {'index': _i}, namespace='/bench')
+                assert _result.is_success() and _result.resp['index'] == _i, str(_result)
+            _use = time.perf_counter() - _start
+            print('round trip   requests: %6d  use: %7.3fs  avg latency: %8.3fms' % (
+                _request_num, _use, _use / _request_num * 1000
+            ))
+
+            _start = time.perf_counter()
+            _result = _client.call('stream_service', _stream_item_num, namespace='/bench')
+            assert _result.is_success(), str(_result)
+            _count = sum(1 for _ in _result.resp)
+            _use = time.perf_counter() - _start
+            assert _count == _stream_item_num
+            print('stream       items: %9d  use: %7.3fs  items/s: %10.1f' % (
+                _count, _use, _count / _use
+            ))
+    finally:
+        _server.stop()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+SocketIOServer服务模式吞吐量性能测试
+@module benchmark_socketio_server
+@file benchmark_socketio_server.py
+
+执行步骤:
+python benchmark_socketio_server.py [service_worker_num] [stream_batch_size] [client_num] [request_num]
+
+注: 启动本地SocketIOServer后测试以下场景:
+    1、client_num个客户端线程并发调用耗时10ms的服务函数, 每个客户端调用request_num次, 统计每秒处理请求数;
+    2、单个客户端获取服务函数返回的迭代数据, 统计每秒获取的数据项数量;
+    3、在服务函数中将同一数据推送到多个命名空间, 比较直接推送和预编码后推送的耗时
+    可通过不同的service_worker_num(0代表在socket事件线程直接执行)和stream_batch_size(1代表不合并)参数比较差异
+"""
+
+import os
+import sys
+import time
+import threading
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetSimpleFlask.server import SocketIOServer
+from HiveNetSimpleFlask.client import SocketIOClient
+
+
+TEST_PORT = 5012
+NAMESPACES = ['/bench', '/bench1', '/bench2', '/bench3']
+SERVER = None
+
+
+def slow_service(request: dict):
+    """
+    模拟耗时10ms的服务(使用与SocketIO异步模式匹配的sleep)
+    """
+    SERVER.socketio.sleep(0.01)
+    return request['data']
+
+
+def stream_service(request: dict):
+    """
+    返回指定数量的迭代数据
+    """
+    for _i in range(request['data']):
+        yield {'index': _i, 'value': 'x' * 32}
+
+
+def broadcast_service(request: dict):
+    """
+    推送数据到多个命名空间, 返回直接推送和预编码推送的耗时
+    """
+    _data = {'items': [{'index': _i, 'value': 'x' * 32} for _i in range(200)]}
+    _times = request['data']
+    _start = time.perf_counter()
+    for _ in range(_times):
+        for _namespace in NAMESPACES:
+            SocketIOServer.broadcast('bench_broadcast', _data, namespace=_namespace)
+    _plain_use = time.perf_counter() - _start
+
+    _start = time.perf_counter()
+    _encoded = SocketIOServer.pre_encode(_data)
+    for _ in range(_times):
+        SocketIOServer.broadcast('bench_broadcast', _encoded, namespace=NAMESPACES)
+    _pre_encode_use = time.perf_counter() - _start
+
+    return [_plain_use, _pre_encode_use]
+
+
+def client_calls(client_num: int, request_num: int) -> float:
+    """
+    多个客户端并发调用, 返回耗时
+    """
+    _clients = [
+        SocketIOClient({'url': 'http://127.0.0.1:%d' % TEST_PORT, 'service_namespace': ['/bench']})
+        for _ in range(client_num)
+    ]
+
+    def _run(client):
+        for _i in range(request_num):
+            _result = client.call('slow_service', _i, namespace='/bench', overtime=60)
+            assert _result.is_success() and _result.resp == _i, str(_result)
+
+    _threads = [threading.Thread(target=_run, args=(_client, )) for _client in _clients]
+    _start = time.perf_counter()
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    _use = time.perf_counter() - _start
+
+    for _client in _clients:
+        _client.close()
+    return _use
+
+
+if __name__ == '__main__':
+    _worker_num = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    _batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    _client_num = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    _request_num = int(sys.argv[4]) if len(sys.argv) > 4 else 50
+    _stream_item_num = 5000
+    _broadcast_times = 200
+
+    SERVER = _server = SocketIOServer(
+        'benchmark_sio_server', server_config={
+            'flask_run': {'host': '127.0.0.1', 'port': TEST_PORT},
+            'service_namespace': NAMESPACES,
+            'service_worker_num': _worker_num,
+            'stream_batch_size': _batch_size
+        }
+    )
+    _server.add_service('slow_service', slow_service, namespace='/bench')
+    _server.add_service('stream_service', stream_service, namespace='/bench')
+    _server.add_service('broadcast_service', broadcast_service, namespace='/bench')
+    _result = _server.start(is_asyn=True)
+    if not _result.is_success():
+        raise RuntimeError('start server error: %s' % str(_result))
+
+    try:
+        print('service_worker_num: %d, stream_batch_size: %d' % (_worker_num, _batch_size))
+        _use = client_calls(_client_num, _request_num)
+        print('concurrent calls  clients: %3d  requests: %6d  use: %7.3fs  qps: %9.1f' % (
+            _client_num, _client_num * _request_num, _use, _client_num * _request_num / _use
+        ))
+
+        with SocketIOClient({
+            'url': 'http://127.0.0.1:%d' % TEST_PORT, 'service_namespace': ['/bench']
+        }) as _client:
+            _start = time.perf_counter()
+            _result = _client.call('stream_service', _stream_item_num, namespace='/bench', overtime=60)
+            assert _result.is_success(), str(_result)
+            _count = sum(1 for _ in _result.resp)
+            _use = time.perf_counter() - _start
+            assert _count == _stream_item_num
+            print('stream            items: %9d  use: %7.3fs  items/s: %10.1f' % (_count, _use, _count / _use))
+
+            _result = _client.call('broadcast_service', _broadcast_times, namespace='/bench', overtime=60)
+            assert _result.is_success(), str(_result)
+            print('broadcast %d namespaces x %d  plain: %7.3fs  pre-encoded: %7.3fs' % (
+                len(NAMESPACES), _broadcast_times, _result.resp[0], _result.resp[1]
+            ))
+    finally:
+        _server.stop()
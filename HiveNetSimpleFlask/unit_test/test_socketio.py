@@ -7,13 +7,18 @@
 """
 import sys
 import os
+import json
+import time
+import threading
 import unittest
+import gevent
+from socketio.packet import Packet as SocketIOPacket
 from HiveNetCore.logging_hivenet import Logger
 from HiveNetCore.utils.test_tool import TestTool
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir)))
-from HiveNetSimpleFlask.server import SocketIOServer
+from HiveNetSimpleFlask.server import SocketIOServer, PreEncodedData, PreEncodedJson
 from HiveNetSimpleFlask.client import SocketIOClient
 
 
@@ -104,6 +109,18 @@ def main_iter_service(request: dict):
         yield _item
 
 
+def main_slow_iter_service(request: dict):
+    """
+    返回迭代数据, 获取每个数据项前等待指定时间, 数据项为None时抛出异常
+    """
+    print('main_slow_iter_service get: %s' % str(request))
+    for _item in request['data']['items']:
+        gevent.sleep(request['data']['sleep'])
+        if _item is None:
+            raise RuntimeError('test iter error')
+        yield _item
+
+
 def main_none_service(request: dict):
     """
     返回None
@@ -117,6 +134,15 @@ def main_error_service(request: dict):
     raise RuntimeError('test error')
 
 
+def main_sleep_service(request: dict):
+    """
+    等待指定秒数后返回
+    """
+    print('main_sleep_service get: %s' % str(request))
+    time.sleep(request['data'])
+    return request['data']
+
+
 #############################
 # 类函数
 #############################
@@ -171,6 +197,9 @@ class TestSocketIOServer(unittest.TestCase):
         cls.server.add_service(
             'main_error_service', main_error_service, namespace='/test'
         )
+        cls.server.add_service(
+            'main_sleep_service', main_sleep_service, namespace='/test'
+        )
         _class_obj = TestInstance()
         cls.server.add_service_by_class(
             [_class_obj, ], namespace='/test'
@@ -272,6 +301,157 @@ class TestSocketIOServer(unittest.TestCase):
                 '%s失败: %s' % (_tips, str(_result))
             )
 
+    def test_wait_resp(self):
+        # 测试客户端等待响应的处理
+        with SocketIOClient({
+            'url': 'http://127.0.0.1:5001',
+            'is_native_mode': False,
+            'service_namespace': ['/test', '/prd']
+        }) as _client:
+            _tips = '测试等待响应 - 正常返回'
+            _result = _client.call('main_sleep_service', 0.1, namespace='/test')
+            self.assertTrue(_result.is_success() and _result.resp == 0.1, '%s失败: %s' % (_tips, str(_result)))
+            self.assertEqual(len(_client._wait_resp_dict), 0, '%s失败: 等待对象未删除' % _tips)
+
+            _tips = '测试等待响应 - 超时'
+            _start = time.time()
+            _result = _client.call('main_sleep_service', 1, namespace='/test', overtime=0.2)
+            _use = time.time() - _start
+            self.assertEqual(_result.code, '30403', '%s失败: %s' % (_tips, str(_result)))
+            self.assertLess(_use, 0.9, '%s失败: 等待时间 %s' % (_tips, _use))
+            self.assertEqual(len(_client._wait_resp_dict), 0, '%s失败: 等待对象未删除' % _tips)
+
+            _tips = '测试等待响应 - 等待时断开连接'
+            _results = []
+            _thread = threading.Thread(
+                target=lambda: _results.append(
+                    _client.call('main_sleep_service', 2, namespace='/test', overtime=5)
+                )
+            )
+            _start = time.time()
+            _thread.start()
+            time.sleep(0.3)
+            _client.disconnect()
+            _thread.join(5)
+            _use = time.time() - _start
+            self.assertEqual(len(_results), 1, '%s失败: 调用未返回' % _tips)
+            self.assertEqual(_results[0].code, '20406', '%s失败: %s' % (_tips, str(_results[0])))
+            self.assertLess(_use, 1.5, '%s失败: 等待时间 %s' % (_tips, _use))
+            self.assertEqual(len(_client._wait_resp_dict), 0, '%s失败: 等待对象未删除' % _tips)
+
+
+class TestSocketIOServerWorker(unittest.TestCase):
+    """
+    测试SocketIOServer使用工作任务及合并推送的处理
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        启动测试类执行的初始化，只执行一次
+        """
+        cls.server = SocketIOServer(
+            'test_sio_worker_server', server_config={
+                'flask_run': {
+                    'host': '127.0.0.1', 'port': 5002
+                },
+                'service_namespace': ['/test'],
+                'service_worker_num': 4,
+                'stream_batch_size': 3
+            },
+            logger=LOGGER
+        )
+
+        cls.server.add_service('main_resp_service', main_resp_service, namespace='/test')
+        cls.server.add_service('main_iter_service', main_iter_service, namespace='/test')
+        cls.server.add_service('main_slow_iter_service', main_slow_iter_service, namespace='/test')
+        cls.server.add_service('main_ordered_service', main_resp_service, namespace='/test', ordered=True)
+        cls.server.add_service('main_error_service', main_error_service, namespace='/test')
+
+        _result = cls.server.start(is_asyn=True)
+        if not _result.is_success():
+            raise RuntimeError('start server error: %s' % str(_result))
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        结束测试类执行的销毁，只执行一次
+        """
+        _result = cls.server.stop()
+        if not _result.is_success():
+            print('stop server error: %s' % str(_result))
+
+    def test_worker(self):
+        with SocketIOClient({
+            'url': 'http://127.0.0.1:5002',
+            'service_namespace': ['/test']
+        }) as _client:
+            _tips = '测试工作任务执行并获取返回值'
+            _except = {'a': 'val_a', 'b': 'val_b'}
+            for _service in ('main_resp_service', 'main_ordered_service', 'main_ordered_service'):
+                _result = _client.call(_service, _except, namespace='/test')
+                self.assertTrue(
+                    _result.is_success() and TestTool.cmp_dict(_except, _result.resp),
+                    '%s失败: %s' % (_tips, str(_result))
+                )
+
+            _tips = '测试合并推送迭代对象'
+            _except = ['a', 'b', 'c', 'd', 'e', 'f', 'g']
+            _result = _client.call('main_iter_service', _except, namespace='/test')
+            self.assertTrue(_result.is_success(), '%s失败: %s' % (_tips, str(_result)))
+            self.assertEqual(list(_result.resp), _except, '%s失败' % _tips)
+
+            _tips = '测试合并推送迭代对象 - 获取数据阻塞时按等待时间推送'
+            _start = time.time()
+            _result = _client.call(
+                'main_slow_iter_service', {'items': ['a', 'b'], 'sleep': 0.5}, namespace='/test'
+            )
+            self.assertTrue(_result.is_success(), '%s失败: %s' % (_tips, str(_result)))
+            _items = list()
+            _uses = list()
+            for _item in _result.resp:
+                _items.append(_item)
+                _uses.append(time.time() - _start)
+            self.assertEqual(_items, ['a', 'b'], '%s失败' % _tips)
+            self.assertLess(_uses[0], 0.9, '%s失败: 第1项推送时间 %s' % (_tips, str(_uses)))
+
+            _tips = '测试合并推送迭代对象 - 获取数据项异常'
+            _result = _client.call(
+                'main_slow_iter_service', {'items': ['a', None], 'sleep': 0.2}, namespace='/test'
+            )
+            self.assertTrue(_result.is_success(), '%s失败: %s' % (_tips, str(_result)))
+            with self.assertRaisesRegex(RuntimeError, 'test iter error'):
+                list(_result.resp)
+
+            _tips = '测试服务函数返回异常'
+            _result = _client.call('main_error_service', _except, namespace='/test')
+            self.assertTrue(
+                not _result.is_success() and _result.error == 'test error',
+                '%s失败: %s' % (_tips, str(_result))
+            )
+
+    def test_pre_encode(self):
+        _data = {'a': 'val_a', 'b': [1, 2, 3]}
+        _json = PreEncodedJson(json)
+        self.assertEqual(
+            _json.dumps(['event', PreEncodedData(_data, json_obj=json)], separators=(',', ':')),
+            json.dumps(['event', _data], separators=(',', ':'))
+        )
+        self.assertEqual(_json.dumps(['event', _data]), json.dumps(['event', _data]))
+
+        # 预编码处理只替换服务器独立报文类的json对象, 不修改全局的SocketIO报文类
+        _global_json = SocketIOPacket.json
+        _server = SocketIOServer('test_pre_encode_server', server_config={'debug': False}, logger=LOGGER)
+        _packet_class = _server.socketio.server.packet_class
+        self.assertIsNot(_packet_class, SocketIOPacket)
+        self.assertIsInstance(_packet_class.json, PreEncodedJson)
+        self.assertIs(SocketIOPacket.json, _global_json)
+        self.assertIs(PreEncodedJson.get_packet_json(app=_server.native_app), _packet_class.json)
+        self.assertEqual(
+            _packet_class(data=['event', PreEncodedData(_data)]).encode(),
+            SocketIOPacket(data=['event', _data]).encode()
+        )
+
 
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作
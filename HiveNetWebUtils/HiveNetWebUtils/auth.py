@@ -14,7 +14,7 @@
 import sys
 import os
 import copy
-import re
+import hmac
 import json
 import datetime
 from typing import Any
@@ -24,6 +24,11 @@ from HiveNetCore.utils.string_tool import StringTool
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetWebUtils.utils.cryptography import HCrypto
+from HiveNetWebUtils.utils.ip_rule import IPRuleTable
+from HiveNetWebUtils.utils.auth_cache import SecretCache, NonceStore
+
+
+_SIGN_EXCLUDE_PARAS = frozenset(('app_id', 'nonce_str', 'timestamp', 'sign'))  # 不参与参数排序拼接的签名参数
 
 
 class AuthBaseFw(object):
@@ -143,10 +148,11 @@ class IPAuth(AuthBaseFw):
         IP黑白名单模式验证模块
 
         @param {list} init_blacklist=None - 初始化的黑名单
-            名单可以使用通配符禁止某个网段, 例如 ['127.0.*.*', '138.*.*.*']
+            名单可以使用通配符或CIDR禁止某个网段(支持IPv6), 例如 ['127.0.*.*', '138.*.*.*', '10.1.0.0/16', '2001:db8::/32']
         @param {list} init_whitelist=None - 初始化的白名单
         @param {int} error_resp_status=403 - 验证失败返回状态码
         @param {str|dict} error_resp_msg={'status': '10409', 'msg':'IP地址验证失败'} - 验证失败返回的信息
+        @param {int} ip_cache_size=4096 - 名单匹配结果缓存的最大IP数, 0代表不缓存
         """
         self.para = kwargs
         self.error_resp_status = self.para.get('error_resp_status', 403)
@@ -154,16 +160,11 @@ class IPAuth(AuthBaseFw):
             'error_resp_msg', {'status': '10409', 'msg': 'IP地址验证失败'}
         )
 
-        # 黑白名单管理
+        # 黑白名单管理, 名单编译为区间表匹配, 修改名单时整体替换匹配数据, 验证处理无需加锁
+        _cache_size = self.para.get('ip_cache_size', 4096)
         self.ip_dict = {
-            'blacklist': {
-                'show': list(),  # 显示配置
-                'reg': dict()  # 正则表的配置, key为show中的显示名, value为正则表达式规则
-            },
-            'whitelist': {
-                'show': list(),  # 显示配置
-                'reg': dict()  # 正则表的配置, key为show中的显示名, value为正则表达式规则
-            }
+            'blacklist': IPRuleTable(cache_size=_cache_size),
+            'whitelist': IPRuleTable(cache_size=_cache_size)
         }
 
         # 初始化黑白名单
@@ -207,13 +208,7 @@ class IPAuth(AuthBaseFw):
 
         @param {str|list} ips - 要添加的ip或ip列表
         """
-        if type(ips) == str:
-            # 单个黑名单
-            self._add_list('blacklist', ips)
-        else:
-            # 多个黑名单
-            for _ip in ips:
-                self._add_list('blacklist', _ip)
+        self.ip_dict['blacklist'].add(ips)
 
     def remove_blacklist(self, ips):
         """
@@ -221,21 +216,21 @@ class IPAuth(AuthBaseFw):
 
         @param {str|list} ips - 要删除的ip或ip列表
         """
-        if type(ips) == str:
-            # 单个黑名单
-            self._remove_list('blacklist', ips)
-        else:
-            # 多个黑名单
-            for _ip in ips:
-                self._remove_list('blacklist', _ip)
+        self.ip_dict['blacklist'].remove(ips)
 
     def clear_blacklist(self):
         """
         清除黑名单
         """
         self.ip_dict['blacklist'].clear()
-        self.ip_dict['blacklist']['show'] = list()
-        self.ip_dict['blacklist']['reg'] = dict()
+
+    def reload_blacklist(self, ips):
+        """
+        使用新的名单整体替换黑名单(替换过程不影响正在进行的验证)
+
+        @param {str|list} ips - 新的ip或ip列表
+        """
+        self.ip_dict['blacklist'].reload(ips)
 
     def add_whitelist(self, ips):
         """
@@ -243,13 +238,7 @@ class IPAuth(AuthBaseFw):
 
         @param {str|list} ips - 要添加的ip或ip列表
         """
-        if type(ips) == str:
-            # 单个黑名单
-            self._add_list('whitelist', ips)
-        else:
-            # 多个黑名单
-            for _ip in ips:
-                self._add_list('whitelist', _ip)
+        self.ip_dict['whitelist'].add(ips)
 
     def remove_whitelist(self, ips):
         """
@@ -257,61 +246,25 @@ class IPAuth(AuthBaseFw):
 
         @param {str|list} ips - 要删除的ip或ip列表
         """
-        if type(ips) == str:
-            # 单个黑名单
-            self._remove_list('whitelist', ips)
-        else:
-            # 多个黑名单
-            for _ip in ips:
-                self._remove_list('whitelist', _ip)
+        self.ip_dict['whitelist'].remove(ips)
 
     def clear_whitelist(self):
         """
         清除白名单
         """
         self.ip_dict['whitelist'].clear()
-        self.ip_dict['whitelist']['show'] = list()
-        self.ip_dict['whitelist']['reg'] = dict()
-
-    #############################
-    # 内部函数
-    #############################
-
-    def _add_list(self, ip_type: str, ip: str):
-        """
-        插入名单数据
 
-        @param {str} ip_type - 'blacklist' 或 'whitelist'
-        @param {str} ip - 要插入的ip地址
-        """
-        _dict = self.ip_dict[ip_type]
-        if ip in _dict['show']:
-            # 名单已存在
-            return
-
-        # 加入显示名单
-        _dict['show'].append(ip)
-
-        # 生成名单的匹配正则表达式
-        if ip.find('*') >= 0:
-            # 需要生成正则表达式
-            _re = re.compile('^' + ip.replace('.', '\\.').replace('*', '.*') + '$')
-            _dict['reg'][ip] = _re
-
-    def _remove_list(self, ip_type: str, ip: str):
+    def reload_whitelist(self, ips):
         """
-        删除名单数据
+        使用新的名单整体替换白名单(替换过程不影响正在进行的验证)
 
-        @param {str} ip_type - 'blacklist' 或 'whitelist'
-        @param {str} ip - 要删除的ip地址
+        @param {str|list} ips - 新的ip或ip列表
         """
-        _dict = self.ip_dict[ip_type]
-        if ip in _dict['show']:
-            # 删除正则表达式
-            _dict['reg'].pop(ip, None)
+        self.ip_dict['whitelist'].reload(ips)
 
-            # 删除显示ip
-            _dict['show'].remove(ip)
+    #############################
+    # 内部函数
+    #############################
 
     def _verify_ip(self, ip_type: str, ip: str) -> bool:
         """
@@ -322,17 +275,7 @@ class IPAuth(AuthBaseFw):
 
         @returns {bool} - 检查结果, 匹配到返回True
         """
-        _dict = self.ip_dict[ip_type]
-        if ip in _dict['show']:
-            return True
-
-        # 遍历正则规则
-        for _re in _dict['reg'].values():
-            if _re.search(ip) is not None:
-                return True
-
-        # 没有匹配上
-        return False
+        return self.ip_dict[ip_type].match(ip)
 
     #############################
     # 重载基础框架的函数
@@ -352,7 +295,7 @@ class IPAuth(AuthBaseFw):
         _ip = await AsyncTools.async_run_coroutine(self._get_ip_from_request(*args, **kwargs))
 
         # 先检查白名单
-        if len(self.ip_dict['whitelist']['show']) > 0:
+        if len(self.ip_dict['whitelist']) > 0:
             if not self.verify_whitelist(_ip):
                 # 不在白名单内
                 _status = self.error_resp_status
@@ -444,6 +387,15 @@ class AppKeyAuth(AuthBaseFw):
             HMAC-SHA256
         @param {dict} algorithm_extend=None - 扩展算法支持, key为algorithm名, value为扩展的算法函数
             扩展函数定义如下: fun(value:str, key:str) -> str
+        @param {float} secret_cache_ttl=0 - 密钥对缓存有效期(秒), 0代表不缓存, 每次都通过get_secret_fun获取
+            注: 缓存过期时只有一个请求执行get_secret_fun刷新, 其他请求继续使用过期的密钥对
+        @param {float} secret_cache_negative_ttl=5.0 - get_secret_fun抛出异常(例如app_id不存在)时的缓存有效期(秒)
+        @param {int} secret_cache_size=10000 - 密钥对缓存的最大数量
+        @param {bool} nonce_check=False - 是否检查nonce_str重复(拒绝时间戳有效范围内的重放请求)
+            注: nonce_str的登记保存在内存中, 多个服务实例的情况只能拒绝对同一实例的重放
+        @param {int} nonce_store_size=100000 - nonce_str的最大登记数量
+        @param {int} nonce_error_resp_status=403 - nonce_str重复时返回状态码
+        @param {str|dict} nonce_error_resp_msg={'status': '13009', 'msg':'重复的请求'} - nonce_str重复时返回的信息
         """
         self.para = kwargs
         self.get_secret_fun = self.para.get('get_secret_fun', self.apk_get_secret_fun)
@@ -472,6 +424,26 @@ class AppKeyAuth(AuthBaseFw):
         # 简易的AppKey管理台, 内存字典管理, key为app_id, value为(app_key, app_secret) 键值对
         self._app_key_manager = dict()
 
+        # 密钥对缓存
+        self._secret_cache = None
+        if self.para.get('secret_cache_ttl', 0) > 0:
+            self._secret_cache = SecretCache(
+                lambda app_id: self.get_secret_fun(app_id), ttl=self.para['secret_cache_ttl'],
+                negative_ttl=self.para.get('secret_cache_negative_ttl', 5.0),
+                max_size=self.para.get('secret_cache_size', 10000)
+            )
+
+        # 防重放的nonce_str登记, 登记时间窗口覆盖时间戳允许的前后差异范围
+        self.nonce_error_resp_status = self.para.get('nonce_error_resp_status', 403)
+        self.nonce_error_resp_msg = self.para.get(
+            'nonce_error_resp_msg', {'status': '13009', 'msg': '重复的请求'}
+        )
+        self._nonce_store = None
+        if self.para.get('nonce_check', False):
+            self._nonce_store = NonceStore(
+                window=self.timestamp_expired_time * 2, max_size=self.para.get('nonce_store_size', 100000)
+            )
+
     #############################
     # 签名工具
     #############################
@@ -492,24 +464,28 @@ class AppKeyAuth(AuthBaseFw):
         _nonce_str = msg['nonce_str']
         _timestamp = msg['timestamp']
 
-        # 参数清单组合, 按参数名排序, 去掉非空值, URL键值对方式组合
-        _para_list = list(msg.keys())
-        _para_list.sort()
-        _str_sign_temp = ''
-        for _para in _para_list:
-            if _para not in ('app_id', 'nonce_str', 'timestamp', 'sign') and msg[_para] not in (None, ''):
-                _value = msg[_para]
-                if type(_value) != str:
-                    _value = json.dumps(_value, ensure_ascii=False, sort_keys=True)
-
-                _str_sign_temp = '%s%s=%s&' % (
-                    _str_sign_temp, _para, _value
-                )
+        # 参数清单组合, 按参数名排序, 去掉非空值, URL键值对方式组合(放入数组最后一次拼接)
+        _parts = list()
+        for _para in sorted(msg):
+            if _para in _SIGN_EXCLUDE_PARAS:
+                continue
+
+            _value = msg[_para]
+            if _value is None or _value == '':
+                continue
+
+            _type = type(_value)
+            if _type is not str:
+                # 整数的json字符串与str一致, 无需json转换
+                _value = str(_value) if _type is int else json.dumps(_value, ensure_ascii=False, sort_keys=True)
+
+            _parts.append('%s=%s&' % (_para, _value))
 
         # 增加app_id、app_key、app_secret, nonce_str、timestamp到键值对中
-        _str_sign_temp = '%sapp_id=%s&app_key=%s&app_secret=%s&nonce_str=%s&timestamp=%s' % (
-            _str_sign_temp, _app_id, app_key, app_secret, _nonce_str, _timestamp
-        )
+        _parts.append('app_id=%s&app_key=%s&app_secret=%s&nonce_str=%s&timestamp=%s' % (
+            _app_id, app_key, app_secret, _nonce_str, _timestamp
+        ))
+        _str_sign_temp = ''.join(_parts)
 
         # 进行加密处理并返回签名串
         _algorithm = self.algorithm if algorithm is None else algorithm
@@ -529,7 +505,7 @@ class AppKeyAuth(AuthBaseFw):
         msg['nonce_str'] = HCrypto.generate_nonce(self.para.get('nonce_len', 8))  # 随机字符串
         msg['timestamp'] = datetime.datetime.now().strftime(self.timestamp_fmt)  # 时间戳
         _sign_type = msg.get('sign_type', self.algorithm)  # 签名类型, 如果有送值代表指定算法
-        _app_key, _app_secret = self.get_secret_fun(_app_id)  # 通过指定的算法获取
+        _app_key, _app_secret = self.get_secret(_app_id)  # 通过指定的算法获取
         msg['sign'] = self.get_signature(msg, _app_key, _app_secret, algorithm=_sign_type)
 
         return msg
@@ -545,9 +521,9 @@ class AppKeyAuth(AuthBaseFw):
         try:
             _app_id = msg['app_id']
             _sign_type = msg.get('sign_type', self.algorithm)  # 签名类型, 如果有送值代表指定算法
-            _app_key, _app_secret = self.get_secret_fun(_app_id)  # 通过指定的算法获取
+            _app_key, _app_secret = self.get_secret(_app_id)  # 通过指定的算法获取
             _sign = self.get_signature(msg, _app_key, _app_secret, algorithm=_sign_type)
-            return _sign == msg['sign']
+            return hmac.compare_digest(_sign, msg['sign'])
         except:
             return False
 
@@ -560,13 +536,63 @@ class AppKeyAuth(AuthBaseFw):
         @returns {bool} - 验证结果
         """
         try:
-            _timestamp = datetime.datetime.strptime(msg['timestamp'], self.timestamp_fmt)
+            _timestamp = msg['timestamp']
+            if self.timestamp_fmt == '%Y%m%d%H%M%S' and len(_timestamp) == 14 and _timestamp.isdigit():
+                # 默认格式直接截取转换, 避免strptime的开销
+                _timestamp = datetime.datetime(
+                    int(_timestamp[0:4]), int(_timestamp[4:6]), int(_timestamp[6:8]),
+                    int(_timestamp[8:10]), int(_timestamp[10:12]), int(_timestamp[12:14])
+                )
+            else:
+                _timestamp = datetime.datetime.strptime(_timestamp, self.timestamp_fmt)
             if abs((datetime.datetime.now() - _timestamp).total_seconds()) > self.timestamp_expired_time:
                 return False
             return True
         except:
             return False
 
+    def verify_nonce(self, msg: dict) -> bool:
+        """
+        验证nonce_str是否未使用过(并登记当前nonce_str)
+        注: 未开启nonce_check时直接返回True
+
+        @param {dict} msg - 要验证的报文字典
+
+        @returns {bool} - 验证结果, 重复的请求返回False
+        """
+        if self._nonce_store is None:
+            return True
+
+        try:
+            return self._nonce_store.check_and_add(msg['app_id'], msg['nonce_str'])
+        except:
+            return False
+
+    #############################
+    # 密钥对获取
+    #############################
+    def get_secret(self, app_id: str) -> tuple:
+        """
+        获取app_id的密钥对(开启缓存时优先从缓存获取)
+
+        @param {str} app_id - 要获取的app_id
+
+        @returns {tuple} - (app_key, app_secret) 密钥对
+        """
+        if self._secret_cache is None:
+            return self.get_secret_fun(app_id)
+
+        return self._secret_cache.get(app_id)
+
+    def invalidate_secret(self, app_id: str = None):
+        """
+        删除密钥对缓存(密钥对更新后调用)
+
+        @param {str} app_id=None - 要删除的app_id, 不传代表删除所有缓存
+        """
+        if self._secret_cache is not None:
+            self._secret_cache.invalidate(app_id)
+
     #############################
     # 简易AppKey管理台工具
     #############################
@@ -588,6 +614,7 @@ class AppKeyAuth(AuthBaseFw):
         @param {tuple} key_pair - (app_key, app_secret) 密钥对
         """
         self._app_key_manager[app_id] = key_pair
+        self.invalidate_secret(app_id)
 
     def apk_generate_key_pair(self, app_id: str) -> tuple:
         """
@@ -601,6 +628,7 @@ class AppKeyAuth(AuthBaseFw):
         _app_key = StringTool.get_random_str(random_length=8)
         _app_secret = StringTool.get_random_str(random_length=32)
         self._app_key_manager[app_id] = (_app_key, _app_secret)
+        self.invalidate_secret(app_id)
 
         return (_app_key, _app_secret)
 
@@ -659,6 +687,10 @@ class AppKeyAuth(AuthBaseFw):
             # 验证失败, 返回标准的错误信息
             _status = self.sign_error_resp_status
             _resp_msg = copy.deepcopy(self.sign_error_resp_msg)
+        elif not self.verify_nonce(_json_dict):
+            # 签名验证通过后再登记nonce_str, 避免伪造请求占用合法的nonce_str
+            _status = self.nonce_error_resp_status
+            _resp_msg = copy.deepcopy(self.nonce_error_resp_msg)
 
         if _status == 200:
             # 返回校验成功
@@ -14,8 +14,10 @@
 """
 import sys
 import os
-import copy
 import ssl
+import asyncio
+import logging
+import threading
 import traceback
 import json as def_json
 from typing import Any
@@ -76,6 +78,22 @@ class ClientBaseFw(object):
         # 退出是关闭连接
         AsyncTools.sync_run_coroutine(self.close())
 
+    async def __aenter__(self):
+        """
+        async with进入调用的函数
+        """
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """
+        async with退出的函数
+
+        @param {?} exc_type - 异常类型
+        @param {?} exc_val - 异常值
+        @param {?} exc_tb - tracback信息
+        """
+        await AsyncTools.async_run_coroutine(self.close())
+
     #############################
     # 需要重载的公共函数
     #############################
@@ -168,9 +186,39 @@ class AIOHttpClient(ClientBaseFw):
             http_ver {tuple} - http协议版本, (主版本号, 次版本号), 默认为(1, 1)
             aiohttp_session_paras {dict} - aiohttp.ClientSession的全局调用参数
             aiohttp_request_paras {dict} - aiohttp.ClientSession.request的全局调用参数
-        """
+            use_session_pool {bool} - 是否使用持久会话(连接池), 默认为True
+                注: 持久会话按事件循环(event loop)创建并复用连接(keep-alive), 需通过close或async with方式关闭
+                    (析构时不会自动关闭, 只记录未关闭的告警日志);
+                    设置为False时每次调用都创建新的会话, 调用完成后关闭
+            conn_limit {int} - 会话连接池的最大连接数, 0代表不限制, 默认为100
+            conn_limit_per_host {int} - 每个目标主机(host+port)的最大连接数, 0代表不限制, 默认为0
+            keepalive_timeout {float} - 空闲连接的保持时间, 单位为秒, 默认为15
+            dns_cache_ttl {float} - DNS解析结果的缓存时间, 单位为秒, None代表永久缓存, 默认为10
+            aiohttp_connector_paras {dict} - aiohttp.TCPConnector的其他调用参数
+        """
+        # 持久会话字典, key为事件循环对象, value为会话对象
+        self._sessions = dict()
+        self._sessions_lock = threading.Lock()
         super().__init__(conn_config, **kwargs)
 
+    def __del__(self):
+        """
+        析构函数
+        注: 析构时无法保证会话所在的事件循环可用, 因此不关闭持久会话, 只记录告警日志
+        """
+        _sessions = getattr(self, '_sessions', None)
+        if not _sessions:
+            # 没有持久会话, 无需处理
+            return
+
+        _unclosed = len([_session for _session in list(_sessions.values()) if not _session.closed])
+        if _unclosed > 0:
+            logging.getLogger(__name__).warning(
+                'Unclosed %s sessions [%d], please call close or use "async with"' % (
+                    self.__class__.__name__, _unclosed
+                )
+            )
+
     #############################
     # 需要重载的公共函数
     #############################
@@ -196,7 +244,20 @@ class AIOHttpClient(ClientBaseFw):
         关闭连接
         (可为同步或异步函数)
         """
-        pass
+        _sessions = getattr(self, '_sessions', None)
+        if not _sessions:
+            return
+
+        with self._sessions_lock:
+            _items = list(_sessions.items())
+            _sessions.clear()
+
+        for _loop, _session in _items:
+            try:
+                await self._close_session(_session, _loop)
+            except:
+                # 关闭失败不影响其他会话的关闭
+                pass
 
     async def reconnect(self, *args, **kwargs) -> CResult:
         """
@@ -208,7 +269,9 @@ class AIOHttpClient(ClientBaseFw):
 
         @returns {CResult} - 响应对象, 如果返回结果为失败代表重连失败
         """
-        pass
+        # 关闭现有的持久会话, 下次调用时重新创建
+        await self.close()
+        return CResult(code='00000')
 
     async def call(self, service_uri: str, request: Any = None, headers: dict = {}, method: str = 'GET',
             timeout: float = None, bytes_read_size: int = -1, debug: bool = False, **kwargs) -> CResult:
@@ -232,6 +295,7 @@ class AIOHttpClient(ClientBaseFw):
                 status {int} - 返回状态码
                 headers {dict} - 返回报文头
                 data {bytes|asyncgen} - 返回内容, 如果bytes_read_size为-1则是全部的字节数组, 否则为异步迭代对象(每次返回指定大小的数组)
+                    注: 异步迭代对象需读取完成(或调用aclose)后才会将连接归还连接池
         """
         # 要访问的url
         _url = service_uri if service_uri.startswith('http://') or service_uri.startswith('https://') else '%s%s' % (
@@ -239,90 +303,23 @@ class AIOHttpClient(ClientBaseFw):
         )
 
         # 其他请求参数的处理
-        _headers = copy.deepcopy(self._headers)
+        _headers = dict(self._headers)
         _headers.update(headers)
-        _timeout = self._timeout if timeout is None else timeout
-        _aiohttp_request_paras = copy.copy(self._aiohttp_request_paras)
+        _aiohttp_request_paras = dict(self._aiohttp_request_paras)
         _aiohttp_request_paras.update(kwargs)
+        if timeout is not None:
+            # 指定本次请求的超时时间, 否则使用会话的全局超时时间
+            _aiohttp_request_paras['timeout'] = aiohttp.ClientTimeout(total=timeout)
 
         # 处理发送对象
         _send_data = None if request is None else self._obj_to_request(request, _headers)
 
         _std_resp = {} # 标准响应对象
         try:
-            async with aiohttp.ClientSession(
-                headers=_headers,
-                timeout=aiohttp.ClientTimeout(total=_timeout),
-                connector=aiohttp.TCPConnector(enable_cleanup_closed=True),
-                version=self._http_ver, **self._aiohttp_session_paras
-            ) as _session:
-                # 真正进行调用
-                try:
-                    if debug:
-                        # 打印请求信息
-                        print(method, _url)
-                        print('headers:')
-                        if _headers is not None:
-                            print(def_json.dumps(_headers, ensure_ascii=False, indent=2))
-                        print('body:')
-                        if _send_data is not None:
-                            if _headers is not None and headers.get('Content-Type', '') == 'application/octet-stream':
-                                # 二进制数据
-                                print(StringTool.bytes_to_hex(_send_data))
-                            else:
-                                # 字符串格式
-                                print(str(_send_data, encoding='utf-8'))
-
-                    # 进行请求
-                    async with _session.request(
-                        method, _url, data=_send_data, ssl=self._ssl, **_aiohttp_request_paras
-                    ) as _response:
-                        # 处理标准响应信息
-                        _std_resp['url'] = _response.url
-                        _std_resp['status'] = _response.status
-                        _std_resp['headers'] = {}
-                        for _item in _response.headers.items():
-                            _std_resp['headers'][_item[0]] = _item[1]
-
-                        # 获取内容
-                        if bytes_read_size > 0:
-                            # 分次获取二进制流数据的方式
-                            _std_resp['data'] = self._resp_bytes_to_async_iter(
-                                _response, bytes_read_size
-                            )
-                        else:
-                            _std_resp['data'] = await _response.read()
-                            if _std_resp['status'] == 200 and _std_resp['data'] == '':
-                                _std_resp['data'] = None
-
-                        # 打印返回信息
-                        if debug:
-                            print('')
-                            print('Resp Url: %s' % _std_resp['url'])
-                            print('Resp Status: %d' % _std_resp['status'])
-                            print('headers:')
-                            if _std_resp['headers'] is not None:
-                                print(def_json.dumps(_std_resp['headers'], ensure_ascii=False, indent=2))
-                            print('body:')
-                            if _std_resp['data'] is not None:
-                                if _std_resp.get('headers', {}).get('Content-Type', '') == 'application/octet-stream':
-                                    # 二进制数据
-                                    print(StringTool.bytes_to_hex(_std_resp['data']))
-                                else:
-                                    # 字符串格式
-                                    print(str(_std_resp['data'], encoding='utf-8'))
-
-                        # 返回处理结果
-                        _result = CResult(code='00000')
-                        _result.resp = _std_resp
-                        return _result
-                except Exception as _err:
-                    # 已经发起远程调用, 如果出现异常都视为未知类的异常
-                    _result = CResult(
-                        code='31007', error=str(_err), trace_str=traceback.format_exc()
-                    )
-                    _result.resp = _std_resp
-                    return _result
+            if self._use_session_pool:
+                _session = self._get_session()
+            else:
+                _session = self._new_session()
         except Exception as _err:
             # 未发起远程调用, 异常视为失败
             _result = CResult(
@@ -331,6 +328,83 @@ class AIOHttpClient(ClientBaseFw):
             _result.resp = _std_resp
             return _result
 
+        # 真正进行调用
+        _is_stream = False  # 是否分次获取数据, 由迭代对象负责释放响应和关闭会话
+        try:
+            if debug:
+                # 打印请求信息
+                print(method, _url)
+                print('headers:')
+                if _headers is not None:
+                    print(def_json.dumps(_headers, ensure_ascii=False, indent=2))
+                print('body:')
+                if _send_data is not None:
+                    if _headers is not None and headers.get('Content-Type', '') == 'application/octet-stream':
+                        # 二进制数据
+                        print(StringTool.bytes_to_hex(_send_data))
+                    else:
+                        # 字符串格式
+                        print(str(_send_data, encoding='utf-8'))
+
+            # 进行请求
+            _response = await _session.request(
+                method, _url, data=_send_data, headers=_headers, ssl=self._ssl, **_aiohttp_request_paras
+            )
+            try:
+                # 处理标准响应信息
+                _std_resp['url'] = _response.url
+                _std_resp['status'] = _response.status
+                _std_resp['headers'] = dict(_response.headers.items())
+
+                # 获取内容
+                if bytes_read_size > 0:
+                    # 分次获取二进制流数据的方式
+                    _std_resp['data'] = self._resp_bytes_to_async_iter(
+                        _response, bytes_read_size,
+                        session=None if self._use_session_pool else _session
+                    )
+                    _is_stream = True
+                else:
+                    _std_resp['data'] = await _response.read()
+                    if _std_resp['status'] == 200 and _std_resp['data'] == '':
+                        _std_resp['data'] = None
+            finally:
+                if not _is_stream:
+                    # 释放响应, 连接归还连接池
+                    _response.release()
+
+            # 打印返回信息
+            if debug:
+                print('')
+                print('Resp Url: %s' % _std_resp['url'])
+                print('Resp Status: %d' % _std_resp['status'])
+                print('headers:')
+                if _std_resp['headers'] is not None:
+                    print(def_json.dumps(_std_resp['headers'], ensure_ascii=False, indent=2))
+                print('body:')
+                if _std_resp['data'] is not None and not _is_stream:
+                    if _std_resp.get('headers', {}).get('Content-Type', '') == 'application/octet-stream':
+                        # 二进制数据
+                        print(StringTool.bytes_to_hex(_std_resp['data']))
+                    else:
+                        # 字符串格式
+                        print(str(_std_resp['data'], encoding='utf-8'))
+
+            # 返回处理结果
+            _result = CResult(code='00000')
+            _result.resp = _std_resp
+            return _result
+        except Exception as _err:
+            # 已经发起远程调用, 如果出现异常都视为未知类的异常
+            _result = CResult(
+                code='31007', error=str(_err), trace_str=traceback.format_exc()
+            )
+            _result.resp = _std_resp
+            return _result
+        finally:
+            if not self._use_session_pool and not _is_stream:
+                await _session.close()
+
     #############################
     # 需重载的内部函数
     #############################
@@ -369,6 +443,18 @@ class AIOHttpClient(ClientBaseFw):
         self._aiohttp_session_paras = self._conn_config.get('aiohttp_session_paras', {})
         self._aiohttp_request_paras = self._conn_config.get('aiohttp_request_paras', {})
 
+        # 会话连接池参数
+        self._use_session_pool = self._conn_config.get('use_session_pool', True)
+        self._connector_paras = {
+            'limit': self._conn_config.get('conn_limit', 100),
+            'limit_per_host': self._conn_config.get('conn_limit_per_host', 0),
+            'keepalive_timeout': self._conn_config.get('keepalive_timeout', 15.0),
+            'ttl_dns_cache': self._conn_config.get('dns_cache_ttl', 10),
+            'use_dns_cache': True,
+            'enable_cleanup_closed': True
+        }
+        self._connector_paras.update(self._conn_config.get('aiohttp_connector_paras', {}))
+
     #############################
     # 内部函数
     #############################
@@ -405,24 +491,108 @@ class AIOHttpClient(ClientBaseFw):
         # 返回字节数组
         return _data
 
-    async def _resp_bytes_to_async_iter(self, response, bytes_read_size: int) -> bytes:
+    async def _resp_bytes_to_async_iter(self, response, bytes_read_size: int, session=None) -> bytes:
         """
         将响应对象的content内容转换为异步迭代方式获取
 
         @param {ClientResponse} response - 响应对象
         @param {int} bytes_read_size - 二进制数据读取缓存大小
+        @param {aiohttp.ClientSession} session=None - 读取完成后需要关闭的会话(非持久会话)
+        """
+        try:
+            while True:
+                _chunk = await response.content.read(bytes_read_size)
+                if not _chunk:
+                    break
+                yield _chunk
+        finally:
+            response.release()
+            if session is not None:
+                await session.close()
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        """
+        创建新的会话对象
+        (需在事件循环中执行)
+
+        @returns {aiohttp.ClientSession} - 会话对象
+        """
+        return aiohttp.ClientSession(
+            headers=self._headers,
+            timeout=aiohttp.ClientTimeout(total=self._timeout),
+            connector=aiohttp.TCPConnector(**self._connector_paras),
+            version=self._http_ver, **self._aiohttp_session_paras
+        )
+
+    def _get_session(self) -> aiohttp.ClientSession:
         """
-        while True:
-            _chunk = await response.content.read(bytes_read_size)
-            if not _chunk:
-                break
-            yield _chunk
+        获取当前事件循环的持久会话对象, 不存在则创建
+        (需在事件循环中执行)
+
+        @returns {aiohttp.ClientSession} - 会话对象
+        """
+        _loop = asyncio.get_running_loop()
+        _session = self._sessions.get(_loop, None)
+        if _session is not None and not _session.closed:
+            return _session
+
+        with self._sessions_lock:
+            _session = self._sessions.get(_loop, None)
+            if _session is None or _session.closed:
+                # 清理已关闭的事件循环的会话
+                for _key in [_key for _key in self._sessions.keys() if _key.is_closed()]:
+                    self._sessions.pop(_key, None)
+
+                _session = self._new_session()
+                self._sessions[_loop] = _session
+
+        return _session
+
+    async def _close_session(self, session: aiohttp.ClientSession, loop):
+        """
+        关闭会话对象
+
+        @param {aiohttp.ClientSession} session - 要关闭的会话对象
+        @param {AbstractEventLoop} loop - 会话所在的事件循环
+        """
+        if session.closed or loop.is_closed():
+            return
+
+        try:
+            _running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            _running_loop = None
+
+        if loop is _running_loop:
+            await session.close()
+        elif loop.is_running():
+            # 会话所在的事件循环在其他线程运行, 提交到该事件循环执行
+            _future = asyncio.run_coroutine_threadsafe(session.close(), loop)
+            if _running_loop is None:
+                _future.result(timeout=5)
+            else:
+                await asyncio.wait_for(asyncio.wrap_future(_future), 5)
+        else:
+            loop.run_until_complete(session.close())
 
 
 class HttpClient(AIOHttpClient):
     """
     同步模式的Http客户端连接
+    注: 所有同步客户端共用一个后台线程运行的事件循环, 调用提交到该事件循环执行, 从而可以复用持久会话的连接
     """
+
+    # 后台事件循环
+    _bg_loop = None
+    _bg_thread = None
+    _bg_lock = threading.Lock()
+
+    def __del__(self):
+        """
+        析构函数
+        """
+        self.close()
+
     #############################
     # 需要重载的公共函数
     #############################
@@ -444,7 +614,15 @@ class HttpClient(AIOHttpClient):
         """
         关闭连接
         """
-        return AsyncTools.sync_run_coroutine(super().close())
+        if not getattr(self, '_sessions', None):
+            # 没有持久会话, 无需提交到后台事件循环
+            return
+
+        try:
+            return self._run_in_bg_loop(super().close(), timeout=5)
+        except:
+            # 后台事件循环已停止(例如解释器退出)
+            pass
 
     def reconnect(self, *args, **kwargs) -> CResult:
         """
@@ -455,7 +633,7 @@ class HttpClient(AIOHttpClient):
 
         @returns {CResult} - 响应对象, 如果返回结果为失败代表重连失败
         """
-        return AsyncTools.sync_run_coroutine(
+        return self._run_in_bg_loop(
             super().reconnect(*args, **kwargs)
         )
 
@@ -480,11 +658,85 @@ class HttpClient(AIOHttpClient):
                 url {str} - 访问的url
                 status {int} - 返回状态码
                 headers {dict} - 返回报文头
-                data {bytes|asyncgen} - 返回内容, 如果bytes_read_size为-1则是全部的字节数组, 否则为异步迭代对象(每次返回指定大小的数组)
+                data {bytes|generator} - 返回内容, 如果bytes_read_size为-1则是全部的字节数组, 否则为迭代对象(每次返回指定大小的数组)
+                    注: 迭代对象需读取完成(或调用close)后才会将连接归还连接池
         """
-        return AsyncTools.sync_run_coroutine(
+        _result = self._run_in_bg_loop(
             super().call(
                 service_uri, request, headers=headers, method=method, timeout=timeout,
                 bytes_read_size=bytes_read_size, debug=debug, **kwargs
             )
         )
+        if bytes_read_size > 0 and _result.is_success():
+            # 异步迭代对象需在后台事件循环中读取, 转换为同步迭代对象
+            _result.resp['data'] = self._async_iter_to_iter(_result.resp['data'])
+
+        return _result
+
+    #############################
+    # 内部函数
+    #############################
+    @classmethod
+    def _get_bg_loop(cls):
+        """
+        获取后台事件循环, 未启动则启动
+
+        @returns {AbstractEventLoop} - 后台事件循环
+        """
+        _loop = cls._bg_loop
+        if _loop is not None and cls._bg_thread.is_alive():
+            return _loop
+
+        with cls._bg_lock:
+            if cls._bg_loop is None or not cls._bg_thread.is_alive():
+                _loop = asyncio.new_event_loop()
+                _thread = threading.Thread(
+                    target=cls._run_bg_loop, args=(_loop, ), name='HttpClientBgLoop', daemon=True
+                )
+                _thread.start()
+                cls._bg_loop = _loop
+                cls._bg_thread = _thread
+
+        return cls._bg_loop
+
+    @classmethod
+    def _run_bg_loop(cls, loop):
+        """
+        后台事件循环的线程函数
+
+        @param {AbstractEventLoop} loop - 事件循环
+        """
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def _run_in_bg_loop(self, coroutine_obj, timeout: float = None) -> Any:
+        """
+        在后台事件循环中执行协程并等待返回结果
+
+        @param {coroutine} coroutine_obj - 协程对象
+        @param {float} timeout=None - 等待超时时间, 单位为秒
+
+        @returns {Any} - 处理结果
+        """
+        _loop = self._get_bg_loop()
+        if threading.current_thread() is self._bg_thread:
+            coroutine_obj.close()
+            raise RuntimeError('HttpClient can not be called in the background event loop thread')
+
+        return asyncio.run_coroutine_threadsafe(coroutine_obj, _loop).result(timeout=timeout)
+
+    def _async_iter_to_iter(self, async_iter):
+        """
+        将后台事件循环的异步迭代对象转换为同步迭代对象
+
+        @param {AsyncGenerator} async_iter - 异步迭代对象
+        """
+        try:
+            while True:
+                try:
+                    _chunk = self._run_in_bg_loop(async_iter.__anext__())
+                except StopAsyncIteration:
+                    break
+                yield _chunk
+        finally:
+            self._run_in_bg_loop(async_iter.aclose())
@@ -20,19 +20,22 @@ import threading
 import datetime
 import asyncio
 import json
+import time
 import socket
+import zlib
+import selectors
+from concurrent import futures
 from functools import wraps
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from enum import Enum
 from typing import Callable
 from HiveNetCore.generic import CResult, NullObj
 from HiveNetCore.i18n import _, get_global_i18n, init_global_i18n
 from HiveNetCore.utils.exception_tool import ExceptionTool
-from HiveNetCore.utils.net_tool import NetTool
 from HiveNetCore.utils.run_tool import AsyncTools, RunTool
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
-from HiveNetWebUtils.utils.socket import SocketTool
+from HiveNetWebUtils.utils.socket import SocketTool, SocketFrameReader
 
 
 __MOUDLE__ = 'server'  # 模块名
@@ -759,6 +762,7 @@ class TcpIpServer(ServerBaseFW):
     """
     TcpIp协议的服务实现
     通讯协议为: 前4个字节为后续报文信息的字节长度(int), 后面报文信息为json字符串的字节数组, 字节编码为utf-8
+        注: 报文头的最高位为报文信息是否zlib压缩的标识, 具体可参考SocketTool.send_frame/recv_frame
     注:
     1、通过add_service可以添加service_uri为''的处理函数, 如果请求匹配不到service_uri时将使用该函数进行处理;
     2、add_service的处理函数的定义如下:
@@ -766,6 +770,10 @@ class TcpIpServer(ServerBaseFW):
             service_uri - 匹配上的服务标识
             request - 获取到的请求信息json字典
             返回值为要返回到socket的字典, 如果无需返回则使用None返回
+    3、支持两种服务模式(server_config的server_mode参数):
+        thread - 每接入一个连接启动一个线程, 处理一个请求后关闭连接
+        selector - 事件驱动模式, 由服务主线程通过selectors监听所有连接, 连接保持可连续发送多个请求,
+            请求由有界的线程池处理, 同一连接的请求按顺序逐个处理
     """
 
     def __init__(self, app_name: str, server_config: dict = None, support_auths: dict = {},
@@ -780,8 +788,21 @@ class TcpIpServer(ServerBaseFW):
             ip {str} - 主机名或IP地址, 默认为''
             port {int} - 监听端口, 默认为8080
             max_connect {int} - 允许最大连接数, 默认为20
+                注: thread模式为监听的等待队列长度, selector模式同时作为保持的最大连接数
             recv_timeout {float} - 数据接收的超时时间, 单位为秒, 默认为10
             send_timeout {float} - 数据发送的超时时间, 单位为秒, 默认为10
+            server_mode {str} - 服务模式, 默认为'thread'
+                thread - 每个连接启动一个线程处理一个请求, 处理完成后关闭连接
+                selector - 事件驱动模式, 连接保持并由线程池处理请求
+            workers {int} - selector模式处理请求的线程池大小, 默认为10
+            keep_alive_timeout {float} - selector模式连接空闲的保持时间, 单位为秒, 超过将关闭连接, 默认为60
+            recv_buffer_size {int} - selector模式每个连接预分配的接收缓存大小, 默认为65536
+                注: 收到的报文超过缓存大小时会随数据到达自动扩展
+            max_frame_size {int} - 允许接收的最大请求报文长度(包括解压后的长度), 单位为字节
+                注: 1、超过该长度的请求将记录错误日志并关闭连接, 不会按报文头声明的长度分配内存;
+                    2、selector模式默认为16MB, thread模式默认为None(不限制)
+            compress_size {int} - 返回报文大于等于该大小时进行压缩, 默认为0, 代表不压缩
+                注: 客户端需支持压缩报文帧的处理
         @param {dict} support_auths={} - 服务器支持的验证对象字典, key为验证对象类型名(可以为类名), value为验证对象实例对象
             注意: 支持的auth对象必须有auth_required这个修饰符函数
         @param {function} before_server_start=None - 服务器启动前执行的函数对象, 传入服务自身(self)
@@ -860,6 +881,11 @@ class TcpIpServer(ServerBaseFW):
             force_log_level=logging.ERROR
         ):
             # 注: 重载该函数, 可在该部分实现自定义的获取请求及处理逻辑
+            if self._server_config['server_mode'] == 'selector':
+                # 事件驱动模式, 执行一次事件监听处理
+                await self._selector_run_once(server_info)
+                return _result
+
             # 监听下一个连接请求
             _accept_result = await AsyncTools.async_run_coroutine(self._accept_one(server_info))
 
@@ -906,7 +932,10 @@ class TcpIpServer(ServerBaseFW):
         ):
             # 注: 重载该函数, 可在该部分实现自定义的服务关闭前处理
             # 等待所有连接处理完成
-            if len(self._dynamic_var['connect_thread']['list']) > 0:
+            if self._server_config['server_mode'] == 'selector':
+                if self._dynamic_var['selector']['processing'] > 0:
+                    _result.is_finished = False
+            elif len(self._dynamic_var['connect_thread']['list']) > 0:
                 _result.is_finished = False
 
         return _result
@@ -942,6 +971,20 @@ class TcpIpServer(ServerBaseFW):
         _max_connect = self._server_config.get('max_connect', None)
         if _max_connect is None or _max_connect <= 0:
             _max_connect = 20
+        self._server_config['max_connect'] = _max_connect
+
+        if self._server_config.get('server_mode', None) not in ('thread', 'selector'):
+            self._server_config['server_mode'] = 'thread'
+        if self._server_config.get('workers', None) is None:
+            self._server_config['workers'] = 10
+        if self._server_config.get('keep_alive_timeout', None) is None:
+            self._server_config['keep_alive_timeout'] = 60.0
+        if self._server_config.get('recv_buffer_size', None) is None:
+            self._server_config['recv_buffer_size'] = 65536
+        if self._server_config.get('max_frame_size', None) is None and self._server_config['server_mode'] == 'selector':
+            self._server_config['max_frame_size'] = 16 * 1024 * 1024
+        if self._server_config.get('compress_size', None) is None:
+            self._server_config['compress_size'] = 0
 
     #############################
     # 内部函数
@@ -988,6 +1031,7 @@ class TcpIpServer(ServerBaseFW):
             # 绑定监听端口, 同时返回服务信息
             _server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             _server_socket.setblocking(False)   # 将socket设置为非阻塞. 在创建socket对象后就进行该操作.
+            _server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # 避免TIME_WAIT导致重启绑定失败
             _server_socket.bind((self._server_config['ip'], self._server_config['port']))
             _server_socket.listen(self._server_config.get('max_connect', 20))
 
@@ -998,6 +1042,10 @@ class TcpIpServer(ServerBaseFW):
             _result.server_info.send_timeout = self._server_config.get('send_timeout', 10.0)
             _result.server_info.recv_timeout = self._server_config.get('recv_timeout', 10.9)
 
+            if self._server_config['server_mode'] == 'selector':
+                # 事件驱动模式, 创建监听对象及请求处理线程池
+                self._init_selector(_server_socket)
+
         return _result
 
     async def _accept_one(self, server_info: NullObj) -> CResult:
@@ -1087,6 +1135,10 @@ class TcpIpServer(ServerBaseFW):
         finally:
             self._dynamic_var['connect_thread']['list_lock'].release()
 
+        if self._server_config['server_mode'] == 'selector':
+            # 关闭所有保持的连接及线程池
+            self._close_selector()
+
         # 关闭网络连接
         server_info.csocket.close()
 
@@ -1116,32 +1168,12 @@ class TcpIpServer(ServerBaseFW):
                 if _request_dict is None:
                     return
 
-                # 获取匹配的处理函数
-                _match_service_uri = ''
-                if self._match_service_uri_func is not None:
-                    _match_service_uri = AsyncTools.sync_run_coroutine(
-                        self._match_service_uri_func(_request_dict)
-                    )
-
-                _deal_fun_para = self._service_router.get(_match_service_uri, None)
-                if _deal_fun_para is None:
-                    _deal_fun_para = self._service_router.get('', None)
-
-                if _deal_fun_para is None:
-                    raise ModuleNotFoundError(_('service "[$1]" not found', _match_service_uri))
-
                 # 执行处理
-                _resp_dict = AsyncTools.sync_run_coroutine(
-                    _deal_fun_para['handler'](net_info, _match_service_uri, _request_dict)
-                )
+                _resp_dict = self._deal_request(net_info, _request_dict)
 
                 # 处理返回
                 if _resp_dict is not None:
-                    _data = json.dumps(_resp_dict, ensure_ascii=False).encode(encoding='utf-8')
-                    _data = NetTool.int_to_bytes(len(_data), signed=False) + _data
-                    _send_result = AsyncTools.sync_run_coroutine(
-                        SocketTool.send_data(net_info, _data)
-                    )
+                    _send_result = self._send_resp(net_info, _resp_dict)
                     if not _send_result.is_success():
                         # 记录失败日志
                         self._logger.error('%s: %s' % (_('send data to remote error'), str(_send_result)))
@@ -1158,6 +1190,48 @@ class TcpIpServer(ServerBaseFW):
             finally:
                 self._dynamic_var['connect_thread']['list_lock'].release()
 
+    def _deal_request(self, net_info, request_dict: dict) -> dict:
+        """
+        匹配服务处理函数并执行请求处理
+
+        @param {NullObj} net_info - 连接信息对象
+        @param {dict} request_dict - 请求信息字典
+
+        @returns {dict} - 处理函数返回的响应字典, 无需返回时为None
+        """
+        # 获取匹配的处理函数
+        _match_service_uri = ''
+        if self._match_service_uri_func is not None:
+            _match_service_uri = AsyncTools.sync_run_coroutine(
+                self._match_service_uri_func(request_dict)
+            )
+
+        _deal_fun_para = self._service_router.get(_match_service_uri, None)
+        if _deal_fun_para is None:
+            _deal_fun_para = self._service_router.get('', None)
+
+        if _deal_fun_para is None:
+            raise ModuleNotFoundError(_('service "[$1]" not found', _match_service_uri))
+
+        # 执行处理
+        return AsyncTools.sync_run_coroutine(
+            _deal_fun_para['handler'](net_info, _match_service_uri, request_dict)
+        )
+
+    def _send_resp(self, net_info, resp_dict: dict) -> CResult:
+        """
+        发送响应信息
+
+        @param {NullObj} net_info - 连接信息对象
+        @param {dict} resp_dict - 要返回的响应字典
+
+        @returns {CResult} - 发送结果, 参考SocketTool.send_data
+        """
+        return SocketTool.send_frame(
+            net_info, json.dumps(resp_dict, ensure_ascii=False).encode(encoding='utf-8'),
+            {'compress_size': self._server_config['compress_size']}
+        )
+
     async def _get_std_request(self, net_info) -> dict:
         """
         获取标准请求对象
@@ -1172,19 +1246,12 @@ class TcpIpServer(ServerBaseFW):
         @returns {dict} - 返回请求处理后的字典
         """
         _request_dict = None
-        # 获取报文信息长度
+        # 获取报文信息
         _result = await AsyncTools.async_run_coroutine(
-            SocketTool.recv_data(net_info, {'recv_len': 4})
+            SocketTool.recv_frame(net_info, {'max_len': self._server_config.get('max_frame_size', None)})
         )
         if _result.is_success():
-            _msg_len = NetTool.bytes_to_int(_result.data, signed=False)
-
-            # 获取报文信息
-            _result = await AsyncTools.async_run_coroutine(
-                SocketTool.recv_data(net_info, {'recv_len': _msg_len})
-            )
-            if _result.is_success():
-                _request_dict = json.loads(_result.data)
+            _request_dict = json.loads(_result.data)
 
         if _request_dict is not None:
             # 正常获取到信息
@@ -1195,6 +1262,257 @@ class TcpIpServer(ServerBaseFW):
             return None
 
 
+    #############################
+    # 事件驱动(selector)模式相关函数
+    #############################
+
+    def _init_selector(self, server_socket):
+        """
+        初始化事件驱动模式的处理对象
+
+        @param {socket} server_socket - 服务端监听的socket对象
+        """
+        _selector = selectors.DefaultSelector()
+        _selector.register(server_socket, selectors.EVENT_READ, data=None)
+
+        # 用于线程池处理完成后唤醒监听的socket对
+        _wakeup_r, _wakeup_w = socket.socketpair()
+        _wakeup_r.setblocking(False)
+        _wakeup_w.setblocking(False)
+        _selector.register(_wakeup_r, selectors.EVENT_READ, data='wakeup')
+
+        self._dynamic_var['selector'] = {
+            'selector': _selector,
+            'server_socket': server_socket,
+            'accepting': True,  # 是否正在监听新连接
+            'wakeup_r': _wakeup_r,
+            'wakeup_w': _wakeup_w,
+            'conns': {},  # 保持的连接清单, key为socket的fileno, value为连接信息对象
+            'done_queue': deque(),  # 处理完成待重新监听的连接队列, 元素为(net_info, is_keep)
+            'processing': 0,  # 正在处理的请求数
+            'processing_lock': threading.Lock(),
+            'pool': futures.ThreadPoolExecutor(
+                max_workers=self._server_config['workers'],
+                thread_name_prefix='Thread-ConnectDeal'
+            ),
+            'last_check_time': time.monotonic()
+        }
+
+    def _close_selector(self):
+        """
+        关闭事件驱动模式的处理对象
+        """
+        _vars = self._dynamic_var['selector']
+        for _net_info in list(_vars['conns'].values()):
+            self._selector_close_conn(_net_info, is_service_shutdown=True)
+
+        _vars['pool'].shutdown(wait=False)
+        _vars['selector'].close()
+        _vars['wakeup_r'].close()
+        _vars['wakeup_w'].close()
+
+    async def _selector_run_once(self, server_info):
+        """
+        执行一次事件监听及处理
+
+        @param {NullObj} server_info - 服务端连接信息对象
+        """
+        _vars = self._dynamic_var['selector']
+
+        # 处理线程池已完成请求的连接
+        while len(_vars['done_queue']) > 0:
+            _net_info, _is_keep = _vars['done_queue'].popleft()
+            if _is_keep:
+                _net_info.in_process = False
+                _net_info.last_active = time.monotonic()
+                if not self._selector_dispatch(_net_info) and not _net_info.is_closed:
+                    # 缓存中没有待处理的完整请求, 重新监听连接数据
+                    _vars['selector'].register(_net_info.csocket, selectors.EVENT_READ, data=_net_info)
+            else:
+                self._selector_close_conn(_net_info)
+
+        for _key, _mask in _vars['selector'].select(timeout=0.05):
+            if _key.data is None:
+                await self._selector_accept(server_info)
+            elif _key.data == 'wakeup':
+                with ExceptionTool.ignored(expect=(BlockingIOError, InterruptedError)):
+                    _vars['wakeup_r'].recv(4096)
+            else:
+                self._selector_recv(_key.data)
+
+        # 检查连接超时, 每秒检查一次即可
+        _now = time.monotonic()
+        if _now - _vars['last_check_time'] >= 1.0:
+            _vars['last_check_time'] = _now
+            for _net_info in list(_vars['conns'].values()):
+                if _net_info.in_process:
+                    continue
+
+                if _net_info.frame_reader.pending:
+                    if _now - _net_info.last_active > _net_info.recv_timeout:
+                        # 接收报文超时
+                        self._logger.error('%s: %s' % (
+                            _('recv data from remote error'), str(CResult(code='20403'))
+                        ))
+                        self._selector_close_conn(_net_info)
+                elif _now - _net_info.last_active > self._server_config['keep_alive_timeout']:
+                    # 空闲超时
+                    self._selector_close_conn(_net_info)
+
+    async def _selector_accept(self, server_info):
+        """
+        获取监听端口所有待接入的连接
+
+        @param {NullObj} server_info - 服务端连接信息对象
+        """
+        _vars = self._dynamic_var['selector']
+        while len(_vars['conns']) < self._server_config['max_connect']:
+            _accept_result = await self._accept_one(server_info)
+            if not _accept_result.is_success():
+                if _accept_result.code != '20407':
+                    self._logger.log(
+                        logging.ERROR,
+                        "[SER][NAME:%s][EX:%s]%s: %s\n%s" % (
+                            self._app_name, str(type(_accept_result.error)),
+                            _('accept net connection error'), _accept_result.msg,
+                            _accept_result.trace_str
+                        )
+                    )
+                break
+
+            # 初始化连接的接收缓存
+            _net_info = _accept_result.net_info
+            _net_info.csocket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            _net_info.frame_reader = SocketFrameReader(
+                buffer_size=self._server_config['recv_buffer_size'],
+                max_len=self._server_config['max_frame_size']
+            )
+            _net_info.in_process = False
+            _net_info.is_closed = False
+            _net_info.last_active = time.monotonic()
+            _vars['conns'][_net_info.csocket.fileno()] = _net_info
+            _vars['selector'].register(_net_info.csocket, selectors.EVENT_READ, data=_net_info)
+
+        if len(_vars['conns']) >= self._server_config['max_connect'] and _vars['accepting']:
+            # 达到最大连接数, 暂停监听新连接
+            _vars['selector'].unregister(_vars['server_socket'])
+            _vars['accepting'] = False
+
+    def _selector_recv(self, net_info):
+        """
+        从连接中读取数据到预分配的缓存
+
+        @param {NullObj} net_info - 连接信息对象
+        """
+        try:
+            _len = net_info.frame_reader.recv_from(net_info.csocket)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._selector_close_conn(net_info)
+            return
+
+        if _len == 0:
+            # 远端已关闭连接
+            self._selector_close_conn(net_info)
+            return
+
+        net_info.last_active = time.monotonic()
+        if self._selector_dispatch(net_info):
+            # 已获取到完整请求, 处理完成前不再监听该连接
+            self._dynamic_var['selector']['selector'].unregister(net_info.csocket)
+
+    def _selector_dispatch(self, net_info) -> bool:
+        """
+        检查接收缓存, 如果已获取到完整的请求则提交线程池处理
+
+        @param {NullObj} net_info - 连接信息对象
+
+        @returns {bool} - 是否已提交请求处理
+        """
+        try:
+            _data = net_info.frame_reader.get_frame()
+        except (zlib.error, OverflowError) as _e:
+            # 报文超过长度限制或压缩报文解压失败, 无法继续处理该连接的数据
+            self._logger.error('%s: %s %s' % (_('recv data from remote error'), str(net_info.raddr), str(_e)))
+            self._selector_close_conn(net_info)
+            return False
+
+        if _data is None:
+            return False
+
+        # 提交线程池处理
+        _vars = self._dynamic_var['selector']
+        net_info.in_process = True
+        with _vars['processing_lock']:
+            _vars['processing'] += 1
+        _vars['pool'].submit(self._selector_deal_func, net_info, _data)
+        return True
+
+    def _selector_close_conn(self, net_info, is_service_shutdown: bool = False):
+        """
+        关闭事件驱动模式的连接
+
+        @param {NullObj} net_info - 连接信息对象
+        @param {bool} is_service_shutdown=False - 是否因服务关闭而断开连接
+        """
+        _vars = self._dynamic_var['selector']
+        if is_service_shutdown:
+            self._logger.log(
+                self._log_level, '[SER-STOP][NAME:%s]%s: %s' % (
+                    self._app_name, _('close remote connection because servie shutdown'), str(net_info.raddr)
+                )
+            )
+
+        with ExceptionTool.ignored(expect=(KeyError, ValueError)):
+            _vars['selector'].unregister(net_info.csocket)
+
+        _vars['conns'].pop(net_info.csocket.fileno(), None)
+        AsyncTools.sync_run_coroutine(SocketTool.close(net_info))
+        net_info.frame_reader.close()
+        net_info.is_closed = True
+
+        if not _vars['accepting'] and not is_service_shutdown \
+                and len(_vars['conns']) < self._server_config['max_connect']:
+            # 恢复监听新连接
+            _vars['selector'].register(_vars['server_socket'], selectors.EVENT_READ, data=None)
+            _vars['accepting'] = True
+
+    def _selector_deal_func(self, net_info, data: bytes):
+        """
+        线程池中执行的请求处理函数
+
+        @param {NullObj} net_info - 连接信息对象
+        @param {bytes} data - 获取到的请求报文数据
+        """
+        _vars = self._dynamic_var['selector']
+        _is_keep = False
+        try:
+            with ExceptionTool.ignored_all(
+                logger=self._logger,
+                self_log_msg='[SER-DEAL][NAME:%s]%s: ' % (self._app_name, _(
+                    'net server connect deal threading error')),
+                force_log_level=logging.ERROR
+            ):
+                _resp_dict = self._deal_request(net_info, json.loads(data))
+
+                # 处理返回
+                if _resp_dict is not None:
+                    _send_result = self._send_resp(net_info, _resp_dict)
+                    if not _send_result.is_success():
+                        self._logger.error('%s: %s' % (_('send data to remote error'), str(_send_result)))
+                        return
+
+                _is_keep = True
+        finally:
+            with _vars['processing_lock']:
+                _vars['processing'] -= 1
+
+            # 通知监听线程
+            _vars['done_queue'].append((net_info, _is_keep))
+            with ExceptionTool.ignored(expect=(BlockingIOError, InterruptedError, OSError)):
+                _vars['wakeup_w'].send(b'\0')
+
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作
     # 打印版本信息
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2022 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+服务鉴权的缓存工具
+
+@module auth_cache
+@file auth_cache.py
+"""
+import sys
+import os
+import time
+import threading
+from collections import OrderedDict
+# 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+
+
+class SecretCache(object):
+    """
+    带有效期的密钥缓存
+    缓存获取函数的返回值, 获取函数抛出异常时也缓存异常(负缓存, 避免不存在的app_id反复查询数据库);
+    负缓存只保存异常类型及参数, 每次命中时抛出新创建的异常对象, 避免共享同一异常对象导致异常追踪信息不断累积;
+    同一个key同时只有一个线程执行获取函数, 其他线程在缓存已过期时直接使用过期的值, 没有缓存值时等待获取结果
+    """
+
+    def __init__(self, get_fun, ttl: float = 60.0, negative_ttl: float = 5.0, max_size: int = 10000):
+        """
+        构造函数
+
+        @param {function} get_fun - 获取值的函数, fun(key) -> Any
+        @param {float} ttl=60.0 - 缓存有效期(秒)
+        @param {float} negative_ttl=5.0 - 获取函数抛出异常时的缓存有效期(秒), 0代表不缓存异常
+        @param {int} max_size=10000 - 最大缓存数量, 超过时优先删除已过期的缓存, 再按缓存顺序删除
+        """
+        self.get_fun = get_fun
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+
+        # 缓存字典, key为获取的key, value为(过期时间, 值, (异常类型, 异常参数))
+        self._cache = dict()
+        self._lock = threading.Lock()
+        self._loading = dict()  # 正在获取的key, value为获取完成的通知事件
+
+    def get(self, key):
+        """
+        获取值
+
+        @param {Any} key - 要获取的key
+
+        @returns {Any} - 获取到的值
+
+        @throws {Exception} - 获取函数抛出的异常(包括负缓存的异常)
+        """
+        _item = self._cache.get(key, None)
+        if _item is not None and _item[0] > time.monotonic():
+            return self._get_item_value(_item)
+
+        with self._lock:
+            _item = self._cache.get(key, None)
+            if _item is not None and _item[0] > time.monotonic():
+                return self._get_item_value(_item)
+
+            _event = self._loading.get(key, None)
+            _is_loader = _event is None
+            if _is_loader:
+                _event = threading.Event()
+                self._loading[key] = _event
+
+        if not _is_loader:
+            if _item is not None and _item[2] is None:
+                # 其他线程正在刷新, 直接使用过期的值
+                return _item[1]
+
+            _event.wait()
+            _item = self._cache.get(key, None)
+            if _item is None:
+                # 获取失败且不缓存异常, 重新获取
+                return self.get(key)
+            return self._get_item_value(_item)
+
+        # 当前线程执行获取
+        _error = None
+        try:
+            try:
+                _item = (time.monotonic() + self.ttl, self.get_fun(key), None)
+            except Exception as _e:
+                if self.negative_ttl <= 0:
+                    raise
+                _error = _e
+                _item = (time.monotonic() + self.negative_ttl, None, self._copy_exception(_e))
+
+            with self._lock:
+                self._set_item(key, _item)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            _event.set()
+
+        if _error is not None:
+            # 执行获取的线程直接抛出原异常, 保留异常追踪信息
+            raise _error
+
+        return _item[1]
+
+    def invalidate(self, key=None):
+        """
+        删除缓存
+
+        @param {Any} key=None - 要删除的key, 不传代表删除所有缓存
+        """
+        with self._lock:
+            if key is None:
+                self._cache = dict()
+            else:
+                self._cache.pop(key, None)
+
+    #############################
+    # 内部函数
+    #############################
+    def _get_item_value(self, item: tuple):
+        """
+        获取缓存项的值
+
+        @param {tuple} item - 缓存项
+
+        @returns {Any} - 缓存的值, 如果是缓存的异常则抛出该异常的复制对象
+        """
+        if item[2] is not None:
+            raise self._copy_exception(item[2]).with_traceback(None)
+        return item[1]
+
+    def _copy_exception(self, error: Exception) -> Exception:
+        """
+        复制异常对象(不包含异常追踪信息)
+        注: 不执行异常类的构造函数(构造函数可能有必填的kv参数或自行组装信息), 直接复制args及属性;
+            无法复制时返回原异常对象
+
+        @param {Exception} error - 要复制的异常对象
+
+        @returns {Exception} - 复制后的异常对象
+        """
+        try:
+            _error = error.__class__.__new__(error.__class__, *error.args)
+            _error.__dict__.update(error.__dict__)
+        except Exception:
+            _error = error
+
+        return _error
+
+    def _set_item(self, key, item: tuple):
+        """
+        放入缓存项(需在锁内执行)
+
+        @param {Any} key - 缓存key
+        @param {tuple} item - 缓存项
+        """
+        if key not in self._cache and len(self._cache) >= self.max_size:
+            # 先删除已过期的缓存, 仍超过上限时删除最早的缓存
+            _now = time.monotonic()
+            self._cache = {_key: _item for _key, _item in self._cache.items() if _item[0] > _now}
+            while len(self._cache) >= self.max_size:
+                self._cache.pop(next(iter(self._cache)))
+
+        self._cache[key] = item
+
+
+class NonceStore(object):
+    """
+    随机字符串(nonce)登记表
+    用于拒绝在有效时间窗口内的重放请求, 登记和检查的时间复杂度为O(1)
+    """
+
+    def __init__(self, window: float = 600.0, max_size: int = 100000):
+        """
+        构造函数
+
+        @param {float} window=600.0 - 登记的有效时间窗口(秒), 超过时间窗口的nonce将被清理
+            注: 应不小于请求时间戳允许的时间差异范围, 超过该范围的请求将被时间戳检查拒绝
+        @param {int} max_size=100000 - 最大登记数量, 超过时删除最早登记的nonce
+        """
+        self.window = window
+        self.max_size = max_size
+
+        # 登记字典(按登记顺序, 即过期时间顺序), key为(app_id, nonce), value为过期时间
+        self._nonces = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._nonces)
+
+    def check_and_add(self, app_id: str, nonce: str) -> bool:
+        """
+        检查nonce是否已使用, 未使用则登记
+
+        @param {str} app_id - 商户id
+        @param {str} nonce - 随机字符串
+
+        @returns {bool} - 未使用返回True, 已使用(重放请求)返回False
+        """
+        _key = (app_id, nonce)
+        _now = time.monotonic()
+        with self._lock:
+            # 清理已过期的登记
+            _nonces = self._nonces
+            while len(_nonces) > 0:
+                if next(iter(_nonces.values())) > _now and len(_nonces) < self.max_size:
+                    break
+                _nonces.popitem(last=False)
+
+            _expire = _nonces.get(_key, None)
+            if _expire is not None and _expire > _now:
+                return False
+
+            _nonces[_key] = _now + self.window
+            return True
+
+    def clear(self):
+        """
+        清除所有登记
+        """
+        with self._lock:
+            self._nonces.clear()
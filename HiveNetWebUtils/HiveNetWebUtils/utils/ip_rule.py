@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Copyright 2022 黎慧剑
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+IP名单规则匹配工具
+
+@module ip_rule
+@file ip_rule.py
+"""
+import sys
+import os
+import re
+import socket
+import bisect
+import ipaddress
+import threading
+# 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+
+
+class IPRuleTable(object):
+    """
+    IP名单规则匹配表
+    将名单规则编译为按地址排序的不重叠区间表(IPv4/IPv6分开), 匹配时通过二分查找处理, 支持的规则包括:
+        单个IP - 例如 '10.1.1.1', '2001:db8::1'
+        CIDR网段 - 例如 '10.1.0.0/16', '2001:db8::/32'
+        通配符网段 - 例如 '127.0.*.*', '138.*', 通配符只出现在末尾的完整段时转换为网段
+    其他无法转换为网段的通配符规则(例如 '*.1.1.1')按原来的正则表达式方式匹配, 非IP格式的规则按字符串完全匹配
+
+    注: 修改规则时重新编译匹配数据并整体替换, 匹配处理无需加锁; 匹配结果按IP缓存, 规则修改后缓存随匹配数据一起替换
+    """
+
+    #############################
+    # 构造函数
+    #############################
+    def __init__(self, rules=None, cache_size: int = 4096):
+        """
+        构造函数
+
+        @param {str|list} rules=None - 初始化的规则或规则列表
+        @param {int} cache_size=4096 - 匹配结果缓存的最大IP数, 达到上限时清空缓存, 0代表不缓存
+        """
+        self.cache_size = cache_size
+        self._lock = threading.Lock()  # 修改规则的锁, 匹配处理不使用
+        self._rules = list()  # 规则清单(按添加顺序)
+        self._compiled = self._compile(self._rules)
+        if rules is not None:
+            self.add(rules)
+
+    #############################
+    # 属性
+    #############################
+    @property
+    def rules(self) -> list:
+        """
+        获取规则清单(按添加顺序)
+        @property {list}
+        """
+        return list(self._rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    #############################
+    # 公共函数
+    #############################
+    def match(self, ip: str) -> bool:
+        """
+        检查ip是否匹配规则
+
+        @param {str} ip - 要检查的ip地址
+
+        @returns {bool} - 检查结果, 匹配到返回True
+        """
+        _compiled = self._compiled  # 只获取一次, 规则重新编译时不影响本次匹配
+        _cache = _compiled['cache']
+        _result = _cache.get(ip, None)
+        if _result is not None:
+            return _result
+
+        _result = False
+        _ip_num = self._ip_to_int(ip)
+        if _ip_num is not None:
+            _starts, _ends = _compiled[_ip_num[0]]
+            _index = bisect.bisect_right(_starts, _ip_num[1]) - 1
+            _result = _index >= 0 and _ip_num[1] <= _ends[_index]
+
+        if not _result:
+            _result = ip in _compiled['exact']
+        if not _result:
+            for _re in _compiled['reg']:
+                if _re.search(ip) is not None:
+                    _result = True
+                    break
+
+        if self.cache_size > 0:
+            if len(_cache) >= self.cache_size:
+                _cache.clear()
+            _cache[ip] = _result
+
+        return _result
+
+    def add(self, rules):
+        """
+        添加规则
+
+        @param {str|list} rules - 要添加的规则或规则列表
+        """
+        with self._lock:
+            # 使用字典去重并保持添加顺序
+            _rules = dict.fromkeys(self._rules)
+            _rules.update(dict.fromkeys([rules] if type(rules) == str else rules))
+            self._set_rules(list(_rules))
+
+    def remove(self, rules):
+        """
+        删除规则
+
+        @param {str|list} rules - 要删除的规则或规则列表
+        """
+        _remove = set([rules] if type(rules) == str else rules)
+        with self._lock:
+            self._set_rules([_rule for _rule in self._rules if _rule not in _remove])
+
+    def clear(self):
+        """
+        清除所有规则
+        """
+        with self._lock:
+            self._set_rules(list())
+
+    def reload(self, rules):
+        """
+        使用新的规则清单整体替换现有规则
+
+        @param {str|list} rules - 新的规则或规则列表
+        """
+        _rules = list(dict.fromkeys([rules] if type(rules) == str else rules))
+        with self._lock:
+            self._set_rules(_rules)
+
+    #############################
+    # 内部函数
+    #############################
+    def _set_rules(self, rules: list):
+        """
+        编译并替换规则(需在锁内执行)
+
+        @param {list} rules - 新的规则清单
+        """
+        _compiled = self._compile(rules)
+        self._rules = rules
+        self._compiled = _compiled
+
+    @classmethod
+    def _compile(cls, rules: list) -> dict:
+        """
+        编译规则
+
+        @param {list} rules - 规则清单
+
+        @returns {dict} - 编译后的匹配数据
+            4 {tuple} - IPv4的区间表(起始地址数组, 结束地址数组)
+            6 {tuple} - IPv6的区间表(起始地址数组, 结束地址数组)
+            exact {set} - 按字符串完全匹配的规则
+            reg {list} - 按正则表达式匹配的规则
+            cache {dict} - 匹配结果缓存
+        """
+        _ranges = {4: list(), 6: list()}
+        _exact = set()
+        _reg = list()
+        for _rule in rules:
+            _range = cls._rule_to_range(_rule)
+            if _range is not None:
+                _ranges[_range[0]].append(_range[1:])
+            elif _rule.find('*') >= 0:
+                # 需要生成正则表达式
+                _reg.append(re.compile('^' + _rule.replace('.', '\\.').replace('*', '.*') + '$'))
+            else:
+                _exact.add(_rule)
+
+        _compiled = {'exact': _exact, 'reg': _reg, 'cache': dict()}
+        for _version, _list in _ranges.items():
+            # 合并重叠或相邻的区间
+            _starts = list()
+            _ends = list()
+            for _start, _end in sorted(_list):
+                if len(_ends) > 0 and _start <= _ends[-1] + 1:
+                    _ends[-1] = max(_ends[-1], _end)
+                else:
+                    _starts.append(_start)
+                    _ends.append(_end)
+            _compiled[_version] = (_starts, _ends)
+
+        return _compiled
+
+    @classmethod
+    def _rule_to_range(cls, rule: str) -> tuple:
+        """
+        将规则转换为地址区间
+
+        @param {str} rule - 规则
+
+        @returns {tuple} - (地址版本4或6, 起始地址数值, 结束地址数值), 无法转换返回None
+        """
+        if rule.find('*') < 0:
+            if rule.find('/') < 0:
+                # 单个IP
+                _ip_num = cls._ip_to_int(rule)
+                return None if _ip_num is None else (_ip_num[0], _ip_num[1], _ip_num[1])
+
+            try:
+                _network = ipaddress.ip_network(rule, strict=False)
+            except ValueError:
+                return None
+            return _network.version, int(_network.network_address), int(_network.broadcast_address)
+
+        # 通配符只出现在末尾的完整段, 例如 '127.0.*.*', 可以转换为网段
+        _parts = rule.split('.')
+        _prefix = list()
+        for _part in _parts:
+            if _part == '*':
+                break
+            if not _part.isdigit() or int(_part) > 255:
+                return None
+            _prefix.append(int(_part))
+
+        if len(_prefix) == 0 or len(_parts) > 4 or _parts[len(_prefix):].count('*') != len(_parts) - len(_prefix):
+            # 全部为通配符的情况也可以匹配非IPv4的地址, 按正则表达式处理
+            return None
+
+        _start = 0
+        for _num in _prefix:
+            _start = (_start << 8) + _num
+        _host_bits = 8 * (4 - len(_prefix))
+        _start = _start << _host_bits
+        return 4, _start, _start + (1 << _host_bits) - 1
+
+    @classmethod
+    def _ip_to_int(cls, ip: str) -> tuple:
+        """
+        将ip地址转换为数值
+
+        @param {str} ip - ip地址
+
+        @returns {tuple} - (地址版本4或6, 地址数值), 非IP地址返回None
+        """
+        try:
+            if ip.find(':') < 0:
+                return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+
+            _ip = ipaddress.IPv6Address(ip)
+            if _ip.ipv4_mapped is not None:
+                # IPv4映射地址按IPv4处理
+                return 4, int(_ip.ipv4_mapped)
+            return 6, int(_ip)
+        except (OSError, ValueError):
+            return None
@@ -13,17 +13,25 @@ socket连接的工具类
 """
 import sys
 import os
+import time
+import zlib
+import struct
+import select
 import socket
-import asyncio
 import datetime
 from HiveNetCore.generic import CResult, NullObj
 from HiveNetCore.utils.exception_tool import ExceptionTool
-from HiveNetCore.utils.run_tool import AsyncTools
 # 根据当前文件路径将包路径纳入, 在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
 
 
+FRAME_HEAD_STRUCT = struct.Struct('>I')  # 报文帧的报文头结构
+FRAME_COMPRESS_FLAG = 0x80000000  # 报文头中的压缩标识位
+FRAME_MAX_LEN = 0x7FFFFFFF  # 报文帧允许的最大数据长度
+RECV_CHUNK_SIZE = 65536  # 接收数据时首次分配的缓存大小, 数据到达后再按倍数扩展
+
+
 class SocketTool(object):
     """
     socket连接的工具类
@@ -116,11 +124,199 @@ class SocketTool(object):
             result.recv_time : datetime 实际开始接受数据时间
             result.overtime : float 超时时间(秒), 当返回结果为超时, 可获取超时时间信息
         """
+        _result = cls._recv_buffer(net_info, recv_para)
+        _result.data = bytes(_result.data)
+        return _result
+
+    @classmethod
+    def send_data(cls, net_info, data: bytes, send_para={}):
+        """
+        向指定的网络连接发送数据
+
+        @param {NullObj} net_info - 网络连接信息对象
+            net_info.csocket - socket对象
+            net_info.laddr 本地地址,地址对象("IP地址",打开端口)
+            net_info.raddr 远端地址,地址对象("IP地址",打开端口)
+            net_info.send_timeout 发送超时时间, 单位为秒
+            net_info.recv_timeout 收取超时时间, 单位为秒
+        @param {bytes} data - 要写入的数据对象
+        @param {dict} send_para - 写入数据的参数:
+            overtime {float} - 发送超时时间, 单位为秒, 非必须参数
+        @returns {CResult} - 发送结果:
+            result.code: '00000'-成功, '20404'-写入数据超时, 其他为写入失败
+            result.send_time : datetime 实际发送完成时间
+            result.overtime : float 超时时间(秒), 当返回结果为超时, 可获取超时时间信息
+        """
+        return cls._send_buffers(net_info, [data], send_para)
+
+    #############################
+    # 报文帧处理
+    # 报文帧格式为: 4个字节的报文头 + 报文数据
+    # 报文头为无符号的大端整数, 最高位为报文数据是否zlib压缩的标识, 其余位为报文数据的字节长度
+    #############################
+
+    @classmethod
+    def recv_frame(cls, net_info, recv_para={}):
+        """
+        从指定的网络连接中读取一个完整的报文帧
+
+        @param {NullObj} net_info - 网络连接信息对象, 定义参考recv_data
+        @param {dict} recv_para - 读取数据的参数, 包括:
+            overtime {float} - 获取超时时间, 单位为秒, 非必要参数
+            max_len {int} - 允许的最大报文长度(包括解压后的长度), 超过将返回失败, 非必要参数
+
+        @returns {CResult} - 数据获取结果:
+            result.code: '00000'-成功, '20403'-获取数据超时, '20405'-报文长度超过限制, 其他为获取失败
+            result.data: 获取到的报文数据(bytes或bytearray, 如果是压缩报文为解压后的数据)
+            result.recv_time : datetime 实际开始接受数据时间
+            result.overtime : float 超时时间(秒), 当返回结果为超时, 可获取超时时间信息
+        """
+        if not isinstance(recv_para, dict):
+            recv_para = {}
+
+        # 获取报文头
+        _result = cls._recv_buffer(net_info, {'recv_len': 4, 'overtime': recv_para.get('overtime', None)})
+        if not _result.is_success():
+            return _result
+
+        _msg_len, _compressed = cls.unpack_frame_head(_result.data)
+        _max_len = recv_para.get('max_len', None)
+        if _max_len is not None and _msg_len > _max_len:
+            _result.change_code(code='20405')
+            _result.data = None
+            return _result
+
+        # 获取报文数据, 超时时间扣减获取报文头已使用的时间
+        _overtime = _result.overtime - (datetime.datetime.now() - _result.recv_time).total_seconds()
+        _recv_time = _result.recv_time
+        _result = cls._recv_buffer(net_info, {'recv_len': _msg_len, 'overtime': max(_overtime, 0.0)})
+        _result.recv_time = _recv_time
+        if _result.is_success() and _compressed:
+            with ExceptionTool.ignored_cresult(_result, error_map={OverflowError: ('20405', None)}):
+                _result.data = cls.decompress_frame(_result.data, max_len=_max_len)
+            if not _result.is_success():
+                _result.data = None
+
+        return _result
+
+    @classmethod
+    def send_frame(cls, net_info, data: bytes, send_para={}):
+        """
+        向指定的网络连接发送一个报文帧
+        注: 报文头和报文数据通过scatter方式一起发送, 不进行数据拼接
+
+        @param {NullObj} net_info - 网络连接信息对象, 定义参考send_data
+        @param {bytes} data - 要发送的报文数据
+        @param {dict} send_para - 写入数据的参数:
+            overtime {float} - 发送超时时间, 单位为秒, 非必须参数
+            compress_size {int} - 报文数据大于等于该大小时进行压缩, 不传或为0代表不压缩
+
+        @returns {CResult} - 发送结果, 定义参考send_data
+        """
+        if not isinstance(send_para, dict):
+            send_para = {}
+
+        _compressed = False
+        _compress_size = send_para.get('compress_size', 0)
+        if _compress_size and len(data) >= _compress_size:
+            data = zlib.compress(data)
+            _compressed = True
+
+        return cls._send_buffers(
+            net_info, [cls.pack_frame_head(len(data), _compressed), data], send_para
+        )
+
+    @classmethod
+    def decompress_frame(cls, data, max_len: int = None) -> bytes:
+        """
+        解压报文帧的报文数据
+
+        @param {bytes|bytearray} data - 压缩的报文数据
+        @param {int} max_len=None - 允许解压后的最大长度, None代表不限制
+
+        @returns {bytes} - 解压后的报文数据
+
+        @throws {OverflowError} - 解压后的长度超过限制
+        @throws {zlib.error} - 压缩数据不正确
+        """
+        if max_len is None:
+            return zlib.decompress(data)
+
+        # 最多解压出比限制多一个字节的数据, 避免压缩炸弹占用大量内存
+        _decompress_obj = zlib.decompressobj()
+        _data = _decompress_obj.decompress(data, max_len + 1)
+        if len(_data) > max_len:
+            raise OverflowError('decompressed frame length exceeds the limit [%d]' % max_len)
+
+        if not _decompress_obj.eof:
+            raise zlib.error('incomplete or truncated compressed frame')
+
+        return _data
+
+    @classmethod
+    def pack_frame_head(cls, msg_len: int, compressed: bool = False) -> bytes:
+        """
+        生成报文帧的报文头
+
+        @param {int} msg_len - 报文数据长度
+        @param {bool} compressed=False - 报文数据是否已压缩
+
+        @returns {bytes} - 4个字节的报文头
+        """
+        if msg_len > FRAME_MAX_LEN:
+            raise OverflowError('frame length [%d] exceeds the limit' % msg_len)
+
+        return FRAME_HEAD_STRUCT.pack((msg_len | FRAME_COMPRESS_FLAG) if compressed else msg_len)
+
+    @classmethod
+    def unpack_frame_head(cls, head) -> tuple:
+        """
+        解析报文帧的报文头
+
+        @param {bytes|bytearray|memoryview} head - 4个字节的报文头
+
+        @returns {tuple} - (msg_len, compressed)
+        """
+        _head = FRAME_HEAD_STRUCT.unpack_from(head)[0]
+        return (_head & FRAME_MAX_LEN, (_head & FRAME_COMPRESS_FLAG) != 0)
+
+    #############################
+    # 内部函数
+    #############################
+
+    @classmethod
+    def _wait_socket(cls, sock, is_write: bool, timeout: float):
+        """
+        等待socket可读或可写
+
+        @param {socket} sock - socket对象
+        @param {bool} is_write - 是否等待可写, False代表等待可读
+        @param {float} timeout - 最大等待时间, 单位为秒
+        """
+        if timeout <= 0:
+            return
+
+        if is_write:
+            select.select([], [sock], [], timeout)
+        else:
+            select.select([sock], [], [], timeout)
+
+    @classmethod
+    def _recv_buffer(cls, net_info, recv_para: dict) -> CResult:
+        """
+        将指定长度的数据直接读取到缓存中
+        注: 缓存不按要获取的长度一次分配, 而是随数据到达按倍数扩展, 避免远端声明超大长度占用内存
+
+        @param {NullObj} net_info - 网络连接信息对象
+        @param {dict} recv_para - 读取数据的参数, 定义参考recv_data
+
+        @returns {CResult} - 数据获取结果, result.data为bytearray对象, 其他定义参考recv_data
+        """
         if not isinstance(recv_para, dict):
             recv_para = {}
 
         _result = CResult('00000')
-        _result.data = b''
+        _result.data = bytearray()
         _result.recv_time = datetime.datetime.now()
         _overtime = recv_para.get('overtime', None)
         if _overtime is None:
@@ -133,47 +329,53 @@ class SocketTool(object):
         with ExceptionTool.ignored_cresult(
             _result
         ):
-            _rest_bytes = recv_para['recv_len']
-            while _rest_bytes > 0:
-                # 检查是否超时
-                if (datetime.datetime.now() - _result.recv_time).total_seconds() > _overtime:
+            _recv_len = recv_para['recv_len']
+            _buffer = bytearray(min(_recv_len, RECV_CHUNK_SIZE))
+            _pos = 0
+            _begin = time.monotonic()
+            while _pos < _recv_len:
+                _rest_time = _overtime - (time.monotonic() - _begin)
+                if _rest_time <= 0:
                     # 已超时
                     _result.change_code(code='20403')
                     break
 
-                _buffer = b''
-                with ExceptionTool.ignored(expect=(BlockingIOError)):
-                    # 获取数据
-                    _buffer = net_info.csocket.recv(_rest_bytes)
-                    if _buffer is not None and len(_buffer) > 0:
-                        _result.data = _result.data + _buffer
-                        _rest_bytes = _rest_bytes - len(_buffer)
-                    else:
-                        # 休眠一下
-                        AsyncTools.sync_run_coroutine(
-                            asyncio.sleep(0.001)
-                        )
+                if _pos == len(_buffer):
+                    # 缓存已满, 按倍数扩展缓存(不超过要获取的长度)
+                    _buffer.extend(bytes(min(len(_buffer), _recv_len - len(_buffer))))
+
+                try:
+                    with memoryview(_buffer) as _view, _view[_pos:] as _rest_view:
+                        _len = net_info.csocket.recv_into(_rest_view)
+                except (BlockingIOError, InterruptedError):
+                    # 等待数据到达
+                    cls._wait_socket(net_info.csocket, False, _rest_time)
+                    continue
+
+                if _len == 0:
+                    # 远端已关闭连接, 无法再获取到数据, 按超时处理
+                    _result.change_code(code='20403')
+                    break
+
+                _pos += _len
+
+            if _pos < _recv_len:
+                del _buffer[_pos:]
+            _result.data = _buffer
 
         return _result
 
     @classmethod
-    def send_data(cls, net_info, data: bytes, send_para={}):
+    def _send_buffers(cls, net_info, buffers: list, send_para: dict) -> CResult:
         """
-        向指定的网络连接发送数据
+        发送多个数据缓存
+        注: 支持sendmsg的平台通过scatter方式一次发送多个缓存, 避免数据拼接
 
         @param {NullObj} net_info - 网络连接信息对象
-            net_info.csocket - socket对象
-            net_info.laddr 本地地址,地址对象("IP地址",打开端口)
-            net_info.raddr 远端地址,地址对象("IP地址",打开端口)
-            net_info.send_timeout 发送超时时间, 单位为秒
-            net_info.recv_timeout 收取超时时间, 单位为秒
-        @param {bytes} data - 要写入的数据对象
-        @param {dict} send_para - 写入数据的参数:
-            overtime {float} - 发送超时时间, 单位为秒, 非必须参数
-        @returns {CResult} - 发送结果:
-            result.code: '00000'-成功, '20404'-写入数据超时, 其他为写入失败
-            result.send_time : datetime 实际发送完成时间
-            result.overtime : float 超时时间(秒), 当返回结果为超时, 可获取超时时间信息
+        @param {list} buffers - 要发送的数据缓存清单(bytes/bytearray/memoryview)
+        @param {dict} send_para - 写入数据的参数, 定义参考send_data
+
+        @returns {CResult} - 发送结果, 定义参考send_data
         """
         if not isinstance(send_para, dict):
             send_para = {}
@@ -189,23 +391,145 @@ class SocketTool(object):
 
         _result.overtime = _overtime
 
-        _begin_time = datetime.datetime.now()
+        _begin = time.monotonic()
         with ExceptionTool.ignored_cresult(
             _result
         ):
-            _rest_bytes = len(data)
-            _total_bytes = _rest_bytes
-            while _rest_bytes > 0:
-                # 检查是否超时
-                if (datetime.datetime.now() - _begin_time).total_seconds() > _overtime:
+            _sock = net_info.csocket
+            _use_sendmsg = hasattr(_sock, 'sendmsg')
+            _views = [memoryview(_buffer).cast('B') for _buffer in buffers if len(_buffer) > 0]
+            while len(_views) > 0:
+                _rest_time = _overtime - (time.monotonic() - _begin)
+                if _rest_time <= 0:
                     # 已超时
                     _result.change_code(code='20404')
                     break
-                with ExceptionTool.ignored(expect=(BlockingIOError)):
-                    # 发送数据
-                    _len = net_info.csocket.send(data[_total_bytes - _rest_bytes:])
-                    if _len > 0:
-                        _rest_bytes = _rest_bytes - _len
+
+                try:
+                    if _use_sendmsg:
+                        _len = _sock.sendmsg(_views)
+                    else:
+                        _len = _sock.send(_views[0])
+                except (BlockingIOError, InterruptedError):
+                    # 等待发送缓冲区可用
+                    cls._wait_socket(_sock, True, _rest_time)
+                    continue
+
+                # 删除已发送的数据
+                while _len > 0:
+                    if _len >= len(_views[0]):
+                        _len -= len(_views[0])
+                        _views.pop(0)
+                    else:
+                        _views[0] = _views[0][_len:]
+                        _len = 0
 
             _result.send_time = datetime.datetime.now()
         return _result
+
+
+class SocketFrameReader(object):
+    """
+    报文帧的增量读取对象, 用于非阻塞socket的事件驱动处理
+    注: 数据通过recv_into直接读取到预分配的缓存中, 报文格式参考SocketTool的报文帧处理说明
+    """
+
+    def __init__(self, buffer_size: int = 65536, max_len: int = None):
+        """
+        构造函数
+
+        @param {int} buffer_size=65536 - 预分配的接收缓存大小, 缓存满时随数据到达按倍数扩展
+        @param {int} max_len=None - 允许的最大报文长度(包括解压后的长度), None代表不限制
+        """
+        self._buffer_size = buffer_size
+        self._max_len = max_len
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._pos = 0  # 缓存中已接收数据的长度
+        self._msg_len = None  # 当前报文的数据长度, None代表还未获取到报文头
+        self._compressed = False  # 当前报文是否压缩
+
+    @property
+    def pending(self) -> bool:
+        """
+        缓存中是否有未处理完的数据
+        @property {bool}
+        """
+        return self._pos > 0
+
+    def recv_from(self, sock) -> int:
+        """
+        从socket中读取可获取的数据到缓存
+
+        @param {socket} sock - socket对象
+
+        @returns {int} - 读取到的数据长度, 0代表远端已关闭连接
+
+        @throws {BlockingIOError} - 非阻塞socket当前没有可读取的数据
+        """
+        if self._pos == len(self._buffer):
+            # 缓存已满, 按倍数扩展缓存, 已获取报文头的情况不超过报文帧的大小
+            _size = len(self._buffer) * 2
+            if self._msg_len is not None and self._msg_len + 4 > self._pos:
+                _size = min(_size, self._msg_len + 4)
+            self._resize(_size)
+
+        _len = sock.recv_into(self._view[self._pos:])
+        self._pos += _len
+        return _len
+
+    def get_frame(self):
+        """
+        从缓存中获取一个完整的报文帧
+
+        @returns {bytes} - 报文数据(如果是压缩报文为解压后的数据), 如果缓存中没有完整的报文帧返回None
+
+        @throws {OverflowError} - 报文长度超过限制
+        @throws {zlib.error} - 压缩报文解压失败
+        """
+        if self._msg_len is None:
+            if self._pos < 4:
+                return None
+
+            _msg_len, self._compressed = SocketTool.unpack_frame_head(self._buffer)
+            if self._max_len is not None and _msg_len > self._max_len:
+                raise OverflowError('frame length [%d] exceeds the limit [%d]' % (_msg_len, self._max_len))
+            self._msg_len = _msg_len
+
+        _end_pos = self._msg_len + 4
+        if self._pos < _end_pos:
+            return None
+
+        # 获取报文数据, 并将剩余数据移到缓存开始位置
+        _data = bytes(self._view[4:_end_pos])
+        _rest_len = self._pos - _end_pos
+        if _rest_len > 0:
+            self._buffer[0:_rest_len] = bytes(self._view[_end_pos:self._pos])
+        self._pos = _rest_len
+        self._msg_len = None
+        if len(self._buffer) > self._buffer_size and _rest_len <= self._buffer_size:
+            # 恢复缓存大小, 避免长期占用大块内存
+            self._resize(self._buffer_size)
+
+        if self._compressed:
+            _data = SocketTool.decompress_frame(_data, max_len=self._max_len)
+
+        return _data
+
+    def close(self):
+        """
+        释放缓存
+        """
+        self._view.release()
+
+    def _resize(self, size: int):
+        """
+        调整缓存的大小, 保留已接收的数据
+
+        @param {int} size - 新的缓存大小
+        """
+        _buffer = bytearray(size)
+        _buffer[0:self._pos] = self._view[0:self._pos]
+        self._view.release()
+        self._buffer = _buffer
+        self._view = memoryview(_buffer)
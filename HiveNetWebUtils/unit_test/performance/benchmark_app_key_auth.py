@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+AppKeyAuth鉴权处理性能测试
+@module benchmark_app_key_auth
+@file benchmark_app_key_auth.py
+
+执行步骤:
+python benchmark_app_key_auth.py [request_num] [secret_delay_ms]
+
+注: 只测试鉴权处理(_auth_call: 时间戳检查+签名验证+nonce检查)每秒可处理的请求数, 请求报文包含12个参数;
+    get_secret_fun通过sleep模拟数据库查询的耗时, legacy为原有的签名字符串拼接方式且不缓存密钥对
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import asyncio
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetWebUtils.auth import AppKeyAuth
+from HiveNetWebUtils.utils.cryptography import HCrypto
+
+
+class BenchAppKeyAuth(AppKeyAuth):
+    """
+    直接传入请求字典的AppKeyAuth实现
+    """
+
+    def _get_json_from_request(self, *args, **kwargs) -> dict:
+        return args[0]
+
+
+class LegacyAppKeyAuth(BenchAppKeyAuth):
+    """
+    原有的签名字符串拼接方式
+    """
+
+    def get_signature(self, msg: dict, app_key: str, app_secret: str, algorithm: str = None) -> str:
+        _para_list = list(msg.keys())
+        _para_list.sort()
+        _str_sign_temp = ''
+        for _para in _para_list:
+            if _para not in ('app_id', 'nonce_str', 'timestamp', 'sign') and msg[_para] not in (None, ''):
+                _value = msg[_para]
+                if type(_value) != str:
+                    _value = json.dumps(_value, ensure_ascii=False, sort_keys=True)
+                _str_sign_temp = '%s%s=%s&' % (_str_sign_temp, _para, _value)
+
+        _str_sign_temp = '%sapp_id=%s&app_key=%s&app_secret=%s&nonce_str=%s&timestamp=%s' % (
+            _str_sign_temp, msg['app_id'], app_key, app_secret, msg['nonce_str'], msg['timestamp']
+        )
+        _algorithm = self.algorithm if algorithm is None else algorithm
+        return self.algorithm_mapping[_algorithm](_str_sign_temp, key=app_secret, encoding=self.encoding)
+
+
+def run_case(name: str, auth: AppKeyAuth, request_num: int, secret_delay: float):
+    """
+    执行一个测试场景
+    """
+    _secrets = {'app%d' % _i: ('key%d' % _i, 'secret%d' % _i) for _i in range(10)}
+
+    def _get_secret_fun(app_id: str) -> tuple:
+        if secret_delay > 0:
+            time.sleep(secret_delay)
+        return _secrets[app_id]
+
+    auth.get_secret_fun = _get_secret_fun
+    _msgs = list()
+    for _i in range(request_num):
+        _msg = {'app_id': 'app%d' % (_i % 10), 'user_id': 'u%d' % _i, 'amount': _i, 'memo': '测试请求'}
+        for _j in range(9):
+            _msg['para%d' % _j] = 'value%d' % _j
+        _app_key, _app_secret = _secrets[_msg['app_id']]
+        _msg['nonce_str'] = HCrypto.generate_nonce(16)
+        _msg['timestamp'] = time.strftime(auth.timestamp_fmt)
+        _msg['sign'] = auth.get_signature(_msg, _app_key, _app_secret)
+        _msgs.append(_msg)
+
+    async def _run():
+        _ok = 0
+        for _msg in _msgs:
+            _result = await auth._auth_call(_msg)
+            if _result[0]:
+                _ok += 1
+        return _ok
+
+    gc.collect()
+    _start = time.perf_counter()
+    _ok = asyncio.run(_run())
+    _use = time.perf_counter() - _start
+    assert _ok == request_num
+
+    print('%-28s requests: %6d  use: %7.3fs  per request: %8.2fus  requests/s: %9.1f' % (
+        name, request_num, _use, _use / request_num * 1000000, request_num / _use
+    ))
+
+
+if __name__ == '__main__':
+    _request_num = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    _secret_delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 0.5) / 1000
+    for _delay in (0, _secret_delay):
+        print('get_secret_fun delay: %.2fms' % (_delay * 1000))
+        run_case('legacy', LegacyAppKeyAuth(), _request_num, _delay)
+        run_case('fast canonicalization', BenchAppKeyAuth(), _request_num, _delay)
+        run_case('+ secret cache', BenchAppKeyAuth(secret_cache_ttl=60), _request_num, _delay)
+        run_case('+ secret cache + nonce', BenchAppKeyAuth(secret_cache_ttl=60, nonce_check=True),
+                 _request_num, _delay)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Http客户端调用性能测试
+@module benchmark_http_client
+@file benchmark_http_client.py
+
+执行步骤:
+python benchmark_http_client.py [request_num] [concurrency]
+
+注: 在独立线程中启动本地aiohttp服务, 分别测试AIOHttpClient顺序调用、并发调用, 以及HttpClient同步顺序调用的每秒请求数;
+    no pool为每次调用创建新会话的原处理方式(use_session_pool=False), pool为持久会话复用连接的方式
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from aiohttp import web
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetWebUtils.client import AIOHttpClient, HttpClient
+
+
+TEST_PORT = 9522
+
+
+def start_server():
+    """
+    在独立线程中启动本地测试服务
+    """
+    async def _echo(request):
+        return web.Response(body=await request.read() or b'ok')
+
+    _loop = asyncio.new_event_loop()
+    _app = web.Application()
+    _app.router.add_route('*', '/echo', _echo)
+    _runner = web.AppRunner(_app, access_log=None)
+    _loop.run_until_complete(_runner.setup())
+    _loop.run_until_complete(web.TCPSite(_runner, '127.0.0.1', TEST_PORT, backlog=1024).start())
+    threading.Thread(target=_loop.run_forever, daemon=True).start()
+
+
+def print_result(name: str, request_num: int, use: float):
+    print('%-32s requests: %6d  use: %7.3fs  qps: %9.1f' % (name, request_num, use, request_num / use))
+
+
+async def aio_case(name: str, use_session_pool: bool, request_num: int, concurrency: int):
+    """
+    异步客户端测试场景
+    """
+    _client = AIOHttpClient({
+        'port': TEST_PORT, 'use_session_pool': use_session_pool, 'conn_limit_per_host': concurrency
+    })
+    _semaphore = asyncio.Semaphore(concurrency)
+
+    async def _call():
+        async with _semaphore:
+            _result = await _client.call('echo', 'hello', method='POST')
+            assert _result.is_success() and _result.resp['data'] == b'hello', _result.error
+
+    _start = time.perf_counter()
+    if concurrency <= 1:
+        for _ in range(request_num):
+            await _call()
+    else:
+        await asyncio.gather(*[_call() for _ in range(request_num)])
+    print_result(name, request_num, time.perf_counter() - _start)
+    await _client.close()
+
+
+def sync_case(name: str, use_session_pool: bool, request_num: int):
+    """
+    同步客户端测试场景
+    """
+    _client = HttpClient({'port': TEST_PORT, 'use_session_pool': use_session_pool})
+    _start = time.perf_counter()
+    for _ in range(request_num):
+        _result = _client.call('echo', 'hello', method='POST')
+        assert _result.is_success() and _result.resp['data'] == b'hello', _result.error
+    print_result(name, request_num, time.perf_counter() - _start)
+    _client.close()
+
+
+if __name__ == '__main__':
+    _request_num = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    _concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    start_server()
+
+    for _pool in (False, True):
+        _tag = 'pool' if _pool else 'no pool'
+        asyncio.run(aio_case('aio sequential (%s)' % _tag, _pool, _request_num, 1))
+        asyncio.run(aio_case('aio concurrent %d (%s)' % (_concurrency, _tag), _pool, _request_num, _concurrency))
+        sync_case('sync sequential (%s)' % _tag, _pool, _request_num)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+IP名单匹配性能测试
+@module benchmark_ip_rule
+@file benchmark_ip_rule.py
+
+执行步骤:
+python benchmark_ip_rule.py [rule_num, ...]
+
+注: legacy为原有的匹配方式(名单列表in判断+遍历通配符正则表达式), table为IPRuleTable(区间表二分查找),
+    table (cache)为命中匹配结果缓存的情况; 名单中一半为单个IP, 一半为通配符网段
+"""
+
+import os
+import re
+import sys
+import time
+import random
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetWebUtils.utils.ip_rule import IPRuleTable
+
+
+class LegacyIPList(object):
+    """
+    原有的名单匹配方式
+    """
+
+    def __init__(self, rules: list):
+        self.show = list()
+        self.reg = dict()
+        for _rule in rules:
+            if _rule in self.show:
+                continue
+            self.show.append(_rule)
+            if _rule.find('*') >= 0:
+                self.reg[_rule] = re.compile('^' + _rule.replace('.', '\\.').replace('*', '.*') + '$')
+
+    def match(self, ip: str) -> bool:
+        if ip in self.show:
+            return True
+        for _re in self.reg.values():
+            if _re.search(ip) is not None:
+                return True
+        return False
+
+
+def random_ip() -> str:
+    return '%d.%d.%d.%d' % tuple(random.randint(1, 254) for _ in range(4))
+
+
+def gen_rules(rule_num: int) -> list:
+    _rules = list()
+    for _i in range(rule_num):
+        if _i % 2 == 0:
+            _rules.append(random_ip())
+        else:
+            _rules.append('%d.%d.%d.*' % tuple(random.randint(1, 254) for _ in range(3)))
+    return _rules
+
+
+def run_case(name: str, matcher, ips: list, loop: int):
+    _match = matcher.match
+    _start = time.perf_counter()
+    _hit = 0
+    for _ in range(loop):
+        for _ip in ips:
+            if _match(_ip):
+                _hit += 1
+    _use = time.perf_counter() - _start
+    _num = len(ips) * loop
+    print('%-16s checks: %7d  hit: %6d  use: %8.3fs  per check: %9.2fus' % (
+        name, _num, _hit, _use, _use / _num * 1000000
+    ))
+
+
+if __name__ == '__main__':
+    _rule_nums = [int(_num) for _num in sys.argv[1:]] if len(sys.argv) > 1 else [10, 1000, 100000]
+    random.seed(1)
+    for _rule_num in _rule_nums:
+        print('rules: %d' % _rule_num)
+        _rules = gen_rules(_rule_num)
+        # 一半请求命中名单
+        _ips = [random_ip() for _ in range(500)] + [
+            _rule.replace('*', '1') for _rule in random.sample(_rules, min(500, len(_rules)))
+        ]
+        _legacy_loop = max(1, 200000 // (_rule_num * len(_ips)))
+        run_case('legacy', LegacyIPList(_rules), _ips, _legacy_loop)
+        _start = time.perf_counter()
+        _table = IPRuleTable(_rules, cache_size=0)
+        print('%-16s compile use: %8.3fs' % ('table', time.perf_counter() - _start))
+        run_case('table', _table, _ips, 100)
+        run_case('table (cache)', IPRuleTable(_rules), _ips, 100)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+SocketTool大报文收发性能测试
+@module benchmark_socket_frame
+@file benchmark_socket_frame.py
+
+执行步骤:
+python benchmark_socket_frame.py [size_mb, ...]
+
+注: legacy为原有的拼接方式(bytes拼接接收+报文头拼接发送), frame为SocketTool.send_frame/recv_frame
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+from HiveNetCore.generic import NullObj
+from HiveNetCore.utils.net_tool import NetTool
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetWebUtils.utils.socket import SocketTool
+
+
+def get_net_info(sock: socket.socket) -> NullObj:
+    """
+    生成连接信息对象
+    """
+    sock.setblocking(False)
+    _net_info = NullObj()
+    _net_info.csocket = sock
+    _net_info.send_timeout = 60.0
+    _net_info.recv_timeout = 60.0
+    return _net_info
+
+
+def legacy_send(net_info, data: bytes):
+    """
+    原有的发送方式: 拼接报文头后循环发送
+    """
+    data = NetTool.int_to_bytes(len(data), signed=False) + data
+    _rest_bytes = len(data)
+    _total_bytes = _rest_bytes
+    while _rest_bytes > 0:
+        try:
+            _len = net_info.csocket.send(data[_total_bytes - _rest_bytes:])
+            _rest_bytes -= _len
+        except BlockingIOError:
+            pass
+
+
+def legacy_recv_len(net_info, recv_len: int) -> bytes:
+    """
+    原有的接收方式: bytes拼接
+    """
+    _data = b''
+    _rest_bytes = recv_len
+    while _rest_bytes > 0:
+        try:
+            _buffer = net_info.csocket.recv(_rest_bytes)
+            _data = _data + _buffer
+            _rest_bytes -= len(_buffer)
+        except BlockingIOError:
+            time.sleep(0.001)
+    return _data
+
+
+def legacy_recv(net_info) -> bytes:
+    _len = NetTool.bytes_to_int(legacy_recv_len(net_info, 4), signed=False)
+    return legacy_recv_len(net_info, _len)
+
+
+def frame_send(net_info, data: bytes):
+    SocketTool.send_frame(net_info, data)
+
+
+def frame_recv(net_info) -> bytes:
+    return SocketTool.recv_frame(net_info).data
+
+
+def run_case(name: str, send_fun, recv_fun, data: bytes, times: int):
+    """
+    执行一个测试场景
+    """
+    _server_sock, _client_sock = socket.socketpair()
+    _send_info = get_net_info(_client_sock)
+    _recv_info = get_net_info(_server_sock)
+
+    def _send_thread():
+        for _ in range(times):
+            send_fun(_send_info, data)
+
+    _thread = threading.Thread(target=_send_thread)
+    _start = time.perf_counter()
+    _thread.start()
+    for _ in range(times):
+        _recv = recv_fun(_recv_info)
+        assert len(_recv) == len(data)
+    _thread.join()
+    _use = time.perf_counter() - _start
+    _server_sock.close()
+    _client_sock.close()
+    print('%-8s size: %5.1fMB  times: %3d  use: %7.3fs  throughput: %8.1fMB/s' % (
+        name, len(data) / 1048576, times, _use, len(data) * times / 1048576 / _use
+    ))
+
+
+if __name__ == '__main__':
+    _sizes = [float(_arg) for _arg in sys.argv[1:]] or [1, 8, 32]
+    for _size in _sizes:
+        _data = os.urandom(int(_size * 1048576))
+        _times = max(1, int(64 / _size))
+        run_case('legacy', legacy_send, legacy_recv, _data, _times)
+        run_case('frame', frame_send, frame_recv, _data, _times)
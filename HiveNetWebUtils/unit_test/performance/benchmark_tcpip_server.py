@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+TcpIpServer性能测试(每秒连接数及请求延迟)
+@module benchmark_tcpip_server
+@file benchmark_tcpip_server.py
+
+执行步骤:
+python benchmark_tcpip_server.py [client_threads] [requests_per_thread]
+"""
+
+import os
+import sys
+import time
+import json
+import socket
+import logging
+import threading
+from HiveNetCore.utils.run_tool import AsyncTools
+from HiveNetCore.utils.net_tool import NetTool
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), os.path.pardir, os.path.pardir)))
+from HiveNetWebUtils.server import TcpIpServer
+
+
+def echo_service(net_info, service_uri: str, request: dict) -> dict:
+    """
+    直接返回请求的服务
+    """
+    return request
+
+
+def recv_len(sock: socket.socket, size: int) -> bytes:
+    """
+    阻塞获取指定长度的数据
+    """
+    _data = bytearray()
+    while len(_data) < size:
+        _buffer = sock.recv(size - len(_data))
+        if not _buffer:
+            raise ConnectionError('connection closed')
+        _data.extend(_buffer)
+    return bytes(_data)
+
+
+def call(sock: socket.socket, msg: dict) -> dict:
+    """
+    发送一个请求并获取响应
+    """
+    _data = json.dumps(msg).encode('utf-8')
+    sock.sendall(NetTool.int_to_bytes(len(_data), signed=False) + _data)
+    _len = NetTool.bytes_to_int(recv_len(sock, 4), signed=False)
+    return json.loads(recv_len(sock, _len))
+
+
+def client_thread_fun(port: int, count: int, keep_alive: bool, latencies: list):
+    """
+    客户端测试线程
+    """
+    _msg = {'head': {'uri': ''}, 'msg': 'benchmark'}
+    _sock = None
+    for _i in range(count):
+        _start = time.perf_counter()
+        if _sock is None:
+            _sock = socket.create_connection(('127.0.0.1', port))
+            _sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        call(_sock, _msg)
+        if not keep_alive:
+            _sock.close()
+            _sock = None
+        latencies.append(time.perf_counter() - _start)
+
+    if _sock is not None:
+        _sock.close()
+
+
+def run_case(name: str, server_config: dict, threads: int, count: int, keep_alive: bool):
+    """
+    执行一个测试场景
+    """
+    _logger = logging.getLogger('benchmark_tcpip_server')
+    _logger.setLevel(logging.ERROR)
+    _server = TcpIpServer(name, server_config, logger=_logger, log_level=logging.DEBUG)
+    AsyncTools.sync_run_coroutine(_server.add_service('', echo_service))
+    AsyncTools.sync_run_coroutine(_server.start(is_asyn=True, sleep_time=0.05))
+    try:
+        _latencies = []
+        _threads = [
+            threading.Thread(
+                target=client_thread_fun,
+                args=(server_config['port'], count, keep_alive, _latencies)
+            ) for _ in range(threads)
+        ]
+        _start = time.perf_counter()
+        for _thread in _threads:
+            _thread.start()
+        for _thread in _threads:
+            _thread.join()
+        _use = time.perf_counter() - _start
+    finally:
+        AsyncTools.sync_run_coroutine(_server.stop(sleep_time=0.05))
+
+    _latencies.sort()
+    _total = len(_latencies)
+    print('%-32s requests: %6d  req/s: %9.1f  avg: %7.3fms  p50: %7.3fms  p99: %7.3fms' % (
+        name, _total, _total / _use, sum(_latencies) / _total * 1000,
+        _latencies[int(_total * 0.5)] * 1000, _latencies[min(int(_total * 0.99), _total - 1)] * 1000
+    ))
+
+
+if __name__ == '__main__':
+    _threads = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    _count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    run_case(
+        'thread_new_connection', {'ip': '127.0.0.1', 'port': 9612, 'max_connect': 128},
+        _threads, _count, False
+    )
+    run_case(
+        'selector_new_connection', {
+            'ip': '127.0.0.1', 'port': 9613, 'max_connect': 128, 'server_mode': 'selector', 'workers': 8
+        }, _threads, _count, False
+    )
+    run_case(
+        'selector_keep_alive', {
+            'ip': '127.0.0.1', 'port': 9614, 'max_connect': 128, 'server_mode': 'selector', 'workers': 8
+        }, _threads, _count, True
+    )
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+测试AppKeyAuth的签名、密钥缓存及防重放处理
+@module test_app_key_auth
+@file test_app_key_auth.py
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import unittest
+from HiveNetCore.utils.run_tool import AsyncTools
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HiveNetWebUtils.auth import AppKeyAuth
+from HiveNetWebUtils.utils.auth_cache import SecretCache, NonceStore
+from HiveNetWebUtils.utils.cryptography import HCrypto
+
+
+class AppKeyAuthTest(AppKeyAuth):
+    """
+    直接传入请求字典的AppKeyAuth实现
+    """
+
+    def _get_json_from_request(self, *args, **kwargs) -> dict:
+        return args[0]
+
+
+def legacy_signature(msg: dict, app_key: str, app_secret: str) -> str:
+    """
+    原有的签名字符串拼接方式(MD5)
+    """
+    _str_sign_temp = ''
+    for _para in sorted(msg.keys()):
+        if _para not in ('app_id', 'nonce_str', 'timestamp', 'sign') and msg[_para] not in (None, ''):
+            _value = msg[_para]
+            if type(_value) != str:
+                _value = json.dumps(_value, ensure_ascii=False, sort_keys=True)
+            _str_sign_temp = '%s%s=%s&' % (_str_sign_temp, _para, _value)
+
+    _str_sign_temp = '%sapp_id=%s&app_key=%s&app_secret=%s&nonce_str=%s&timestamp=%s' % (
+        _str_sign_temp, msg['app_id'], app_key, app_secret, msg['nonce_str'], msg['timestamp']
+    )
+    return HCrypto.md5(_str_sign_temp)
+
+
+class TestAppKeyAuth(unittest.TestCase):
+
+    def test_signature(self):
+        _auth = AppKeyAuthTest()
+        _app_key, _app_secret = _auth.apk_generate_key_pair('app1')
+        _msg = _auth.sign({
+            'app_id': 'app1', 'b': 'text', 'a': 10, 'c': True, 'd': 1.5, 'e': None, 'f': '',
+            'g': {'y': [1, 2], 'x': '中文'}, 'h': 0
+        })
+        self.assertEqual(_msg['sign'], legacy_signature(_msg, _app_key, _app_secret), 'signature changed')
+        self.assertTrue(_auth.verify_sign(_msg))
+        _msg['b'] = 'changed'
+        self.assertFalse(_auth.verify_sign(_msg))
+
+    def test_secret_cache(self):
+        _calls = list()
+
+        def _get_fun(key):
+            _calls.append(key)
+            time.sleep(0.05)
+            if key == 'none':
+                raise KeyError(key)
+            return (key, 'secret_%d' % len(_calls))
+
+        _cache = SecretCache(_get_fun, ttl=0.2, negative_ttl=0.2)
+        _threads = [threading.Thread(target=_cache.get, args=('app', )) for _ in range(10)]
+        for _thread in _threads:
+            _thread.start()
+        for _thread in _threads:
+            _thread.join()
+        self.assertEqual(_calls, ['app'], 'single flight error')
+
+        # 负缓存, 每次命中抛出新的异常对象
+        _errors = list()
+        for _ in range(3):
+            with self.assertRaises(KeyError) as _cm:
+                _cache.get('none')
+            _errors.append(_cm.exception)
+        self.assertEqual(_calls.count('none'), 1, 'negative cache error')
+        self.assertEqual([_error.args for _error in _errors], [('none', )] * 3, 'negative cache args error')
+        self.assertEqual(len(set(id(_error) for _error in _errors)), 3, 'negative cache exception shared')
+
+        # 构造函数参数与args不一致的异常类
+        class _MsgError(Exception):
+            def __init__(self, code):
+                super().__init__('auth error [%s]' % code)
+                self.code = code
+
+        class _KwError(Exception):
+            def __init__(self, msg, *, code):
+                super().__init__(msg)
+                self.code = code
+
+        for _error_obj in (_MsgError('401'), _KwError('auth error [401]', code='401')):
+            def _error_fun(key):
+                raise _error_obj
+
+            _error_cache = SecretCache(_error_fun, ttl=0.2, negative_ttl=0.2)
+            for _ in range(2):
+                with self.assertRaises(type(_error_obj)) as _cm:
+                    _error_cache.get('error')
+                self.assertEqual(
+                    (str(_cm.exception), _cm.exception.code), ('auth error [401]', '401'),
+                    'negative cache %s error' % type(_error_obj).__name__
+                )
+
+        # 过期刷新
+        time.sleep(0.25)
+        self.assertEqual(_cache.get('app'), ('app', 'secret_3'))
+        _cache.invalidate('app')
+        self.assertEqual(_cache.get('app'), ('app', 'secret_4'))
+
+    def test_nonce(self):
+        _store = NonceStore(window=0.1, max_size=3)
+        self.assertTrue(_store.check_and_add('app', 'n1'))
+        self.assertFalse(_store.check_and_add('app', 'n1'))
+        self.assertTrue(_store.check_and_add('app2', 'n1'))
+        time.sleep(0.15)
+        self.assertTrue(_store.check_and_add('app', 'n1'))
+        for _i in range(5):
+            _store.check_and_add('app', 'x%d' % _i)
+        self.assertEqual(len(_store), 3, 'max size error')
+
+    def test_auth_call(self):
+        _auth = AppKeyAuthTest(secret_cache_ttl=60, nonce_check=True)
+        _auth.apk_generate_key_pair('app1')
+        _msg = _auth.sign({'app_id': 'app1', 'data': 'test'})
+        self.assertEqual(AsyncTools.sync_run_coroutine(_auth._auth_call(_msg)), (True, 200, 'success'))
+
+        # 重放请求
+        _result = AsyncTools.sync_run_coroutine(_auth._auth_call(_msg))
+        self.assertEqual((_result[0], _result[2]['status']), (False, '13009'), 'replay not rejected')
+
+        # 更新密钥后缓存失效
+        _auth.apk_generate_key_pair('app1')
+        _result = AsyncTools.sync_run_coroutine(_auth._auth_call(_auth.sign({'app_id': 'app1', 'data': 'test'})))
+        self.assertTrue(_result[0], 'secret cache not invalidated')
+
+
+if __name__ == '__main__':
+    unittest.main()
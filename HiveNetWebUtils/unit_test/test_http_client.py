@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+测试Http客户端连接
+@module test_http_client
+@file test_http_client.py
+"""
+
+import os
+import sys
+import asyncio
+import threading
+import unittest
+from aiohttp import web
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HiveNetWebUtils.client import AIOHttpClient, HttpClient
+
+
+TEST_PORT = 9521
+
+
+class TestHttpClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 在独立线程中启动测试服务, 登记每个请求的连接端口
+        cls.peers = list()
+
+        async def _echo(request):
+            cls.peers.append(request.transport.get_extra_info('peername')[1])
+            return web.Response(body=await request.read() or b'ok')
+
+        async def _bytes(request):
+            return web.Response(body=b'0123456789' * 10, content_type='application/octet-stream')
+
+        cls.loop = asyncio.new_event_loop()
+        _app = web.Application()
+        _app.router.add_route('*', '/echo', _echo)
+        _app.router.add_get('/bytes', _bytes)
+        cls.runner = web.AppRunner(_app)
+        cls.loop.run_until_complete(cls.runner.setup())
+        cls.loop.run_until_complete(web.TCPSite(cls.runner, '127.0.0.1', TEST_PORT).start())
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.runner.cleanup(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+
+    def setUp(self):
+        self.peers.clear()
+
+    def test_aio_session_pool(self):
+        async def _test():
+            _client = AIOHttpClient({'port': TEST_PORT})
+            for _i in range(3):
+                _result = await _client.call('echo', 'hello %d' % _i, method='POST')
+                self.assertTrue(_result.is_success(), _result.error)
+                self.assertEqual(_result.resp['data'], b'hello %d' % _i)
+
+            # 并发请求
+            _results = await asyncio.gather(*[_client.call('echo') for _ in range(5)])
+            self.assertTrue(all([_result.resp['status'] == 200 for _result in _results]))
+
+            # 分次读取数据
+            _result = await _client.call('bytes', bytes_read_size=30)
+            _data = b''.join([_chunk async for _chunk in _result.resp['data']])
+            self.assertEqual(_data, b'0123456789' * 10)
+
+            _session = _client._get_session()
+            await _client.close()
+            self.assertTrue(_session.closed)
+
+        asyncio.run(_test())
+        # 顺序请求复用同一个连接
+        self.assertEqual(len(set(self.peers[0:3])), 1, 'connection not reused')
+
+    def test_aio_no_session_pool(self):
+        async def _test():
+            _client = AIOHttpClient({'port': TEST_PORT, 'use_session_pool': False})
+            for _ in range(2):
+                _result = await _client.call('echo')
+                self.assertEqual(_result.resp['data'], b'ok')
+
+            _result = await _client.call('bytes', bytes_read_size=30)
+            _data = b''.join([_chunk async for _chunk in _result.resp['data']])
+            self.assertEqual(len(_data), 100)
+            self.assertEqual(len(_client._sessions), 0)
+
+        asyncio.run(_test())
+        self.assertEqual(len(set(self.peers)), 2, 'connection should not reused')
+
+    def test_aio_close(self):
+        async def _test():
+            async with AIOHttpClient({'port': TEST_PORT}) as _client:
+                _result = await _client.call('echo')
+                self.assertEqual(_result.resp['data'], b'ok')
+                _session = _client._get_session()
+
+            self.assertTrue(_session.closed, 'session not closed by async with')
+            self.assertEqual(len(_client._sessions), 0)
+
+            # 未关闭的会话在析构时只记录告警, 不自动关闭
+            _client = AIOHttpClient({'port': TEST_PORT})
+            await _client.call('echo')
+            _session = _client._get_session()
+            with self.assertLogs('HiveNetWebUtils.client', level='WARNING'):
+                _client.__del__()
+            self.assertFalse(_session.closed, 'session should not closed by __del__')
+            await _client.close()
+
+        asyncio.run(_test())
+
+    def test_sync_client(self):
+        with HttpClient({'port': TEST_PORT, 'conn_limit_per_host': 2}) as _client:
+            for _ in range(3):
+                _result = _client.call('echo', {'a': 1}, method='POST')
+                self.assertTrue(_result.is_success(), _result.error)
+                self.assertEqual(_result.resp['data'], b'{"a": 1}')
+
+            _result = _client.call('bytes', bytes_read_size=40)
+            self.assertEqual([len(_chunk) for _chunk in _result.resp['data']], [40, 40, 20])
+
+            # 连接失败
+            _result = _client.call('http://127.0.0.1:1/echo', timeout=2)
+            self.assertFalse(_result.is_success())
+
+        self.assertEqual(len(set(self.peers)), 1, 'connection not reused')
+        self.assertEqual(len(_client._sessions), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
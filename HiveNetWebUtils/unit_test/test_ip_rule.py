@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+测试IP名单规则匹配
+@module test_ip_rule
+@file test_ip_rule.py
+"""
+
+import os
+import sys
+import unittest
+# 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+from HiveNetWebUtils.utils.ip_rule import IPRuleTable
+from HiveNetWebUtils.auth import IPAuth
+
+
+class TestIPRule(unittest.TestCase):
+
+    def test_match(self):
+        _table = IPRuleTable([
+            '10.1.1.1', '127.0.*.*', '138.*', '192.168.0.0/16', '192.168.3.0/24',
+            '2001:db8::/32', '*.0.0.1', '10.2.1*.1', 'localhost'
+        ])
+        _cases = [
+            ('10.1.1.1', True), ('10.1.1.2', False),
+            ('127.0.3.4', True), ('127.1.0.1', False),
+            ('138.255.0.1', True), ('139.0.0.2', False),
+            ('192.168.200.1', True), ('192.169.0.1', False),
+            ('2001:db8:1::1', True), ('2001:db9::1', False),
+            ('::ffff:127.0.0.8', True),
+            ('11.0.0.1', True),  # 正则表达式规则
+            ('10.2.15.1', True), ('10.2.25.1', False),
+            ('localhost', True), ('unknown', False)
+        ]
+        for _ip, _expect in _cases * 2:  # 第二次为缓存结果
+            self.assertEqual(_table.match(_ip), _expect, 'match [%s] error' % _ip)
+
+    def test_update(self):
+        _table = IPRuleTable(['10.0.0.0/8', '10.1.1.1'])
+        self.assertTrue(_table.match('10.1.1.1'))
+        _table.remove('10.0.0.0/8')
+        self.assertEqual(_table.rules, ['10.1.1.1'])
+        self.assertFalse(_table.match('10.2.0.1'), 'cache not reset')
+        self.assertTrue(_table.match('10.1.1.1'))
+        _table.reload(['172.16.*.*'])
+        self.assertEqual((_table.match('10.1.1.1'), _table.match('172.16.0.1')), (False, True))
+        _table.clear()
+        self.assertEqual((len(_table), _table.match('172.16.0.1')), (0, False))
+
+    def test_ip_auth(self):
+        _auth = IPAuth(init_blacklist=['10.1.*.*'], init_whitelist=['10.0.0.0/8'])
+        self.assertTrue(_auth.verify_whitelist('10.1.2.3'))
+        self.assertTrue(_auth.verify_blacklist('10.1.2.3'))
+        self.assertFalse(_auth.verify_blacklist('10.2.2.3'))
+        _auth.reload_blacklist(['10.2.0.0/16'])
+        self.assertEqual((_auth.verify_blacklist('10.1.2.3'), _auth.verify_blacklist('10.2.2.3')), (False, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
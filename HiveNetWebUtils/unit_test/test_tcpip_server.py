@@ -11,20 +11,27 @@ import os
 import sys
 import time
 import json
+import zlib
+import socket
 import unittest
-from HiveNetCore.generic import CResult
+import threading
+from HiveNetCore.generic import CResult, NullObj
 from HiveNetCore.utils.run_tool import AsyncTools
 from HiveNetCore.utils.net_tool import NetTool
 from HiveNetCore.utils.test_tool import TestTool
 # 根据当前文件路径将包路径纳入，在非安装的情况下可以引用到
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 from HiveNetWebUtils.server import TcpIpServer
-from HiveNetWebUtils.utils.socket import SocketTool
+from HiveNetWebUtils.utils.socket import SocketTool, SocketFrameReader
 
 # 开启异步事件嵌套执行支持
 AsyncTools.nest_asyncio_apply()
 
 
+# 解压后远大于压缩前的报文数据
+ZLIB_BOMB = zlib.compress(b'0' * 10000000)
+
+
 #############################
 # 生命周期函数
 #############################
@@ -205,6 +212,244 @@ class TestTcpIpServer(unittest.TestCase):
             msg='%s error: %s' % (_tips, str(_result))
         )
 
+        _tips = '测试thread模式默认不限制报文长度'
+        _msg = {
+            'head': {'uri': 'no_exists_uri'},
+            'msg': 'a' * (17 * 1024 * 1024)
+        }
+        _result = self.send_msg(_msg)
+        self.assertTrue(
+            _result.is_success() and _result.data['request'] == _msg,
+            msg='%s error: %s' % (_tips, str(_result)[0: 200])
+        )
+
+
+class TestTcpIpServerSelector(unittest.TestCase):
+    """
+    测试事件驱动(selector)模式的TcpIpServer
+    """
+    # 测试用的工具函数
+    @classmethod
+    def send_and_recv(cls, net_info, msg: dict, compress_size: int = 0) -> CResult:
+        """
+        在已有连接上发送消息并接收返回值
+        """
+        _send_data = json.dumps(msg, ensure_ascii=False).encode(encoding='utf-8')
+        _result = AsyncTools.sync_run_coroutine(
+            SocketTool.send_frame(net_info, _send_data, {'compress_size': compress_size})
+        )
+        if not _result.is_success():
+            return _result
+
+        _result = AsyncTools.sync_run_coroutine(
+            SocketTool.recv_frame(net_info)
+        )
+        if _result.is_success():
+            _result.data = json.loads(_result.data)
+
+        return _result
+
+    # 整个Test类的开始和结束执行
+    @classmethod
+    def setUpClass(cls):
+        """
+        启动测试类执行的初始化, 只执行一次
+        """
+        # 创建服务, 使用较小的接收缓存以测试缓存扩展
+        cls.server = TcpIpServer(
+            'test_tcpip_selector', {
+                'ip': '127.0.0.1', 'port': 9513, 'server_mode': 'selector',
+                'workers': 4, 'max_connect': 5, 'recv_buffer_size': 64, 'compress_size': 1024,
+                'max_frame_size': 65536
+            },
+            match_service_uri_func=match_service_uri_func
+        )
+
+        # 添加服务
+        AsyncTools.sync_run_coroutine(cls.server.add_service(
+            '', common_service
+        ))  # 通用服务
+
+        # 启动服务
+        _result = AsyncTools.sync_run_coroutine(
+            cls.server.start(is_asyn=True)
+        )
+        if not _result.is_success():
+            print('start server error: %s' % str(_result))
+            raise RuntimeError()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        结束测试类执行的销毁, 只执行一次
+        """
+        AsyncTools.sync_run_coroutine(cls.server.stop())
+
+    def test_keep_alive(self):
+        _result = AsyncTools.sync_run_coroutine(
+            SocketTool.connect(connect_config={'ip': '127.0.0.1', 'port': 9513})
+        )
+        self.assertTrue(_result.is_success(), msg='connect error: %s' % str(_result))
+        _net_info = _result.net_info
+
+        try:
+            _tips = '测试同一连接发送多个请求'
+            for _i in range(5):
+                _msg = {
+                    'head': {'uri': 'no_exists_uri'},
+                    'msg': 'test keep alive %d' % _i
+                }
+                _expect_resp = {
+                    'name': 'common_service', 'service_uri': 'no_exists_uri', 'request': _msg
+                }
+                _result = self.send_and_recv(_net_info, _msg)
+                self.assertTrue(
+                    _result.is_success() and TestTool.cmp_dict(_result.data, _expect_resp),
+                    msg='%s [%d] error: %s' % (_tips, _i, str(_result))
+                )
+
+            _tips = '测试超过接收缓存大小的请求(返回压缩报文)'
+            _msg = {
+                'head': {'uri': 'no_exists_uri'},
+                'msg': 'big message ' * 1000
+            }
+            _expect_resp = {
+                'name': 'common_service', 'service_uri': 'no_exists_uri', 'request': _msg
+            }
+            _result = self.send_and_recv(_net_info, _msg)
+            self.assertTrue(
+                _result.is_success() and TestTool.cmp_dict(_result.data, _expect_resp),
+                msg='%s error: %s' % (_tips, str(_result))
+            )
+
+            _tips = '测试发送压缩报文'
+            _result = self.send_and_recv(_net_info, _msg, compress_size=1024)
+            self.assertTrue(
+                _result.is_success() and TestTool.cmp_dict(_result.data, _expect_resp),
+                msg='%s error: %s' % (_tips, str(_result))
+            )
+        finally:
+            AsyncTools.sync_run_coroutine(SocketTool.close(_net_info))
+
+    def test_max_frame_size(self):
+        for _tips, _send_data in (
+            ('测试报文头声明超过限制的长度', SocketTool.pack_frame_head(1 << 30)),
+            ('测试解压后超过限制的压缩报文', SocketTool.pack_frame_head(len(ZLIB_BOMB), True) + ZLIB_BOMB)
+        ):
+            _result = AsyncTools.sync_run_coroutine(
+                SocketTool.connect(connect_config={'ip': '127.0.0.1', 'port': 9513})
+            )
+            self.assertTrue(_result.is_success(), msg='connect error: %s' % str(_result))
+            _net_info = _result.net_info
+            try:
+                # 服务端直接关闭连接
+                _net_info.csocket.sendall(_send_data)
+                _result = AsyncTools.sync_run_coroutine(
+                    SocketTool.recv_frame(_net_info, {'overtime': 5})
+                )
+                self.assertTrue(
+                    _result.code == '20403' and len(_result.data) == 0, msg='%s error: %s' % (_tips, str(_result))
+                )
+            finally:
+                AsyncTools.sync_run_coroutine(SocketTool.close(_net_info))
+
+        _tips = '测试超过限制后服务仍可正常处理请求'
+        _result = AsyncTools.sync_run_coroutine(
+            SocketTool.connect(connect_config={'ip': '127.0.0.1', 'port': 9513})
+        )
+        _net_info = _result.net_info
+        try:
+            _msg = {'head': {'uri': 'no_exists_uri'}, 'msg': 'after max frame size'}
+            _result = self.send_and_recv(_net_info, _msg)
+            self.assertTrue(
+                _result.is_success() and _result.data['request'] == _msg, msg='%s error: %s' % (_tips, str(_result))
+            )
+        finally:
+            AsyncTools.sync_run_coroutine(SocketTool.close(_net_info))
+
+
+class TestSocketFrame(unittest.TestCase):
+    """
+    测试报文帧的接收限制
+    """
+
+    def setUp(self):
+        self.sock_send, self.sock_recv = socket.socketpair()
+        self.sock_recv.setblocking(False)
+        self.net_info = NullObj()
+        self.net_info.csocket = self.sock_recv
+        self.net_info.recv_timeout = 1.0
+
+    def tearDown(self):
+        self.sock_send.close()
+        self.sock_recv.close()
+
+    def send_async(self, data: bytes):
+        """
+        在独立线程中发送数据, 避免超过socket缓冲区大小时阻塞
+        """
+        _thread = threading.Thread(target=self.sock_send.sendall, args=(data, ), daemon=True)
+        _thread.start()
+
+    def test_recv_frame(self):
+        _tips = '测试按数据到达扩展缓存'
+        _data = os.urandom(300000)
+        self.sock_send.sendall(SocketTool.pack_frame_head(len(_data)))
+        self.sock_send.sendall(_data[0: 100000])
+        _result = SocketTool.recv_frame(self.net_info, {'overtime': 0.5, 'max_len': 1000000})
+        self.assertTrue(
+            _result.code == '20403' and len(_result.data) == 100000, msg='%s error: %s' % (_tips, str(_result))
+        )
+        self.send_async(SocketTool.pack_frame_head(len(_data)) + _data)
+        _result = SocketTool.recv_frame(self.net_info, {'max_len': 1000000})
+        self.assertTrue(_result.is_success() and _result.data == _data, msg='%s error: %s' % (_tips, str(_result)))
+
+        _tips = '测试报文头声明超过限制的长度'
+        self.sock_send.sendall(SocketTool.pack_frame_head(1 << 30))
+        _result = SocketTool.recv_frame(self.net_info, {'max_len': 1000000})
+        self.assertTrue(_result.code == '20405', msg='%s error: %s' % (_tips, str(_result)))
+
+        _tips = '测试解压后超过限制的压缩报文'
+        self.sock_send.sendall(SocketTool.pack_frame_head(len(ZLIB_BOMB), True) + ZLIB_BOMB)
+        _result = SocketTool.recv_frame(self.net_info, {'max_len': 1000000})
+        self.assertTrue(_result.code == '20405' and _result.data is None, msg='%s error: %s' % (_tips, str(_result)))
+
+    def test_frame_reader(self):
+        _tips = '测试报文帧读取对象按数据到达扩展缓存'
+        _reader = SocketFrameReader(buffer_size=64, max_len=1000000)
+        _data = os.urandom(300000)
+        self.sock_send.sendall(SocketTool.pack_frame_head(len(_data)) + _data[0: 1000])
+        _frame = None
+        while _frame is None:
+            try:
+                _reader.recv_from(self.sock_recv)
+            except BlockingIOError:
+                time.sleep(0.01)
+                continue
+            _frame = _reader.get_frame()
+            if _reader._pos == 1004:
+                # 只分配已接收数据需要的缓存
+                self.assertTrue(len(_reader._buffer) <= 2048, msg='%s error: %d' % (_tips, len(_reader._buffer)))
+                self.send_async(_data[1000:])
+        self.assertTrue(_frame == _data, msg='%s error' % _tips)
+
+        _tips = '测试报文帧读取对象的长度限制'
+        self.sock_send.sendall(SocketTool.pack_frame_head(1 << 30))
+        time.sleep(0.1)
+        _reader.recv_from(self.sock_recv)
+        with self.assertRaises(OverflowError, msg=_tips):
+            _reader.get_frame()
+        self.assertTrue(len(_reader._buffer) <= 2048, msg='%s error: %d' % (_tips, len(_reader._buffer)))
+
+        _tips = '测试报文帧读取对象解压后的长度限制'
+        _reader = SocketFrameReader(buffer_size=64, max_len=1000000)
+        self.sock_send.sendall(SocketTool.pack_frame_head(len(ZLIB_BOMB), True) + ZLIB_BOMB)
+        with self.assertRaises(OverflowError, msg=_tips):
+            while _reader.get_frame() is None:
+                time.sleep(0.01)
+                _reader.recv_from(self.sock_recv)
+        _reader.close()
+
 
 if __name__ == '__main__':
     # 当程序自己独立运行时执行的操作